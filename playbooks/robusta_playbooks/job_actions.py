@@ -22,6 +22,7 @@ from robusta.api import (
     get_resource_events_table,
     to_kubernetes_name,
 )
+from robusta.core.model.env_vars import POD_LOGS_ENRICHMENT_MAX_BYTES
 from robusta.core.reporting.base import EnrichmentType
 from robusta.integrations.kubernetes.api_client_utils import wait_until_job_complete
 
@@ -122,7 +123,8 @@ def alert_handling_job(event: PrometheusKubernetesAlert, params: JobParams):
                 job.to_dict(), cls=RobustaJob
             )  # temporary workaround for https://github.com/haxsaw/hikaru/issues/15
             pod = job.get_single_pod()
-            event.add_enrichment([FileBlock("job-runner-logs.txt", pod.get_logs())])
+            logs = pod.get_log_contents(max_bytes=POD_LOGS_ENRICHMENT_MAX_BYTES)
+            event.add_enrichment([FileBlock("job-runner-logs.txt", logs or b"")])
         except Exception as e:
             if str(e) != "Failed to reach wait condition":
                 warning_msg = f"Error running Job: {e}"
@@ -232,15 +234,16 @@ def job_pod_enricher(event: JobEvent, params: JobPodEnricherParams):
         regex_replacement_style = (
             RegexReplacementStyle[params.regex_replacement_style] if params.regex_replacement_style else None
         )
-        log_data = pod.get_logs(
+        log_data = pod.get_log_contents(
             regex_replacer_patterns=params.regex_replacer_patterns,
             regex_replacement_style=regex_replacement_style,
             filter_regex=params.filter_regex,
             previous=params.previous,
+            max_bytes=POD_LOGS_ENRICHMENT_MAX_BYTES,
         )
         if log_data:
             event.add_enrichment(
-                [FileBlock(filename=f"{pod.metadata.name}.log", contents=log_data.encode())],
+                [FileBlock(filename=f"{pod.metadata.name}.log", contents=log_data)],
             )
 
 
@@ -1,10 +1,14 @@
 import logging
+import multiprocessing
 import os
+import queue
+import signal
 import threading
 import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from concurrent.futures.process import BrokenProcessPool, ProcessPoolExecutor
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import dpath.util
 import prometheus_client
 from hikaru.model.rel_1_26 import (
@@ -28,11 +32,13 @@ from kubernetes.client import (
     V1DeploymentList,
     V1Job,
     V1JobList,
+    V1Node,
     V1NodeList,
     V1ObjectMeta,
     V1Pod,
     V1PodList,
     V1PodTemplateSpec,
+    V1ReplicaSet,
     V1ReplicaSetList,
     V1StatefulSet,
     V1StatefulSetList,
@@ -46,6 +52,7 @@ from robusta.core.model.env_vars import (
     ARGO_ROLLOUTS,
     DISABLE_HELM_MONITORING,
     DISCOVERY_BATCH_SIZE,
+    DISCOVERY_CONCURRENCY,
     DISCOVERY_MAX_BATCHES,
     DISCOVERY_POD_OWNED_PODS,
     DISCOVERY_PROCESS_TIMEOUT_SEC,
@@ -70,6 +77,16 @@ discovery_process_time = prometheus_client.Summary(
     "discovery_process_time",
     "Total discovery process time (seconds)",
 )
+discovery_kind_process_time = prometheus_client.Summary(
+    "discovery_kind_process_time",
+    "Time spent listing each resource kind in the discovery process (seconds)",
+    ["kind"],
+)
+
+
+class DiscoveryBatch(BaseModel):
+    services: List[ServiceInfo] = []
+    jobs: List[JobInfo] = []
 
 
 class DiscoveryResults(BaseModel):
@@ -81,13 +98,34 @@ class DiscoveryResults(BaseModel):
     helm_releases: List[HelmRelease] = []
     pods_running_count: int = 0
     openshift_groups: List[OpenshiftGroup] = []
+    kind_durations: Dict[str, float] = {}
 
     class Config:
         arbitrary_types_allowed = True
 
 
+class DiscoveryState:
+    """Resources collected while listing the different kinds, and used to build the discovery results"""
+
+    def __init__(self):
+        # map between namespace, to the name and labels of the pods in it. Used to find the pods of each job
+        self.namespace_pods: Dict[str, List[Tuple[str, Dict[str, str]]]] = defaultdict(list)
+        self.node_requests = defaultdict(list)  # map between node name, to request of pods running on it
+        self.pods_running_count = 0
+        self.nodes: List[V1Node] = []
+        self.job_pages: List[List[V1Job]] = []
+        self.openshift_groups: List[OpenshiftGroup] = []
+        self.helm_releases_map: Dict[str, HelmRelease] = {}  # used to pick only the latest release data
+        self.namespaces: List[NamespaceInfo] = []
+        self.kind_durations: Dict[str, float] = defaultdict(float)
+
+
 DISCOVERY_STACKTRACE_FILE = "/tmp/make_discovery_stacktrace"
 DISCOVERY_STACKTRACE_TIMEOUT_S = int(os.environ.get("DISCOVERY_STACKTRACE_TIMEOUT_S", 10))
+DISCOVERY_OOM_MESSAGE = (
+    "The discovery process was killed, likely due to an Out of Memory error. Refer to the following documentation to "
+    "increase the available memory for the pod robusta-runner: https://docs.robusta.dev/master/help.html"
+)
 KIND_TO_COREV1_METHOD = {
     "pods": "list_pod_for_all_namespaces",
     "configmaps": "list_config_map_for_all_namespaces",
@@ -202,6 +240,30 @@ class Discovery:
             ),
         )
 
+    @staticmethod
+    def create_service_info_from_api_server(
+        kind: str, obj: Union[V1Deployment, V1DaemonSet, V1StatefulSet, V1Pod, V1ReplicaSet]
+    ) -> Optional[ServiceInfo]:
+        """
+        Build the service of a k8s python api object. Returns None for objects that aren't reported as services
+        (finished or owned pods, owned or scaled down replicasets)
+        """
+        if kind == "Pod" and not should_report_pod(obj):
+            return None
+        if kind == "ReplicaSet" and (obj.metadata.owner_references or not obj.spec.replicas):
+            return None
+        return Discovery.__create_service_info(
+            obj.metadata,
+            kind,
+            extract_containers(obj),
+            extract_volumes(obj),
+            extract_total_pods(obj),
+            extract_ready_pods(obj),
+            is_helm_release=is_release_managed_by_helm(
+                annotations=obj.metadata.annotations, labels=obj.metadata.labels
+            ),
+        )
+
     @staticmethod
     def count_resources(kind, api_group, version):
         if not api_group:
@@ -288,495 +350,672 @@ class Discovery:
 
 
     @staticmethod
-    def discovery_process() -> DiscoveryResults:
-        create_monkey_patches()
-        Discovery.stacktrace_thread_active = True
-        threading.Thread(target=Discovery.stack_dump_on_signal, daemon=True).start()
-        pods_metadata: List[V1ObjectMeta] = []
-        node_requests = defaultdict(list)  # map between node name, to request of pods running on it
-        active_services: List[ServiceInfo] = []
-        openshift_groups: List[OpenshiftGroup] = []
+    def __list_custom_crds(state: DiscoveryState) -> Iterator[DiscoveryBatch]:
         continue_ref: Optional[str] = None
-        # discover micro services
+        for cls_name in CUSTOM_CRD:
+            if (cls := CRDS_map.get(cls_name)) is None:
+                continue
 
-        try:
-            for cls_name in CUSTOM_CRD:
-                if (cls := CRDS_map.get(cls_name)) is None:
-                    continue
+            for _ in range(DISCOVERY_MAX_BATCHES):
+                try:
+                    crd_res = client.CustomObjectsApi().list_cluster_custom_object(
+                        group=cls.group,
+                        version=cls.version,
+                        plural=cls.plural,
+                        limit=DISCOVERY_BATCH_SIZE,
+                        _continue=continue_ref,
+                    )
+                except Exception:
+                    logging.exception(msg=f"Failed to list {cls.name} from api.")
+                    break
 
-                for _ in range(DISCOVERY_MAX_BATCHES):
+                page_services: List[ServiceInfo] = []
+                for crd in crd_res.get("items", []):
                     try:
-                        crd_res = client.CustomObjectsApi().list_cluster_custom_object(
-                            group=cls.group,
-                            version=cls.version,
-                            plural=cls.plural,
-                            limit=DISCOVERY_BATCH_SIZE,
-                            _continue=continue_ref,
+                        meta = DictToK8sObj(crd.get("metadata"), V1ObjectMeta)
+                        page_services.extend(
+                            [
+                                Discovery.__create_service_info(
+                                    meta=meta,
+                                    kind=cls.name,
+                                    containers=[],
+                                    volumes=[],
+                                    total_pods=dpath.util.get(crd, cls.total_pods_path, default=0),
+                                    ready_pods=dpath.util.get(crd, cls.ready_pods_path, default=0),
+                                    is_helm_release=is_release_managed_by_helm(
+                                        annotations=meta.annotations, labels=meta.labels
+                                    ),
+                                )
+                            ]
                         )
                     except Exception:
-                        logging.exception(msg=f"Failed to list {cls.name} from api.")
-                        break
-
-                    for crd in crd_res.get("items", []):
-                        try:
-                            meta = DictToK8sObj(crd.get("metadata"), V1ObjectMeta)
-                            active_services.extend(
-                                [
-                                    Discovery.__create_service_info(
-                                        meta=meta,
-                                        kind=cls.name,
-                                        containers=[],
-                                        volumes=[],
-                                        total_pods=dpath.util.get(crd, cls.total_pods_path, default=0),
-                                        ready_pods=dpath.util.get(crd, cls.ready_pods_path, default=0),
-                                        is_helm_release=is_release_managed_by_helm(
-                                            annotations=meta.annotations, labels=meta.labels
-                                        ),
-                                    )
-                                ]
-                            )
-                        except Exception:
-                            logging.exception(msg=f"Failed to parse {cls.name} {crd}")
-                            continue
-
-                    continue_ref = crd_res.get("metadata", {}).get("continue")
-                    if not continue_ref:
-                        break
+                        logging.exception(msg=f"Failed to parse {cls.name} {crd}")
+                        continue
 
-            if IS_OPENSHIFT:
-                for _ in range(DISCOVERY_MAX_BATCHES):
-                    try:
-                        deployconfigs_res = client.CustomObjectsApi().list_cluster_custom_object(
-                            group=DeploymentConfig.group,
-                            version=DeploymentConfig.version,
-                            plural=DeploymentConfig.plural,
-                            limit=DISCOVERY_BATCH_SIZE,
-                            _continue=continue_ref,
-                        )
-                    except Exception:
-                        logging.exception(msg="Failed to list Deployment configs from api.")
-                        break
-
-                    for dc in deployconfigs_res.get("items", []):
-                        try:
-                            meta = DictToK8sObj(dc.get("metadata"), V1ObjectMeta)
-                            spec = dc.get("spec", {})
-                            template = DictToK8sObj(spec.get("template"), V1PodTemplateSpec)
-
-                            active_services.extend(
-                                [
-                                    Discovery.__create_service_info(
-                                        meta=meta,
-                                        kind="DeploymentConfig",
-                                        containers=template.spec.containers,
-                                        volumes=template.spec.volumes,
-                                        total_pods=spec.get("replicas", 1),
-                                        ready_pods=dc.get("status", {}).get("readyReplicas", 0),
-                                        is_helm_release=is_release_managed_by_helm(
-                                            annotations=meta.annotations, labels=meta.labels
-                                        ),
-                                    )
-                                ]
-                            )
-                        except Exception:
-                            logging.exception(msg=f"Failed to parse Deployment config/n {dc}")
-                            continue
+                yield DiscoveryBatch(services=page_services)
+                continue_ref = crd_res.get("metadata", {}).get("continue")
+                if not continue_ref:
+                    break
 
-                    continue_ref = deployconfigs_res.get("metadata", {}).get("continue")
-                    if not continue_ref:
-                        break
+    @staticmethod
+    def __list_deployment_configs(state: DiscoveryState) -> Iterator[DiscoveryBatch]:
+        continue_ref: Optional[str] = None
+        for _ in range(DISCOVERY_MAX_BATCHES):
+            try:
+                deployconfigs_res = client.CustomObjectsApi().list_cluster_custom_object(
+                    group=DeploymentConfig.group,
+                    version=DeploymentConfig.version,
+                    plural=DeploymentConfig.plural,
+                    limit=DISCOVERY_BATCH_SIZE,
+                    _continue=continue_ref,
+                )
+            except Exception:
+                logging.exception(msg="Failed to list Deployment configs from api.")
+                break
 
-            if OPENSHIFT_GROUPS:
-                groupname_to_namespaces = defaultdict(list)
+            page_services: List[ServiceInfo] = []
+            for dc in deployconfigs_res.get("items", []):
                 try:
-                    role_bindings = client.RbacAuthorizationV1Api().list_role_binding_for_all_namespaces()
-                    for role_binding in role_bindings.items:
-                        ns = role_binding.metadata.namespace
+                    meta = DictToK8sObj(dc.get("metadata"), V1ObjectMeta)
+                    spec = dc.get("spec", {})
+                    template = DictToK8sObj(spec.get("template"), V1PodTemplateSpec)
 
-                        if not role_binding.subjects:
-                            logging.info(f"Skipping role binding: {role_binding.metadata.name} in ns: {role_binding.metadata.namespace}")
-                            continue
+                    page_services.extend(
+                        [
+                            Discovery.__create_service_info(
+                                meta=meta,
+                                kind="DeploymentConfig",
+                                containers=template.spec.containers,
+                                volumes=template.spec.volumes,
+                                total_pods=spec.get("replicas", 1),
+                                ready_pods=dc.get("status", {}).get("readyReplicas", 0),
+                                is_helm_release=is_release_managed_by_helm(
+                                    annotations=meta.annotations, labels=meta.labels
+                                ),
+                            )
+                        ]
+                    )
+                except Exception:
+                    logging.exception(msg=f"Failed to parse Deployment config/n {dc}")
+                    continue
 
-                        for subject in role_binding.subjects:
-                            if subject.kind == "Group":
-                                groupname_to_namespaces[subject.name].append(ns)
+            yield DiscoveryBatch(services=page_services)
+            continue_ref = deployconfigs_res.get("metadata", {}).get("continue")
+            if not continue_ref:
+                break
 
-                except Exception:
-                    logging.exception(msg="Failed to build Openshift rolebinding to groups map.")
+    @staticmethod
+    def __list_openshift_groups(state: DiscoveryState) -> List[DiscoveryBatch]:
+        continue_ref: Optional[str] = None
+        groupname_to_namespaces = defaultdict(list)
+        try:
+            role_bindings = client.RbacAuthorizationV1Api().list_role_binding_for_all_namespaces()
+            for role_binding in role_bindings.items:
+                ns = role_binding.metadata.namespace
 
-                for _ in range(DISCOVERY_MAX_BATCHES):
-                    try:
-                        os_groups = client.CustomObjectsApi().list_cluster_custom_object(
-                            group="user.openshift.io",
-                            version="v1",
-                            plural="groups",
-                            limit=DISCOVERY_BATCH_SIZE,
-                            _continue=continue_ref,
-                        )
-                    except Exception:
-                        logging.exception(msg="Failed to list Openshift groups from api.")
-                        break
-
-                    for os_group in os_groups.get("items", []):
-                        try:
-                            meta = os_group.get("metadata", {})
-                            name = meta.get("name")
-                            openshift_groups.extend(
-                                [
-                                    OpenshiftGroup(
-                                        name=name,
-                                        users=os_group.get("users", []) or [],
-                                        namespaces=groupname_to_namespaces.get(name, []),
-                                        labels=meta.get("labels"),
-                                        annotations=meta.get("annotations"),
-                                        resource_version=meta.get("resourceVersion"),
-                                    )
-                                ]
-                            )
-                        except Exception:
-                            logging.exception(msg=f"Failed to parse Openshift Group/n {os_group}")
-                            continue
-
-                    continue_ref = os_groups.get("metadata", {}).get("continue")
-                    if not continue_ref:
-                        break
-            # rollouts.
-            continue_ref = None
-            if ARGO_ROLLOUTS:
-                for _ in range(DISCOVERY_MAX_BATCHES):
-                    try:
-                        rollouts_res = client.CustomObjectsApi().list_cluster_custom_object(
-                            group=Rollout.group,
-                            version=Rollout.version,
-                            plural=Rollout.plural,
-                            limit=DISCOVERY_BATCH_SIZE,
-                            _continue=continue_ref,
-                        )
-                    except Exception:
-                        logging.exception(msg="Failed to list Argo Rollouts from api.")
-                        break
-
-                    for ro in rollouts_res.get("items", []):
-                        try:
-                            meta = DictToK8sObj(ro.get("metadata"), V1ObjectMeta)
-                            spec = ro.get("spec", {})
-                            template = DictToK8sObj(spec.get("template"), V1PodTemplateSpec)
-                            status = ro.get("status", {})
-
-                            active_services.extend(
-                                [
-                                    Discovery.__create_service_info(
-                                        meta=meta,
-                                        kind=Rollout.kind,
-                                        containers=template.spec.containers if template else [],
-                                        volumes=template.spec.volumes if template else [],
-                                        total_pods=status.get("replicas", 1),
-                                        ready_pods=status.get("readyReplicas", 0),
-                                        is_helm_release=is_release_managed_by_helm(
-                                            annotations=meta.annotations, labels=meta.labels
-                                        ),
-                                    )
-                                ]
-                            )
-                        except Exception:
-                            logging.exception(msg=f"Failed to parse Rollout/n {ro}")
-                            continue
+                if not role_binding.subjects:
+                    logging.info(f"Skipping role binding: {role_binding.metadata.name} in ns: {role_binding.metadata.namespace}")
+                    continue
 
-                    continue_ref = rollouts_res.get("metadata", {}).get("continue")
-                    if not continue_ref:
-                        break
+                for subject in role_binding.subjects:
+                    if subject.kind == "Group":
+                        groupname_to_namespaces[subject.name].append(ns)
 
-            # discover deployments
-            # using k8s api `continue` to load in batches
-            continue_ref = None
-            for _ in range(DISCOVERY_MAX_BATCHES):
-                deployments: V1DeploymentList = client.AppsV1Api().list_deployment_for_all_namespaces(
-                    limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref
-                )
-                active_services.extend(
-                    [
-                        Discovery.__create_service_info(
-                            deployment.metadata,
-                            "Deployment",
-                            extract_containers(deployment),
-                            extract_volumes(deployment),
-                            extract_total_pods(deployment),
-                            extract_ready_pods(deployment),
-                            is_helm_release=is_release_managed_by_helm(
-                                annotations=deployment.metadata.annotations, labels=deployment.metadata.labels
-                            ),
-                        )
-                        for deployment in deployments.items
-                    ]
-                )
-                continue_ref = deployments.metadata._continue
-                if not continue_ref:
-                    break
+        except Exception:
+            logging.exception(msg="Failed to build Openshift rolebinding to groups map.")
 
-            # discover statefulsets
-            continue_ref = None
-            for _ in range(DISCOVERY_MAX_BATCHES):
-                statefulsets: V1StatefulSetList = client.AppsV1Api().list_stateful_set_for_all_namespaces(
-                    limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref
-                )
-                active_services.extend(
-                    [
-                        Discovery.__create_service_info(
-                            statefulset.metadata,
-                            "StatefulSet",
-                            extract_containers(statefulset),
-                            extract_volumes(statefulset),
-                            extract_total_pods(statefulset),
-                            extract_ready_pods(statefulset),
-                            is_helm_release=is_release_managed_by_helm(
-                                annotations=statefulset.metadata.annotations, labels=statefulset.metadata.labels
-                            ),
-                        )
-                        for statefulset in statefulsets.items
-                    ]
+        for _ in range(DISCOVERY_MAX_BATCHES):
+            try:
+                os_groups = client.CustomObjectsApi().list_cluster_custom_object(
+                    group="user.openshift.io",
+                    version="v1",
+                    plural="groups",
+                    limit=DISCOVERY_BATCH_SIZE,
+                    _continue=continue_ref,
                 )
-                continue_ref = statefulsets.metadata._continue
-                if not continue_ref:
-                    break
+            except Exception:
+                logging.exception(msg="Failed to list Openshift groups from api.")
+                break
 
-            # discover daemonsets
-            continue_ref = None
-            for _ in range(DISCOVERY_MAX_BATCHES):
-                daemonsets: V1DaemonSetList = client.AppsV1Api().list_daemon_set_for_all_namespaces(
-                    limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref
-                )
-                active_services.extend(
-                    [
-                        Discovery.__create_service_info(
-                            daemonset.metadata,
-                            "DaemonSet",
-                            extract_containers(daemonset),
-                            extract_volumes(daemonset),
-                            extract_total_pods(daemonset),
-                            extract_ready_pods(daemonset),
-                            is_helm_release=is_release_managed_by_helm(
-                                annotations=daemonset.metadata.annotations, labels=daemonset.metadata.labels
-                            ),
-                        )
-                        for daemonset in daemonsets.items
-                    ]
-                )
-                continue_ref = daemonsets.metadata._continue
-                if not continue_ref:
-                    break
+            for os_group in os_groups.get("items", []):
+                try:
+                    meta = os_group.get("metadata", {})
+                    name = meta.get("name")
+                    state.openshift_groups.extend(
+                        [
+                            OpenshiftGroup(
+                                name=name,
+                                users=os_group.get("users", []) or [],
+                                namespaces=groupname_to_namespaces.get(name, []),
+                                labels=meta.get("labels"),
+                                annotations=meta.get("annotations"),
+                                resource_version=meta.get("resourceVersion"),
+                            )
+                        ]
+                    )
+                except Exception:
+                    logging.exception(msg=f"Failed to parse Openshift Group/n {os_group}")
+                    continue
 
-            # discover replicasets
-            continue_ref = None
-            for _ in range(DISCOVERY_MAX_BATCHES):
-                replicasets: V1ReplicaSetList = client.AppsV1Api().list_replica_set_for_all_namespaces(
-                    limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref
-                )
-                active_services.extend(
-                    [
-                        Discovery.__create_service_info(
-                            replicaset.metadata,
-                            "ReplicaSet",
-                            extract_containers(replicaset),
-                            extract_volumes(replicaset),
-                            extract_total_pods(replicaset),
-                            extract_ready_pods(replicaset),
-                            is_helm_release=is_release_managed_by_helm(
-                                annotations=replicaset.metadata.annotations, labels=replicaset.metadata.labels
-                            ),
-                        )
-                        for replicaset in replicasets.items
-                        if not replicaset.metadata.owner_references and replicaset.spec.replicas > 0
-                    ]
-                )
-                continue_ref = replicasets.metadata._continue
-                if not continue_ref:
-                    break
+            continue_ref = os_groups.get("metadata", {}).get("continue")
+            if not continue_ref:
+                break
+        return []
 
-            # discover pods
-            continue_ref = None
-            pods_running_count = 0
-            for _ in range(DISCOVERY_MAX_BATCHES):
-                pods: V1PodList = client.CoreV1Api().list_pod_for_all_namespaces(
-                    limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref
+    @staticmethod
+    def __list_rollouts(state: DiscoveryState) -> Iterator[DiscoveryBatch]:
+        continue_ref: Optional[str] = None
+        for _ in range(DISCOVERY_MAX_BATCHES):
+            try:
+                rollouts_res = client.CustomObjectsApi().list_cluster_custom_object(
+                    group=Rollout.group,
+                    version=Rollout.version,
+                    plural=Rollout.plural,
+                    limit=DISCOVERY_BATCH_SIZE,
+                    _continue=continue_ref,
                 )
-                for pod in pods.items:
-                    pods_metadata.append(pod.metadata)
-                    if should_report_pod(pod):
-                        active_services.append(
+            except Exception:
+                logging.exception(msg="Failed to list Argo Rollouts from api.")
+                break
+
+            page_services: List[ServiceInfo] = []
+            for ro in rollouts_res.get("items", []):
+                try:
+                    meta = DictToK8sObj(ro.get("metadata"), V1ObjectMeta)
+                    spec = ro.get("spec", {})
+                    template = DictToK8sObj(spec.get("template"), V1PodTemplateSpec)
+                    status = ro.get("status", {})
+
+                    page_services.extend(
+                        [
                             Discovery.__create_service_info(
-                                pod.metadata,
-                                "Pod",
-                                extract_containers(pod),
-                                extract_volumes(pod),
-                                extract_total_pods(pod),
-                                extract_ready_pods(pod),
+                                meta=meta,
+                                kind=Rollout.kind,
+                                containers=template.spec.containers if template else [],
+                                volumes=template.spec.volumes if template else [],
+                                total_pods=status.get("replicas", 1),
+                                ready_pods=status.get("readyReplicas", 0),
                                 is_helm_release=is_release_managed_by_helm(
-                                    annotations=pod.metadata.annotations, labels=pod.metadata.labels
+                                    annotations=meta.annotations, labels=meta.labels
                                 ),
                             )
-                        )
+                        ]
+                    )
+                except Exception:
+                    logging.exception(msg=f"Failed to parse Rollout/n {ro}")
+                    continue
 
-                    pod_status = pod.status.phase
-                    if pod_status in ["Running", "Unknown", "Pending"] and pod.spec.node_name:
-                        node_requests[pod.spec.node_name].append(utils.k8s_pod_requests(pod))
-                    if pod_status == "Running":
-                        pods_running_count += 1
+            yield DiscoveryBatch(services=page_services)
+            continue_ref = rollouts_res.get("metadata", {}).get("continue")
+            if not continue_ref:
+                break
 
-                continue_ref = pods.metadata._continue
-                if not continue_ref:
-                    break
+    @staticmethod
+    def __list_deployments(state: DiscoveryState) -> Iterator[DiscoveryBatch]:
+        # using k8s api `continue` to load in batches
+        continue_ref = None
+        for _ in range(DISCOVERY_MAX_BATCHES):
+            deployments: V1DeploymentList = client.AppsV1Api().list_deployment_for_all_namespaces(
+                limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref
+            )
+            yield DiscoveryBatch(
+                services=[
+                    Discovery.__create_service_info(
+                        deployment.metadata,
+                        "Deployment",
+                        extract_containers(deployment),
+                        extract_volumes(deployment),
+                        extract_total_pods(deployment),
+                        extract_ready_pods(deployment),
+                        is_helm_release=is_release_managed_by_helm(
+                            annotations=deployment.metadata.annotations, labels=deployment.metadata.labels
+                        ),
+                    )
+                    for deployment in deployments.items
+                ]
+            )
+            continue_ref = deployments.metadata._continue
+            if not continue_ref:
+                break
 
-        except Exception as e:
-            logging.error(
-                "Failed to run periodic service discovery",
-                exc_info=True,
+    @staticmethod
+    def __list_statefulsets(state: DiscoveryState) -> Iterator[DiscoveryBatch]:
+        continue_ref = None
+        for _ in range(DISCOVERY_MAX_BATCHES):
+            statefulsets: V1StatefulSetList = client.AppsV1Api().list_stateful_set_for_all_namespaces(
+                limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref
             )
-            raise e
+            yield DiscoveryBatch(
+                services=[
+                    Discovery.__create_service_info(
+                        statefulset.metadata,
+                        "StatefulSet",
+                        extract_containers(statefulset),
+                        extract_volumes(statefulset),
+                        extract_total_pods(statefulset),
+                        extract_ready_pods(statefulset),
+                        is_helm_release=is_release_managed_by_helm(
+                            annotations=statefulset.metadata.annotations, labels=statefulset.metadata.labels
+                        ),
+                    )
+                    for statefulset in statefulsets.items
+                ]
+            )
+            continue_ref = statefulsets.metadata._continue
+            if not continue_ref:
+                break
 
-        # discover nodes - no need for batching. Number of nodes is not big enough
-        try:
-            current_nodes: V1NodeList = client.CoreV1Api().list_node()
-            nodes = [utils.from_api_server_node(node, node_requests.get(node.metadata.name, [])) for node in current_nodes.items]
-        except Exception as e:
-            logging.error(
-                "Failed to run periodic nodes discovery",
-                exc_info=True,
+    @staticmethod
+    def __list_daemonsets(state: DiscoveryState) -> Iterator[DiscoveryBatch]:
+        continue_ref = None
+        for _ in range(DISCOVERY_MAX_BATCHES):
+            daemonsets: V1DaemonSetList = client.AppsV1Api().list_daemon_set_for_all_namespaces(
+                limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref
             )
-            raise e
+            yield DiscoveryBatch(
+                services=[
+                    Discovery.__create_service_info(
+                        daemonset.metadata,
+                        "DaemonSet",
+                        extract_containers(daemonset),
+                        extract_volumes(daemonset),
+                        extract_total_pods(daemonset),
+                        extract_ready_pods(daemonset),
+                        is_helm_release=is_release_managed_by_helm(
+                            annotations=daemonset.metadata.annotations, labels=daemonset.metadata.labels
+                        ),
+                    )
+                    for daemonset in daemonsets.items
+                ]
+            )
+            continue_ref = daemonsets.metadata._continue
+            if not continue_ref:
+                break
 
-        # discover jobs
-        active_jobs: List[JobInfo] = []
-        try:
-            continue_ref: Optional[str] = None
-            for _ in range(DISCOVERY_MAX_BATCHES):
-                try:
-                    current_jobs: V1JobList = client.BatchV1Api().list_job_for_all_namespaces(
-                        limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref
+    @staticmethod
+    def __list_replicasets(state: DiscoveryState) -> Iterator[DiscoveryBatch]:
+        continue_ref = None
+        for _ in range(DISCOVERY_MAX_BATCHES):
+            replicasets: V1ReplicaSetList = client.AppsV1Api().list_replica_set_for_all_namespaces(
+                limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref
+            )
+            yield DiscoveryBatch(
+                services=[
+                    Discovery.__create_service_info(
+                        replicaset.metadata,
+                        "ReplicaSet",
+                        extract_containers(replicaset),
+                        extract_volumes(replicaset),
+                        extract_total_pods(replicaset),
+                        extract_ready_pods(replicaset),
+                        is_helm_release=is_release_managed_by_helm(
+                            annotations=replicaset.metadata.annotations, labels=replicaset.metadata.labels
+                        ),
                     )
-                except ApiException as e:
-                    if e.status == 410 and e.body:
-                        # Continue token expired, extract new token from error and continue
-                        import json
-                        error_body = json.loads(e.body)
-                        new_continue_token = error_body.get("metadata", {}).get("continue")
-                        if new_continue_token:
-                            logging.info("Continue token expired for jobs listing. Continuing")
-                            continue_ref = new_continue_token
-                            continue
-                    raise
-
-                for job in current_jobs.items:
-                    job_pods = []
-                    job_labels = {}
-                    if job.spec.selector:
-                        job_labels = job.spec.selector.match_labels
-                    elif job.metadata.labels:
-                        job_name = job.metadata.labels.get("job-name", None)
-                        if job_name:
-                            job_labels = {"job-name": job_name}
-
-                    if job_labels:  # add job pods only if we found a valid selector
-                        job_pods = [
-                            pod_meta.name
-                            for pod_meta in pods_metadata
-                            if (
-                                (job.metadata.namespace == pod_meta.namespace)
-                                and (job_labels.items() <= (pod_meta.labels or {}).items())
-                            )
-                        ]
+                    for replicaset in replicasets.items
+                    if not replicaset.metadata.owner_references and replicaset.spec.replicas > 0
+                ]
+            )
+            continue_ref = replicasets.metadata._continue
+            if not continue_ref:
+                break
 
-                    active_jobs.append(JobInfo.from_api_server(job, job_pods))
+    @staticmethod
+    def __list_pods(state: DiscoveryState) -> Iterator[DiscoveryBatch]:
+        continue_ref = None
+        for _ in range(DISCOVERY_MAX_BATCHES):
+            pods: V1PodList = client.CoreV1Api().list_pod_for_all_namespaces(
+                limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref
+            )
+            page_services: List[ServiceInfo] = []
+            for pod in pods.items:
+                state.namespace_pods[pod.metadata.namespace].append((pod.metadata.name, pod.metadata.labels or {}))
+                if should_report_pod(pod):
+                    page_services.append(
+                        Discovery.__create_service_info(
+                            pod.metadata,
+                            "Pod",
+                            extract_containers(pod),
+                            extract_volumes(pod),
+                            extract_total_pods(pod),
+                            extract_ready_pods(pod),
+                            is_helm_release=is_release_managed_by_helm(
+                                annotations=pod.metadata.annotations, labels=pod.metadata.labels
+                            ),
+                        )
+                    )
 
-                continue_ref = current_jobs.metadata._continue
-                if not continue_ref:
-                    break
+                pod_status = pod.status.phase
+                if pod_status in ["Running", "Unknown", "Pending"] and pod.spec.node_name:
+                    state.node_requests[pod.spec.node_name].append(utils.k8s_pod_requests(pod))
+                if pod_status == "Running":
+                    state.pods_running_count += 1
 
-        except Exception as e:
-            logging.error(
-                "Failed to run periodic jobs discovery",
-                exc_info=True,
-            )
-            raise e
+            yield DiscoveryBatch(services=page_services)
+            continue_ref = pods.metadata._continue
+            if not continue_ref:
+                break
 
-        helm_releases_map: dict[str, HelmRelease] = {}
-        if not DISABLE_HELM_MONITORING:
-            # discover helm state
+    @staticmethod
+    def __list_nodes(state: DiscoveryState) -> List[DiscoveryBatch]:
+        # no need for batching. Number of nodes is not big enough
+        current_nodes: V1NodeList = client.CoreV1Api().list_node()
+        state.nodes = current_nodes.items
+        return []
+
+    @staticmethod
+    def __list_job_pages() -> Iterator[List[V1Job]]:
+        continue_ref: Optional[str] = None
+        for _ in range(DISCOVERY_MAX_BATCHES):
             try:
-                continue_ref: Optional[str] = None
-                for _ in range(DISCOVERY_MAX_BATCHES):
-                    secrets = client.CoreV1Api().list_secret_for_all_namespaces(
-                        label_selector="owner=helm", _continue=continue_ref
-                    )
-                    if not secrets.items:
-                        break
-
-                    for secret_item in secrets.items:
-                        release_data = secret_item.data.get("release", None)
-                        if not release_data:
-                            continue
-
-                        try:
-                            decoded_release_row = HelmRelease.from_api_server(secret_item.data["release"])
-                            # we use map here to deduplicate and pick only the latest release data
-                            helm_releases_map[decoded_release_row.get_service_key()] = decoded_release_row
-                        except Exception as e:
-                            logging.error(f"an error occurred while decoding helm releases: {e}")
-
-                    continue_ref = secrets.metadata._continue
-                    if not continue_ref:
-                        break
-
-            except Exception as e:
-                logging.error(
-                    "Failed to run periodic helm discovery",
-                    exc_info=True,
+                current_jobs: V1JobList = client.BatchV1Api().list_job_for_all_namespaces(
+                    limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref
                 )
-                raise e
+            except ApiException as e:
+                if e.status == 410 and e.body:
+                    # Continue token expired, extract new token from error and continue
+                    import json
+                    error_body = json.loads(e.body)
+                    new_continue_token = error_body.get("metadata", {}).get("continue")
+                    if new_continue_token:
+                        logging.info("Continue token expired for jobs listing. Continuing")
+                        continue_ref = new_continue_token
+                        continue
+                raise
+
+            yield current_jobs.items
+            continue_ref = current_jobs.metadata._continue
+            if not continue_ref:
+                break
 
-        # discover namespaces
-        try:
-            namespaces: List[NamespaceInfo] = [
-                NamespaceInfo.from_api_server(namespace) for namespace in client.CoreV1Api().list_namespace().items
-            ]
-        except Exception as e:
-            logging.error(
-                "Failed to run periodic namespaces discovery",
-                exc_info=True,
+    @staticmethod
+    def __jobs_batch(jobs: List[V1Job], state: DiscoveryState) -> DiscoveryBatch:
+        page_jobs: List[JobInfo] = []
+        for job in jobs:
+            job_pods = []
+            job_labels = job_pod_selector(job)
+            if job_labels:  # add job pods only if we found a valid selector
+                job_pods = [
+                    pod_name
+                    for pod_name, pod_labels in state.namespace_pods.get(job.metadata.namespace, [])
+                    if job_labels.items() <= pod_labels.items()
+                ]
+
+            page_jobs.append(JobInfo.from_api_server(job, job_pods))
+        return DiscoveryBatch(jobs=page_jobs)
+
+    @staticmethod
+    def __list_jobs(state: DiscoveryState) -> Iterator[DiscoveryBatch]:
+        # the pods must be listed before the jobs, to find the pods of each job
+        for page in Discovery.__list_job_pages():
+            yield Discovery.__jobs_batch(page, state)
+
+    @staticmethod
+    def __collect_job_pages(state: DiscoveryState) -> List[DiscoveryBatch]:
+        # the pods of the jobs are matched once all the pods are listed
+        state.job_pages = list(Discovery.__list_job_pages())
+        return []
+
+    @staticmethod
+    def __list_helm_releases(state: DiscoveryState) -> List[DiscoveryBatch]:
+        continue_ref: Optional[str] = None
+        for _ in range(DISCOVERY_MAX_BATCHES):
+            secrets = client.CoreV1Api().list_secret_for_all_namespaces(
+                label_selector="owner=helm", _continue=continue_ref
             )
-            raise e
+            if not secrets.items:
+                break
+
+            for secret_item in secrets.items:
+                release_data = secret_item.data.get("release", None)
+                if not release_data:
+                    continue
+
+                try:
+                    decoded_release_row = HelmRelease.from_api_server(secret_item.data["release"])
+                    # we use map here to deduplicate and pick only the latest release data
+                    state.helm_releases_map[decoded_release_row.get_service_key()] = decoded_release_row
+                except Exception as e:
+                    logging.error(f"an error occurred while decoding helm releases: {e}")
+
+            continue_ref = secrets.metadata._continue
+            if not continue_ref:
+                break
+        return []
+
+    @staticmethod
+    def __list_namespaces(state: DiscoveryState) -> List[DiscoveryBatch]:
+        state.namespaces = [
+            NamespaceInfo.from_api_server(namespace) for namespace in client.CoreV1Api().list_namespace().items
+        ]
+        return []
+
+    @staticmethod
+    def __kind_listers() -> Dict[str, Callable[[DiscoveryState], Iterable[DiscoveryBatch]]]:
+        """The listing function of each kind, in the sequential discovery order"""
+        listers: Dict[str, Callable[[DiscoveryState], Iterable[DiscoveryBatch]]] = {}
+        if CUSTOM_CRD:
+            listers["CustomCRD"] = Discovery.__list_custom_crds
+        if IS_OPENSHIFT:
+            listers["DeploymentConfig"] = Discovery.__list_deployment_configs
+        if OPENSHIFT_GROUPS:
+            listers["OpenshiftGroup"] = Discovery.__list_openshift_groups
+        if ARGO_ROLLOUTS:
+            listers["Rollout"] = Discovery.__list_rollouts
+        listers["Deployment"] = Discovery.__list_deployments
+        listers["StatefulSet"] = Discovery.__list_statefulsets
+        listers["DaemonSet"] = Discovery.__list_daemonsets
+        listers["ReplicaSet"] = Discovery.__list_replicasets
+        listers["Pod"] = Discovery.__list_pods
+        listers["Node"] = Discovery.__list_nodes
+        listers["Job"] = Discovery.__list_jobs
+        if not DISABLE_HELM_MONITORING:
+            listers["HelmRelease"] = Discovery.__list_helm_releases
+        listers["Namespace"] = Discovery.__list_namespaces
+        return listers
+
+    @staticmethod
+    def __timed_batches(
+        kind: str, lister: Callable[[DiscoveryState], Iterable[DiscoveryBatch]], state: DiscoveryState
+    ) -> Iterator[DiscoveryBatch]:
+        # only the time spent listing is counted, not the time the consumer spends on each batch
+        batches: Optional[Iterator[DiscoveryBatch]] = None
+        try:
+            while True:
+                start = time.time()
+                try:
+                    if batches is None:
+                        batches = iter(lister(state))
+                    batch = next(batches)
+                except StopIteration:
+                    return
+                finally:
+                    state.kind_durations[kind] += time.time() - start
+                yield batch
+        except Exception:
+            logging.error(f"Failed to run periodic {kind} discovery", exc_info=True)
+            raise
+
+    @staticmethod
+    def __sequential_batches(state: DiscoveryState) -> Iterator[DiscoveryBatch]:
+        for kind, lister in Discovery.__kind_listers().items():
+            yield from Discovery.__timed_batches(kind, lister, state)
+
+    @staticmethod
+    def __concurrent_batches(state: DiscoveryState) -> Iterator[DiscoveryBatch]:
+        """
+        List the kinds in parallel, using up to DISCOVERY_CONCURRENCY threads.
+        Batches are yielded as soon as they're listed, in the order they arrive.
+        The listing threads wait while the consumer is behind, so only a few batches are held in memory.
+        """
+        listers = Discovery.__kind_listers()
+        listers["Job"] = Discovery.__collect_job_pages
+        batches: queue.Queue = queue.Queue(maxsize=DISCOVERY_CONCURRENCY)
+        stopped = threading.Event()  # the consumer stopped before all the batches were yielded
+
+        def put(item: Union[DiscoveryBatch, str]):
+            while not stopped.is_set():
+                try:
+                    batches.put(item, timeout=1)
+                    return
+                except queue.Full:
+                    pass
+
+        def list_kind(kind: str, lister: Callable[[DiscoveryState], Iterable[DiscoveryBatch]]):
+            try:
+                for batch in Discovery.__timed_batches(kind, lister, state):
+                    put(batch)
+                    if stopped.is_set():
+                        return
+            finally:
+                put(kind)  # marks the end of the kind
+
+        with ThreadPoolExecutor(max_workers=DISCOVERY_CONCURRENCY, thread_name_prefix="discovery") as executor:
+            futures = [executor.submit(list_kind, kind, lister) for kind, lister in listers.items()]
+            try:
+                remaining_kinds = len(futures)
+                while remaining_kinds:
+                    item = batches.get()
+                    if isinstance(item, str):
+                        remaining_kinds -= 1
+                    else:
+                        yield item
+                for future in futures:
+                    future.result()  # raise the listing errors
+            finally:
+                stopped.set()  # release the listing threads waiting for the queue, so the executor can shut down
+                for future in futures:
+                    future.cancel()  # kinds that didn't start listing yet
+
+        for page in state.job_pages:
+            yield Discovery.__jobs_batch(page, state)
+
+    @staticmethod
+    def discovery_batches() -> Iterator[Union[DiscoveryBatch, DiscoveryResults]]:
+        """
+        Discover the cluster resources.
+        Services and jobs are yielded in batches, one per api page, as they are listed.
+        The last item is a DiscoveryResults with the rest of the discovered resources.
+        """
+        create_monkey_patches()
+        Discovery.stacktrace_thread_active = True
+        threading.Thread(target=Discovery.stack_dump_on_signal, daemon=True).start()
+        state = DiscoveryState()
+        if DISCOVERY_CONCURRENCY > 1:
+            yield from Discovery.__concurrent_batches(state)
+        else:
+            yield from Discovery.__sequential_batches(state)
+
+        nodes = [
+            utils.from_api_server_node(node, state.node_requests.get(node.metadata.name, [])) for node in state.nodes
+        ]
         Discovery.stacktrace_thread_active = False
 
-        return DiscoveryResults(
-            services=active_services,
+        yield DiscoveryResults(
             nodes=nodes,
-            node_requests=node_requests,
-            jobs=active_jobs,
-            namespaces=namespaces,
-            helm_releases=list(helm_releases_map.values()),
-            pods_running_count=pods_running_count,
-            openshift_groups=openshift_groups,
+            node_requests=state.node_requests,
+            namespaces=state.namespaces,
+            helm_releases=list(state.helm_releases_map.values()),
+            pods_running_count=state.pods_running_count,
+            openshift_groups=state.openshift_groups,
+            kind_durations=dict(state.kind_durations),
         )
 
+    @staticmethod
+    def discovery_process() -> DiscoveryResults:
+        services: List[ServiceInfo] = []
+        jobs: List[JobInfo] = []
+        for batch in Discovery.discovery_batches():
+            if isinstance(batch, DiscoveryResults):
+                batch.services = services
+                batch.jobs = jobs
+                return batch
+            services.extend(batch.services)
+            jobs.extend(batch.jobs)
+
     @staticmethod
     @discovery_errors_count.count_exceptions()
     @discovery_process_time.time()
     def discover_resources() -> DiscoveryResults:
         try:
             future = Discovery.executor.submit(Discovery.discovery_process)
-            return future.result(timeout=DISCOVERY_PROCESS_TIMEOUT_SEC)
+            results: DiscoveryResults = future.result(timeout=DISCOVERY_PROCESS_TIMEOUT_SEC)
+            Discovery.observe_kind_durations(results)
+            return results
         except Exception as e:
             # We've seen this and believe the process is killed due to oom kill
             # The process pool becomes not usable, so re-creating it
             logging.error("Discovery process internal error")
             if isinstance(e, BrokenProcessPool):
                 Discovery.out_of_memory_detected = True
-                logging.error("The discovery process was killed, likely due to an Out of Memory error. Refer to the following documentation to increase the available memory for the pod robusta-runner: https://docs.robusta.dev/master/help.html")
+                logging.error(DISCOVERY_OOM_MESSAGE)
 
             Discovery.executor.shutdown()
             Discovery.executor = ProcessPoolExecutor(max_workers=1)
             logging.info("Initialized new discovery pool")
             raise e
 
+    @staticmethod
+    def observe_kind_durations(results: DiscoveryResults):
+        # the discovery runs in a child process, so the kind durations are reported by the parent process
+        for kind, duration in results.kind_durations.items():
+            discovery_kind_process_time.labels(kind).observe(duration)
+
+    @staticmethod
+    def streaming_discovery_process(conn):
+        try:
+            for batch in Discovery.discovery_batches():
+                conn.send(batch)
+        except Exception as e:
+            try:
+                conn.send(e)
+            except Exception:  # the exception can't be pickled
+                conn.send(Exception(f"Discovery failed: {e}"))
+        finally:
+            conn.close()
+
+    @staticmethod
+    @discovery_errors_count.count_exceptions()
+    @discovery_process_time.time()
+    def stream_resources(on_batch: Callable[[DiscoveryBatch], None]) -> DiscoveryResults:
+        """
+        Run the discovery in a child process, and pass each batch of services and jobs to on_batch as it arrives,
+        so only a single batch is held in memory at a time.
+        Returns the rest of the discovered resources. The returned services and jobs are empty.
+        """
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=Discovery.streaming_discovery_process, args=(sender,), daemon=True)
+        process.start()
+        sender.close()  # only the child writes to the pipe
+        deadline = time.time() + DISCOVERY_PROCESS_TIMEOUT_SEC
+        try:
+            while True:
+                if not receiver.poll(max(0.0, deadline - time.time())):
+                    raise TimeoutError(f"Discovery did not finish in {DISCOVERY_PROCESS_TIMEOUT_SEC} seconds")
+                try:
+                    message = receiver.recv()
+                except EOFError:  # the process exited without sending the results
+                    process.join(timeout=5)
+                    if process.exitcode == -signal.SIGKILL:
+                        Discovery.out_of_memory_detected = True
+                        logging.error(DISCOVERY_OOM_MESSAGE)
+                    raise Exception(f"Discovery process exited unexpectedly. exit code {process.exitcode}")
+
+                if isinstance(message, Exception):
+                    raise message
+                if isinstance(message, DiscoveryResults):
+                    Discovery.observe_kind_durations(message)
+                    return message
+                on_batch(message)
+        except Exception:
+            logging.error("Discovery process internal error")
+            raise
+        finally:
+            receiver.close()
+            if process.is_alive():
+                process.kill()
+            process.join()
+
     @staticmethod
     def discover_stats() -> ClusterStats:
         deploy_count = -1
@@ -896,6 +1135,16 @@ def extract_containers_k8(resource) -> List[Container]:
     return []
 
 
+def job_pod_selector(job: V1Job) -> Dict[str, str]:
+    if job.spec.selector:
+        return job.spec.selector.match_labels or {}
+    if job.metadata.labels:
+        job_name = job.metadata.labels.get("job-name", None)
+        if job_name:
+            return {"job-name": job_name}
+    return {}
+
+
 def is_pod_ready(pod) -> bool:
     conditions = []
     if isinstance(pod, V1Pod):
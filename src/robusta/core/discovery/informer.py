@@ -0,0 +1,234 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import prometheus_client
+from kubernetes import watch
+from kubernetes.client import V1Pod
+from kubernetes.client.exceptions import ApiException
+
+from robusta.core.discovery import utils
+from robusta.core.model.env_vars import DISCOVERY_BATCH_SIZE, DISCOVERY_MAX_BATCHES, DISCOVERY_WATCH_TIMEOUT_SEC
+from robusta.core.model.pods import PodResources
+
+HTTP_STATUS_GONE = 410
+WATCH_ERROR_BACKOFF_SEC = 5
+
+informer_events = prometheus_client.Counter(
+    "discovery_informer_events", "Number of watch events received by the discovery informers", ["kind", "type"]
+)
+informer_relists = prometheus_client.Counter(
+    "discovery_informer_relists", "Number of full relists made by the discovery informers", ["kind"]
+)
+
+
+def object_resource_version(obj: Any) -> Optional[str]:
+    if isinstance(obj, dict):
+        return obj.get("metadata", {}).get("resourceVersion")
+    metadata = getattr(obj, "metadata", None)
+    return getattr(metadata, "resource_version", None) if metadata else None
+
+
+class ResourceInformer:
+    """
+    Keeps the state of a single resource kind in sync using the list-then-watch pattern.
+
+    The resources are listed once, and then watched starting at the resourceVersion of that list. Bookmark events
+    advance the resourceVersion without sending objects, so an expired watch can be resumed where it stopped.
+    A full relist is done only when the api server answers 410 Gone (the resourceVersion is no longer available).
+
+    list_func is a k8s python api list function (for example CoreV1Api().list_pod_for_all_namespaces).
+    on_list is called with all the listed objects, after each (re)list.
+    on_event is called with the event type (ADDED, MODIFIED or DELETED) and the object, for each watch event.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        list_func: Callable,
+        on_list: Callable[[List[Any]], None],
+        on_event: Callable[[str, Any], None],
+        label_selector: Optional[str] = None,
+        field_selector: Optional[str] = None,
+        watch_timeout: int = DISCOVERY_WATCH_TIMEOUT_SEC,
+        watch_factory: Optional[Callable[[], watch.Watch]] = None,
+    ):
+        self.kind = kind
+        self.list_func = list_func
+        self.on_list = on_list
+        self.on_event = on_event
+        self.label_selector = label_selector
+        self.field_selector = field_selector
+        self.watch_timeout = watch_timeout
+        self.watch_factory = watch_factory or watch.Watch
+        self.resource_version: Optional[str] = None
+        self.__stopped = False
+        self.__watch: Optional[watch.Watch] = None
+
+    def relist(self):
+        items = []
+        list_resource_version: Optional[str] = None
+        continue_ref: Optional[str] = None
+        for _ in range(DISCOVERY_MAX_BATCHES):
+            resources = self.list_func(**self.__selector_args(), limit=DISCOVERY_BATCH_SIZE, _continue=continue_ref)
+            items.extend(resources.items)
+            # all the pages of a list are a consistent snapshot, of the resourceVersion of the first page
+            if continue_ref is None:
+                list_resource_version = resources.metadata.resource_version
+            continue_ref = resources.metadata._continue
+            if not continue_ref:
+                break
+
+        informer_relists.labels(self.kind).inc()
+        self.on_list(items)
+        self.resource_version = list_resource_version
+
+    def watch_once(self):
+        """Watch from the current resourceVersion until the watch times out, or the informer is stopped"""
+        self.__watch = self.watch_factory()
+        try:
+            for event in self.__watch.stream(
+                self.list_func,
+                **self.__selector_args(),
+                resource_version=self.resource_version,
+                allow_watch_bookmarks=True,
+                timeout_seconds=self.watch_timeout,
+            ):
+                event_type = event["type"]
+                informer_events.labels(self.kind, event_type).inc()
+                if event_type != "BOOKMARK":
+                    try:
+                        self.on_event(event_type, event["object"])
+                    except Exception:
+                        logging.exception(f"Failed to handle {event_type} event of {self.kind}")
+
+                resource_version = object_resource_version(event["raw_object"])
+                if resource_version:
+                    self.resource_version = resource_version
+                if self.__stopped:
+                    break
+        finally:
+            self.__watch.stop()
+
+    def run(self):
+        if self.resource_version is None:  # not listed yet
+            self.__relist_until_success()
+        while not self.__stopped:
+            try:
+                self.watch_once()
+            except ApiException as e:
+                if e.status != HTTP_STATUS_GONE:
+                    logging.warning(f"Failed to watch {self.kind}: {e.status} {e.reason}")
+                    time.sleep(WATCH_ERROR_BACKOFF_SEC)
+                    continue
+                logging.info(f"{self.kind} resource version {self.resource_version} expired, relisting")
+                self.__relist_until_success()
+            except Exception:
+                logging.exception(f"Failed to watch {self.kind}")
+                time.sleep(WATCH_ERROR_BACKOFF_SEC)
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, name=f"{self.kind}-informer", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.__stopped = True
+        if self.__watch:
+            self.__watch.stop()
+
+    def __relist_until_success(self):
+        while not self.__stopped:
+            try:
+                self.relist()
+                return
+            except Exception:
+                logging.exception(f"Failed to relist {self.kind}")
+                time.sleep(WATCH_ERROR_BACKOFF_SEC)
+
+    def __selector_args(self) -> dict:
+        selector_args = {}
+        if self.label_selector:
+            selector_args["label_selector"] = self.label_selector
+        if self.field_selector:
+            selector_args["field_selector"] = self.field_selector
+        return selector_args
+
+
+class PodIndex:
+    """
+    The pods known to the pods informer, indexed by namespace and by node.
+
+    Used to find the pods of a job, and the requests of the pods running on a node, without listing the pods.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__labels: Dict[str, Dict[str, Dict[str, str]]] = defaultdict(dict)  # namespace -> pod name -> labels
+        self.__requests: Dict[str, Dict[str, PodResources]] = defaultdict(dict)  # node -> pod key -> requests
+        self.__nodes: Dict[str, str] = {}  # pod key -> node of pods with requests
+        self.__running: Dict[str, bool] = {}  # pod key -> is running
+
+    def reset(self, pods: List[V1Pod]):
+        with self.__lock:
+            self.__labels.clear()
+            self.__requests.clear()
+            self.__nodes.clear()
+            self.__running.clear()
+            for pod in pods:
+                self.__add(pod)
+
+    def update(self, pod: V1Pod) -> Set[str]:
+        """Returns the nodes of the pod requests, before and after the update"""
+        with self.__lock:
+            return {node_name for node_name in [self.__remove(pod), self.__add(pod)] if node_name}
+
+    def remove(self, pod: V1Pod) -> Set[str]:
+        """Returns the node of the removed pod requests"""
+        with self.__lock:
+            node_name = self.__remove(pod)
+            return {node_name} if node_name else set()
+
+    def job_pods(self, namespace: str, selector: Dict[str, str]) -> List[str]:
+        if not selector:  # add job pods only if we found a valid selector
+            return []
+        with self.__lock:
+            return [
+                pod_name
+                for pod_name, pod_labels in self.__labels.get(namespace, {}).items()
+                if selector.items() <= pod_labels.items()
+            ]
+
+    def node_requests(self, node_name: str) -> List[PodResources]:
+        with self.__lock:
+            return list(self.__requests.get(node_name, {}).values())
+
+    def running_count(self) -> int:
+        with self.__lock:
+            return sum(self.__running.values())
+
+    def __add(self, pod: V1Pod) -> Optional[str]:
+        pod_key = f"{pod.metadata.namespace}/{pod.metadata.name}"
+        self.__labels[pod.metadata.namespace][pod.metadata.name] = pod.metadata.labels or {}
+        pod_status = pod.status.phase if pod.status else None
+        self.__running[pod_key] = pod_status == "Running"
+        if pod_status in ["Running", "Unknown", "Pending"] and pod.spec.node_name:
+            self.__requests[pod.spec.node_name][pod_key] = utils.k8s_pod_requests(pod)
+            self.__nodes[pod_key] = pod.spec.node_name
+            return pod.spec.node_name
+        return None
+
+    def __remove(self, pod: V1Pod) -> Optional[str]:
+        pod_key = f"{pod.metadata.namespace}/{pod.metadata.name}"
+        namespace_pods = self.__labels.get(pod.metadata.namespace)
+        if namespace_pods is not None:
+            namespace_pods.pop(pod.metadata.name, None)
+            if not namespace_pods:
+                del self.__labels[pod.metadata.namespace]
+        node_name = self.__nodes.pop(pod_key, None)
+        if node_name:
+            self.__requests[node_name].pop(pod_key, None)
+        self.__running.pop(pod_key, None)
+        return node_name
@@ -1,3 +1,4 @@
+import os
 import threading
 import time
 from collections import defaultdict
@@ -6,6 +7,7 @@ from typing import Dict, List, Optional
 from pydantic.main import BaseModel
 
 from robusta.core.model.env_vars import RESOURCE_UPDATES_CACHE_TTL_SEC
+from robusta.utils.prefix_trie import PrefixTrie
 
 
 class TopLevelResource(BaseModel):
@@ -24,14 +26,19 @@ class CachedResourceInfo(BaseModel):
 
 class TopServiceResolver:
     __recent_resource_updates: Dict[str, CachedResourceInfo] = {}
-    __namespace_to_resource: Dict[str, List[TopLevelResource]] = defaultdict(list)
+    # resources are stored in a per namespace prefix trie, keyed by the resource name
+    __namespace_to_resource: Dict[str, PrefixTrie[TopLevelResource]] = defaultdict(PrefixTrie)
     __cached_updates_lock = threading.Lock()
 
+    @classmethod
+    def reset_after_fork(cls):
+        cls.__cached_updates_lock = threading.Lock()
+
     @classmethod
     def store_cached_resources(cls, resources: List[TopLevelResource]):
-        new_store = defaultdict(list)
+        new_store: Dict[str, PrefixTrie[TopLevelResource]] = defaultdict(PrefixTrie)
         for resource in resources:
-            new_store[resource.namespace].append(resource)
+            new_store[resource.namespace].insert(resource.name, resource)
 
         # The resources are stored periodically, after reading it from the API server. If, between reads
         # new resources are added, they will be missing from the cache. So, in addition to the periodic read, we
@@ -44,7 +51,9 @@ class TopServiceResolver:
                 if time.time() - recent_update.event_time > RESOURCE_UPDATES_CACHE_TTL_SEC:
                     del cls.__recent_resource_updates[resource_key]
                 else:
-                    new_store[recent_update.resource.namespace].append(recent_update.resource)
+                    new_store[recent_update.resource.namespace].insert(
+                        recent_update.resource.name, recent_update.resource
+                    )
 
         cls.__namespace_to_resource = new_store
 
@@ -62,22 +71,19 @@ class TopServiceResolver:
         if name is None or namespace is None:
             return None
 
-        longest_match = None
-        max_length = -1
-
-        for cached_resource in cls.__namespace_to_resource.get(namespace, []):
-            if name.startswith(cached_resource.name):
-                match_length = len(cached_resource.name)
-                if match_length > max_length:
-                    longest_match = cached_resource
-                    max_length = match_length
+        namespace_resources = cls.__namespace_to_resource.get(namespace)
+        if namespace_resources is None:
+            return None
 
-        return longest_match
+        return namespace_resources.longest_prefix_value(name)
 
     @classmethod
     def add_cached_resource(cls, resource: TopLevelResource):
-        cls.__namespace_to_resource[resource.namespace].append(resource)
+        cls.__namespace_to_resource[resource.namespace].insert(resource.name, resource)
         with cls.__cached_updates_lock:
             cls.__recent_resource_updates[resource.get_resource_key()] = CachedResourceInfo(
                 resource=resource, event_time=time.time()
             )
+
+
+os.register_at_fork(after_in_child=TopServiceResolver.reset_after_fork)
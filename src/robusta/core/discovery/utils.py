@@ -1,4 +1,4 @@
-from typing import Dict, List, Union
+from typing import Any, Dict, List, Union
 
 from hikaru.model.rel_1_26 import Node
 from kubernetes.client import V1Container, V1Node, V1NodeCondition, V1Pod, V1ResourceRequirements, V1Taint
@@ -80,14 +80,21 @@ def from_api_server_node(
         conditions=__to_active_conditions_str(api_server_node.status.conditions),
         memory_capacity=PodResources.parse_mem(capacity.get("memory", "0Mi")),
         memory_allocatable=PodResources.parse_mem(allocatable.get("memory", "0Mi")),
-        memory_allocated=sum([req.memory for req in pod_requests_list]),
         cpu_capacity=PodResources.parse_cpu(capacity.get("cpu", "0")),
         cpu_allocatable=PodResources.parse_cpu(allocatable.get("cpu", "0")),
+        node_info=__to_node_info(api_server_node),
+        resource_version=int(version) if version else 0,
+        **node_allocated_fields(pod_requests_list),
+    )
+
+
+def node_allocated_fields(pod_requests_list: List[PodResources]) -> Dict[str, Any]:
+    """The NodeInfo fields of the resources allocated to the pods on the node"""
+    return dict(
+        memory_allocated=sum([req.memory for req in pod_requests_list]),
         cpu_allocated=round(sum([req.cpu for req in pod_requests_list]), 3),
         pods_count=len(pod_requests_list),
         pods=",".join([pod_req.pod_name for pod_req in pod_requests_list]),
-        node_info=__to_node_info(api_server_node),
-        resource_version=int(version) if version else 0,
     )
 
 
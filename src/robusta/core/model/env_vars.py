@@ -20,6 +20,8 @@ CUSTOM_PLAYBOOKS_ROOT = os.path.join(PLAYBOOKS_ROOT, "storage")
 CUSTOM_SSH_HOST_KEYS = os.environ.get("CUSTOM_SSH_HOST_KEYS", "")
 
 PLAYBOOKS_CONFIG_FILE_PATH = os.environ.get("PLAYBOOKS_CONFIG_FILE_PATH")
+# how long the validated params of a playbook action are reused between events. 0 to validate them on every event
+ACTION_PARAMS_CACHE_TTL_SEC = float(os.environ.get("ACTION_PARAMS_CACHE_TTL_SEC", 300))
 
 INSTALLATION_NAMESPACE = os.environ.get("INSTALLATION_NAMESPACE", "robusta")
 DISCOVERY_PERIOD_SEC = int(os.environ.get("DISCOVERY_PERIOD_SEC", 90))
@@ -28,19 +30,75 @@ DISCOVERY_CHECK_THRESHOLD_SEC = int(os.environ.get("DISCOVERY_CHECK_THRESHOLD_SE
 DISCOVERY_PROCESS_TIMEOUT_SEC = int(os.environ.get("DISCOVERY_PROCESS_TIMEOUT_SEC", 60 * 120))  # 120 min
 DISCOVERY_WATCHDOG_CHECK_SEC = int(os.environ.get("DISCOVERY_WATCHDOG_CHECK_SEC", 15 * 120))  # 15 min
 SUPABASE_TIMEOUT_SECONDS = int(os.environ.get("SUPABASE_TIMEOUT_SECONDS", 60))
+# findings and watched resources are written to Supabase in bulk requests, every window or when a batch is full.
+# Set the window to 0 to write them synchronously
+SUPABASE_WRITE_BATCH_WINDOW_SEC = float(os.environ.get("SUPABASE_WRITE_BATCH_WINDOW_SEC", 0.5))
+SUPABASE_WRITE_BATCH_MAX_ROWS = int(os.environ.get("SUPABASE_WRITE_BATCH_MAX_ROWS", 100))
+# when that many rows are pending, the writing thread flushes them itself
+SUPABASE_WRITE_MAX_PENDING_ROWS = int(os.environ.get("SUPABASE_WRITE_MAX_PENDING_ROWS", 2000))
+SUPABASE_WRITE_RETRIES = int(os.environ.get("SUPABASE_WRITE_RETRIES", 3))
+SUPABASE_DELETE_BATCH_SIZE = int(os.environ.get("SUPABASE_DELETE_BATCH_SIZE", 100))
 GRAFANA_RENDERER_URL = os.environ.get("GRAFANA_RENDERER_URL", "http://127.0.0.1:8281/render")
 RESOURCE_UPDATES_CACHE_TTL_SEC = os.environ.get("RESOURCE_UPDATES_CACHE_TTL_SEC", 120)
 INTERNAL_PLAYBOOKS_ROOT = os.environ.get("INTERNAL_PLAYBOOKS_ROOT", "/app/src/robusta/core/playbooks/internal")
 DEFAULT_TIMEZONE = pytz.timezone(os.environ.get("DEFAULT_TIMEZONE", "UTC"))
 NUM_EVENT_THREADS = int(os.environ.get("NUM_EVENT_THREADS", 20))
 INCOMING_EVENTS_QUEUE_MAX_SIZE = int(os.environ.get("INCOMING_EVENTS_QUEUE_MAX_SIZE", 500))
+# when above 0, the playbooks of alerts, kubernetes and helm events run in this many worker processes
+EVENT_WORKER_PROCESSES = int(os.environ.get("EVENT_WORKER_PROCESSES", 0))
+EVENT_WORKER_THREADS = int(os.environ.get("EVENT_WORKER_THREADS", 4))
+EVENT_WORKER_STOP_TIMEOUT_SEC = int(os.environ.get("EVENT_WORKER_STOP_TIMEOUT_SEC", 30))
+
+# when enabled, findings are handed off to per sink delivery queues instead of being written on the event thread
+ASYNC_SINK_DELIVERY = load_bool("ASYNC_SINK_DELIVERY", False)
+# findings of a sink are written in order by a single worker. More workers write concurrently, and give up the order
+SINK_DELIVERY_WORKERS = int(os.environ.get("SINK_DELIVERY_WORKERS", 1))
+SINK_DELIVERY_QUEUE_MAX_SIZE = int(os.environ.get("SINK_DELIVERY_QUEUE_MAX_SIZE", 500))
+# findings waiting longer than this in a sink delivery queue are dropped
+SINK_DELIVERY_TIMEOUT_SEC = int(os.environ.get("SINK_DELIVERY_TIMEOUT_SEC", 300))
+SINK_DELIVERY_SHUTDOWN_TIMEOUT_SEC = int(os.environ.get("SINK_DELIVERY_SHUTDOWN_TIMEOUT_SEC", 10))
+
+# max number of scheduled jobs running concurrently
+SCHEDULER_MAX_WORKERS = int(os.environ.get("SCHEDULER_MAX_WORKERS", 10))
+# scheduled jobs state changes are written to the store together, at most once per this interval. 0 to write through
+SCHEDULER_DAL_FLUSH_INTERVAL_SEC = float(os.environ.get("SCHEDULER_DAL_FLUSH_INTERVAL_SEC", 5))
+# store the scheduled jobs state in a local json file, instead of the scheduled-jobs ConfigMap
+SCHEDULED_JOBS_STORE_PATH = os.environ.get("SCHEDULED_JOBS_STORE_PATH", None)
 
 FLOAT_PRECISION_LIMIT = int(os.environ.get("FLOAT_PRECISION_LIMIT", 11))
+# process the series of prometheus charts with numpy, instead of a python loop over the samples. Off by default, since
+# the processed series are downsampled too, which changes the points of the charts
+CHART_VECTORIZED_SERIES = load_bool("CHART_VECTORIZED_SERIES", False)
+# with CHART_VECTORIZED_SERIES, series are downsampled (Largest-Triangle-Three-Buckets) to about a point per 2 pixels
+# of the chart. 0 to disable
+CHART_MAX_POINTS_PER_SERIES = int(os.environ.get("CHART_MAX_POINTS_PER_SERIES", 640))
 
 PROMETHEUS_REQUEST_TIMEOUT_SECONDS = float(os.environ.get("PROMETHEUS_REQUEST_TIMEOUT_SECONDS", 90.0))
 PROMETHEUS_ENABLED = os.environ.get("PROMETHEUS_ENABLED", "false").lower() == "true"
 MANAGED_CONFIGURATION_ENABLED = os.environ.get("MANAGED_CONFIGURATION_ENABLED", "false").lower() == "true"
 PROMETHEUS_SSL_ENABLED = os.environ.get("PROMETHEUS_SSL_ENABLED", "false").lower() == "true"
+# prometheus clients are reused between queries, and rebuilt (with fresh auth tokens) after this time
+PROMETHEUS_CLIENT_MAX_AGE_SEC = int(os.environ.get("PROMETHEUS_CLIENT_MAX_AGE_SEC", 1800))
+# successful prometheus connection checks are cached for this time
+PROMETHEUS_HEALTH_CHECK_TTL_SEC = int(os.environ.get("PROMETHEUS_HEALTH_CHECK_TTL_SEC", 60))
+# cache prometheus range query results, and fetch only the missing tail of overlapping queries
+PROMETHEUS_QUERY_CACHE_ENABLED = load_bool("PROMETHEUS_QUERY_CACHE_ENABLED", True)
+PROMETHEUS_QUERY_CACHE_MAX_BYTES = int(os.environ.get("PROMETHEUS_QUERY_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+PROMETHEUS_QUERY_CACHE_TTL_SEC = int(os.environ.get("PROMETHEUS_QUERY_CACHE_TTL_SEC", 600))
+# query results newer than this are not final (late scrapes and rule evaluations), and are fetched again
+PROMETHEUS_QUERY_CACHE_FRESHNESS_LAG_SEC = int(os.environ.get("PROMETHEUS_QUERY_CACHE_FRESHNESS_LAG_SEC", 60))
+
+# kubernetes objects of prometheus alerts are read concurrently, by a pool of this many threads
+ALERT_RESOURCES_LOAD_WORKERS = int(os.environ.get("ALERT_RESOURCES_LOAD_WORKERS", 8))
+# max time to wait for the kubernetes objects of a single prometheus alert
+ALERT_RESOURCES_LOAD_TIMEOUT_SEC = float(os.environ.get("ALERT_RESOURCES_LOAD_TIMEOUT_SEC", 10))
+# kubernetes objects read for a prometheus alert are reused by alerts received within this time. 0 to disable
+ALERT_RESOURCES_CACHE_TTL_SEC = float(os.environ.get("ALERT_RESOURCES_CACHE_TTL_SEC", 10))
+
+# nodes of prometheus alerts are found in an index of the nodes, listed again after this time
+NODE_INDEX_REFRESH_SEC = float(os.environ.get("NODE_INDEX_REFRESH_SEC", 60))
+# lookups of unknown nodes list the nodes again, but not more than once in this time
+NODE_INDEX_MIN_REFRESH_SEC = float(os.environ.get("NODE_INDEX_MIN_REFRESH_SEC", 15))
 
 INCOMING_REQUEST_TIME_WINDOW_SECONDS = int(os.environ.get("INCOMING_REQUEST_TIME_WINDOW_SECONDS", 3600))
 
@@ -71,10 +129,23 @@ RUNNER_SERVICE_ACCOUNT = os.environ.get("RUNNER_SERVICE_ACCOUNT", f"{RELEASE_NAM
 
 TELEMETRY_PERIODIC_SEC = int(os.environ.get("TELEMETRY_PERIODIC_SEC", 60 * 60 * 24))  # 24H
 
+# shared http transport of the sinks. Requests to the same host reuse keep-alive connections
+HTTP_CONNECT_TIMEOUT_SEC = float(os.environ.get("HTTP_CONNECT_TIMEOUT_SEC", 10))
+HTTP_READ_TIMEOUT_SEC = float(os.environ.get("HTTP_READ_TIMEOUT_SEC", 60))
+HTTP_MAX_CONCURRENT_REQUESTS_PER_HOST = int(os.environ.get("HTTP_MAX_CONCURRENT_REQUESTS_PER_HOST", 10))
+# connection errors, and 429 and 502-504 responses of idempotent requests, are retried with exponential backoff
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", 3))
+HTTP_RETRY_BACKOFF_SEC = float(os.environ.get("HTTP_RETRY_BACKOFF_SEC", 0.5))
+HTTP_RETRY_MAX_WAIT_SEC = float(os.environ.get("HTTP_RETRY_MAX_WAIT_SEC", 30))
+
 SLACK_REQUEST_TIMEOUT = int(os.environ.get("SLACK_REQUEST_TIMEOUT", 90))
 SLACK_RATE_LIMIT_RETRIES = int(os.environ.get("SLACK_RATE_LIMIT_RETRIES", 2))
 SLACK_TABLE_COLUMNS_LIMIT = int(os.environ.get("SLACK_TABLE_COLUMNS_LIMIT", 3))
 SLACK_FORWARD_URL = os.environ.get("SLACK_FORWARD_URL")  # forward endpoint "https://api.robusta.dev/slack/"
+# how long a file uploaded to Slack is reused, when the same file is sent to other sinks or channels. 0 to disable
+SLACK_UPLOAD_CACHE_TTL_SEC = float(os.environ.get("SLACK_UPLOAD_CACHE_TTL_SEC", 600))
+# number of files of a finding uploaded to Slack concurrently
+SLACK_UPLOAD_WORKERS = int(os.environ.get("SLACK_UPLOAD_WORKERS", 4))
 DISCORD_TABLE_COLUMNS_LIMIT = int(os.environ.get("DISCORD_TABLE_COLUMNS_LIMIT", 4))
 RSA_KEYS_PATH = os.environ.get("RSA_KEYS_PATH", "/etc/robusta/auth")
 
@@ -98,6 +169,13 @@ ADDITIONAL_CERTIFICATE: str = os.environ.get("CERTIFICATE", "")
 DISCOVERY_MAX_BATCHES = int(os.environ.get("DISCOVERY_MAX_BATCHES", 25))
 DISCOVERY_BATCH_SIZE = int(os.environ.get("DISCOVERY_BATCH_SIZE", 30000))
 DISCOVERY_POD_OWNED_PODS = load_bool("DISCOVERY_POD_OWNED_PODS", False)
+# max number of resource kinds listed in parallel by the discovery process. 1 lists the kinds one after the other
+DISCOVERY_CONCURRENCY = int(os.environ.get("DISCOVERY_CONCURRENCY", 1))
+# stream discovered services and jobs from the discovery process in batches, instead of returning all of them at once
+DISCOVERY_STREAMING = load_bool("DISCOVERY_STREAMING", False)
+# keep the discovered resources in sync with list-then-watch informers, instead of relisting every discovery period
+DISCOVERY_INFORMERS = load_bool("DISCOVERY_INFORMERS", False)
+DISCOVERY_WATCH_TIMEOUT_SEC = int(os.environ.get("DISCOVERY_WATCH_TIMEOUT_SEC", 300))
 
 DISABLE_HELM_MONITORING = load_bool("DISABLE_HELM_MONITORING", False)
 DISABLE_FINDINGS_PERSISTENCE = load_bool("DISABLE_FINDINGS_PERSISTENCE", False)
@@ -141,6 +219,25 @@ PROCESSED_ALERTS_CACHE_MAX_SIZE = int(os.environ.get("PROCESSED_ALERTS_CACHE_MAX
 
 POD_WAIT_RETRIES = int(os.environ.get("POD_WAIT_RETRIES", 10))
 POD_WAIT_RETRIES_SECONDS = int(os.environ.get("POD_WAIT_RETRIES_SECONDS", 5))
+# wait for pods and jobs to complete with a shared watch per namespace and kind, instead of polling each of them
+COMPLETION_WAITER_ENABLED = load_bool("COMPLETION_WAITER_ENABLED", True)
+COMPLETION_WAITER_WATCH_TIMEOUT_SEC = int(os.environ.get("COMPLETION_WAITER_WATCH_TIMEOUT_SEC", 60))
+# watches are stopped when no one waited on their namespace and kind for this long
+COMPLETION_WAITER_IDLE_SEC = float(os.environ.get("COMPLETION_WAITER_IDLE_SEC", 60))
+# waited objects are still read this often, in case a watch event was missed. Until a watch is synced, they're polled
+COMPLETION_WAITER_RESYNC_SEC = float(os.environ.get("COMPLETION_WAITER_RESYNC_SEC", 30))
+# reuse warm debugger pods for the commands run on nodes, instead of creating a debugger pod for each command.
+# Off by default, since idle privileged debugger pods are kept running on the nodes
+DEBUGGER_POOL_ENABLED = load_bool("DEBUGGER_POOL_ENABLED", False)
+DEBUGGER_POOL_MAX_PODS = int(os.environ.get("DEBUGGER_POOL_MAX_PODS", 20))  # cluster wide
+DEBUGGER_POOL_IDLE_TTL_SEC = float(os.environ.get("DEBUGGER_POOL_IDLE_TTL_SEC", 120))
+DEBUGGER_POOL_MAX_POD_AGE_SEC = int(os.environ.get("DEBUGGER_POOL_MAX_POD_AGE_SEC", 1800))
+# pool pods of previous runs, and pool pods killed by their deadline, are deleted this often while the pool is used
+DEBUGGER_POOL_CLEANUP_INTERVAL_SEC = float(os.environ.get("DEBUGGER_POOL_CLEANUP_INTERVAL_SEC", 600))
+# when all the pooled pods are leased, wait this long for one, before creating a one-off debugger pod
+DEBUGGER_POOL_LEASE_TIMEOUT_SEC = float(os.environ.get("DEBUGGER_POOL_LEASE_TIMEOUT_SEC", 10))
+# the last bytes of a pod log attached to findings, so chatty containers don't hold the whole log in memory
+POD_LOGS_ENRICHMENT_MAX_BYTES = int(os.environ.get("POD_LOGS_ENRICHMENT_MAX_BYTES", 10 * 1024 * 1024))
 
 HOLMES_ENABLED = load_bool("HOLMES_ENABLED", False)
 HOLMES_ASK_SLACK_BUTTON_ENABLED = load_bool("HOLMES_ASK_SLACK_BUTTON_ENABLED", True)
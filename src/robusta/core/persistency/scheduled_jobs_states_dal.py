@@ -1,66 +1,216 @@
 import json
 import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
 from threading import Lock
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import kubernetes
 from hikaru.model.rel_1_26 import ObjectMeta
 
-from robusta.core.model.env_vars import INSTALLATION_NAMESPACE
+from robusta.core.model.env_vars import (
+    INSTALLATION_NAMESPACE,
+    SCHEDULED_JOBS_STORE_PATH,
+    SCHEDULER_DAL_FLUSH_INTERVAL_SEC,
+)
 from robusta.core.schedule.model import ScheduledJob
 from robusta.integrations.kubernetes.autogenerated.v1.models import ConfigMap
 
 JOBS_CONFIGMAP_NAME = "scheduled-jobs"
 CONFIGMAP_NAMESPACE = INSTALLATION_NAMESPACE
+MAX_CONFLICT_RETRIES = 3
 
 
-class SchedulerDal:
-    mutex = Lock()
+class StoreConflictError(Exception):
+    """The jobs store was modified by someone else since it was loaded"""
+
+
+class SchedulerBackend(ABC):
+    """
+    Storage of the serialized scheduled jobs, by job id.
+
+    Each load returns a version of the stored data. store fails with StoreConflictError if the data was modified
+    since that version was loaded.
+    """
 
-    def __init__(self):
-        self.__init_scheduler_dal()
+    @abstractmethod
+    def load(self) -> Tuple[Dict[str, str], Optional[str]]:
+        """Returns the stored jobs, and the version of the store"""
+        pass
 
-    def __load_config_map(self) -> ConfigMap:
-        return ConfigMap.readNamespacedConfigMap(JOBS_CONFIGMAP_NAME, CONFIGMAP_NAMESPACE).obj
+    @abstractmethod
+    def store(self, jobs: Dict[str, str], version: Optional[str]) -> Optional[str]:
+        """Replaces the stored jobs, if the store version wasn't changed. Returns the new version"""
+        pass
 
-    def __init_scheduler_dal(self):
+
+class ConfigMapSchedulerBackend(SchedulerBackend):
+    def __init__(self, name: str = JOBS_CONFIGMAP_NAME, namespace: str = CONFIGMAP_NAMESPACE):
+        self.name = name
+        self.namespace = namespace
+        self.__conf_map: Optional[ConfigMap] = None  # the last loaded configmap, updated by store
+        self.__init_config_map()
+
+    def __init_config_map(self):
         try:
-            self.__load_config_map()
+            ConfigMap.readNamespacedConfigMap(self.name, self.namespace)
         except kubernetes.client.exceptions.ApiException as e:
             # we only want to catch exceptions because the config map doesn't exist
             if e.reason != "Not Found":
                 raise
             # job states configmap doesn't exists, create it
-            self.mutex.acquire()
-            try:
-                conf_map = ConfigMap(metadata=ObjectMeta(name=JOBS_CONFIGMAP_NAME, namespace=CONFIGMAP_NAMESPACE))
-                conf_map.createNamespacedConfigMap(conf_map.metadata.namespace)
-                logging.info(f"created jobs states configmap {JOBS_CONFIGMAP_NAME} {CONFIGMAP_NAMESPACE}")
-            finally:
-                self.mutex.release()
+            conf_map = ConfigMap(metadata=ObjectMeta(name=self.name, namespace=self.namespace))
+            conf_map.createNamespacedConfigMap(conf_map.metadata.namespace)
+            logging.info(f"created jobs states configmap {self.name} {self.namespace}")
 
-    def save_scheduled_job(self, job: ScheduledJob):
-        self.mutex.acquire()
+    def load(self) -> Tuple[Dict[str, str], Optional[str]]:
+        self.__conf_map = ConfigMap.readNamespacedConfigMap(self.name, self.namespace).obj
+        return dict(self.__conf_map.data or {}), self.__conf_map.metadata.resourceVersion
+
+    def store(self, jobs: Dict[str, str], version: Optional[str]) -> Optional[str]:
+        # update the loaded configmap, so its labels, annotations and owner references are kept.
+        # the api server rejects the replace with a conflict if the resourceVersion isn't the current one
+        conf_map = self.__conf_map or ConfigMap.readNamespacedConfigMap(self.name, self.namespace).obj
+        conf_map.metadata.resourceVersion = version
+        conf_map.data = jobs
         try:
-            confMap = self.__load_config_map()
-            confMap.data[job.job_id] = job.json()
-            confMap.replaceNamespacedConfigMap(confMap.metadata.name, confMap.metadata.namespace)
-        finally:
-            self.mutex.release()
+            response = conf_map.replaceNamespacedConfigMap(self.name, self.namespace)
+        except kubernetes.client.exceptions.ApiException as e:
+            if e.status == 409:
+                raise StoreConflictError(f"configmap {self.namespace}/{self.name} was modified") from e
+            raise
+        self.__conf_map = response.obj
+        return self.__conf_map.metadata.resourceVersion
+
+
+class FileSchedulerBackend(SchedulerBackend):
+    """Stores the jobs in a local json file. Useful for tests and for small deployments"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {"version": "0", "jobs": {}}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def load(self) -> Tuple[Dict[str, str], Optional[str]]:
+        content = self.__read()
+        return content["jobs"], content["version"]
+
+    def store(self, jobs: Dict[str, str], version: Optional[str]) -> Optional[str]:
+        current_version = self.__read()["version"]
+        if current_version != version:
+            raise StoreConflictError(f"{self.path} version is {current_version}, expected {version}")
+
+        new_version = str(int(current_version) + 1)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": new_version, "jobs": jobs}, f)
+        os.replace(tmp_path, self.path)
+        return new_version
+
+
+def default_backend() -> SchedulerBackend:
+    if SCHEDULED_JOBS_STORE_PATH:
+        return FileSchedulerBackend(SCHEDULED_JOBS_STORE_PATH)
+    return ConfigMapSchedulerBackend()
+
+
+class SchedulerDal:
+    """
+    Write-behind cache of the scheduled jobs store.
+
+    Reads are served from the cache. Listing the jobs reloads the store once, and keeps local changes that weren't
+    flushed yet. Changes are flushed together every flush_interval seconds (immediately if flush_interval is 0).
+    On a version conflict, the store is reloaded and the local changes are applied on top of it.
+    """
+
+    mutex = Lock()
+
+    def __init__(
+        self, backend: Optional[SchedulerBackend] = None, flush_interval: float = SCHEDULER_DAL_FLUSH_INTERVAL_SEC
+    ):
+        self.backend = backend or default_backend()
+        self.flush_interval = flush_interval
+        self.__jobs, self.__version = self.backend.load()
+        self.__dirty: Dict[str, Optional[str]] = {}  # job id to serialized job, None for deleted jobs
+        self.__flush_requested = threading.Event()
+        if flush_interval > 0:
+            threading.Thread(target=self.__flush_loop, name="scheduler-dal-flush", daemon=True).start()
+
+    def save_scheduled_job(self, job: ScheduledJob):
+        self.__update(job.job_id, job.json())
 
     def get_scheduled_job(self, job_id: str) -> Optional[ScheduledJob]:
-        state_data = self.__load_config_map().data.get(job_id)
+        with self.mutex:
+            state_data = self.__jobs.get(job_id)
         return ScheduledJob(**json.loads(state_data)) if state_data is not None else None
 
     def del_scheduled_job(self, job_id: str):
-        self.mutex.acquire()
-        try:
-            confMap = self.__load_config_map()
-            if confMap.data.get(job_id) is not None:
-                del confMap.data[job_id]
-                confMap.replaceNamespacedConfigMap(confMap.metadata.name, confMap.metadata.namespace)
-        finally:
-            self.mutex.release()
+        with self.mutex:
+            if job_id not in self.__jobs:
+                return
+        self.__update(job_id, None)
 
     def list_scheduled_jobs(self) -> List[ScheduledJob]:
-        return [self.get_scheduled_job(job_id) for job_id in self.__load_config_map().data.keys()]
+        with self.mutex:
+            self.__reload()
+            jobs = list(self.__jobs.values())
+        return [ScheduledJob(**json.loads(state_data)) for state_data in jobs]
+
+    def flush(self):
+        with self.mutex:
+            self.__flush()
+
+    def __update(self, job_id: str, state_data: Optional[str]):
+        with self.mutex:
+            if state_data is None:
+                self.__jobs.pop(job_id, None)
+            else:
+                self.__jobs[job_id] = state_data
+            self.__dirty[job_id] = state_data
+            if self.flush_interval <= 0:
+                self.__flush()
+            else:
+                self.__flush_requested.set()
+
+    def __reload(self):
+        self.__jobs, self.__version = self.backend.load()
+        self.__apply_dirty()
+
+    def __apply_dirty(self):
+        for job_id, state_data in self.__dirty.items():
+            if state_data is None:
+                self.__jobs.pop(job_id, None)
+            else:
+                self.__jobs[job_id] = state_data
+
+    def __flush(self):
+        if not self.__dirty:
+            return
+        for _ in range(MAX_CONFLICT_RETRIES):
+            try:
+                self.__version = self.backend.store(dict(self.__jobs), self.__version)
+                self.__dirty = {}
+                return
+            except StoreConflictError:
+                logging.info("Scheduled jobs store was modified, reloading it")
+                self.__reload()
+        logging.error(f"Failed to save scheduled jobs after {MAX_CONFLICT_RETRIES} conflicts. Will retry later")
+        self.__flush_requested.set()
+
+    def __flush_loop(self):
+        while True:
+            self.__flush_requested.wait()
+            # coalesce all the changes made during the flush interval into a single write
+            time.sleep(self.flush_interval)
+            self.__flush_requested.clear()
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("Failed to save scheduled jobs")
+                self.__flush_requested.set()
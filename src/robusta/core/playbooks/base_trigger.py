@@ -18,6 +18,10 @@ class TriggerEvent(BaseModel):
         """Returns a description of the concrete event"""
         return "NA"
 
+    def get_event_key(self) -> Optional[str]:
+        """Returns the key of the object the event is about. Events with the same key are handled in order"""
+        return None
+
 
 class BaseTrigger(DocumentedModel):
     def get_trigger_event(self) -> str:
@@ -2,6 +2,7 @@ import logging
 from typing import Optional
 
 from robusta.core.model.base_params import NamedRegexPattern
+from robusta.core.model.env_vars import POD_LOGS_ENRICHMENT_MAX_BYTES
 from robusta.core.playbooks.pod_utils.crashloop_utils import get_crash_report_enrichments
 from robusta.core.reporting import Finding, FindingSource, FindingSeverity, FileBlock, EmptyFileBlock
 from robusta.core.reporting.base import EnrichmentType
@@ -41,11 +42,12 @@ def send_crash_report(
 
     for container_status in crashed_container_statuses:
         try:
-            container_log = pod.get_logs(
+            container_log = pod.get_log_contents(
                 container_status.name,
                 previous=True,
                 regex_replacer_patterns=regex_replacer_patterns,
                 regex_replacement_style=regex_replacement_style,
+                max_bytes=POD_LOGS_ENRICHMENT_MAX_BYTES,
             )
 
             if not container_log:
@@ -55,7 +57,7 @@ def send_crash_report(
                     f"could not fetch logs from container: {container_status.name}"
                 )
             else:
-                log_block = FileBlock(filename=f"{pod.metadata.name}.log", contents=container_log.encode())
+                log_block = FileBlock(filename=f"{pod.metadata.name}.log", contents=container_log)
 
             finding.add_enrichment([log_block],
                                    enrichment_type=EnrichmentType.text_file, title="Logs")
@@ -12,6 +12,7 @@ from robusta.api import (
     RegexReplacementStyle,
     RobustaPod,
 )
+from robusta.core.model.env_vars import POD_LOGS_ENRICHMENT_MAX_BYTES
 from robusta.core.playbooks.pod_utils.crashloop_utils import get_crash_report_enrichments
 from robusta.core.reporting.base import EnrichmentType
 
@@ -56,14 +57,15 @@ def start_log_enrichment(
         #  similar problems in other cases.
         container = pod.spec.containers[0].name
 
-    log_data = ""
+    log_data = b""
     for _ in range(tries - 1):
-        log_data = pod.get_logs(
+        log_data = pod.get_log_contents(
             container=container,
             regex_replacer_patterns=params.regex_replacer_patterns,
             regex_replacement_style=regex_replacement_style,
             filter_regex=params.filter_regex,
             previous=params.previous,
+            max_bytes=POD_LOGS_ENRICHMENT_MAX_BYTES,
         )
         if not log_data:
             logging.info("log data is empty, retrying...")
@@ -78,7 +80,7 @@ def start_log_enrichment(
             f"could not fetch logs from container: {container}"
         )
     else:
-        log_block = FileBlock(filename=f"{pod.metadata.name}.log", contents=log_data.encode())
+        log_block = FileBlock(filename=f"{pod.metadata.name}.log", contents=log_data)
     title = "Logs" if not title_override else title_override
     event.add_enrichment([log_block],
                          enrichment_type=EnrichmentType.text_file, title=title)
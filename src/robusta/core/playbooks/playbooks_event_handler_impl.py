@@ -1,14 +1,14 @@
-import copy
 import logging
 import sys
 import time
 import traceback
 from collections import defaultdict
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import prometheus_client
 from prometrix import PrometheusNotFound
 
+from robusta.core.model.env_vars import ASYNC_SINK_DELIVERY
 from robusta.core.model.events import ExecutionBaseEvent, ExecutionContext
 from robusta.core.playbooks.base_trigger import BaseTrigger, TriggerEvent
 from robusta.core.playbooks.playbook_utils import merge_global_params, to_safe_str
@@ -18,7 +18,10 @@ from robusta.core.reporting import MarkdownBlock
 from robusta.core.reporting.base import Finding
 from robusta.core.reporting.consts import SYNC_RESPONSE_SINK
 from robusta.core.sinks.robusta.dal.model_conversion import ModelConversion
+from robusta.core.sinks.sink_base import SinkBase
+from robusta.core.sinks.sink_delivery import SinkDeliveryEngine
 from robusta.integrations.kubernetes.base_triggers import K8sBaseTrigger
+from robusta.integrations.kubernetes.custom_models import debugger_pod_pool
 from robusta.model.alert_relabel_config import AlertRelabel
 from robusta.model.config import Registry
 from robusta.model.playbook_action import PlaybookAction
@@ -37,9 +40,12 @@ playbooks_summary = prometheus_client.Summary(
 class PlaybooksEventHandlerImpl(PlaybooksEventHandler):
     def __init__(self, registry: Registry):
         self.registry = registry
+        self.sink_delivery = SinkDeliveryEngine()
+        # set in event worker processes, which send the findings to the runner process to deliver them
+        self.findings_forwarder: Optional[Callable[[Dict[str, List[Finding]]], None]] = None
 
     def handle_trigger(self, trigger_event: TriggerEvent) -> Optional[Dict[str, Any]]:
-        playbooks = self.registry.get_playbooks().get_playbooks(trigger_event)
+        playbooks = self.registry.get_playbooks().get_candidate_playbooks(trigger_event)
         if not playbooks:  # no registered playbooks for this event type
             return
 
@@ -124,7 +130,7 @@ class PlaybooksEventHandlerImpl(PlaybooksEventHandler):
 
         finding_json["evidence"] = [
             ModelConversion.to_evidence_json(
-                account_id, cluster_id, SYNC_RESPONSE_SINK, signing_key, finding.id, enrichment
+                account_id, cluster_id, SYNC_RESPONSE_SINK, signing_key, finding.id, enrichment, finding.encoding
             )
             for enrichment in finding.enrichments
         ]
@@ -221,14 +227,12 @@ class PlaybooksEventHandlerImpl(PlaybooksEventHandler):
                 continue
 
             action_with_params: bool = registered_action.params_type is not None
-            action_params = None
             params = None
             if action_with_params:
                 try:
-                    action_params = merge_global_params(self.get_global_config(), action.action_params)
-                    params = registered_action.params_type(**action_params)
-                    params.post_initialization()
+                    params = action.get_params(self.get_global_config(), registered_action.params_type)
                 except Exception:
+                    action_params = merge_global_params(self.get_global_config(), action.action_params or {})
                     msg = (
                         f"Failed to create {registered_action.params_type} "
                         f"using {to_safe_str(action_params)} for running {action.action_name} "
@@ -246,7 +250,7 @@ class PlaybooksEventHandlerImpl(PlaybooksEventHandler):
                 msg = (
                     e.msg
                     if e.msg
-                    else f"Action Exception {e.type} while processing {action.action_name} {to_safe_str(action_params)}"
+                    else f"Action Exception {e.type} while processing {action.action_name} {to_safe_str(params)}"
                 )
                 logging.exception(msg)
                 execution_event.response = self.__error_resp(msg, e.code, log=False)
@@ -272,7 +276,7 @@ class PlaybooksEventHandlerImpl(PlaybooksEventHandler):
                 playbooks_errors_count.labels(source).inc()
             except Exception:
                 logging.error(
-                    f"Failed to execute action {action.action_name} {to_safe_str(action_params)}", exc_info=True
+                    f"Failed to execute action {action.action_name} {to_safe_str(params)}", exc_info=True
                 )
                 execution_event.response = self.__error_resp(
                     ErrorCodes.ACTION_UNEXPECTED_ERROR.name, ErrorCodes.ACTION_UNEXPECTED_ERROR.value, log=False
@@ -296,13 +300,17 @@ class PlaybooksEventHandlerImpl(PlaybooksEventHandler):
         return None
 
     def __handle_findings(self, execution_event: ExecutionBaseEvent):
-        sinks_info = self.registry.get_telemetry().sinks_info
+        if self.findings_forwarder:
+            self.findings_forwarder(execution_event.sink_findings)
+        else:
+            self.deliver_findings(execution_event.sink_findings)
 
-        for sink_name in execution_event.sink_findings.keys():
+    def deliver_findings(self, sink_findings: Dict[str, List[Finding]]):
+        for sink_name in sink_findings.keys():
             if SYNC_RESPONSE_SINK == sink_name:
                 continue  # not a real sink, just container for findings that needs to be returned synchronously
 
-            for finding in execution_event.sink_findings[sink_name]:
+            for finding in sink_findings[sink_name]:
                 try:
                     sink = self.registry.get_sinks().sinks.get(sink_name)
                     if not sink:
@@ -311,19 +319,22 @@ class PlaybooksEventHandlerImpl(PlaybooksEventHandler):
 
                     # only write the finding if is matching against the sink matchers
                     if sink.accepts(finding):
-                        try:
-                            # create deep copy, so that iterating on one sink enrichments won't affect the others
-                            # Each sink has a different findings, but enrichments are shared
-                            finding_copy = copy.deepcopy(finding)
-                            sink.write_finding(finding_copy, self.registry.get_sinks().platform_enabled)
-
-                            sink_info = sinks_info[sink_name]
-                            sink_info.type = sink.__class__.__name__
-                            sink_info.findings_count += 1
-                        except Exception:  # if we have an error, we should still respect stop
-                            logging.exception(
-                                f"Failed to send finding {finding.aggregation_key} to sink {sink.sink_name}"
+                        # copy the finding, so that changes made by one sink won't affect the others
+                        # Each sink has a different finding, but the enrichment blocks are shared
+                        finding_copy = finding.copy_for_sink()
+                        platform_enabled = self.registry.get_sinks().platform_enabled
+                        if ASYNC_SINK_DELIVERY:
+                            # the sink accepted the finding, so stop is respected even though it's written later
+                            self.sink_delivery.add_task(
+                                sink_name,
+                                sink.params.delivery,
+                                self.__write_finding,
+                                sink,
+                                finding_copy,
+                                platform_enabled,
                             )
+                        else:
+                            self.__write_finding(sink, finding_copy, platform_enabled)
 
                         if sink.params.stop:
                             return
@@ -331,6 +342,16 @@ class PlaybooksEventHandlerImpl(PlaybooksEventHandler):
                 except Exception:  # Failure to send to one sink shouldn't fail all
                     logging.error(f"Failed to publish finding to sink {sink_name}", exc_info=True)
 
+    def __write_finding(self, sink: SinkBase, finding: Finding, platform_enabled: bool):
+        try:
+            sink.write_finding(finding, platform_enabled)
+
+            sink_info = self.registry.get_telemetry().sinks_info[sink.sink_name]
+            sink_info.type = sink.__class__.__name__
+            sink_info.findings_count += 1
+        except Exception:  # if we have an error, we should still respect stop
+            logging.exception(f"Failed to send finding {finding.aggregation_key} to sink {sink.sink_name}")
+
     def get_global_config(self) -> dict:
         return self.registry.get_global_config()
 
@@ -366,6 +387,14 @@ class PlaybooksEventHandlerImpl(PlaybooksEventHandler):
         if receiver is not None:
             receiver.stop()
 
+        scheduler = self.registry.get_scheduler()
+        if scheduler is not None:
+            scheduler.flush()  # scheduled jobs state changes are written periodically
+
+        self.sink_delivery.stop()  # deliver pending findings before shutting down
+        for sink in self.registry.get_sinks().get_all().values():
+            sink.flush()
+        debugger_pod_pool.stop()  # don't leave idle debugger pods on the nodes
         self.set_cluster_active(False)
         sys.exit(0)
 
@@ -0,0 +1,117 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from robusta.core.playbooks.base_trigger import BaseTrigger, TriggerEvent
+from robusta.integrations.kubernetes.base_triggers import K8sBaseTrigger, K8sTriggerEvent
+from robusta.integrations.prometheus.trigger import PrometheusAlertTrigger, PrometheusTriggerEvent
+from robusta.model.playbook_definition import PlaybookDefinition
+from robusta.utils.prefix_trie import PrefixTrie
+
+ANY_KIND = "Any"
+ALL_STATUSES = "all"
+
+
+class _PrefixIndex:
+    """Matches a value against many prefixes. An empty prefix matches everything, like `prefix_match`"""
+
+    def __init__(self):
+        self.prefixes: PrefixTrie[int] = PrefixTrie()
+        self.wildcards: Set[int] = set()
+
+    def add(self, prefix: Optional[str], trigger_id: int):
+        if prefix:
+            self.prefixes.insert(prefix, trigger_id)
+        else:
+            self.wildcards.add(trigger_id)
+
+    def matching(self, value: Optional[str]) -> Set[int]:
+        matches: Set[int] = set()
+        if value is not None:
+            for trigger_ids in self.prefixes.iter_prefix_values(value):
+                matches.update(trigger_ids)
+        return matches
+
+
+class PlaybooksIndex:
+    """
+    Precompiled dispatch index for the playbooks registered on a single trigger event type.
+
+    The index only narrows the list of candidate playbooks. Each candidate still goes through the full
+    `should_fire` check of its triggers, so the index must never filter out a playbook that could fire.
+    Triggers that aren't indexed (custom triggers, for example) always make their playbook a candidate.
+    Candidates are returned in the original playbooks order, to keep the `stop` semantics intact.
+    """
+
+    def __init__(self, playbooks: List[PlaybookDefinition]):
+        self.playbooks = playbooks
+        self.__always: Set[int] = set()
+
+        # kubernetes triggers are indexed by trigger id. A trigger id maps to the playbook position
+        self.__k8s_trigger_to_playbook: List[int] = []
+        self.__k8s_kind_operation: Dict[Tuple[str, Optional[str]], List[int]] = defaultdict(list)
+        self.__k8s_names = _PrefixIndex()
+        self.__k8s_namespaces = _PrefixIndex()
+
+        # prometheus triggers are indexed by (alert name, status). None is a wildcard on both
+        self.__alerts: Dict[Tuple[Optional[str], Optional[str]], Set[int]] = defaultdict(set)
+
+        for position, playbook in enumerate(playbooks):
+            for trigger in playbook.triggers:
+                self.__add_trigger(position, trigger.get())
+
+    def __add_trigger(self, position: int, trigger: BaseTrigger):
+        if isinstance(trigger, K8sBaseTrigger):
+            trigger_id = len(self.__k8s_trigger_to_playbook)
+            self.__k8s_trigger_to_playbook.append(position)
+            operation = trigger.operation.value if trigger.operation else None
+            self.__k8s_kind_operation[(trigger.kind, operation)].append(trigger_id)
+            self.__k8s_names.add(trigger.name_prefix, trigger_id)
+            self.__k8s_namespaces.add(trigger.namespace_prefix, trigger_id)
+        elif isinstance(trigger, PrometheusAlertTrigger):
+            status = None if trigger.status in (None, ALL_STATUSES) else trigger.status
+            self.__alerts[(trigger.alert_name, status)].add(position)
+        else:
+            self.__always.add(position)
+
+    def get_candidates(self, trigger_event: TriggerEvent) -> List[PlaybookDefinition]:
+        if isinstance(trigger_event, K8sTriggerEvent):
+            positions = self.__k8s_candidates(trigger_event)
+        elif isinstance(trigger_event, PrometheusTriggerEvent):
+            positions = self.__alert_candidates(trigger_event)
+        else:
+            return self.playbooks
+
+        positions.update(self.__always)
+        if len(positions) == len(self.playbooks):
+            return self.playbooks
+        return [self.playbooks[position] for position in sorted(positions)]
+
+    def __k8s_candidates(self, trigger_event: K8sTriggerEvent) -> Set[int]:
+        k8s_payload = trigger_event.k8s_payload
+        kind = k8s_payload.kind
+        operation = k8s_payload.operation
+        trigger_ids: List[int] = []
+        for key in [(kind, operation), (kind, None), (ANY_KIND, operation), (ANY_KIND, None)]:
+            trigger_ids.extend(self.__k8s_kind_operation.get(key, []))
+        if not trigger_ids:
+            return set()
+
+        meta = k8s_payload.obj.get("metadata") or {}
+        names = self.__k8s_names
+        namespaces = self.__k8s_namespaces
+        matching_names = names.matching(meta.get("name", ""))
+        matching_namespaces = namespaces.matching(meta.get("namespace", ""))
+        return {
+            self.__k8s_trigger_to_playbook[trigger_id]
+            for trigger_id in trigger_ids
+            if (trigger_id in names.wildcards or trigger_id in matching_names)
+            and (trigger_id in namespaces.wildcards or trigger_id in matching_namespaces)
+        }
+
+    def __alert_candidates(self, trigger_event: PrometheusTriggerEvent) -> Set[int]:
+        alert_name = trigger_event.alert.labels.get("alertname")
+        status = trigger_event.alert.status
+        positions: Set[int] = set()
+        for key in [(alert_name, status), (alert_name, None), (None, status), (None, None)]:
+            positions.update(self.__alerts.get(key, set()))
+        return positions
@@ -6,6 +6,7 @@ from string import Template
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import humanize
+import numpy as np
 import pygal
 from hikaru.model.rel_1_26 import Node
 from prometrix import PrometheusQueryResult
@@ -17,10 +18,23 @@ from robusta.core.model.base_params import (
     ResourceChartItemType,
     ResourceChartResourceType,
 )
-from robusta.core.model.env_vars import FLOAT_PRECISION_LIMIT, PROMETHEUS_REQUEST_TIMEOUT_SECONDS
+from robusta.core.model.env_vars import (
+    CHART_MAX_POINTS_PER_SERIES,
+    CHART_VECTORIZED_SERIES,
+    FLOAT_PRECISION_LIMIT,
+    PROMETHEUS_QUERY_CACHE_ENABLED,
+    PROMETHEUS_REQUEST_TIMEOUT_SECONDS,
+)
+from robusta.core.playbooks.prometheus_query_cache import prometheus_query_cache
 from robusta.core.reporting.blocks import GraphBlock, PrometheusBlock, PrometheusBlockLineData
 from robusta.core.reporting.custom_rendering import PlotCustomCSS, charts_style
-from robusta.integrations.prometheus.utils import get_prometheus_connect
+from robusta.integrations.prometheus.utils import (
+    PrometheusClientPool,
+    check_prometheus_connection,
+    get_prometheus_connect,
+    prometheus_query_latency,
+)
+from robusta.utils.downsampling import lttb
 
 ResourceKey = Tuple[ResourceChartResourceType, ResourceChartItemType]
 ChartLabelFactory = Callable[[int], str]
@@ -90,11 +104,24 @@ def run_prometheus_query_range(
 
     prom = get_prometheus_connect(prometheus_params)
     params = {"timeout": PROMETHEUS_REQUEST_TIMEOUT_SECONDS}
-    prom.check_prometheus_connection(params)
-    result = prom.safe_custom_query_range(
-        query=promql_query, start_time=starts_at, end_time=ends_at, step=step, params=params
-    )
-
+    check_prometheus_connection(prom, params)
+
+    def query_range(start_time: datetime, end_time: datetime, query_step: str) -> dict:
+        try:
+            with prometheus_query_latency.labels("query_range").time():
+                return prom.safe_custom_query_range(
+                    query=promql_query, start_time=start_time, end_time=end_time, step=query_step, params=params
+                )
+        except Exception:
+            PrometheusClientPool.mark_unhealthy(prom)
+            raise
+
+    if not PROMETHEUS_QUERY_CACHE_ENABLED:
+        return PrometheusQueryResult(data=query_range(starts_at, ends_at, step))
+
+    # the results depend on the queried prometheus, including tenant headers
+    cache_key = (prom.url, tuple(sorted(prom.headers.items())), promql_query)
+    result = prometheus_query_cache.query_range(cache_key, query_range, starts_at, ends_at, step)
     return PrometheusQueryResult(data=result)
 
 
@@ -115,6 +142,39 @@ def get_resolution_from_duration(duration: timedelta) -> int:
     return _DEFAULT_RESOLUTION
 
 
+def get_series_plot_values(
+    series: PrometheusSeriesDict, vectorized: Optional[bool] = None
+) -> Tuple[List[Tuple[float, float]], float, float, float]:
+    """
+    Returns the (timestamp, value) points to plot for a series, its max value (0 for series without positive values),
+    and its min and max timestamps.
+    With vectorized (CHART_VECTORIZED_SERIES when not given), the series is processed with numpy, and downsampled to
+    CHART_MAX_POINTS_PER_SERIES points.
+    """
+    if vectorized is None:
+        vectorized = CHART_VECTORIZED_SERIES
+    if not vectorized:
+        values = []
+        max_value = 0
+        for index in range(len(series["values"])):
+            timestamp = series["timestamps"][index]
+            value = round(float(series["values"][index]), FLOAT_PRECISION_LIMIT)
+            values.append((timestamp, value))
+            if value > max_value:
+                max_value = value
+        return values, max_value, min(series["timestamps"]), max(series["timestamps"])
+
+    timestamps = np.asarray(series["timestamps"], dtype=float)
+    values = np.round(np.asarray(series["values"], dtype=float), FLOAT_PRECISION_LIMIT)
+    numeric_values = values[~np.isnan(values)]
+    max_value = max(float(numeric_values.max()), 0) if len(numeric_values) else 0
+    min_time, max_time = float(timestamps.min()), float(timestamps.max())
+    # the triangle areas of lttb are not defined for NaN and infinite values
+    if CHART_MAX_POINTS_PER_SERIES and np.isfinite(values).all():
+        timestamps, values = lttb(timestamps, values, CHART_MAX_POINTS_PER_SERIES)
+    return list(zip(timestamps.tolist(), values.tolist())), max_value, min_time, max_time
+
+
 def get_target_name(series: PrometheusSeriesDict) -> Optional[str]:
     for label in ["container", "pod", "node"]:
         if label in series["metric"]:
@@ -222,15 +282,10 @@ def create_chart_from_prometheus_query(
         if label == "" and chart_label_factory is not None:
             label = chart_label_factory(i)
 
-        values = []
-        for index in range(len(series["values"])):
-            timestamp = series["timestamps"][index]
-            value = round(float(series["values"][index]), FLOAT_PRECISION_LIMIT)
-            values.append((timestamp, value))
-            if value > max_y_value:
-                max_y_value = value
-        min_time = min(min_time, min(series["timestamps"]))
-        max_time = max(max_time, max(series["timestamps"]))
+        values, series_max_value, series_min_time, series_max_time = get_series_plot_values(series)
+        max_y_value = max(max_y_value, series_max_value)
+        min_time = min(min_time, series_min_time)
+        max_time = max(max_time, series_max_time)
 
         # Adjust min_time to ensure it is at least 1 hour before oom_kill_time, and adjust max_time to ensure it is at least 30 minutes after oom_kill_time, as required for the graph plot adjustments.
         if oom_kill_time:
@@ -455,14 +510,10 @@ def build_chart_from_prometheus_result(
         if not label:
             label = "\n".join([v for (key, v) in series["metric"].items() if key != "job"])
 
-        values = []
-        for idx, timestamp in enumerate(series["timestamps"]):
-            val = round(float(series["values"][idx]), FLOAT_PRECISION_LIMIT)
-            values.append((timestamp, val))
-            max_y_value = max(max_y_value, val)
-
-        min_time = min(min_time, min(series["timestamps"]))
-        max_time = max(max_time, max(series["timestamps"]))
+        values, series_max_value, series_min_time, series_max_time = get_series_plot_values(series)
+        max_y_value = max(max_y_value, series_max_value)
+        min_time = min(min_time, series_min_time)
+        max_time = max(max_time, series_max_time)
 
         plot_data = PlotData(
             plot=(label, values),
@@ -544,8 +595,13 @@ def run_prometheus_query(prometheus_params: PrometheusParams, query: str) -> Pro
     prom = get_prometheus_connect(prometheus_params)
     query = __add_additional_labels(query, prometheus_params)
     prom_params = {"timeout": PROMETHEUS_REQUEST_TIMEOUT_SECONDS}
-    prom.check_prometheus_connection(prom_params)
-    results = prom.safe_custom_query(query=query, params=prom_params)
+    check_prometheus_connection(prom, prom_params)
+    try:
+        with prometheus_query_latency.labels("query").time():
+            results = prom.safe_custom_query(query=query, params=prom_params)
+    except Exception:
+        PrometheusClientPool.mark_unhealthy(prom)
+        raise
     return PrometheusQueryResult(results)
 
 
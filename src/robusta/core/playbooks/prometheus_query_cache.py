@@ -0,0 +1,205 @@
+import bisect
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import prometheus_client
+from cachetools import TTLCache
+
+from robusta.core.model.env_vars import (
+    PROMETHEUS_QUERY_CACHE_FRESHNESS_LAG_SEC,
+    PROMETHEUS_QUERY_CACHE_MAX_BYTES,
+    PROMETHEUS_QUERY_CACHE_TTL_SEC,
+)
+
+# estimated serialized size of a single [timestamp, "value"] point, without the value itself
+POINT_OVERHEAD_BYTES = 20
+
+query_cache_requests = prometheus_client.Counter(
+    "prometheus_query_cache_requests",
+    "Number of prometheus range queries by cache result (hit, partial, miss or bypass)",
+    ["result"],
+)
+query_cache_saved_bytes = prometheus_client.Counter(
+    "prometheus_query_cache_saved_bytes", "Estimated size of the prometheus range query results served from the cache"
+)
+
+# fetches a range query: (start, end, step) -> the prometheus query_range response data
+RangeFetcher = Callable[[datetime, datetime, str], dict]
+SeriesKey = Tuple[Tuple[str, str], ...]
+
+
+class CachedSeries:
+    def __init__(self, metric: Dict[str, str]):
+        self.metric = metric
+        self.timestamps: List[float] = []
+        self.values: List[str] = []
+
+    def truncate_after(self, timestamp: float):
+        index = bisect.bisect_right(self.timestamps, timestamp)
+        del self.timestamps[index:]
+        del self.values[index:]
+
+    def extend(self, values: List[List]):
+        for point_timestamp, value in values:
+            self.timestamps.append(float(point_timestamp))
+            self.values.append(value)
+
+    def range_values(self, start: float, end: float) -> List[List]:
+        first = bisect.bisect_left(self.timestamps, start)
+        last = bisect.bisect_right(self.timestamps, end)
+        return [[self.timestamps[i], self.values[i]] for i in range(first, last)]
+
+    def size(self) -> int:
+        labels_size = sum(len(name) + len(value) for name, value in self.metric.items())
+        return labels_size + sum(len(value) + POINT_OVERHEAD_BYTES for value in self.values)
+
+
+class CachedRange:
+    """
+    The series of a range query, for the grid points between start and end.
+
+    Points up to stable_until were old enough when fetched to not change anymore. Newer points are refetched.
+    """
+
+    def __init__(self, start: float, end: float, stable_until: float):
+        self.start = start
+        self.end = end
+        self.stable_until = stable_until
+        self.series: Dict[SeriesKey, CachedSeries] = {}
+        self.created_at = time.time()
+        self.size = 0
+
+    def merge(self, result: List[dict], after: float, end: float, stable_until: float):
+        """Replace the points newer than after, with the points of result (fetched from after, up to end)"""
+        for series in self.series.values():
+            series.truncate_after(after)
+        for result_series in result:
+            key = tuple(sorted(result_series["metric"].items()))
+            cached_series = self.series.get(key)
+            if cached_series is None:
+                cached_series = self.series[key] = CachedSeries(result_series["metric"])
+            cached_series.extend(result_series.get("values", []))
+        self.end = end
+        self.stable_until = max(min(end, stable_until), after)
+        self.size = sum(series.size() for series in self.series.values())
+
+    def range_result(self, start: float, end: float) -> Tuple[dict, int]:
+        """The query result of the points between start and end, and its estimated size"""
+        result = []
+        size = 0
+        for series in self.series.values():
+            values = series.range_values(start, end)
+            if values:
+                result.append({"metric": series.metric, "values": values})
+                size += sum(len(value) + POINT_OVERHEAD_BYTES for _, value in values)
+        return {"resultType": "matrix", "result": result}, size
+
+
+def step_seconds(step: str) -> Optional[int]:
+    """The step, rounded up to whole seconds, or None for steps not given in seconds (for example '5m')"""
+    try:
+        return max(math.ceil(float(step)), 1)
+    except ValueError:
+        return None
+
+
+class PrometheusQueryCache:
+    """
+    Cache of prometheus range query results.
+
+    The start, end and step of each query are snapped to a grid of the step size, so overlapping time windows of the
+    same query share grid points. When a cached range covers the start of a query, only the missing tail of the query
+    is fetched from prometheus.
+    The points of the last freshness_lag_sec are not considered final (late scrapes, rule evaluations), and are
+    fetched again by the next query.
+    The cache is an LRU, bounded by the estimated size of the cached results. Ranges expire ttl_sec after they are
+    first fetched.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = PROMETHEUS_QUERY_CACHE_MAX_BYTES,
+        ttl_sec: int = PROMETHEUS_QUERY_CACHE_TTL_SEC,
+        freshness_lag_sec: int = PROMETHEUS_QUERY_CACHE_FRESHNESS_LAG_SEC,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        self.freshness_lag_sec = freshness_lag_sec
+        self.__init_state()
+
+    def reset_after_fork(self):
+        """Drop the ranges of the parent process, which a parent thread may have been merging when it forked"""
+        self.__init_state()
+
+    def __init_state(self):
+        self.__ranges: TTLCache = TTLCache(
+            maxsize=self.max_bytes, ttl=self.ttl_sec, getsizeof=lambda cached: cached.size
+        )
+        self.__lock = threading.Lock()
+
+    def query_range(
+        self, key: Hashable, fetch: RangeFetcher, starts_at: datetime, ends_at: datetime, step: str
+    ) -> dict:
+        step_sec = step_seconds(step)
+        if step_sec is None:
+            query_cache_requests.labels("bypass").inc()
+            return fetch(starts_at, ends_at, step)
+
+        start = math.floor(starts_at.timestamp() / step_sec) * step_sec
+        end = max(math.floor(ends_at.timestamp() / step_sec) * step_sec, start)
+        key = (key, step_sec)
+        with self.__lock:
+            cached: Optional[CachedRange] = self.__ranges.get(key)
+            if cached and (time.time() - cached.created_at > self.ttl_sec or cached.start > start):
+                cached = None
+            if cached and cached.stable_until < start - step_sec:
+                cached = None  # the missing tail is not adjacent to the query start, and would leave a gap
+
+            if cached and end <= cached.stable_until:
+                query_cache_requests.labels("hit").inc()
+                result, size = cached.range_result(start, end)
+                query_cache_saved_bytes.inc(size)
+                return result
+
+            fetch_after = cached.stable_until if cached else start - step_sec
+            if cached:
+                _, cached_size = cached.range_result(start, fetch_after)
+
+        data = fetch(self.__datetime(fetch_after + step_sec), self.__datetime(end), str(step_sec))
+        if data.get("resultType") != "matrix":
+            query_cache_requests.labels("bypass").inc()
+            return data
+
+        if cached:
+            query_cache_requests.labels("partial").inc()
+            query_cache_saved_bytes.inc(cached_size)
+        else:
+            query_cache_requests.labels("miss").inc()
+            cached = CachedRange(start, end, fetch_after)
+
+        stable_until = math.floor((time.time() - self.freshness_lag_sec) / step_sec) * step_sec
+        with self.__lock:
+            cached.merge(data["result"], fetch_after, end, stable_until)
+            result, _ = cached.range_result(start, end)
+            try:
+                self.__ranges[key] = cached
+            except ValueError:  # larger than the whole cache
+                logging.debug(f"prometheus query result of {cached.size} bytes is too large to cache")
+        return result
+
+    def clear(self):
+        with self.__lock:
+            self.__ranges.clear()
+
+    @staticmethod
+    def __datetime(timestamp: float) -> datetime:
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+prometheus_query_cache = PrometheusQueryCache()
+os.register_at_fork(after_in_child=prometheus_query_cache.reset_after_fork)
@@ -1,6 +1,6 @@
+import copy
 import hashlib
 import logging
-import re
 import urllib.parse
 import uuid
 from abc import ABC, abstractmethod
@@ -15,8 +15,9 @@ from strenum import StrEnum
 from robusta.core.discovery.top_service_resolver import TopServiceResolver
 from robusta.core.model.env_vars import ROBUSTA_UI_DOMAIN
 from robusta.core.reporting.consts import FindingSource, FindingSubjectType, FindingType
+from robusta.core.reporting.finding_encoding import FindingEncoding
 from robusta.integrations.kubernetes.api_client_utils import get_namespace_labels
-from robusta.utils.scope import BaseScopeMatcher
+from robusta.utils.scope import BaseScopeMatcher, compile_value_matcher
 from robusta.utils.time_utils import current_utc_timestamp
 
 
@@ -151,6 +152,15 @@ class Enrichment:
     def __str__(self):
         return f"annotations: {self.annotations} Enrichment: {self.blocks} "
 
+    def copy_for_sink(self) -> "Enrichment":
+        # the blocks list is copied, but the blocks themselves are shared
+        return Enrichment(
+            blocks=list(self.blocks),
+            annotations=dict(self.annotations),
+            enrichment_type=self.enrichment_type,
+            title=self.title,
+        )
+
 
 class FilterableScopeMatcher(BaseScopeMatcher):
     def __init__(self, data):
@@ -177,12 +187,12 @@ class Filterable(ABC):
         if isinstance(expression, str) or isinstance(expression, Dict):
             return Filterable.__value_match(value, expression)
         else:  # expression is list of values
-            return any([Filterable.__value_match(value, single_exp) for single_exp in expression])
+            return any(Filterable.__value_match(value, single_exp) for single_exp in expression)
 
     @staticmethod
     def __value_match(value: Union[str, Dict[str, str]], expression: Union[str, Dict]) -> bool:
         if isinstance(value, str) and isinstance(expression, str):
-            return bool(re.match(expression, value))
+            return compile_value_matcher(expression).match(value)
         elif isinstance(value, Dict) and isinstance(expression, Dict):  # value is Dict[str, str], expression is a Dict
             return expression.items() <= value.items()
         else:
@@ -194,16 +204,17 @@ class Filterable(ABC):
         accept = True
         if scope_requirements is not None:
             data = self.attribute_map
-            try:
-                data["namespace_labels"] = get_namespace_labels(data["namespace"])
-            except KeyError:
-                data["namespace_labels"] = {}
+            if scope_requirements.uses_attribute("namespace_labels"):  # avoid fetching the namespace if not needed
+                try:
+                    data["namespace_labels"] = get_namespace_labels(data["namespace"])
+                except KeyError:
+                    data["namespace_labels"] = {}
             matcher = FilterableScopeMatcher(data)
             if scope_requirements.exclude:
-                if matcher.scope_inc_exc_matches(scope_requirements.exclude):
+                if matcher.scope_inc_exc_matches(scope_requirements.compiled_exclude):
                     return False
             if scope_requirements.include:
-                if matcher.scope_inc_exc_matches(scope_requirements.include):
+                if matcher.scope_inc_exc_matches(scope_requirements.compiled_include):
                     return True
                 else:  # include was defined, but not matched. So if not matched by old matcher, should be rejected!
                     accept = False
@@ -282,10 +293,7 @@ class Finding(Filterable):
         self.subject = subject
         self.enrichments: List[Enrichment] = []
         self.links: List[Link] = []
-        self.service = TopServiceResolver.guess_cached_resource(name=subject.name, namespace=subject.namespace)
-        self.service_key = self.service.get_resource_key() if self.service else ""
-        uri_path = f"services/{self.service_key}?tab=grouped" if self.service_key else "graphs"
-        self.investigate_uri = f"{ROBUSTA_UI_DOMAIN}/{uri_path}"
+        self.resolve_service()
         self.add_silence_url = add_silence_url
         self.silence_labels = silence_labels
         self.creation_date = creation_date
@@ -295,6 +303,15 @@ class Finding(Filterable):
         self.starts_at = starts_at if starts_at else current_utc_timestamp()
         self.ends_at = ends_at
         self.dirty = False
+        self.encoding = FindingEncoding()  # shared by the sink copies of the finding
+
+    def resolve_service(self):
+        """Set the service of the finding subject, from the cached services"""
+        subject = self.subject
+        self.service = TopServiceResolver.guess_cached_resource(name=subject.name, namespace=subject.namespace)
+        self.service_key = self.service.get_resource_key() if self.service else ""
+        uri_path = f"services/{self.service_key}?tab=grouped" if self.service_key else "graphs"
+        self.investigate_uri = f"{ROBUSTA_UI_DOMAIN}/{uri_path}"
 
     @property
     def attribute_map(self) -> Dict[str, Union[str, Dict[str, str]]]:
@@ -371,6 +388,24 @@ class Finding(Filterable):
         video_link.type = LinkType.VIDEO
         self.add_link(video_link, suppress_warning)
 
+    def copy_for_sink(self) -> "Finding":
+        """
+        Copy of the finding for a single sink, used when the same finding is sent to multiple sinks.
+
+        Sinks may change the finding attributes, links and enrichments, so these are copied.
+        The enrichment blocks, which might hold large files, are shared between the copies and must not be
+        modified in place by sinks. The finding encoding is shared too, so each block is encoded once for all sinks.
+        """
+        finding_copy = copy.copy(self)
+        finding_copy.subject = copy.copy(self.subject)
+        finding_copy.subject.labels = dict(self.subject.labels)
+        finding_copy.subject.annotations = dict(self.subject.annotations)
+        if self.silence_labels is not None:
+            finding_copy.silence_labels = dict(self.silence_labels)
+        finding_copy.links = [link.copy() for link in self.links]
+        finding_copy.enrichments = [enrichment.copy_for_sink() for enrichment in self.enrichments]
+        return finding_copy
+
     def __str__(self):
         return f"title: {self.title} desc: {self.description} severity: {self.severity} sub-name: {self.subject.name} sub-type:{self.subject.subject_type.value} enrich: {self.enrichments}"
 
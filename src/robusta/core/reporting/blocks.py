@@ -115,25 +115,13 @@ class FileBlock(BaseBlock):
         if not self.is_text_file():
             return self.contents
 
-        decoded_content = self.contents.decode("utf-8")
-        content_length = len(decoded_content)
-
-        if content_length <= max_file_size_bytes:
+        if len(self.contents) <= max_file_size_bytes:
             return self.contents
 
-        lines = decoded_content.splitlines()
-        byte_length_newline = len("\n".encode("utf-8"))
-
-        truncated_lines: List[str] = []
-        for idx, line in enumerate(lines):
-            line_content_length = len(line) + byte_length_newline
-
-            content_length -= line_content_length
-            if content_length <= max_file_size_bytes:
-                truncated_lines = lines[idx + 1 :]
-                break
-
-        return "\n".join(truncated_lines).encode("utf-8")
+        # keep the lines after the first line break that leaves at most max_file_size_bytes. utf-8 bytes of a line
+        # break are never part of another character, so the content is cut without decoding it
+        cut = self.contents.find(b"\n", len(self.contents) - max_file_size_bytes - 1)
+        return self.contents[cut + 1 :] if cut != -1 else b""
 
 
 class EmptyFileBlock(BaseBlock):
@@ -0,0 +1,101 @@
+import json
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Tuple, TypeVar
+
+import prometheus_client
+
+finding_encoding_requests = prometheus_client.Counter(
+    "finding_encoding_requests",
+    "Requests of encoded finding parts, from the finding encoding cache",
+    ["kind", "result"],
+)
+
+T = TypeVar("T")
+
+# objects are encoded by their attributes, like the sinks always did. The encoder is created once, since json.dumps
+# with a default function creates a new encoder on every call. ensure_ascii (the default) makes the output ascii only,
+# so its length is its size in bytes
+json_encoder = json.JSONEncoder(default=lambda o: getattr(o, "__dict__", str(o)))
+
+
+def to_json(obj: Any) -> str:
+    return json_encoder.encode(obj)
+
+
+class FindingEncoding:
+    """
+    Encoded representations of the parts of a finding (blocks, enrichments, its service), shared by the copies of the
+    finding sent to each sink. Each part is encoded once per kind of encoding, and reused by the other sinks.
+
+    Parts are cached by identity, so they must not be modified after they're encoded. Enrichment blocks are already
+    shared between the sink copies of a finding, and must not be modified in place by sinks.
+    """
+
+    def __init__(self):
+        self.__encoded: Dict[Tuple[str, Hashable, int], Tuple[Any, Any]] = {}  # key -> (part, encoded part)
+        self.__lock = threading.Lock()
+
+    def __deepcopy__(self, memo) -> "FindingEncoding":
+        return FindingEncoding()  # a deep copy of a finding has its own parts
+
+    def __reduce__(self):
+        return FindingEncoding, ()  # parts are cached by identity, which isn't kept by pickling
+
+    def get(self, kind: str, part: Any, encode: Callable[[Any], T], variant: Hashable = None) -> T:
+        """Return the part encoded by encode, which is called once per kind and variant"""
+        key = (kind, variant, id(part))
+        with self.__lock:
+            cached = self.__encoded.get(key)
+        if cached is not None and cached[0] is part:  # the part is kept referenced, so its id isn't reused
+            finding_encoding_requests.labels(kind, "hit").inc()
+            return cached[1]
+
+        finding_encoding_requests.labels(kind, "miss").inc()
+        encoded = encode(part)
+        with self.__lock:
+            self.__encoded[key] = (part, encoded)
+        return encoded
+
+    def to_json(self, part: Any) -> str:
+        return self.get("json", part, to_json)
+
+    def enrichment_to_json(self, enrichment) -> str:
+        """Same as to_json(enrichment), with the enrichment blocks encoded once"""
+        encoded_items = []
+        for name, value in vars(enrichment).items():
+            if name == "blocks":
+                encoded_value = "[" + ", ".join(self.to_json(block) for block in value) + "]"
+            else:
+                encoded_value = to_json(value)
+            encoded_items.append(f"{to_json(name)}: {encoded_value}")
+        return "{" + ", ".join(encoded_items) + "}"
+
+
+class SizeLimitedJsonObject:
+    """
+    Json object text, assembled from encoded values. Keys are added in order until one doesn't fit in size_limit bytes,
+    where each key counts as the size of a json object with this key only (`{"key": value}`)
+    """
+
+    def __init__(self, size_limit: int):
+        self.size_limit = size_limit
+        self.size = 0
+        self.full = False
+        self.__items: List[str] = []
+
+    def add(self, key: str, encoded_value: str) -> bool:
+        if self.full:
+            return False
+
+        item = f"{to_json(key)}: {encoded_value}"
+        item_size = len(item) + 2  # encoded json is ascii only
+        if self.size + item_size > self.size_limit:
+            self.full = True
+            return False
+
+        self.__items.append(item)
+        self.size += item_size
+        return True
+
+    def to_json(self) -> str:
+        return "{" + ", ".join(self.__items) + "}"
@@ -1,13 +1,14 @@
 import logging
 import os
-import threading
 import time
 from collections import defaultdict
 from typing import List
 from croniter import croniter
 
+from robusta.core.model.env_vars import SCHEDULER_MAX_WORKERS
 from robusta.core.persistency.scheduled_jobs_states_dal import SchedulerDal
 from robusta.core.schedule.model import DynamicDelayRepeat, JobStatus, ScheduledJob, SchedulingInfo, CronScheduleRepeat
+from robusta.core.schedule.timer_dispatcher import TimerDispatcher
 
 # this initial delay is important for when the robusta-runner version is updated
 # at the same time a scheduled playbook is added to the configuration
@@ -21,11 +22,14 @@ class Scheduler:
     scheduled_jobs = defaultdict(None)
     registered_runnables = {}
     dal = None
+    dispatcher = None
 
     def register_task(self, runnable_name: str, func):
         self.registered_runnables[runnable_name] = func
 
     def init_scheduler(self):
+        if Scheduler.dispatcher is None:  # shared by all instances, like the scheduled jobs
+            Scheduler.dispatcher = TimerDispatcher(max_workers=SCHEDULER_MAX_WORKERS)
         self.dal = SchedulerDal()
         # schedule standalone tasks
         for job in self.__get_standalone_jobs():
@@ -60,6 +64,11 @@ class Scheduler:
         self.__remove_scheduler_job(job_id)
         self.dal.del_scheduled_job(job_id)
 
+    def flush(self):
+        # the dal writes the jobs state periodically, save the latest state before a shutdown or a reload
+        if self.dal:
+            self.dal.flush()
+
     def is_scheduled(self, job_id):
         return self.scheduled_jobs.get(job_id) is not None
 
@@ -113,9 +122,7 @@ class Scheduler:
         logging.info(f"Scheduled job done. job_id {job.job_id} executions {job.state.exec_count}")
 
     def __schedule_job_internal(self, delay, job_id, func, kwargs):
-        job = threading.Timer(delay, func, kwargs=kwargs)
-        self.scheduled_jobs[job_id] = job
-        job.start()
+        self.scheduled_jobs[job_id] = self.dispatcher.schedule(delay, func, kwargs)
 
     def __remove_scheduler_job(self, job_id):
         job = self.scheduled_jobs.get(job_id)
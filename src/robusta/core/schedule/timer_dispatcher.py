@@ -0,0 +1,104 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import prometheus_client
+
+scheduler_pending_timers = prometheus_client.Gauge(
+    "scheduler_pending_timers", "Number of scheduled jobs waiting to run"
+)
+scheduler_drift = prometheus_client.Summary(
+    "scheduler_drift", "Delay between the scheduled time of a job and the time it started running (seconds)"
+)
+
+
+class TimerTask:
+    """
+    Handle of a task scheduled on a TimerDispatcher.
+
+    Has the same cancel() semantics as threading.Timer: cancelling a task that already started running has no effect.
+    """
+
+    def __init__(self, due_time: float, func: Callable, kwargs: dict):
+        self.due_time = due_time  # time.monotonic(), so wall clock changes don't move the task
+        self.func = func
+        self.kwargs = kwargs
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerDispatcher:
+    """
+    Runs delayed tasks using a single dispatcher thread, instead of a sleeping thread per task.
+
+    Pending tasks are kept in a heap ordered by due time. The dispatcher thread sleeps until the earliest task is due,
+    and hands it off to a bounded thread pool, so long running tasks don't delay other tasks.
+    Cancelled tasks are removed lazily, when they reach the top of the heap.
+    """
+
+    def __init__(self, max_workers: int, name: str = "scheduler"):
+        self.__heap: List[Tuple[float, int, TimerTask]] = []
+        self.__counter = itertools.count()  # tie breaker for tasks with the same due time
+        self.__condition = threading.Condition()
+        self.__running = True
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        scheduler_pending_timers.set_function(lambda: len(self.__heap))
+        self.__thread = threading.Thread(target=self.__dispatch, name=f"{name}-dispatcher", daemon=True)
+        self.__thread.start()
+
+    def schedule(self, delay: float, func: Callable, kwargs: Optional[dict] = None) -> TimerTask:
+        task = TimerTask(time.monotonic() + delay, func, kwargs or {})
+        with self.__condition:
+            heapq.heappush(self.__heap, (task.due_time, next(self.__counter), task))
+            if self.__heap[0][2] is task:  # new earliest task, wake up the dispatcher to recalculate the wait time
+                self.__condition.notify()
+        return task
+
+    def pending(self) -> int:
+        with self.__condition:
+            return sum(1 for _, _, task in self.__heap if not task.cancelled)
+
+    def stop(self, wait: bool = False):
+        with self.__condition:
+            self.__running = False
+            self.__heap = []
+            self.__condition.notify()
+        self.__executor.shutdown(wait=wait)
+
+    def __dispatch(self):
+        while True:
+            with self.__condition:
+                while self.__running and not self.__ready():
+                    timeout = self.__heap[0][0] - time.monotonic() if self.__heap else None
+                    self.__condition.wait(timeout)
+                if not self.__running:
+                    return
+                _, _, task = heapq.heappop(self.__heap)
+
+            if task.cancelled:
+                continue
+            try:
+                self.__executor.submit(self.__run, task)
+            except RuntimeError:  # executor shutdown
+                return
+
+    def __ready(self) -> bool:
+        while self.__heap and self.__heap[0][2].cancelled:
+            heapq.heappop(self.__heap)
+        return bool(self.__heap) and self.__heap[0][0] <= time.monotonic()
+
+    @staticmethod
+    def __run(task: TimerTask):
+        if task.cancelled:  # cancelled while waiting for a free worker
+            return
+        scheduler_drift.observe(max(0.0, time.monotonic() - task.due_time))
+        try:
+            task.func(**task.kwargs)
+        except Exception:
+            logging.exception("Scheduled task failed")
@@ -13,7 +13,7 @@ class FileSink(SinkBase):
 
         self.__to_dictionary = ObjectTraverser(exclude_types=[FileBlock],
                                                exclude_empty_parent=False,
-                                               exclude_patterns=["^\.add_silence_url$", "^\.dirty$"],
+                                               exclude_patterns=["^\.add_silence_url$", "^\.dirty$", "^\.encoding$"],
                                                ).to_dictionary
         # TODO: check fromat parameter to support other serialization formats
         self.__serialize = lambda data: json.dumps(data, indent=2)
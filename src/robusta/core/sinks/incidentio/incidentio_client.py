@@ -1,6 +1,8 @@
 import requests
 import json
 
+from robusta.integrations.common.requests import http_transport
+
 class IncidentIoClient:
     def __init__(self, base_url: str, token: str):
         self.base_url = base_url
@@ -13,6 +15,6 @@ class IncidentIoClient:
         """
         Perform an HTTP request to the Incident.io API.
         """
-        response = requests.request(method, url, headers=self.headers, data=json.dumps(payload))
+        response = http_transport.request(method, url, headers=self.headers, data=json.dumps(payload))
 
         return response
@@ -1,5 +1,6 @@
 import json
 import logging
+from typing import Optional
 
 try:
     from kafka import KafkaProducer
@@ -9,8 +10,9 @@ except ImportError:
         raise ImportError("kafka-python is not installed")
 
 
-from robusta.core.reporting.base import Enrichment, Finding
+from robusta.core.reporting.base import BaseBlock, Enrichment, Finding
 from robusta.core.reporting.blocks import JsonBlock, KubernetesDiffBlock
+from robusta.core.reporting.finding_encoding import FindingEncoding
 from robusta.core.sinks.kafka.kafka_sink_params import KafkaSinkConfigWrapper
 from robusta.core.sinks.sink_base import SinkBase
 
@@ -32,6 +34,7 @@ class KafkaSink(SinkBase):
                 finding.subject.name,
                 finding.subject.subject_type.value,
                 finding.subject.namespace,
+                finding.encoding,
             )
 
     def send_enrichment(
@@ -40,6 +43,7 @@ class KafkaSink(SinkBase):
         resource_name: str,
         resource_type: str,
         resource_namespace: str,
+        encoding: Optional[FindingEncoding] = None,
     ):
         kafka_blocks = [
             block
@@ -53,28 +57,40 @@ class KafkaSink(SinkBase):
                 )
             return
 
-        message_payload = ""
         for block in kafka_blocks:
-            if isinstance(block, KubernetesDiffBlock):
-                data = {
-                    "cluster_name": self.cluster_name,
-                    "resource_name": resource_name,
-                    "resource_namespace": resource_namespace,
-                    "resource_type": resource_type,
-                    "message": f"{resource_type} properties change",
-                    "changed_properties": [
-                        {
-                            "property": ".".join(attribute_diff.path),
-                            "old": attribute_diff.other_value,
-                            "new": attribute_diff.value,
-                        }
-                        for attribute_diff in block.diffs
-                    ],
-                }
-                message_payload = json.dumps(data).encode("utf-8")
-            elif isinstance(block, JsonBlock):
-                json_obj = json.loads(block.json_str)
-                json_obj["cluster_name"] = self.cluster_name
-                message_payload = json.dumps(json_obj).encode("utf-8")
+            if encoding:
+                # kafka sinks of the same cluster send the same payloads, to their own topics
+                variant = (self.cluster_name, resource_name, resource_type, resource_namespace)
+                message_payload = encoding.get(
+                    "kafka",
+                    block,
+                    lambda b: self.__to_payload(b, resource_name, resource_type, resource_namespace),
+                    variant,
+                )
+            else:
+                message_payload = self.__to_payload(block, resource_name, resource_type, resource_namespace)
 
             self.producer.send(self.topic, value=message_payload)
+
+    def __to_payload(self, block: BaseBlock, resource_name: str, resource_type: str, resource_namespace: str) -> bytes:
+        if isinstance(block, KubernetesDiffBlock):
+            data = {
+                "cluster_name": self.cluster_name,
+                "resource_name": resource_name,
+                "resource_namespace": resource_namespace,
+                "resource_type": resource_type,
+                "message": f"{resource_type} properties change",
+                "changed_properties": [
+                    {
+                        "property": ".".join(attribute_diff.path),
+                        "old": attribute_diff.other_value,
+                        "new": attribute_diff.value,
+                    }
+                    for attribute_diff in block.diffs
+                ],
+            }
+            return json.dumps(data).encode("utf-8")
+
+        json_obj = json.loads(block.json_str)
+        json_obj["cluster_name"] = self.cluster_name
+        return json.dumps(json_obj).encode("utf-8")
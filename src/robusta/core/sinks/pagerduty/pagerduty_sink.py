@@ -1,8 +1,6 @@
 import logging
 from typing import Dict, Any, Optional, List
 
-import requests
-
 from robusta.core.model.k8s_operation_type import K8sOperationType
 from robusta.core.reporting.base import BaseBlock, Finding, FindingSeverity, Enrichment, Link, LinkType
 from robusta.core.reporting.blocks import (
@@ -18,6 +16,7 @@ from robusta.core.reporting.consts import FindingAggregationKey
 from robusta.core.reporting.url_helpers import convert_prom_graph_url_to_robusta_metrics_explorer
 from robusta.core.sinks.pagerduty.pagerduty_sink_params import PagerdutyConfigWrapper, PagerdutySinkParams
 from robusta.core.sinks.sink_base import SinkBase
+from robusta.integrations.common.requests import http_transport
 
 
 class PagerdutySink(SinkBase):
@@ -122,7 +121,7 @@ class PagerdutySink(SinkBase):
                 }
 
                 headers = {"Content-Type": "application/json"}
-                response = requests.post(self.change_url, json=body, headers=headers)
+                response = http_transport.post(self.change_url, json=body, headers=headers)
                 if not response.ok:
                     logging.error(
                         f"Error sending message to PagerDuty: {response.status_code}, {response.reason}, {response.text}"
@@ -229,7 +228,7 @@ class PagerdutySink(SinkBase):
         }
 
         headers = {"Content-Type": "application/json"}
-        response = requests.post(self.events_url, json=body, headers=headers)
+        response = http_transport.post(self.events_url, json=body, headers=headers)
         if not response.ok:
             logging.error(
                 f"Error sending message to PagerDuty: {response.status_code}, {response.reason}, {response.text}"
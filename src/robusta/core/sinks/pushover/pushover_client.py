@@ -1,8 +1,7 @@
 import logging
 
-import requests
-
 from robusta.core.reporting.utils import PNG_SUFFIX, SVG_SUFFIX, convert_svg_to_png, is_image
+from robusta.integrations.common.requests import http_transport
 
 class PushoverClient:
     def __init__(self, token: str, user: str, device: str, pushover_url: str):
@@ -22,7 +21,7 @@ class PushoverClient:
             "device": self.device
         }
 
-        response = requests.post(self.pushover_url, json=message_json)
+        response = http_transport.post(self.pushover_url, json=message_json)
 
         if response.status_code != 200:
             logging.error(
@@ -52,7 +51,7 @@ class PushoverClient:
             "device": self.device
         }
 
-        response = requests.post(self.pushover_url, json=message_json, files=files)
+        response = http_transport.post(self.pushover_url, json=message_json, files=files)
 
         if response.status_code != 200:
             logging.error(
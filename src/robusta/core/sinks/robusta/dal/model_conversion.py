@@ -3,7 +3,7 @@ import json
 import logging
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from robusta.core.model.env_vars import ENABLE_GRAPH_BLOCK
 from robusta.core.reporting import (
@@ -21,8 +21,10 @@ from robusta.core.reporting import (
     PrometheusBlock,
     TableBlock,
 )
+from robusta.core.reporting.base import BaseBlock
 from robusta.core.reporting.blocks import EmptyFileBlock, GraphBlock, LinksBlock
 from robusta.core.reporting.callbacks import ExternalActionRequestBuilder
+from robusta.core.reporting.finding_encoding import FindingEncoding
 from robusta.core.reporting.holmes import HolmesChatResultsBlock, HolmesResultsBlock, ToolCallResult
 from robusta.core.sinks.transformer import Transformer
 from robusta.utils.parsing import datetime_to_db_str
@@ -107,6 +109,7 @@ class ModelConversion:
             return
         for file in files:
             file_name = file.filename  # changes after zip
+            file = file.copy()  # the file block is shared with other sinks, zip a copy of it
             file.zip()
             data_obj = ModelConversion.get_file_object(file)
             data_obj["metadata"] = {
@@ -116,7 +119,7 @@ class ModelConversion:
 
     @staticmethod
     def add_ai_chat_data(structured_data: List[Dict], block: HolmesChatResultsBlock):
-        metadata = block.holmes_result.metadata or {} # type: ignore
+        metadata = dict(block.holmes_result.metadata or {})  # type: ignore
         metadata["type"] = "ai_investigation_result"
         metadata["createdAt"] = datetime_to_db_str(datetime.now())
         structured_data.append(
@@ -167,129 +170,157 @@ class ModelConversion:
         structured_data.append({"type": "list", "data": block.holmes_result.instructions})
 
     @staticmethod
-    def to_evidence_json(
-        account_id: str,
-        cluster_id: str,
-        sink_name: str,
-        signing_key: str,
-        finding_id: uuid.UUID,
-        enrichment: Enrichment,
-    ) -> Dict[Any, Any]:
-        structured_data: list[Any] = []
-        for block in enrichment.blocks:
-            if isinstance(block, MarkdownBlock):
-                if not block.text:
-                    continue
+    def to_structured_data(block: BaseBlock) -> List[Dict[str, Any]]:
+        """Convert an enrichment block, other than a CallbackBlock, to robusta platform format blocks"""
+        structured_data: List[Any] = []
+        if isinstance(block, MarkdownBlock):
+            if not block.text:
+                return structured_data
+            structured_data.append(
+                {
+                    "type": "markdown",
+                    "data": Transformer.to_github_markdown(block.text),
+                }
+            )
+        elif isinstance(block, DividerBlock):
+            structured_data.append({"type": "divider"})
+        elif isinstance(block, GraphBlock):
+            if ENABLE_GRAPH_BLOCK:
                 structured_data.append(
                     {
-                        "type": "markdown",
-                        "data": Transformer.to_github_markdown(block.text),
+                        "type": "prometheus",
+                        "data": block.graph_data.dict(),
+                        "metadata": block.graph_data.metadata,
+                        "version": 1.0,
                     }
                 )
-            elif isinstance(block, DividerBlock):
-                structured_data.append({"type": "divider"})
-            elif isinstance(block, GraphBlock):
-                if ENABLE_GRAPH_BLOCK:
-                    structured_data.append(
-                        {
-                            "type": "prometheus",
-                            "data": block.graph_data.dict(),
-                            "metadata": block.graph_data.metadata,
-                            "version": 1.0,
-                        }
-                    )
-                else:
-                    if block.is_text_file():
-                        block.zip()
-                    structured_data.append(ModelConversion.get_file_object(block))
-            elif isinstance(block, EmptyFileBlock):
-                structured_data.append(ModelConversion.get_empty_file_object(block))
-            elif isinstance(block, FileBlock):
+            else:
                 if block.is_text_file():
+                    block = block.copy()  # blocks are shared with other sinks, zip a copy of it
                     block.zip()
                 structured_data.append(ModelConversion.get_file_object(block))
-            elif isinstance(block, HolmesResultsBlock):
-                ModelConversion.add_ai_analysis_data(structured_data, block)
-            elif isinstance(block, HolmesChatResultsBlock):
-                ModelConversion.add_ai_chat_data(structured_data, block)
-            elif isinstance(block, HeaderBlock):
-                structured_data.append({"type": "header", "data": block.text})
-            elif isinstance(block, ListBlock):
-                structured_data.append({"type": "list", "data": block.items})
-            elif isinstance(block, PrometheusBlock):
-                structured_data.append(
-                    {"type": "prometheus", "data": dict(block.data), "metadata": block.metadata, "version": 1.0}
-                )
-            elif isinstance(block, TableBlock):
-                if block.table_name:
-                    structured_data.append(
-                        {
-                            "type": "markdown",
-                            "data": Transformer.to_github_markdown(block.table_name),
-                        }
-                    )
-                structured_data.append(
-                    {
-                        "type": "table",
-                        "data": {
-                            "headers": block.headers,
-                            "rows": [row for row in block.rows],
-                            "column_renderers": block.column_renderers,
-                        },
-                        "metadata": block.metadata,
-                    }
-                )
-            elif isinstance(block, KubernetesDiffBlock):
+        elif isinstance(block, EmptyFileBlock):
+            structured_data.append(ModelConversion.get_empty_file_object(block))
+        elif isinstance(block, FileBlock):
+            if block.is_text_file():
+                block = block.copy()  # blocks are shared with other sinks, zip a copy of it
+                block.zip()
+            structured_data.append(ModelConversion.get_file_object(block))
+        elif isinstance(block, HolmesResultsBlock):
+            ModelConversion.add_ai_analysis_data(structured_data, block)
+        elif isinstance(block, HolmesChatResultsBlock):
+            ModelConversion.add_ai_chat_data(structured_data, block)
+        elif isinstance(block, HeaderBlock):
+            structured_data.append({"type": "header", "data": block.text})
+        elif isinstance(block, ListBlock):
+            structured_data.append({"type": "list", "data": block.items})
+        elif isinstance(block, PrometheusBlock):
+            structured_data.append(
+                {"type": "prometheus", "data": dict(block.data), "metadata": block.metadata, "version": 1.0}
+            )
+        elif isinstance(block, TableBlock):
+            if block.table_name:
                 structured_data.append(
                     {
-                        "type": "diff",
-                        "data": {
-                            "old": block.old,
-                            "new": block.new,
-                            "resource_name": block.resource_name,
-                            "num_additions": block.num_additions,
-                            "num_deletions": block.num_deletions,
-                            "num_modifications": block.num_modifications,
-                            "updated_paths": [d.formatted_path for d in block.diffs],
-                        },
+                        "type": "markdown",
+                        "data": Transformer.to_github_markdown(block.table_name),
                     }
                 )
-            elif isinstance(block, CallbackBlock):
-                callbacks = []
-                for text, callback in block.choices.items():
-                    callbacks.append(
-                        {
-                            "text": text,
-                            "callback": ExternalActionRequestBuilder.create_for_func(
-                                callback,
-                                sink_name,
-                                text,
-                                account_id,
-                                cluster_id,
-                                signing_key,
-                            ).json(),
-                        }
-                    )
+            structured_data.append(
+                {
+                    "type": "table",
+                    "data": {
+                        "headers": block.headers,
+                        "rows": [row for row in block.rows],
+                        "column_renderers": block.column_renderers,
+                    },
+                    "metadata": block.metadata,
+                }
+            )
+        elif isinstance(block, KubernetesDiffBlock):
+            structured_data.append(
+                {
+                    "type": "diff",
+                    "data": {
+                        "old": block.old,
+                        "new": block.new,
+                        "resource_name": block.resource_name,
+                        "num_additions": block.num_additions,
+                        "num_deletions": block.num_deletions,
+                        "num_modifications": block.num_modifications,
+                        "updated_paths": [d.formatted_path for d in block.diffs],
+                    },
+                }
+            )
+        elif isinstance(block, JsonBlock):
+            structured_data.append({"type": "json", "data": block.json_str})
+        elif isinstance(block, EventsRef):
+            structured_data.append({"type": "events_ref", "data": block.dict()})
+        elif isinstance(block, LinksBlock):
+            links = [link.dict() for link in block.links]
+            structured_data.append({"type": "list", "data": links})
+        else:
+            logging.warning(f"cannot convert block of type {type(block)} to robusta platform format block: {block}")
+        return structured_data
 
-                structured_data.append({"type": "callbacks", "data": callbacks})
-            elif isinstance(block, JsonBlock):
-                structured_data.append({"type": "json", "data": block.json_str})
-            elif isinstance(block, EventsRef):
-                structured_data.append({"type": "events_ref", "data": block.dict()})
-            elif isinstance(block, LinksBlock):
-                links = [link.dict() for link in block.links]
-                structured_data.append({"type": "list", "data": links})
+    @staticmethod
+    def callbacks_to_structured_data(
+        block: CallbackBlock, account_id: str, cluster_id: str, sink_name: str, signing_key: str
+    ) -> Dict[str, Any]:
+        callbacks = []
+        for text, callback in block.choices.items():
+            callbacks.append(
+                {
+                    "text": text,
+                    "callback": ExternalActionRequestBuilder.create_for_func(
+                        callback,
+                        sink_name,
+                        text,
+                        account_id,
+                        cluster_id,
+                        signing_key,
+                    ).json(),
+                }
+            )
+        return {"type": "callbacks", "data": callbacks}
+
+    @staticmethod
+    def encode_structured_data(block: BaseBlock) -> str:
+        """Json list items of the robusta platform format blocks of an enrichment block"""
+        return ", ".join(json.dumps(data, default=str) for data in ModelConversion.to_structured_data(block))
+
+    @staticmethod
+    def to_evidence_json(
+        account_id: str,
+        cluster_id: str,
+        sink_name: str,
+        signing_key: str,
+        finding_id: uuid.UUID,
+        enrichment: Enrichment,
+        encoding: Optional[FindingEncoding] = None,
+    ) -> Dict[Any, Any]:
+        encoded_blocks: List[str] = []
+        for block in enrichment.blocks:
+            if isinstance(block, CallbackBlock):
+                # callbacks are signed with the sink name, so they're encoded for each sink
+                callbacks = ModelConversion.callbacks_to_structured_data(
+                    block, account_id, cluster_id, sink_name, signing_key
+                )
+                encoded_block = json.dumps(callbacks, default=str)
+            elif encoding:
+                encoded_block = encoding.get("evidence", block, ModelConversion.encode_structured_data)
             else:
-                logging.warning(f"cannot convert block of type {type(block)} to robusta platform format block: {block}")
-                continue  # no reason to crash the entire report
+                encoded_block = ModelConversion.encode_structured_data(block)
+            if encoded_block:
+                encoded_blocks.append(encoded_block)
 
-        if not structured_data:
+        if not encoded_blocks:
             return {}
 
         return {
             "issue_id": str(finding_id),
             "file_type": "structured_data",
-            "data": json.dumps(structured_data, default=str),
+            "data": "[" + ", ".join(encoded_blocks) + "]",
             "account_id": account_id,
             "enrichment_type": enrichment.enrichment_type.name if enrichment.enrichment_type else None,
             "title": enrichment.title if enrichment else None,
@@ -4,7 +4,7 @@ from collections import defaultdict
 from datetime import datetime
 import os
 import threading
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from uuid import uuid4
 from cachetools import TTLCache
 import requests
@@ -30,6 +30,7 @@ from robusta.core.reporting.base import Finding
 from robusta.core.reporting.blocks import EventsBlock, EventsRef, ScanReportBlock, ScanReportRow
 from robusta.core.reporting.consts import EnrichmentAnnotation, ScanState, ScanType
 from robusta.core.sinks.robusta.dal.model_conversion import ModelConversion
+from robusta.core.sinks.robusta.dal.write_batcher import SupabaseWriteBatcher
 from robusta.core.sinks.robusta.rrm.account_resource_fetcher import AccountResourceFetcher
 from robusta.core.sinks.robusta.rrm.types import (
     AccountResource,
@@ -103,6 +104,14 @@ class SupabaseDal(AccountResourceFetcher):
         ttl = int(os.environ.get("SAAS_SESSION_TOKEN_TTL_SEC", "82800"))  # 23 hours
         self.token_cache = TTLCache(maxsize=1, ttl=ttl)
         self.lock = threading.Lock()
+        # the issues of findings reference their evidence
+        self.writer = SupabaseWriteBatcher(self.client, table_order=(EVIDENCE_TABLE, ISSUES_TABLE))
+
+    def flush(self):
+        self.writer.flush()
+
+    def stop(self):
+        self.writer.stop()
 
     def patch_postgrest_execute(self):
         # This is somewhat hacky.
@@ -194,6 +203,7 @@ class SupabaseDal(AccountResourceFetcher):
         if scans and not enrichments:
             return
 
+        evidences = []
         for enrichment in enrichments:
             evidence = ModelConversion.to_evidence_json(
                 account_id=self.account_id,
@@ -202,23 +212,15 @@ class SupabaseDal(AccountResourceFetcher):
                 signing_key=self.signing_key,
                 finding_id=finding.id,
                 enrichment=enrichment,
+                encoding=finding.encoding,
             )
 
-            if not evidence:
-                continue
-
-            try:
-                self.client.table(EVIDENCE_TABLE).insert(evidence, returning=ReturnMethod.minimal).execute()
-            except Exception:
-                logging.exception(f"Failed to persist finding {finding.id} enrichment {enrichment}")
+            if evidence:
+                evidences.append(evidence)
 
-        try:
-            self.client.table(ISSUES_TABLE).insert(
-                ModelConversion.to_finding_json(self.account_id, self.cluster, finding),
-                returning=ReturnMethod.minimal,
-            ).execute()
-        except Exception:
-            logging.exception(f"Failed to persist finding {finding.id}")
+        # written in bulk by the write batcher, evidence before issues. Failures are logged by the batcher
+        self.writer.insert(EVIDENCE_TABLE, evidences)
+        self.writer.insert(ISSUES_TABLE, [ModelConversion.to_finding_json(self.account_id, self.cluster, finding)])
 
     def to_service(self, service: ServiceInfo) -> Dict[Any, Any]:
         return {
@@ -248,11 +250,22 @@ class SupabaseDal(AccountResourceFetcher):
         del as_dict["resource_version"]
         return as_dict
 
-    def persist_services(self, services: List[ServiceInfo]):
+    def persist_services(
+        self, services: List[ServiceInfo], batched: bool = False, on_failure: Optional[Callable[[], None]] = None
+    ):
+        """
+        When batched, the services are queued to the write batcher, coalesced by service key, and on_failure is called
+        if they couldn't be written. Otherwise they are written right away, and failures are raised
+        """
         if not services:
             return
 
         db_services = [self.to_service(service) for service in services]
+        if batched:
+            self.writer.upsert(SERVICES_TABLE, db_services, key=lambda row: row["service_key"], on_failure=on_failure)
+            return
+
+        self.writer.flush(SERVICES_TABLE)  # don't override newer rows with older pending ones
         try:
             self.client.table(SERVICES_TABLE).upsert(db_services, returning=ReturnMethod.minimal).execute()
         except Exception as e:
@@ -384,11 +397,18 @@ class SupabaseDal(AccountResourceFetcher):
 
         return db_node
 
-    def publish_nodes(self, nodes: List[NodeInfo]):
+    def publish_nodes(
+        self, nodes: List[NodeInfo], batched: bool = False, on_failure: Optional[Callable[[], None]] = None
+    ):
         if not nodes:
             return
 
         db_nodes = [self.__to_db_node(node) for node in nodes]
+        if batched:
+            self.writer.upsert(NODES_TABLE, db_nodes, key=lambda row: row["name"], on_failure=on_failure)
+            return
+
+        self.writer.flush(NODES_TABLE)
         try:
             self.client.table(NODES_TABLE).upsert(db_nodes, returning=ReturnMethod.minimal).execute()
         except Exception as e:
@@ -436,85 +456,74 @@ class SupabaseDal(AccountResourceFetcher):
 
         return is_running or len(is_completed) > 0 or is_starting
 
-    def publish_jobs(self, jobs: List[JobInfo]):
+    def publish_jobs(self, jobs: List[JobInfo], batched: bool = False, on_failure: Optional[Callable[[], None]] = None):
         if not jobs:
             return
 
         db_jobs = [self.__to_db_job(job) for job in jobs]
+        if batched:
+            self.writer.upsert(JOBS_TABLE, db_jobs, key=lambda row: row["service_key"], on_failure=on_failure)
+            return
+
+        self.writer.flush(JOBS_TABLE)
         try:
             self.client.table(JOBS_TABLE).upsert(db_jobs, returning=ReturnMethod.minimal).execute()
         except Exception as e:
             logging.error(f"Failed to persist jobs {jobs} error: {e}")
             raise
 
-    def remove_deleted_node(self, node_name: str):
-        if not node_name:
-            return
-
+    def remove_deleted_nodes(self, node_names: List[str]):
+        node_names = [node_name for node_name in node_names if node_name]
         try:
-            (
-                self.client.table(NODES_TABLE)
-                .delete(returning=ReturnMethod.minimal)
-                .eq("account_id", self.account_id)
-                .eq("cluster_id", self.cluster)
-                .eq("name", node_name)
-                .execute()
+            self.writer.delete_in(
+                NODES_TABLE, "name", node_names, {"account_id": self.account_id, "cluster_id": self.cluster}
             )
         except Exception as e:
-            logging.exception(f"Failed to delete node {node_name} error: {e}")
+            logging.exception(f"Failed to delete nodes {node_names} error: {e}")
             raise
 
-    def remove_deleted_service(self, service_key: str):
-        if not service_key:
-            return
+    def remove_deleted_node(self, node_name: str):
+        self.remove_deleted_nodes([node_name])
 
+    def remove_deleted_services(self, service_keys: List[str]):
+        service_keys = [service_key for service_key in service_keys if service_key]
         try:
-            (
-                self.client.table(SERVICES_TABLE)
-                .delete(returning=ReturnMethod.minimal)
-                .eq("account_id", self.account_id)
-                .eq("cluster", self.cluster)
-                .eq("service_key", service_key)
-                .execute()
+            self.writer.delete_in(
+                SERVICES_TABLE, "service_key", service_keys, {"account_id": self.account_id, "cluster": self.cluster}
             )
         except Exception as e:
-            logging.exception(f"Failed to delete service {service_key} error: {e}")
+            logging.exception(f"Failed to delete services {service_keys} error: {e}")
             raise
 
-    def remove_deleted_job(self, job: JobInfo):
-        if not job:
-            return
+    def remove_deleted_service(self, service_key: str):
+        self.remove_deleted_services([service_key])
 
+    def remove_deleted_jobs(self, jobs: List[JobInfo]):
+        service_keys = [job.get_service_key() for job in jobs if job]
         try:
-            (
-                self.client.table(JOBS_TABLE)
-                .delete(returning=ReturnMethod.minimal)
-                .eq("account_id", self.account_id)
-                .eq("cluster_id", self.cluster)
-                .eq("service_key", job.get_service_key())
-                .execute()
+            self.writer.delete_in(
+                JOBS_TABLE, "service_key", service_keys, {"account_id": self.account_id, "cluster_id": self.cluster}
             )
         except Exception as e:
-            logging.exception(f"Failed to delete job {job} error: {e}")
+            logging.exception(f"Failed to delete jobs {service_keys} error: {e}")
             raise
 
-    def remove_deleted_namespace(self, namespace_name: str):
-        if not namespace_name:
-            return
+    def remove_deleted_job(self, job: JobInfo):
+        self.remove_deleted_jobs([job])
 
+    def remove_deleted_namespaces(self, namespace_names: List[str]):
+        namespace_names = [namespace_name for namespace_name in namespace_names if namespace_name]
         try:
-            (
-                self.client.table(NAMESPACES_TABLE)
-                .delete(returning=ReturnMethod.minimal)
-                .filter("account_id", "eq", self.account_id)
-                .filter("cluster_id", "eq", self.cluster)
-                .eq("name", namespace_name)
-                .execute()
+            self.writer.delete_in(
+                NAMESPACES_TABLE, "name", namespace_names, {"account_id": self.account_id, "cluster_id": self.cluster}
             )
         except Exception as e:
-            logging.exception(f"Failed to delete namespace {namespace_name} error: {e}")
+            logging.exception(f"Failed to delete namespaces {namespace_names} error: {e}")
             raise
 
+    def remove_deleted_namespace(self, namespace_name: str):
+        self.remove_deleted_namespaces([namespace_name])
+
     # helm release
     def get_active_helm_release(self) -> List[HelmRelease]:
         try:
@@ -0,0 +1,264 @@
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import httpx
+import prometheus_client
+from postgrest.exceptions import APIError as PostgrestAPIError
+from postgrest.types import ReturnMethod
+
+from robusta.core.model.env_vars import (
+    SUPABASE_DELETE_BATCH_SIZE,
+    SUPABASE_WRITE_BATCH_MAX_ROWS,
+    SUPABASE_WRITE_BATCH_WINDOW_SEC,
+    SUPABASE_WRITE_MAX_PENDING_ROWS,
+    SUPABASE_WRITE_RETRIES,
+)
+
+write_requests = prometheus_client.Counter(
+    "supabase_write_requests", "Bulk write requests to Supabase", ["table", "result"]
+)
+written_rows = prometheus_client.Counter("supabase_written_rows", "Rows written to Supabase", ["table", "result"])
+
+# the request wasn't sent, so it can be sent again even when it isn't idempotent
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class PendingRow(NamedTuple):
+    row: dict
+    on_failure: Optional[Callable[[], None]]
+
+
+class SupabaseWriteBatcher:
+    """
+    Write-behind queue of Supabase inserts and upserts.
+
+    Rows are grouped by table, and written in bulk requests of up to max_batch_rows when a batch is full, or window_sec
+    after the first pending row. Upserted rows with the same key are coalesced, so only the last version is written.
+    The tables of table_order are flushed first, in that order, e.g. the evidence of findings before their issues.
+    Other tables are flushed after them, in the order of their first pending row.
+
+    When max_pending_rows are pending, the adding thread flushes them itself. This bounds the memory, and slows the
+    writers down to the rate Supabase can handle.
+
+    Failed requests are retried when they weren't processed by the server, and upserts also when they may have been
+    (writing them again is harmless, inserts would be duplicated). When a batch still fails, its rows are written one
+    by one, so a single invalid row doesn't drop the whole batch. The on_failure callbacks of the rows that couldn't be
+    written are called after the flush.
+    """
+
+    def __init__(
+        self,
+        client,
+        window_sec: float = SUPABASE_WRITE_BATCH_WINDOW_SEC,
+        max_batch_rows: int = SUPABASE_WRITE_BATCH_MAX_ROWS,
+        max_pending_rows: int = SUPABASE_WRITE_MAX_PENDING_ROWS,
+        retries: int = SUPABASE_WRITE_RETRIES,
+        retry_backoff_sec: float = 1.0,
+        delete_batch_size: int = SUPABASE_DELETE_BATCH_SIZE,
+        table_order: Sequence[str] = (),
+    ):
+        self.client = client
+        self.table_order = list(table_order)
+        self.window_sec = window_sec
+        self.max_batch_rows = max(max_batch_rows, 1)
+        self.max_pending_rows = max_pending_rows
+        self.retries = retries
+        self.retry_backoff_sec = retry_backoff_sec
+        self.delete_batch_size = max(delete_batch_size, 1)
+        # (table, upsert) -> row key -> pending row
+        self.__pending: "OrderedDict[Tuple[str, bool], Dict[Hashable, PendingRow]]" = OrderedDict()
+        self.__pending_rows = 0
+        self.__first_pending_time: Optional[float] = None
+        self.__row_ids = itertools.count()
+        self.__condition = threading.Condition()
+        self.__flush_lock = threading.Lock()  # one flush at a time, so rows are written in order
+        self.__running = window_sec > 0
+        self.__thread: Optional[threading.Thread] = None
+        if self.__running:
+            self.__thread = threading.Thread(target=self.__flush_loop, name="supabase-write-batcher", daemon=True)
+            self.__thread.start()
+
+    def insert(self, table: str, rows: List[dict], on_failure: Optional[Callable[[], None]] = None):
+        self.__add(table, False, rows, None, on_failure)
+
+    def upsert(
+        self,
+        table: str,
+        rows: List[dict],
+        key: Callable[[dict], Hashable],
+        on_failure: Optional[Callable[[], None]] = None,
+    ):
+        self.__add(table, True, rows, key, on_failure)
+
+    def delete_in(self, table: str, column: str, values: Iterable[Any], filters: Dict[str, Any]):
+        """
+        Delete the rows matching the filters, with one of the column values, using `in` filters of up to
+        delete_batch_size values. The pending writes to the table are flushed first. Raises on failure
+        """
+        values = list(values)
+        if not values:
+            return
+
+        self.flush(table)
+        for start in range(0, len(values), self.delete_batch_size):
+            query = self.client.table(table).delete(returning=ReturnMethod.minimal)
+            for filter_column, filter_value in filters.items():
+                query = query.eq(filter_column, filter_value)
+            query.in_(column, values[start : start + self.delete_batch_size]).execute()
+
+    def pending_rows(self) -> int:
+        with self.__condition:
+            return self.__pending_rows
+
+    def flush(self, table: Optional[str] = None):
+        """Write the pending rows, of the table if given"""
+        with self.__flush_lock:
+            with self.__condition:
+                batches = [
+                    (batch_table, upsert, list(rows.values()))
+                    for (batch_table, upsert), rows in self.__pending.items()
+                    if table is None or batch_table == table
+                ]
+                batches.sort(key=lambda batch: self.__table_rank(batch[0]))  # stable, for the other tables
+                for batch_table, upsert, rows in batches:
+                    del self.__pending[(batch_table, upsert)]
+                    self.__pending_rows -= len(rows)
+                if not self.__pending:
+                    self.__first_pending_time = None
+
+            failure_callbacks: Set[Callable[[], None]] = set()
+            for batch_table, upsert, rows in batches:
+                for start in range(0, len(rows), self.max_batch_rows):
+                    batch = rows[start : start + self.max_batch_rows]
+                    failure_callbacks.update(self.__write(batch_table, upsert, batch))
+
+        # outside of the flush lock, since the callbacks may take locks of threads that are waiting for a flush
+        for on_failure in failure_callbacks:
+            try:
+                on_failure()
+            except Exception:
+                logging.exception("Failed to handle failed Supabase writes")
+
+    def stop(self):
+        """Stop the flush thread and write the pending rows. Rows added later are written synchronously"""
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify_all()
+        if self.__thread:
+            self.__thread.join()
+        self.flush()
+
+    def __add(
+        self,
+        table: str,
+        upsert: bool,
+        rows: List[dict],
+        key: Optional[Callable[[dict], Hashable]],
+        on_failure: Optional[Callable[[], None]],
+    ):
+        if not rows:
+            return
+
+        with self.__condition:
+            pending = self.__pending.setdefault((table, upsert), {})
+            for row in rows:
+                row_key = key(row) if key else next(self.__row_ids)
+                if row_key not in pending:
+                    self.__pending_rows += 1
+                pending[row_key] = PendingRow(row, on_failure)
+
+            if self.__first_pending_time is None:  # the flush thread waits for the window of the first row
+                self.__first_pending_time = time.monotonic()
+                self.__condition.notify()
+            elif len(pending) >= self.max_batch_rows:
+                self.__condition.notify()
+            flush_now = not self.__running or self.__pending_rows >= self.max_pending_rows
+
+        if flush_now:
+            self.flush()
+
+    def __table_rank(self, table: str) -> int:
+        return self.table_order.index(table) if table in self.table_order else len(self.table_order)
+
+    def __flush_loop(self):
+        while True:
+            with self.__condition:
+                while self.__running and not self.__flush_due():
+                    timeout = None
+                    if self.__first_pending_time is not None:
+                        timeout = self.__first_pending_time + self.window_sec - time.monotonic()
+                    self.__condition.wait(timeout)
+                if not self.__running:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("Failed to flush Supabase writes")
+
+    def __flush_due(self) -> bool:
+        if self.__first_pending_time is None:
+            return False
+        if time.monotonic() - self.__first_pending_time >= self.window_sec:
+            return True
+        return any(len(rows) >= self.max_batch_rows for rows in self.__pending.values())
+
+    def __write(self, table: str, upsert: bool, rows: List[PendingRow]) -> Set[Callable[[], None]]:
+        """Returns the on_failure callbacks of the rows that couldn't be written"""
+        # the rows of a bulk request must have the same columns, missing columns would be written as nulls
+        by_columns: Dict[frozenset, List[PendingRow]] = {}
+        for pending in rows:
+            by_columns.setdefault(frozenset(pending.row.keys()), []).append(pending)
+
+        failure_callbacks: Set[Callable[[], None]] = set()
+        for same_columns_rows in by_columns.values():
+            if self.__try_write(table, upsert, [pending.row for pending in same_columns_rows], self.retries):
+                continue
+
+            failed = same_columns_rows
+            if len(same_columns_rows) > 1:
+                failed = [
+                    pending
+                    for pending in same_columns_rows
+                    if not self.__try_write(table, upsert, [pending.row], retries=0)
+                ]
+            failure_callbacks.update(pending.on_failure for pending in failed if pending.on_failure)
+        return failure_callbacks
+
+    def __try_write(self, table: str, upsert: bool, rows: List[dict], retries: int) -> bool:
+        for attempt in range(retries + 1):
+            try:
+                query = self.client.table(table)
+                if upsert:
+                    query.upsert(rows, returning=ReturnMethod.minimal).execute()
+                else:
+                    query.insert(rows, returning=ReturnMethod.minimal).execute()
+                write_requests.labels(table, "success").inc()
+                written_rows.labels(table, "success").inc(len(rows))
+                return True
+            except Exception as e:
+                write_requests.labels(table, "failure").inc()
+                if attempt < retries and self.__is_retryable(e, upsert):
+                    time.sleep(self.retry_backoff_sec * 2**attempt)
+                    continue
+                logging.error(f"Failed to write {len(rows)} rows to {table}: {e}")
+                written_rows.labels(table, "failure").inc(len(rows))
+                return False
+        return False
+
+    @staticmethod
+    def __is_retryable(e: Exception, upsert: bool) -> bool:
+        if isinstance(e, NOT_SENT_ERRORS):
+            return True
+        if isinstance(e, PostgrestAPIError):
+            # PGRST00x codes are failed database connections, and 503 is returned when the database is unavailable,
+            # so nothing was written. Rows rejected by PostgREST would be rejected again
+            if e.code == 503 or str(e.code).startswith("PGRST00"):
+                return True
+            # other server errors may come after the rows were written
+            return upsert and isinstance(e.code, int) and e.code >= 500
+        # read timeouts and dropped connections, after the request was sent
+        return upsert and isinstance(e, httpx.TransportError)
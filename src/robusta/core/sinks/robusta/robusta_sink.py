@@ -5,26 +5,43 @@ import os
 import threading
 import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
 
 import requests
 from hikaru.model.rel_1_26 import DaemonSet, Deployment, Job, Node, Pod, ReplicaSet, StatefulSet
+from kubernetes import client
+from kubernetes.client import V1Job, V1Namespace, V1Node, V1Pod, V1Secret
 from robusta.core.model.namespaces import NamespaceMetadata, ResourceCount
-from robusta.core.discovery.discovery import DISCOVERY_STACKTRACE_TIMEOUT_S, Discovery, DiscoveryResults, ResourceAccessForbiddenError
+from robusta.core.discovery.discovery import (
+    DISCOVERY_STACKTRACE_TIMEOUT_S,
+    Discovery,
+    DiscoveryBatch,
+    DiscoveryResults,
+    ResourceAccessForbiddenError,
+    job_pod_selector,
+)
+from robusta.core.discovery.informer import PodIndex, ResourceInformer
 from robusta.core.discovery.top_service_resolver import TopLevelResource, TopServiceResolver
-from robusta.core.discovery.utils import from_api_server_node
+from robusta.core.discovery.utils import from_api_server_node, node_allocated_fields
 from robusta.core.model.base_params import HolmesParams
 from robusta.core.model.cluster_status import ActivityStats, ClusterStats, ClusterStatus
 from robusta.core.model.env_vars import (
+    ARGO_ROLLOUTS,
     CLUSTER_STATUS_PERIOD_SEC,
+    CUSTOM_CRD,
     DISABLE_DISCOVERY,
     DISABLE_FINDINGS_PERSISTENCE,
+    DISABLE_HELM_MONITORING,
     DISABLE_RESOURCE_WATCH_PERSISTENCE,
     DISCOVERY_CHECK_THRESHOLD_SEC,
+    DISCOVERY_INFORMERS,
     DISCOVERY_PERIOD_SEC,
+    DISCOVERY_STREAMING,
     DISCOVERY_WATCHDOG_CHECK_SEC,
     HOLMES_ENABLED,
+    IS_OPENSHIFT,
     MANAGED_CONFIGURATION_ENABLED,
+    OPENSHIFT_GROUPS,
 )
 from robusta.core.model.helm_release import HelmRelease
 from robusta.core.model.jobs import JobInfo
@@ -56,7 +73,8 @@ _holmes_slackbot_cache = TTLCache(maxsize=1, ttl=HOLMES_SLACKBOT_CACHE_TTL)
 
 
 class RobustaSink(SinkBase, EventHandler):
-    services_publish_lock = threading.Lock()
+    # reentrant, since the caches are reset by failed writes callbacks, which may run in a thread holding the lock
+    services_publish_lock = threading.RLock()
 
     def __init__(self, sink_config: RobustaSinkConfigWrapper, registry):
         from robusta.core.sinks.robusta.dal.supabase_dal import SupabaseDal
@@ -121,6 +139,10 @@ class RobustaSink(SinkBase, EventHandler):
         # Some clusters have no jobs. helps differentiate between no jobs, to not initialized
         self.__jobs_cache_initialized: bool = False
         self.__helm_releases_cache: Optional[Dict[str, HelmRelease]] = None
+        # informers discovery state
+        self.__informers: List[ResourceInformer] = []
+        self.__pod_index = PodIndex()
+        self.__helm_secrets: Dict[str, HelmRelease] = {}  # helm secret key to the release stored in it
         self.__init_service_resolver()
         self.__watchdog_thread = threading.Thread(target=self.__discovery_watchdog)
         self.__watchdog_thread.start()
@@ -217,16 +239,23 @@ class RobustaSink(SinkBase, EventHandler):
             self.__namespaces_cache = {namespace.name: namespace for namespace in self.dal.get_active_namespaces()}
 
     def __reset_caches(self):
-        self.__services_cache: Dict[str, ServiceInfo] = {}
-        self.__nodes_cache: Dict[str, NodeInfo] = {}
-        self.__jobs_cache: Dict[str, JobInfo] = {}
-        self.__jobs_cache_initialized = False
-        self.__helm_releases_cache = None
-        self.__namespaces_cache: Dict[str, NamespaceInfo] = {}
-        self.__pods_running_count = 0
+        with self.services_publish_lock:
+            self.__services_cache: Dict[str, ServiceInfo] = {}
+            self.__nodes_cache: Dict[str, NodeInfo] = {}
+            self.__jobs_cache: Dict[str, JobInfo] = {}
+            self.__jobs_cache_initialized = False
+            self.__helm_releases_cache = None
+            self.__namespaces_cache: Dict[str, NamespaceInfo] = {}
+            self.__pods_running_count = 0
 
     def stop(self):
         self.__active = False
+        for informer in self.__informers:
+            informer.stop()
+        self.dal.stop()
+
+    def flush(self):
+        self.dal.flush()
 
     def is_healthy(self) -> bool:
         if self.last_send_time == 0:
@@ -272,7 +301,7 @@ class RobustaSink(SinkBase, EventHandler):
             if operation == K8sOperationType.CREATE or operation == K8sOperationType.UPDATE:
                 # handle created/updated services
                 self.__services_cache[service_key] = new_service
-                self.dal.persist_services([new_service])
+                self.dal.persist_services([new_service], batched=True, on_failure=self.__reset_caches)
 
             elif operation == K8sOperationType.DELETE:
                 self.__safe_delete_service(service_key)
@@ -280,22 +309,16 @@ class RobustaSink(SinkBase, EventHandler):
             self.__discovery_metrics.on_services_updated(1)
 
     def __publish_new_services(self, active_services: List[ServiceInfo]):
-        with self.services_publish_lock:
-            # convert to map
-            curr_services = {}
-            for service in active_services:
-                curr_services[service.get_service_key()] = service
+        discovered_keys: Set[str] = set()
+        self.__publish_services_batch(active_services, discovered_keys)
+        self.__remove_undiscovered_services(discovered_keys)
 
-            # handle deleted services
-            cache_keys = list(self.__services_cache.keys())
+    def __publish_services_batch(self, services: List[ServiceInfo], discovered_keys: Set[str]):
+        with self.services_publish_lock:
             updated_services: List[ServiceInfo] = []
-            for service_key in cache_keys:
-                if not curr_services.get(service_key):  # service doesn't exist any more, delete it
-                    self.__safe_delete_service(service_key)
-
-            # new or changed services
-            for service_key in curr_services.keys():
-                current_service = curr_services[service_key]
+            for current_service in services:
+                service_key = current_service.get_service_key()
+                discovered_keys.add(service_key)
                 cached_service = self.__services_cache.get(service_key)
 
                 # prevent service updates if the resource version in the cache is lower than the new service
@@ -303,7 +326,7 @@ class RobustaSink(SinkBase, EventHandler):
                     continue
 
                 # service not in the cache, or changed
-                if self.__services_cache.get(service_key) != current_service:
+                if cached_service != current_service:
                     updated_services.append(current_service)
                     self.__services_cache[service_key] = current_service
 
@@ -311,6 +334,16 @@ class RobustaSink(SinkBase, EventHandler):
 
             self.dal.persist_services(updated_services)
 
+    def __remove_undiscovered_services(self, discovered_keys: Set[str], service_type: Optional[str] = None):
+        with self.services_publish_lock:
+            deleted_keys = []
+            for service_key, service in self.__services_cache.items():
+                if service_type and service.service_type != service_type:
+                    continue
+                if service_key not in discovered_keys:  # service doesn't exist any more, delete it
+                    deleted_keys.append(service_key)
+            self.__safe_delete_services(deleted_keys)
+
     def __get_events_history(self):
         try:
             logging.info("Getting events history")
@@ -402,17 +435,19 @@ class RobustaSink(SinkBase, EventHandler):
     def __discover_resources(self) -> DiscoveryResults:
         # discovery is using the k8s python API and not Hikaru, since it's performance is 10 times better
         try:
-            results: DiscoveryResults = Discovery.discover_resources()
+            if DISCOVERY_STREAMING:
+                results = self.__stream_discovered_resources()
+            else:
+                results: DiscoveryResults = Discovery.discover_resources()
+                self.__assert_services_cache_initialized()
+                self.__publish_new_services(results.services)
+                self.__assert_jobs_cache_initialized()
+                self.__publish_new_jobs(results.jobs)
 
-            self.__assert_services_cache_initialized()
-            self.__publish_new_services(results.services)
             if results.nodes:
                 self.__assert_node_cache_initialized()
                 self.__publish_new_nodes(results.nodes)
 
-            self.__assert_jobs_cache_initialized()
-            self.__publish_new_jobs(results.jobs)
-
             self.__assert_helm_releases_cache_initialized()
             self.__publish_new_helm_releases(results.helm_releases)
 
@@ -449,6 +484,24 @@ class RobustaSink(SinkBase, EventHandler):
             if Discovery.out_of_memory_detected and "ERROR_DISCOVERY_OOM" not in self.__errors:
                 self.__errors.append("ERROR_DISCOVERY_OOM")
 
+    def __stream_discovered_resources(self) -> DiscoveryResults:
+        # services and jobs are published batch by batch. Deletions are published once all the batches arrived
+        self.__assert_services_cache_initialized()
+        self.__assert_jobs_cache_initialized()
+        discovered_services: Set[str] = set()
+        discovered_jobs: Set[str] = set()
+
+        def publish_batch(batch: DiscoveryBatch):
+            if batch.services:
+                self.__publish_services_batch(batch.services, discovered_services)
+            if batch.jobs:
+                self.__publish_jobs_batch(batch.jobs, discovered_jobs)
+
+        results = Discovery.stream_resources(publish_batch)
+        self.__remove_undiscovered_services(discovered_services)
+        self.__remove_undiscovered_jobs(discovered_jobs)
+        return results
+
     def __publish_new_nodes(self, current_nodes: List[NodeInfo]):
         # convert to map
         curr_nodes = {}
@@ -457,10 +510,8 @@ class RobustaSink(SinkBase, EventHandler):
 
         # handle deleted nodes
         updated_nodes: List[NodeInfo] = []
-        cache_keys = list(self.__nodes_cache.keys())
-        for node_name in cache_keys:
-            if not curr_nodes.get(node_name):  # node doesn't exist anymore, delete it
-                self.__safe_delete_node(node_name)
+        deleted_nodes = [node_name for node_name in self.__nodes_cache if not curr_nodes.get(node_name)]
+        self.__safe_delete_nodes(deleted_nodes)
 
         # new or changed nodes
         for node_name in curr_nodes.keys():
@@ -474,18 +525,24 @@ class RobustaSink(SinkBase, EventHandler):
         self.dal.publish_nodes(updated_nodes)
 
     def __safe_delete_node(self, node_name):
-        self.__nodes_cache.pop(node_name, None)
+        self.__safe_delete_nodes([node_name])
+
+    def __safe_delete_nodes(self, node_names: List[str]):
+        for node_name in node_names:
+            self.__nodes_cache.pop(node_name, None)
 
         # could be case where it is not in cache but is in db, i.e. after cache reset
-        if node_name:
-            self.dal.remove_deleted_node(node_name)
+        self.dal.remove_deleted_nodes(node_names)
 
     def __safe_delete_service(self, service_key):
-        self.__services_cache.pop(service_key, None)
+        self.__safe_delete_services([service_key])
+
+    def __safe_delete_services(self, service_keys: List[str]):
+        for service_key in service_keys:
+            self.__services_cache.pop(service_key, None)
 
         # could be case where it is not in cache but is in db, i.e. after cache reset
-        if service_key:
-            self.dal.remove_deleted_service(service_key)
+        self.dal.remove_deleted_services(service_keys)
 
     def __safe_delete_openshift_group(self, service_key):
         self.__services_cache.pop(service_key, None)
@@ -495,26 +552,22 @@ class RobustaSink(SinkBase, EventHandler):
             self.dal.remove_deleted_service(service_key)
 
     def __safe_delete_job(self, job_key):
-        job_info = self.__jobs_cache.pop(job_key, None)
-        if job_info:
-            self.dal.remove_deleted_job(job_info)
+        self.__safe_delete_jobs([job_key])
+
+    def __safe_delete_jobs(self, job_keys: List[str]):
+        job_infos = [self.__jobs_cache.pop(job_key, None) for job_key in job_keys]
+        self.dal.remove_deleted_jobs([job_info for job_info in job_infos if job_info])
 
     def __publish_new_jobs(self, active_jobs: List[JobInfo]):
-        # convert to map
-        curr_jobs = {}
-        for job in active_jobs:
-            curr_jobs[job.get_service_key()] = job
+        discovered_keys: Set[str] = set()
+        self.__publish_jobs_batch(active_jobs, discovered_keys)
+        self.__remove_undiscovered_jobs(discovered_keys)
 
-        # handle deleted jobs
-        cache_keys = list(self.__jobs_cache.keys())
+    def __publish_jobs_batch(self, jobs: List[JobInfo], discovered_keys: Set[str]):
         updated_jobs: List[JobInfo] = []
-        for job_key in cache_keys:
-            if not curr_jobs.get(job_key):  # job doesn't exist any more, delete it
-                self.__safe_delete_job(job_key)
-
-        # new or changed jobs
-        for job_key in curr_jobs.keys():
-            current_job = curr_jobs[job_key]
+        for current_job in jobs:
+            job_key = current_job.get_service_key()
+            discovered_keys.add(job_key)
             if self.__jobs_cache.get(job_key) != current_job:  # job not in the cache, or changed
                 updated_jobs.append(current_job)
                 self.__jobs_cache[job_key] = current_job
@@ -522,7 +575,12 @@ class RobustaSink(SinkBase, EventHandler):
         self.__discovery_metrics.on_jobs_updated(len(updated_jobs))
         self.dal.publish_jobs(updated_jobs)
 
-    def __publish_new_helm_releases(self, active_helm_releases: List[HelmRelease]):
+    def __remove_undiscovered_jobs(self, discovered_keys: Set[str]):
+        # jobs that don't exist any more
+        self.__safe_delete_jobs([job_key for job_key in self.__jobs_cache if job_key not in discovered_keys])
+
+    def __publish_new_helm_releases(self, active_helm_releases: List[HelmRelease]) -> List[HelmRelease]:
+        """Publish the new, changed and deleted helm releases, and return them"""
         curr_helm_releases = {}
         for helm_release in active_helm_releases:
             curr_helm_releases[helm_release.get_service_key()] = helm_release
@@ -546,6 +604,7 @@ class RobustaSink(SinkBase, EventHandler):
                 self.__helm_releases_cache[helm_release_key] = current_helm_release
 
         self.dal.publish_helm_releases(helm_releases)
+        return helm_releases
 
     def get_holmes_model(self) -> Optional[str]:
         global_config = self.get_global_config()
@@ -642,11 +701,19 @@ class RobustaSink(SinkBase, EventHandler):
         logging.info("Cluster discovery initialized")
         get_history = self.__should_run_history() if not DISABLE_DISCOVERY else False
         self.last_namespace_discovery = 0
+        use_informers = DISCOVERY_INFORMERS and not DISABLE_DISCOVERY and self.__informers_supported()
+        if use_informers:
+            self.__start_informers()
         while self.__active:
             start_t = time.time()
             self.__periodic_cluster_status()
 
-            if not DISABLE_DISCOVERY:
+            if use_informers:
+                self.__refresh_informers_state()
+                if get_history:
+                    self.__get_events_history()
+                    get_history = False
+            elif not DISABLE_DISCOVERY:
                 discovery_results = self.__discover_resources()
 
                 if get_history:
@@ -664,6 +731,278 @@ class RobustaSink(SinkBase, EventHandler):
         logging.info(f"Service discovery for sink {self.sink_name} ended.")
 
 
+    @staticmethod
+    def __informers_supported() -> bool:
+        # openshift resources, rollouts and custom CRDs are discovered only by the periodic discovery
+        if IS_OPENSHIFT or OPENSHIFT_GROUPS or ARGO_ROLLOUTS or CUSTOM_CRD:
+            logging.warning("Informers discovery doesn't support custom resources. Using periodic discovery")
+            return False
+        return True
+
+    def __start_informers(self):
+        self.__assert_services_cache_initialized()
+        self.__assert_jobs_cache_initialized()
+        self.__assert_node_cache_initialized()
+        self.__assert_namespaces_cache_initialized()
+        self.__assert_helm_releases_cache_initialized()
+
+        apps_api = client.AppsV1Api()
+        core_api = client.CoreV1Api()
+        # pods are listed first, since jobs and nodes are built from the pods index
+        self.__informers = [
+            ResourceInformer("Pod", core_api.list_pod_for_all_namespaces, self.__on_pods_list, self.__on_pod_event)
+        ]
+        services_list_funcs = {
+            "Deployment": apps_api.list_deployment_for_all_namespaces,
+            "StatefulSet": apps_api.list_stateful_set_for_all_namespaces,
+            "DaemonSet": apps_api.list_daemon_set_for_all_namespaces,
+            "ReplicaSet": apps_api.list_replica_set_for_all_namespaces,
+        }
+        for kind, list_func in services_list_funcs.items():
+            self.__informers.append(
+                ResourceInformer(
+                    kind,
+                    list_func,
+                    lambda objs, kind=kind: self.__on_services_list(kind, objs),
+                    lambda event_type, obj, kind=kind: self.__on_service_event(kind, event_type, obj),
+                )
+            )
+        self.__informers.extend(
+            [
+                ResourceInformer(
+                    "Job", client.BatchV1Api().list_job_for_all_namespaces, self.__on_jobs_list, self.__on_job_event
+                ),
+                ResourceInformer("Node", core_api.list_node, self.__on_nodes_list, self.__on_node_event),
+                ResourceInformer(
+                    "Namespace", core_api.list_namespace, self.__on_namespaces_list, self.__on_namespace_event
+                ),
+            ]
+        )
+        if not DISABLE_HELM_MONITORING:
+            self.__informers.append(
+                ResourceInformer(
+                    "HelmSecret",
+                    core_api.list_secret_for_all_namespaces,
+                    self.__on_helm_secrets_list,
+                    self.__on_helm_secret_event,
+                    label_selector="owner=helm",
+                )
+            )
+
+        for informer in self.__informers:
+            try:
+                informer.relist()
+            except Exception:  # the informer lists again when it starts
+                logging.error(f"Failed to list {informer.kind}", exc_info=True)
+        for informer in self.__informers:
+            informer.start()
+
+    def __refresh_informers_state(self):
+        # the informers keep the caches up to date. Only the state derived from the caches is refreshed periodically
+        try:
+            self.__pods_running_count = self.__pod_index.running_count()
+            if (
+                self.namespace_monitored_resources
+                and (time.time() - self.last_namespace_discovery) >= self.namespace_discovery_seconds
+            ):
+                self.__refresh_namespaces_metadata()
+                self.last_namespace_discovery = time.time()
+
+            with self.services_publish_lock:
+                services = list(self.__services_cache.values())
+                jobs = list(self.__jobs_cache.values())
+            RobustaSink.__save_resolver_resources(services, jobs)
+        except Exception:
+            logging.error(f"Failed to refresh informers state for {self.sink_name}", exc_info=True)
+
+    def __refresh_namespaces_metadata(self):
+        with self.services_publish_lock:
+            namespaces = [namespace.copy(update={"metadata": None}) for namespace in self.__namespaces_cache.values()]
+        namespaces = self.__discover_custom_namespaced_resources(namespaces) or []
+        with self.services_publish_lock:
+            updated_namespaces: List[NamespaceInfo] = []
+            for namespace in namespaces:
+                cached_namespace = self.__namespaces_cache.get(namespace.name)
+                if cached_namespace and cached_namespace != namespace:  # skip namespaces deleted meanwhile
+                    updated_namespaces.append(namespace)
+                    self.__namespaces_cache[namespace.name] = namespace
+            self.dal.publish_namespaces(updated_namespaces)
+
+    def __on_pods_list(self, pods: List[V1Pod]):
+        self.__pod_index.reset(pods)
+        self.__on_services_list("Pod", pods)
+        with self.services_publish_lock:
+            node_names = list(self.__nodes_cache.keys())
+        self.__refresh_nodes_allocated(node_names)
+
+    def __on_pod_event(self, event_type: str, pod: V1Pod):
+        if event_type == "DELETED":
+            node_names = self.__pod_index.remove(pod)
+        else:
+            node_names = self.__pod_index.update(pod)
+        self.__on_service_event("Pod", event_type, pod)
+        self.__refresh_nodes_allocated(node_names)
+
+    def __refresh_nodes_allocated(self, node_names: Iterable[str]):
+        # the resources allocated on a node change with the pods scheduled to it, without node events
+        with self.services_publish_lock:
+            updated_nodes: List[NodeInfo] = []
+            for node_name in node_names:
+                node_info = self.__nodes_cache.get(node_name)
+                if node_info is None:  # listed before its node, or the node was deleted
+                    continue
+                updated_info = node_info.copy(update=node_allocated_fields(self.__pod_index.node_requests(node_name)))
+                if updated_info != node_info:
+                    self.__nodes_cache[node_name] = updated_info
+                    updated_nodes.append(updated_info)
+            if updated_nodes:
+                self.dal.publish_nodes(updated_nodes, batched=True, on_failure=self.__reset_caches)
+                self.__discovery_metrics.on_nodes_updated(len(updated_nodes))
+
+    def __on_services_list(self, kind: str, objs: List[Any]):
+        services = [Discovery.create_service_info_from_api_server(kind, obj) for obj in objs]
+        discovered_keys: Set[str] = set()
+        self.__publish_services_batch([service for service in services if service], discovered_keys)
+        self.__remove_undiscovered_services(discovered_keys, service_type=kind)
+
+    def __on_service_event(self, kind: str, event_type: str, obj: Any):
+        service = Discovery.create_service_info_from_api_server(kind, obj)
+        if service is None:  # finished pods and scaled down replicasets aren't reported, remove them if cached
+            service_key = f"{obj.metadata.namespace}/{kind}/{obj.metadata.name}"
+            with self.services_publish_lock:
+                if service_key in self.__services_cache:
+                    self.__safe_delete_service(service_key)
+                    self.__discovery_metrics.on_services_updated(1)
+            return
+
+        if event_type == "DELETED":
+            self.__publish_single_service(service, K8sOperationType.DELETE)
+        elif self.__services_cache.get(service.get_service_key()) != service:  # skip updates of unreported fields
+            self.__publish_single_service(service, K8sOperationType.UPDATE)
+
+    def __job_info(self, job: V1Job) -> JobInfo:
+        return JobInfo.from_api_server(job, self.__pod_index.job_pods(job.metadata.namespace, job_pod_selector(job)))
+
+    def __on_jobs_list(self, jobs: List[V1Job]):
+        job_infos = [self.__job_info(job) for job in jobs]
+        discovered_keys: Set[str] = set()
+        with self.services_publish_lock:
+            self.__publish_jobs_batch(job_infos, discovered_keys)
+            self.__remove_undiscovered_jobs(discovered_keys)
+
+    def __on_job_event(self, event_type: str, job: V1Job):
+        job_info = self.__job_info(job)
+        with self.services_publish_lock:
+            if event_type == "DELETED":
+                self.__safe_delete_job(job_info.get_service_key())
+                self.__discovery_metrics.on_jobs_updated(1)
+            else:
+                self.__publish_jobs_batch([job_info], set())
+
+    def __node_info(self, node: V1Node) -> NodeInfo:
+        return from_api_server_node(node, self.__pod_index.node_requests(node.metadata.name))
+
+    def __on_nodes_list(self, nodes: List[V1Node]):
+        node_infos = [self.__node_info(node) for node in nodes]
+        with self.services_publish_lock:
+            self.__publish_new_nodes(node_infos)
+
+    def __on_node_event(self, event_type: str, node: V1Node):
+        node_name = node.metadata.name
+        with self.services_publish_lock:
+            if event_type == "DELETED":
+                self.__safe_delete_node(node_name)
+                self.__discovery_metrics.on_nodes_updated(1)
+                return
+
+            # the node allocated resources are updated with the node status, using the pods currently on the node
+            node_info = self.__node_info(node)
+            if self.__nodes_cache.get(node_name) != node_info:
+                self.__nodes_cache[node_name] = node_info
+                self.dal.publish_nodes([node_info], batched=True, on_failure=self.__reset_caches)
+                self.__discovery_metrics.on_nodes_updated(1)
+
+    def __on_namespaces_list(self, namespaces: List[V1Namespace]):
+        namespace_infos = [NamespaceInfo.from_api_server(namespace) for namespace in namespaces]
+        with self.services_publish_lock:
+            self.__publish_new_namespaces(self.__add_cached_namespace_metadata(namespace_infos))
+
+    def __on_namespace_event(self, event_type: str, namespace: V1Namespace):
+        namespace_name = namespace.metadata.name
+        with self.services_publish_lock:
+            if event_type == "DELETED":
+                self.__namespaces_cache.pop(namespace_name, None)
+                self.dal.remove_deleted_namespace(namespace_name)
+                return
+
+            namespace_info = self.__add_cached_namespace_metadata([NamespaceInfo.from_api_server(namespace)])[0]
+            if self.__namespaces_cache.get(namespace_name) != namespace_info:
+                self.__namespaces_cache[namespace_name] = namespace_info
+                self.dal.publish_namespaces([namespace_info])
+
+    @staticmethod
+    def __decode_helm_secret(secret: V1Secret) -> Optional[HelmRelease]:
+        release_data = (secret.data or {}).get("release", None)
+        if not release_data:
+            return None
+        try:
+            return HelmRelease.from_api_server(release_data)
+        except Exception as e:
+            logging.error(f"an error occurred while decoding helm releases: {e}")
+            return None
+
+    def __latest_helm_releases(self) -> Dict[str, HelmRelease]:
+        # each helm revision is stored in a different secret. Pick the latest revision of each release
+        releases: Dict[str, HelmRelease] = {}
+        for release in self.__helm_secrets.values():
+            release_key = release.get_service_key()
+            if release_key not in releases or releases[release_key].version < release.version:
+                releases[release_key] = release
+        return releases
+
+    def __on_helm_secrets_list(self, secrets: List[V1Secret]):
+        self.__helm_secrets = {}
+        for secret in secrets:
+            release = self.__decode_helm_secret(secret)
+            if release:
+                self.__helm_secrets[f"{secret.metadata.namespace}/{secret.metadata.name}"] = release
+
+        releases = list(self.__latest_helm_releases().values())
+        with self.services_publish_lock:
+            published_releases = self.__publish_new_helm_releases(releases)
+        # a relist sends the events of the releases that changed since they were last published, like a watch event
+        changed_releases = [release for release in published_releases if not release.deleted]
+        if changed_releases:
+            self.__send_helm_release_events(release_data=changed_releases)
+
+    def __on_helm_secret_event(self, event_type: str, secret: V1Secret):
+        secret_key = f"{secret.metadata.namespace}/{secret.metadata.name}"
+        if event_type == "DELETED":
+            release = self.__helm_secrets.pop(secret_key, None)
+        else:
+            release = self.__decode_helm_secret(secret)
+            if release:
+                self.__helm_secrets[secret_key] = release
+        if not release:
+            return
+
+        release_key = release.get_service_key()
+        latest_release = self.__latest_helm_releases().get(release_key)
+        with self.services_publish_lock:
+            cached_release = self.__helm_releases_cache.get(release_key)
+            if latest_release is None:  # all the revisions were deleted, the release was uninstalled
+                if not cached_release:
+                    return
+                cached_release.deleted = True
+                del self.__helm_releases_cache[release_key]
+                self.dal.publish_helm_releases([cached_release])
+                return
+            if cached_release == latest_release:
+                return
+            self.__helm_releases_cache[release_key] = latest_release
+            self.dal.publish_helm_releases([latest_release])
+        self.__send_helm_release_events(release_data=[latest_release])
+
     def __periodic_cluster_status(self):
         first_alert = False
 
@@ -690,12 +1029,11 @@ class RobustaSink(SinkBase, EventHandler):
 
         # handle deleted namespaces
         updated_namespaces: List[NamespaceInfo] = []
-        cache_keys = list(self.__namespaces_cache.keys())
-        for namespace_name in cache_keys:
-            if namespace_name not in curr_namespaces:
-                # namespace was deleted from cluster
-                self.__namespaces_cache.pop(namespace_name, None)
-                self.dal.remove_deleted_namespace(namespace_name)
+        # namespaces deleted from the cluster
+        deleted_namespaces = [name for name in self.__namespaces_cache if name not in curr_namespaces]
+        for namespace_name in deleted_namespaces:
+            self.__namespaces_cache.pop(namespace_name, None)
+        self.dal.remove_deleted_namespaces(deleted_namespaces)
 
         # new or changed namespaces
         for namespace_name, updated_namespace in curr_namespaces.items():
@@ -766,7 +1104,7 @@ class RobustaSink(SinkBase, EventHandler):
                 self.__discovery_metrics.on_nodes_updated(1)
                 return
 
-            self.dal.publish_nodes([new_info])
+            self.dal.publish_nodes([new_info], batched=True, on_failure=self.__reset_caches)
             self.__discovery_metrics.on_nodes_updated(1)
 
     def __update_job(self, new_job: Job, operation: K8sOperationType):
@@ -783,13 +1121,13 @@ class RobustaSink(SinkBase, EventHandler):
                     return
 
                 self.__jobs_cache[job_key] = new_info
-                self.dal.publish_jobs([new_info])
+                self.dal.publish_jobs([new_info], batched=True, on_failure=self.__reset_caches)
                 self.__discovery_metrics.on_jobs_updated(1)
                 return
 
             if operation == K8sOperationType.CREATE:
                 self.__jobs_cache[job_key] = new_info
-                self.dal.publish_jobs([new_info])
+                self.dal.publish_jobs([new_info], batched=True, on_failure=self.__reset_caches)
                 self.__discovery_metrics.on_jobs_updated(1)
                 return
             if operation == K8sOperationType.DELETE:
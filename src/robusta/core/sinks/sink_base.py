@@ -182,6 +182,10 @@ class SinkBase(ABC):
     def stop(self):
         pass
 
+    def flush(self):
+        """Write the findings the sink buffered"""
+        pass
+
     def accepts(self, finding: Finding) -> bool:
         if any(mute.is_muted_now() for mute in self.mute_date_intervals):
             return False
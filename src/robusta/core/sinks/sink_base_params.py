@@ -7,6 +7,7 @@ from pydantic import BaseModel, root_validator, validator
 from pydantic.types import PositiveInt
 import pytz
 
+from robusta.core.model.env_vars import SINK_DELIVERY_QUEUE_MAX_SIZE, SINK_DELIVERY_TIMEOUT_SEC, SINK_DELIVERY_WORKERS
 from robusta.core.playbooks.playbook_utils import replace_env_vars_values
 from robusta.core.sinks.timing import DAY_NAMES
 from robusta.utils.scope import ScopeParams
@@ -136,6 +137,21 @@ class GroupingParams(BaseModel):
         return values
 
 
+class SinkDeliveryParams(BaseModel):
+    """
+    Asynchronous delivery settings, used when ASYNC_SINK_DELIVERY is enabled
+
+    :var workers: Max number of findings written to the sink concurrently. With more than 1 worker, findings may be
+        written out of order, e.g. a resolved alert before the firing one
+    :var queue_size: Max number of findings waiting for delivery. Findings are dropped when the queue is full
+    :var timeout_sec: Findings waiting in the queue for longer than this are dropped
+    """
+
+    workers: PositiveInt = SINK_DELIVERY_WORKERS
+    queue_size: PositiveInt = SINK_DELIVERY_QUEUE_MAX_SIZE
+    timeout_sec: PositiveInt = SINK_DELIVERY_TIMEOUT_SEC
+
+
 class SinkBaseParams(ABC, BaseModel):
     name: str
     send_svg: bool = False
@@ -147,6 +163,7 @@ class SinkBaseParams(ABC, BaseModel):
     mute_intervals: Optional[List[MuteInterval]]
     grouping: Optional[GroupingParams]
     stop: bool = False  # Stop processing if this sink has been matched
+    delivery: Optional[SinkDeliveryParams]
 
     @root_validator
     def env_values_validation(cls, values: Dict):
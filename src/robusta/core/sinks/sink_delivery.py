@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from queue import Full, Queue
+from typing import Callable, Dict, List, Optional, Tuple
+
+import prometheus_client
+
+from robusta.core.model.env_vars import SINK_DELIVERY_SHUTDOWN_TIMEOUT_SEC
+from robusta.core.sinks.sink_base_params import SinkDeliveryParams
+
+sink_delivery_queue_size = prometheus_client.Gauge(
+    "sink_delivery_queue_size", "Number of findings waiting for delivery", labelnames=("sink",)
+)
+sink_delivery_time = prometheus_client.Summary(
+    "sink_delivery_time", "Time to write a finding to the sink (seconds)", labelnames=("sink",)
+)
+sink_delivery_wait_time = prometheus_client.Summary(
+    "sink_delivery_wait_time", "Time a finding waited in the sink delivery queue (seconds)", labelnames=("sink",)
+)
+sink_delivery_dropped = prometheus_client.Counter(
+    "sink_delivery_dropped", "Number of findings dropped before delivery", labelnames=("sink", "reason")
+)
+
+DeliveryTask = Tuple[float, Callable, tuple]
+
+
+class SinkDeliveryQueue:
+    """
+    Bounded delivery queue of a single sink, served by a fixed number of worker threads.
+
+    The number of workers limits how many findings are written to the sink concurrently. A single worker writes the
+    findings in the order they were added.
+    Findings are dropped when the queue is full, or when they waited in the queue longer than the timeout.
+    """
+
+    def __init__(self, sink_name: str, params: SinkDeliveryParams):
+        self.sink_name = sink_name
+        self.params = params
+        self.queue: "Queue[Optional[DeliveryTask]]" = Queue(maxsize=params.queue_size)
+        sink_delivery_queue_size.labels(sink_name).set_function(lambda: self.queue.qsize())
+        self.workers: List[threading.Thread] = []
+        for i in range(params.workers):
+            worker = threading.Thread(target=self.__worker, name=f"sink-delivery-{sink_name}-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def add_task(self, task: Callable, *args) -> bool:
+        try:
+            self.queue.put((time.time(), task, args), block=False)
+            return True
+        except Full:
+            logging.warning(f"Delivery queue of sink {self.sink_name} is full. Dropping finding")
+            sink_delivery_dropped.labels(self.sink_name, "queue_full").inc()
+            return False
+
+    def stop(self, timeout: float):
+        """Let the workers deliver the pending findings, and wait for them up to timeout seconds"""
+        for _ in self.workers:
+            try:
+                self.queue.put(None, timeout=timeout)
+            except Full:
+                logging.warning(f"Failed to stop delivery queue of sink {self.sink_name}, the queue is full")
+                return
+        deadline = time.time() + timeout
+        for worker in self.workers:
+            worker.join(timeout=max(0.0, deadline - time.time()))
+
+    def __worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:  # stop marker
+                return
+
+            queued_time, task, args = item
+            wait_time = time.time() - queued_time
+            sink_delivery_wait_time.labels(self.sink_name).observe(wait_time)
+            if wait_time > self.params.timeout_sec:
+                logging.warning(f"Finding waited {wait_time:.1f}s for delivery to sink {self.sink_name}. Dropping it")
+                sink_delivery_dropped.labels(self.sink_name, "timeout").inc()
+                continue
+
+            start_time = time.time()
+            try:
+                task(*args)
+            except Exception:
+                logging.error(f"Sink {self.sink_name} delivery error", exc_info=True)
+            sink_delivery_time.labels(self.sink_name).observe(time.time() - start_time)
+
+
+class SinkDeliveryEngine:
+    """
+    Hands off findings to a delivery queue per sink, so that a slow sink doesn't block the event workers,
+    or the delivery to other sinks.
+    """
+
+    def __init__(self):
+        self.__queues: Dict[str, SinkDeliveryQueue] = {}
+        self.__lock = threading.Lock()
+
+    def add_task(self, sink_name: str, params: Optional[SinkDeliveryParams], task: Callable, *args) -> bool:
+        return self.__get_queue(sink_name, params or SinkDeliveryParams()).add_task(task, *args)
+
+    def __get_queue(self, sink_name: str, params: SinkDeliveryParams) -> SinkDeliveryQueue:
+        delivery_queue = self.__queues.get(sink_name)
+        if delivery_queue and delivery_queue.params == params:
+            return delivery_queue
+
+        with self.__lock:
+            delivery_queue = self.__queues.get(sink_name)
+            if delivery_queue and delivery_queue.params == params:
+                return delivery_queue
+
+            if delivery_queue:  # sink delivery params changed. Pending findings are delivered by the old workers
+                logging.info(f"Updating delivery queue of sink {sink_name}")
+                threading.Thread(
+                    target=delivery_queue.stop, args=(SINK_DELIVERY_SHUTDOWN_TIMEOUT_SEC,), daemon=True
+                ).start()
+
+            delivery_queue = SinkDeliveryQueue(sink_name, params)
+            self.__queues[sink_name] = delivery_queue
+            return delivery_queue
+
+    def pending(self) -> int:
+        return sum(delivery_queue.queue.qsize() for delivery_queue in self.__queues.values())
+
+    def stop(self, timeout: float = SINK_DELIVERY_SHUTDOWN_TIMEOUT_SEC):
+        with self.__lock:
+            queues = list(self.__queues.values())
+            self.__queues = {}
+
+        stoppers = [threading.Thread(target=delivery_queue.stop, args=(timeout,)) for delivery_queue in queues]
+        for stopper in stoppers:
+            stopper.start()
+        for stopper in stoppers:
+            stopper.join()
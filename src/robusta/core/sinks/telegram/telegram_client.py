@@ -2,9 +2,8 @@ import logging
 import os
 from typing import Union
 
-import requests
-
 from robusta.core.reporting.utils import PNG_SUFFIX, SVG_SUFFIX, convert_svg_to_png, is_image
+from robusta.integrations.common.requests import http_transport
 
 TELEGRAM_BASE_URL = os.environ.get("TELEGRAM_BASE_URL", "https://api.telegram.org")
 
@@ -24,7 +23,7 @@ class TelegramClient:
             "parse_mode": "Markdown",
             "text": message,
         }
-        response = requests.post(url, json=message_json)
+        response = http_transport.post(url, json=message_json)
 
         if response.status_code != 200:
             logging.error(
@@ -39,7 +38,7 @@ class TelegramClient:
             file_name = file_name.replace(SVG_SUFFIX, PNG_SUFFIX)
 
         files = {file_type.lower(): (file_name, contents)}
-        response = requests.post(url, files=files)
+        response = http_transport.post(url, files=files)
 
         if response.status_code != 200:
             logging.error(
@@ -1,5 +1,3 @@
-import requests
-
 from robusta.core.reporting.base import BaseBlock, Finding
 from robusta.core.reporting.blocks import (
     HeaderBlock,
@@ -11,6 +9,7 @@ from robusta.core.reporting.blocks import (
 )
 from robusta.core.sinks.sink_base import SinkBase
 from robusta.core.sinks.victorops.victorops_sink_params import VictoropsConfigWrapper
+from robusta.integrations.common.requests import http_transport
 
 
 class VictoropsSink(SinkBase):
@@ -58,7 +57,7 @@ class VictoropsSink(SinkBase):
 
         json_dict["state_message"] = message_lines
 
-        requests.post(self.url, json=json_dict)
+        http_transport.post(self.url, json=json_dict)
 
     def __to_unformatted_text(cls, block: BaseBlock) -> str:
         if isinstance(block, HeaderBlock):
@@ -1,15 +1,14 @@
-import json
 import logging
 import textwrap
 from typing import List
 
-import requests
-
 from robusta.core.reporting import HeaderBlock, JsonBlock, KubernetesDiffBlock, ListBlock, MarkdownBlock
 from robusta.core.reporting.base import BaseBlock, Finding
+from robusta.core.reporting.finding_encoding import SizeLimitedJsonObject, to_json
 from robusta.core.sinks.sink_base import SinkBase
 from robusta.core.sinks.transformer import Transformer
 from robusta.core.sinks.webhook.webhook_sink_params import WebhookSinkConfigWrapper
+from robusta.integrations.common.requests import http_transport
 
 
 class WebhookSink(SinkBase):
@@ -23,6 +22,7 @@ class WebhookSink(SinkBase):
             if sink_config.webhook_sink.authorization
             else None
         )
+        self.json_headers = {"Content-Type": "application/json", **(self.headers or {})}
         self.size_limit = sink_config.webhook_sink.size_limit
         self.slack_webhook = sink_config.webhook_sink.slack_webhook
 
@@ -50,29 +50,47 @@ class WebhookSink(SinkBase):
         message_lines.append(f"Source: {self.cluster_name}")
         message_lines.append(finding.description)
 
-        message = ""
-
         for enrichment in finding.enrichments:
             for block in enrichment.blocks:
-                message_lines.extend(self.__to_unformatted_text(block))
+                message_lines.extend(finding.encoding.get("webhook_text", block, self.__to_unformatted_text))
 
+        message_parts: List[bytes] = []
+        message_size = 0
         for line in [line for line in message_lines if line]:
             wrapped = textwrap.dedent(
                 f"""
                 {line}
                 """
-            )
-            if len(message.encode('utf-8')) + len(wrapped.encode('utf8')) >= self.size_limit:
+            ).encode("utf-8")
+            if message_size + len(wrapped) >= self.size_limit:
                 break
-            message += wrapped
+            message_parts.append(wrapped)
+            message_size += len(wrapped)
 
         try:
-            r = requests.post(self.url, data=message.encode('utf-8'), headers=self.headers)
+            r = http_transport.post(self.url, data=b"".join(message_parts), headers=self.headers)
             r.raise_for_status()
         except Exception:
             logging.exception(f"Webhook request error\n headers: \n{self.headers}")
 
     def __write_json(self, finding: Finding, platform_enabled: bool):
+        if self.slack_webhook:
+            labels = finding.subject.labels
+            labels_as_text = ", ".join(f"{k}: {v}" for k, v in labels.items()) if labels else None
+            message = {
+                "text": f"*Title:* {finding.title}\n"
+                f"*Description:* {finding.description}\n"
+                f"*Failure:* {finding.failure}\n"
+                f"*Aggregation Key:* {finding.aggregation_key}\n"
+                f"*labels*: {labels_as_text}\n"
+            }
+            try:
+                r = http_transport.post(self.url, json=message, headers=self.headers)
+                r.raise_for_status()
+            except Exception:
+                logging.exception(f"Webhook request error\n headers: \n{self.headers}")
+            return
+
         finding_dict = {
             "title": finding.title,
             "description": finding.description,
@@ -88,9 +106,7 @@ class WebhookSink(SinkBase):
             "ends_at": finding.ends_at.isoformat() if finding.ends_at else None,
             "id": str(finding.id),
             "category": finding.category,
-            "service": json.loads(
-                json.dumps(finding.service, default=lambda o: getattr(o, '__dict__', str(o)))
-            ) if finding.service else None,
+            "service": None,  # encoded below, once for all the sinks
             "service_key": finding.service_key,
             "creation_date": finding.creation_date,
             "investigate_uri": finding.investigate_uri,
@@ -115,37 +131,21 @@ class WebhookSink(SinkBase):
             if finding.add_silence_url:
                 finding_dict["silence"] = finding.get_prometheus_silence_url(self.account_id, self.cluster_name)
 
-        # Enrichments last so they're the first thing dropped if size_limit is exceeded.
-        finding_dict["enrichments"] = json.loads(
-            json.dumps(finding.enrichments, default=lambda o: getattr(o, '__dict__', str(o)))
-        )
-
-        message = {}
-        message_length = 0
-
+        message = SizeLimitedJsonObject(self.size_limit)
         for key, value in finding_dict.items():
-            pair_length = len(json.dumps({key: value}).encode('utf-8'))
-
-            if message_length + pair_length <= self.size_limit:
-                message[key] = value
-                message_length += pair_length
+            if key == "service" and finding.service:
+                encoded_value = finding.encoding.to_json(finding.service)
             else:
+                encoded_value = to_json(value)
+            if not message.add(key, encoded_value):
                 break
-        if self.slack_webhook:
-            labels = message.get('subject', {}).get('labels')
-            if labels:
-                labels_as_text = ", ".join(f"{k}: {v}" for k, v in labels.items())
-            else:
-                labels_as_text = None
-            message = {
-                "text": f"*Title:* {message['title']}\n"
-                f"*Description:* {message['description']}\n"
-                f"*Failure:* {message['failure']}\n"
-                f"*Aggregation Key:* {message['aggregation_key']}\n"
-                f"*labels*: {labels_as_text}\n"
-            }
+
+        # Enrichments last so they're the first thing dropped if size_limit is exceeded.
+        encoded_enrichments = [finding.encoding.enrichment_to_json(enrichment) for enrichment in finding.enrichments]
+        message.add("enrichments", "[" + ", ".join(encoded_enrichments) + "]")
+
         try:
-            r = requests.post(self.url, json=message, headers=self.headers)
+            r = http_transport.post(self.url, data=message.to_json().encode("utf-8"), headers=self.json_headers)
             r.raise_for_status()
         except Exception:
             logging.exception(f"Webhook request error\n headers: \n{self.headers}")
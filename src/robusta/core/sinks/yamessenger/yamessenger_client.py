@@ -3,9 +3,9 @@ import os
 import uuid
 
 import mimetypes
-import requests
 
 from robusta.core.reporting.utils import PNG_SUFFIX, SVG_SUFFIX, convert_svg_to_png, is_image
+from robusta.integrations.common.requests import http_transport
 
 YM_API_BASE_URL = os.environ.get("YM_API_BASE_URL", "https://botapi.messenger.yandex.net")
 YM_API_SEND_TEXT_ENDPOINT = "/bot/v1/messages/sendText"
@@ -41,7 +41,7 @@ class YaMessengerClient:
         else:
             request["chat_id"] = self.chat_id
 
-        response = requests.post(url, headers=headers, json=request)
+        response = http_transport.post(url, headers=headers, json=request)
 
         if response.status_code != 200:
             logging.error(
@@ -76,7 +76,7 @@ class YaMessengerClient:
         else:
             request["chat_id"] = (None, self.chat_id)
 
-        response = requests.post(url, headers=headers, files=request)
+        response = http_transport.post(url, headers=headers, files=request)
 
         if response.status_code != 200:
             logging.error(
@@ -39,6 +39,9 @@ class HelmReleasesTriggerEvent(TriggerEvent):
             f"{self.helm_release.info.status}"
         )
 
+    def get_event_key(self) -> Optional[str]:
+        return f"{self.helm_release.namespace}/{self.helm_release.name}"
+
 
 @dataclass
 class HelmReleasesEvent(ExecutionBaseEvent):
@@ -1,6 +1,6 @@
 import logging
 
-import requests
+from robusta.integrations.common.requests import http_transport
 
 
 class ArgoCDClient:
@@ -17,7 +17,7 @@ class ArgoCDClient:
     def sync_application(self, application_name: str) -> bool:
         sync_url = self.SYNC_APP_PATTERN.format(self.url, application_name)
 
-        argo_response = requests.post(sync_url, headers=self.headers, verify=self.verify_cert)
+        argo_response = http_transport.post(sync_url, headers=self.headers, verify=self.verify_cert)
         if argo_response.status_code != 200:
             logging.error(f"Failed to sync application {application_name} on argo {self.url} {argo_response.reason}")
             return False
@@ -3,8 +3,6 @@ import re
 from itertools import chain
 from typing import Dict, List, Optional, Tuple, Union
 
-import requests
-
 from robusta.core.model.env_vars import DISCORD_TABLE_COLUMNS_LIMIT, ROBUSTA_LOGO_URL
 from robusta.core.reporting import (
     BaseBlock,
@@ -22,6 +20,7 @@ from robusta.core.reporting.utils import add_pngs_for_all_svgs
 from robusta.core.sinks.discord.discord_sink_params import DiscordSinkParams
 from robusta.core.sinks.transformer import Transformer
 from robusta.core.reporting.base import FindingStatus
+from robusta.integrations.common.requests import http_transport
 
 SEVERITY_EMOJI_MAP = {
     FindingSeverity.HIGH: ":red_circle:",
@@ -229,10 +228,10 @@ class DiscordSender:
         )
 
         try:
-            response = requests.post(self.url, json=discord_msg)
+            response = http_transport.post(self.url, json=discord_msg)
             response.raise_for_status()
             if attachment_blocks:
-                response = requests.post(
+                response = http_transport.post(
                     self.url,
                     data={
                         "username": discord_msg["username"],
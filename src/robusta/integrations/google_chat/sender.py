@@ -9,8 +9,7 @@ from robusta.core.reporting.blocks import (
 )
 from robusta.core.reporting.consts import FindingSource
 from robusta.core.sinks.google_chat.google_chat_params import GoogleChatSinkParams
-
-import requests
+from robusta.integrations.common.requests import http_transport
 
 
 class GoogleChatSender:
@@ -109,7 +108,7 @@ class GoogleChatSender:
 
     def __send_to_api(self, data: Dict):
         try:
-            resp = requests.post(self.params.webhook_url.get_secret_value(), json=data)
+            resp = http_transport.post(self.params.webhook_url.get_secret_value(), json=data)
         except Exception:
             logging.exception(f"Webhook request error\n headers: \n{resp.headers}")
 
@@ -16,11 +16,12 @@ from kubernetes.client.api import core_v1_api
 from kubernetes.client.rest import ApiException
 from kubernetes.stream import stream
 
-from robusta.core.model.env_vars import NAMESPACE_DATA_TTL
+from robusta.core.model.env_vars import COMPLETION_WAITER_ENABLED, NAMESPACE_DATA_TTL
 
 
 RUNNING_STATE = "Running"
 SUCCEEDED_STATE = "Succeeded"
+FAILED_STATE = "Failed"
 
 try:
     if os.getenv("KUBERNETES_SERVICE_HOST"):
@@ -58,6 +59,16 @@ def wait_until_job_complete(job: Job, timeout):
     """
     wait until a kubernetes Job object either succeeds or fails at least once
     """
+    if COMPLETION_WAITER_ENABLED:
+        # imported here, since the waiter imports the discovery informers, which import this module
+        from robusta.integrations.kubernetes.completion_waiter import completion_waiter
+
+        def is_v1_job_complete(j) -> bool:
+            return j.status is not None and (j.status.completion_time is not None or j.status.failed is not None)
+
+        if not completion_waiter.wait("Job", job.metadata.namespace, job.metadata.name, is_v1_job_complete, timeout, 5):
+            raise Exception("Failed to reach wait condition")
+        return Job.readNamespacedJob(job.metadata.name, job.metadata.namespace).obj
 
     def is_job_complete(j: Job) -> bool:
         return j.status.completionTime is not None or j.status.failed is not None
@@ -70,20 +81,48 @@ def wait_until_job_complete(job: Job, timeout):
     )
 
 
+def is_pod_status_final(phase: Optional[str], status: str) -> bool:
+    # a pod that succeeded or failed never changes its phase again
+    return phase == status or phase in [SUCCEEDED_STATE, FAILED_STATE]
+
+
 # TODO: refactor to use wait_until function
 def wait_for_pod_status(name, namespace, status: str, timeout_sec: float, backoff_wait_sec: float) -> str:
+    """
+    wait until the pod reaches the status, and return it. Returns the pod phase if it completed in another phase,
+    and FAIL on timeout
+    """
     pod_details = f"pod status: {name} {namespace} {status} {timeout_sec}"
     logging.debug(f"waiting for {pod_details}")
 
+    if COMPLETION_WAITER_ENABLED:
+        # imported here, since the waiter imports the discovery informers, which import this module
+        from robusta.integrations.kubernetes.completion_waiter import completion_waiter
+
+        pod = completion_waiter.wait(
+            "Pod",
+            namespace,
+            name,
+            lambda p: p.status is not None and is_pod_status_final(p.status.phase, status),
+            timeout_sec,
+            backoff_wait_sec,
+        )
+        if pod:
+            logging.debug(f"reached {pod_details}: {pod.status.phase}")
+            return pod.status.phase
+
+        logging.debug(f"failed to reach {pod_details}")
+        return "FAIL"
+
     start_time_sec = time.time()
     while start_time_sec + timeout_sec > time.time():
         try:
             core_v1 = core_v1_api.CoreV1Api()
             resp = core_v1.read_namespaced_pod_status(name, namespace)
 
-            if resp.status.phase == status:
-                logging.debug(f"reached {pod_details}")
-                return status
+            if is_pod_status_final(resp.status.phase, status):
+                logging.debug(f"reached {pod_details}: {resp.status.phase}")
+                return resp.status.phase
 
         except ApiException:
             logging.error(f"failed to get pod status {name} {namespace} {traceback.format_exc()}")
@@ -103,6 +103,10 @@ class K8sTriggerEvent(TriggerEvent):
     def get_event_description(self) -> str:
         return f"{self.k8s_payload.operation}-{self.k8s_payload.kind}-{self.k8s_payload.apiVersion}"
 
+    def get_event_key(self) -> Optional[str]:
+        metadata = self.k8s_payload.obj.get("metadata", {})
+        return metadata.get("uid") or f"{self.k8s_payload.kind}/{metadata.get('namespace')}/{metadata.get('name')}"
+
 
 DEFAULT_CHANGE_INCLUDE = ["spec"]
 DEFAULT_CHANGE_IGNORE = [
@@ -182,10 +186,10 @@ class K8sBaseTrigger(BaseTrigger):
         if self.scope is not None:
             scope_matcher = K8sTriggerEventScopeMatcher(k8s_payload.obj)
             if self.scope.exclude:
-                if scope_matcher.scope_inc_exc_matches(self.scope.exclude):
+                if scope_matcher.scope_inc_exc_matches(self.scope.compiled_exclude):
                     return False
             if self.scope.include:
-                return scope_matcher.scope_inc_exc_matches(self.scope.include)
+                return scope_matcher.scope_inc_exc_matches(self.scope.compiled_include)
 
         return True
 
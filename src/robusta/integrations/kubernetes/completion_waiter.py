@@ -0,0 +1,233 @@
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import prometheus_client
+from kubernetes import client, watch
+from kubernetes.client.exceptions import ApiException
+
+from robusta.core.discovery.informer import ResourceInformer
+from robusta.core.model.env_vars import (
+    COMPLETION_WAITER_IDLE_SEC,
+    COMPLETION_WAITER_RESYNC_SEC,
+    COMPLETION_WAITER_WATCH_TIMEOUT_SEC,
+)
+
+completion_wait_latency = prometheus_client.Histogram(
+    "completion_wait_latency", "Time waiting for pods and jobs to reach a state", ["kind", "result"]
+)
+completion_waiter_api_calls = prometheus_client.Counter(
+    "completion_waiter_api_calls", "Api server calls made while waiting for pods and jobs", ["kind", "call"]
+)
+
+
+def bind_namespace(list_func: Callable, namespace: str) -> Callable:
+    @functools.wraps(list_func)  # the watch finds the returned type in the docstring of the list function
+    def list_namespaced(*args, **kwargs):
+        return list_func(namespace, *args, **kwargs)
+
+    return list_namespaced
+
+
+class WaitedKind(NamedTuple):
+    list_func: Callable[[str], Callable]  # namespace -> list function of the namespace
+    read_func: Callable[[str, str], Any]  # (name, namespace) -> object
+    field_selector: Optional[str] = None
+
+
+WAITED_KINDS: Dict[str, WaitedKind] = {
+    # pending pods are never waited for, and a pod never goes back to pending
+    "Pod": WaitedKind(
+        lambda namespace: bind_namespace(client.CoreV1Api().list_namespaced_pod, namespace),
+        lambda name, namespace: client.CoreV1Api().read_namespaced_pod_status(name, namespace),
+        field_selector="status.phase!=Pending",
+    ),
+    "Job": WaitedKind(
+        lambda namespace: bind_namespace(client.BatchV1Api().list_namespaced_job, namespace),
+        lambda name, namespace: client.BatchV1Api().read_namespaced_job(name, namespace),
+    ),
+}
+
+
+class Waiter(NamedTuple):
+    predicate: Callable[[Any], bool]
+    future: Future
+
+
+class CompletionWaiter:
+    """
+    Waits for pods and jobs to reach a state, using a single watch per namespace and kind for all the waiters.
+
+    Each waiter registers a future, and reads the object once, for its current state. The watch events then resolve
+    the futures of the waiters whose predicate matches the object. The watch informer of a namespace and kind is
+    started by its first waiter, and stopped when it had no waiters for idle_sec.
+
+    Until the watch is synced (listed), waiters poll their object every poll_interval_sec, like before the waiter.
+    Afterwards they read it every resync_sec only, in case an event was missed.
+    """
+
+    def __init__(
+        self,
+        kinds: Optional[Dict[str, WaitedKind]] = None,
+        idle_sec: float = COMPLETION_WAITER_IDLE_SEC,
+        resync_sec: float = COMPLETION_WAITER_RESYNC_SEC,
+        watch_timeout: int = COMPLETION_WAITER_WATCH_TIMEOUT_SEC,
+        watch_factory: Optional[Callable[[], watch.Watch]] = None,
+    ):
+        self.kinds = kinds or WAITED_KINDS
+        self.idle_sec = idle_sec
+        self.resync_sec = resync_sec
+        self.watch_timeout = watch_timeout
+        self.watch_factory = watch_factory
+        self.__init_state()
+
+    def reset_after_fork(self):
+        """Forget the waiters and watches of the parent process. The watch threads aren't running in a forked child"""
+        self.__init_state()
+
+    def __init_state(self):
+        self.__lock = threading.Lock()
+        self.__waiters: Dict[Tuple[str, str], Dict[str, List[Waiter]]] = {}  # (kind, namespace) -> name -> waiters
+        self.__informers: Dict[Tuple[str, str], ResourceInformer] = {}
+        self.__idle_since: Dict[Tuple[str, str], float] = {}
+
+    def wait(
+        self,
+        kind: str,
+        namespace: str,
+        name: str,
+        predicate: Callable[[Any], bool],
+        timeout_sec: float,
+        poll_interval_sec: float,
+    ) -> Optional[Any]:
+        """Return the object once predicate(object) is True, or None on timeout"""
+        key = (kind, namespace)
+        waiter = Waiter(predicate, Future())
+        start_time = time.monotonic()
+        # objects that are already there are returned without listing and watching their namespace
+        self.__read(kind, namespace, name, waiter)
+        if waiter.future.done():
+            completion_wait_latency.labels(kind, "reached").observe(time.monotonic() - start_time)
+            return waiter.future.result()
+
+        with self.__lock:
+            self.__waiters.setdefault(key, {}).setdefault(name, []).append(waiter)
+            self.__idle_since.pop(key, None)
+            informer = self.__informers.get(key)
+            if informer is None:
+                informer = self.__start_informer(key)
+
+        try:
+            while True:
+                # read again once registered, since a running watch doesn't send the changes made before
+                self.__read(kind, namespace, name, waiter)
+                remaining = start_time + timeout_sec - time.monotonic()
+                interval = self.resync_sec if informer.resource_version is not None else poll_interval_sec
+                try:
+                    obj = waiter.future.result(max(min(remaining, interval), 0))
+                    completion_wait_latency.labels(kind, "reached").observe(time.monotonic() - start_time)
+                    return obj
+                except FutureTimeoutError:
+                    if remaining <= interval:
+                        completion_wait_latency.labels(kind, "timeout").observe(time.monotonic() - start_time)
+                        return None
+        finally:
+            self.__remove(key, name, waiter)
+
+    def stop(self):
+        with self.__lock:
+            informers = list(self.__informers.values())
+            self.__informers.clear()
+        for informer in informers:
+            informer.stop()
+
+    def __start_informer(self, key: Tuple[str, str]) -> ResourceInformer:
+        kind, namespace = key
+        waited_kind = self.kinds[kind]
+        list_func = waited_kind.list_func(namespace)
+
+        @functools.wraps(list_func)
+        def counted_list_func(*args, **kwargs):
+            completion_waiter_api_calls.labels(kind, "watch" if kwargs.get("watch") else "list").inc()
+            return list_func(*args, **kwargs)
+
+        informer = ResourceInformer(
+            f"{namespace}/{kind}",
+            counted_list_func,
+            lambda objs: self.__on_objects(key, objs),
+            lambda event_type, obj: self.__on_event(key, event_type, obj),
+            field_selector=waited_kind.field_selector,
+            watch_timeout=self.watch_timeout,
+            watch_factory=self.watch_factory,
+        )
+        self.__informers[key] = informer
+        informer.start()
+        return informer
+
+    def __read(self, kind: str, namespace: str, name: str, waiter: Waiter):
+        if waiter.future.done():
+            return
+        completion_waiter_api_calls.labels(kind, "get").inc()
+        try:
+            obj = self.kinds[kind].read_func(name, namespace)
+        except ApiException as e:
+            # the object might not be created yet
+            logging.debug(f"failed to read {kind} {namespace}/{name}: {e.status} {e.reason}")
+            return
+        self.__resolve(waiter, obj)
+
+    def __on_objects(self, key: Tuple[str, str], objs: List[Any]):
+        for obj in objs:
+            self.__on_event(key, "ADDED", obj)
+
+    def __on_event(self, key: Tuple[str, str], event_type: str, obj: Any):
+        # a deleted object might be recreated with the same name, like the pods of a statefulset
+        if event_type == "DELETED":
+            return
+        with self.__lock:
+            waiters = list(self.__waiters.get(key, {}).get(obj.metadata.name, []))
+        for waiter in waiters:
+            self.__resolve(waiter, obj)
+
+    @staticmethod
+    def __resolve(waiter: Waiter, obj: Any):
+        if waiter.future.done() or not waiter.predicate(obj):
+            return
+        try:
+            waiter.future.set_result(obj)
+        except InvalidStateError:  # resolved concurrently, by a watch event and a read
+            pass
+
+    def __remove(self, key: Tuple[str, str], name: str, waiter: Waiter):
+        with self.__lock:
+            name_waiters = self.__waiters[key][name]
+            name_waiters.remove(waiter)
+            if not name_waiters:
+                del self.__waiters[key][name]
+            if self.__waiters[key]:
+                return
+            del self.__waiters[key]
+            idle_since = time.monotonic()
+            self.__idle_since[key] = idle_since
+
+        timer = threading.Timer(self.idle_sec, self.__stop_if_idle, args=(key, idle_since))
+        timer.daemon = True
+        timer.start()
+
+    def __stop_if_idle(self, key: Tuple[str, str], idle_since: float):
+        with self.__lock:
+            if self.__idle_since.get(key) != idle_since:  # waited on since
+                return
+            del self.__idle_since[key]
+            informer = self.__informers.pop(key, None)
+        if informer:
+            informer.stop()
+
+
+completion_waiter = CompletionWaiter()
+os.register_at_fork(after_in_child=completion_waiter.reset_after_fork)
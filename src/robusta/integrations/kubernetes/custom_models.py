@@ -1,7 +1,7 @@
 import logging
 import os
-import re
 import time
+import uuid
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from typing import TYPE_CHECKING, ClassVar, Dict, List, Optional, Tuple, Type, TypeVar, Union
@@ -15,6 +15,8 @@ from kubernetes.client import ApiException
 from pydantic import BaseModel
 
 from robusta.core.model.env_vars import (
+    DEBUGGER_POOL_ENABLED,
+    DEBUGGER_POOL_MAX_POD_AGE_SEC,
     IMAGE_REGISTRY,
     INSTALLATION_NAMESPACE,
     POD_WAIT_RETRIES,
@@ -24,13 +26,14 @@ from robusta.core.model.env_vars import (
 from robusta.integrations.kubernetes.api_client_utils import (
     SUCCEEDED_STATE,
     exec_shell_command,
-    get_pod_logs,
     prepare_pod_command,
     to_kubernetes_name,
     upload_file,
     wait_for_pod_status,
     wait_until_job_complete,
 )
+from robusta.integrations.kubernetes.debugger_pool import DebuggerPodPool
+from robusta.integrations.kubernetes.pod_logs import LogLineProcessor, stream_pod_logs
 from robusta.integrations.kubernetes.templates import get_deployment_yaml
 from robusta.utils.parsing import load_json
 
@@ -44,6 +47,9 @@ PYTHON_DEBUGGER_IMAGE_OVERRIDE = os.getenv("PYTHON_DEBUGGER_IMAGE", "debug-toolk
 # TODO: import these from the python-tools project
 PYTHON_DEBUGGER_IMAGE = f"{IMAGE_REGISTRY}/{PYTHON_DEBUGGER_IMAGE_OVERRIDE}"
 JAVA_DEBUGGER_IMAGE = f"{IMAGE_REGISTRY}/java-toolkit:v1.0.2"
+DEBUGGER_POOL_LABEL = "robusta.dev/debugger-pool"
+# pooled pods are labeled with the run that created them, shared by the event worker processes of the run
+DEBUGGER_POOL_RUN_ID = uuid.uuid4().hex
 
 
 class Process(BaseModel):
@@ -184,39 +190,50 @@ class RobustaPod(Pod):
         regex_replacer_patterns: Optional[List["NamedRegexPattern"]] = None,
         regex_replacement_style: Optional[RegexReplacementStyle] = None,
         filter_regex: Optional[str] = None,
+        max_bytes: Optional[int] = None,
     ) -> str:
         """
         Fetch pod logs, can replace sensitive data in the logs using a regex
         """
+        logs = self.get_log_contents(
+            container, previous, tail_lines, regex_replacer_patterns, regex_replacement_style, filter_regex, max_bytes
+        )
+        return logs.decode("utf-8") if logs is not None else None
+
+    def get_log_contents(
+        self,
+        container=None,
+        previous=None,
+        tail_lines=None,
+        regex_replacer_patterns: Optional[List["NamedRegexPattern"]] = None,
+        regex_replacement_style: Optional[RegexReplacementStyle] = None,
+        filter_regex: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Optional[bytes]:
+        """
+        Fetch pod logs as bytes, ready for a FileBlock.
+        The log is streamed, filtered and redacted line by line, and only its last max_bytes are kept.
+        """
         if not container and self.spec.containers:
             container = self.spec.containers[0].name
-        pods_logs = get_pod_logs(
+
+        if regex_replacer_patterns:
+            logging.info("Sanitizing log data with the provided regex patterns")
+        processor = LogLineProcessor(
+            filter_regex=filter_regex,
+            redaction_patterns=[(replacer.name, replacer.regex) for replacer in regex_replacer_patterns or []],
+            named_redaction=regex_replacement_style == RegexReplacementStyle.NAMED,
+        )
+        return stream_pod_logs(
             self.metadata.name,
             self.metadata.namespace,
             container,
             previous,
             tail_lines,
+            processor=processor,
+            max_bytes=max_bytes,
         )
 
-        if pods_logs and filter_regex:
-            regex = re.compile(filter_regex)
-            pods_logs = "\n".join(re.findall(regex, pods_logs))
-
-        if pods_logs and regex_replacer_patterns:
-            logging.info("Sanitizing log data with the provided regex patterns")
-            if regex_replacement_style == RegexReplacementStyle.NAMED:
-                for replacer in regex_replacer_patterns:
-                    pods_logs = re.sub(replacer.regex, f"[{replacer.name.upper()}]", pods_logs)
-            else:
-
-                def same_length_asterisks(match):
-                    return "*" * len((match.group(0)))
-
-                for replacer in regex_replacer_patterns:
-                    pods_logs = re.sub(replacer.regex, same_length_asterisks, pods_logs)
-
-        return pods_logs
-
     @staticmethod
     def exec_in_java_pod(
         pod_name: str,
@@ -238,6 +255,8 @@ class RobustaPod(Pod):
         env: Optional[List[EnvVar]] = None,
         mount_host_root: bool = False,
         custom_annotations: Optional[Dict[str, str]] = None,
+        labels: Optional[Dict[str, str]] = None,
+        active_deadline_seconds: Optional[int] = None,
     ) -> "RobustaPod":
         """
         Creates a debugging pod with high privileges
@@ -256,12 +275,14 @@ class RobustaPod(Pod):
                 name=to_kubernetes_name(pod_name, "debug-"),
                 namespace=INSTALLATION_NAMESPACE,
                 annotations=custom_annotations,
+                labels=labels,
             ),
             spec=PodSpec(
                 serviceAccountName=RUNNER_SERVICE_ACCOUNT,
                 hostPID=True,
                 nodeName=node_name,
                 restartPolicy="OnFailure",
+                activeDeadlineSeconds=active_deadline_seconds,
                 containers=[
                     Container(
                         name="debugger",
@@ -322,6 +343,10 @@ class RobustaPod(Pod):
         debug_image=PYTHON_DEBUGGER_IMAGE,
         custom_annotations: Optional[Dict[str, str]] = None,
     ) -> str:
+        if DEBUGGER_POOL_ENABLED:
+            with debugger_pod_pool.lease(node_name, debug_image, custom_annotations) as debugger:
+                return debugger.exec(cmd)
+
         debugger = RobustaPod.create_debugger_pod(
             pod_name, node_name, debug_image, custom_annotations=custom_annotations
         )
@@ -426,6 +451,48 @@ class RobustaPod(Pod):
             raise RuntimeError(f"Pod {pod_name} in namespace {namespace} is not ready after {timeout} seconds")
 
 
+def create_pooled_debugger_pod(
+    node_name: str, debug_image: str, custom_annotations: Optional[Dict[str, str]]
+) -> RobustaPod:
+    return RobustaPod.create_debugger_pod(
+        "pool",
+        node_name,
+        debug_image,
+        custom_annotations=custom_annotations,
+        labels={DEBUGGER_POOL_LABEL: DEBUGGER_POOL_RUN_ID},
+        # a pod the runner didn't delete is killed after the deadline, and its Failed pod is deleted by the pool
+        # cleanup. The pool retires pods before this deadline
+        active_deadline_seconds=2 * DEBUGGER_POOL_MAX_POD_AGE_SEC,
+    )
+
+
+def delete_debugger_pod(debugger: RobustaPod):
+    RobustaPod.deleteNamespacedPod(debugger.metadata.name, debugger.metadata.namespace)
+
+
+def is_debugger_pod_running(debugger: RobustaPod) -> bool:
+    return RobustaPod.read(debugger.metadata.name, debugger.metadata.namespace).status.phase == "Running"
+
+
+def delete_orphan_debugger_pods():
+    """Delete the pool pods of previous runs, and the pool pods that were killed by their deadline"""
+    pods = PodList.listNamespacedPod(INSTALLATION_NAMESPACE, label_selector=DEBUGGER_POOL_LABEL).obj
+    for pod in pods.items:
+        if pod.metadata.labels.get(DEBUGGER_POOL_LABEL) != DEBUGGER_POOL_RUN_ID:
+            logging.info(f"Deleting debugger pod {pod.metadata.name} of a previous run")
+        elif pod.status and pod.status.phase == "Failed":
+            logging.info(f"Deleting failed debugger pod {pod.metadata.name}")
+        else:
+            continue
+        delete_debugger_pod(pod)
+
+
+debugger_pod_pool = DebuggerPodPool(
+    create_pooled_debugger_pod, delete_debugger_pod, is_debugger_pod_running, delete_orphan_debugger_pods
+)
+os.register_at_fork(after_in_child=debugger_pod_pool.reset_after_fork)
+
+
 class RobustaDeployment(Deployment):
     @classmethod
     def from_image(cls: Type[T], name, image="busybox", cmd=None) -> T:
@@ -0,0 +1,275 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import prometheus_client
+
+from robusta.core.model.env_vars import (
+    DEBUGGER_POOL_CLEANUP_INTERVAL_SEC,
+    DEBUGGER_POOL_IDLE_TTL_SEC,
+    DEBUGGER_POOL_LEASE_TIMEOUT_SEC,
+    DEBUGGER_POOL_MAX_POD_AGE_SEC,
+    DEBUGGER_POOL_MAX_PODS,
+)
+
+debugger_pool_pods = prometheus_client.Gauge("debugger_pool_pods", "Pooled debugger pods", ["state"])
+debugger_pool_leases = prometheus_client.Counter("debugger_pool_leases", "Leases of debugger pods", ["result"])
+debugger_pool_evictions = prometheus_client.Counter(
+    "debugger_pool_evictions", "Pooled debugger pods deleted from the pool", ["reason"]
+)
+debugger_pool_lease_latency = prometheus_client.Histogram(
+    "debugger_pool_lease_latency", "Time to lease a debugger pod, including its creation", ["result"]
+)
+
+PoolKey = Tuple[str, str, Tuple[Tuple[str, str], ...]]  # node, image, custom annotations
+
+
+class PooledPod:
+    def __init__(self, key: PoolKey):
+        self.key = key
+        self.pod: Optional[Any] = None  # None while the pod is created
+        self.leased = True
+        self.created_at = time.monotonic()
+        self.released_at = self.created_at
+
+
+class DebuggerPodPool:
+    """
+    Warm debugger pods, reused by the commands run on the same node, with the same image and annotations.
+
+    A pod is leased by a single command at a time. When the command is done, the pod is released back to the pool,
+    and deleted after idle_ttl_sec without leases. Pods are checked with is_healthy before they're leased again, and
+    are retired after max_pod_age_sec.
+
+    At most max_pods pods are pooled in the cluster. When the pool is full, idle pods of other nodes and images are
+    deleted to make room. When all the pods are leased, a lease waits up to lease_timeout_sec for a pod to be released,
+    and then uses a one-off pod, deleted after the command, like without the pool.
+
+    delete_orphans deletes the pool pods that aren't known to the pool, like the pods of previous runs, and pods killed
+    by their deadline. It's called before the first pod is created, and every cleanup_interval_sec while the pool is
+    used.
+    """
+
+    def __init__(
+        self,
+        create_pod: Callable[[str, str, Optional[Dict[str, str]]], Any],
+        delete_pod: Callable[[Any], None],
+        is_healthy: Callable[[Any], bool],
+        delete_orphans: Optional[Callable[[], None]] = None,
+        max_pods: int = DEBUGGER_POOL_MAX_PODS,
+        idle_ttl_sec: float = DEBUGGER_POOL_IDLE_TTL_SEC,
+        max_pod_age_sec: float = DEBUGGER_POOL_MAX_POD_AGE_SEC,
+        lease_timeout_sec: float = DEBUGGER_POOL_LEASE_TIMEOUT_SEC,
+        cleanup_interval_sec: float = DEBUGGER_POOL_CLEANUP_INTERVAL_SEC,
+    ):
+        self.create_pod = create_pod
+        self.delete_pod = delete_pod
+        self.is_healthy = is_healthy
+        self.delete_orphans = delete_orphans
+        self.max_pods = max_pods
+        self.idle_ttl_sec = idle_ttl_sec
+        self.max_pod_age_sec = max_pod_age_sec
+        self.lease_timeout_sec = lease_timeout_sec
+        self.cleanup_interval_sec = cleanup_interval_sec
+        self.__orphans_deleted = delete_orphans is None
+        self.__init_state()
+
+    def reset_after_fork(self):
+        """Forget the pods of the parent process, without deleting them. They're still leased by the parent"""
+        self.__init_state()
+
+    def __init_state(self):
+        self.__pods: List[PooledPod] = []
+        self.__condition = threading.Condition()
+        self.__orphans_lock = threading.Lock()
+        self.__reaper: Optional[threading.Thread] = None
+        self.__stopped = False
+
+    @contextmanager
+    def lease(self, node_name: str, image: str, custom_annotations: Optional[Dict[str, str]] = None) -> Iterator[Any]:
+        """Lease a debugger pod on the node. It's released when the context exits, or deleted if the context raised"""
+        key: PoolKey = (node_name, image, tuple(sorted((custom_annotations or {}).items())))
+        start_time = time.monotonic()
+        pooled, result = self.__acquire(key)
+        debugger_pool_leases.labels(result).inc()
+        debugger_pool_lease_latency.labels(result).observe(time.monotonic() - start_time)
+
+        if pooled is None:  # all the pooled pods are leased
+            self.__delete_orphans_once()
+            pod = self.create_pod(node_name, image, custom_annotations)
+            try:
+                yield pod
+            finally:
+                self.__delete(pod)
+            return
+
+        try:
+            yield pooled.pod
+        except BaseException:
+            self.__remove(pooled, "failed")
+            raise
+        self.__release(pooled)
+
+    def pod_count(self) -> int:
+        with self.__condition:
+            return len(self.__pods)
+
+    def evict_idle(self):
+        """Delete the pods that weren't leased for idle_ttl_sec"""
+        now = time.monotonic()
+        self.__remove_idle("idle", lambda pooled: pooled.released_at + self.idle_ttl_sec <= now)
+
+    def stop(self):
+        """Delete the idle pods. Leased pods are deleted when they're released"""
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+        self.__remove_idle("stopped", lambda pooled: True)
+
+    def __acquire(self, key: PoolKey) -> Tuple[Optional[PooledPod], str]:
+        deadline = time.monotonic() + self.lease_timeout_sec
+        while True:
+            evicted: Optional[PooledPod] = None
+            with self.__condition:
+                while True:
+                    if self.__stopped:
+                        return None, "overflow"
+                    pooled = self.__most_recent_idle(key)
+                    if pooled is not None:
+                        pooled.leased = True
+                        break
+                    if len(self.__pods) >= self.max_pods:
+                        evicted = self.__least_recent_idle()
+                        if evicted is not None:
+                            self.__pods.remove(evicted)
+                    if len(self.__pods) < self.max_pods:
+                        pooled = PooledPod(key)
+                        self.__pods.append(pooled)
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None, "overflow"
+                    self.__condition.wait(remaining)
+                self.__update_metrics()
+
+            if evicted is not None:
+                debugger_pool_evictions.labels("capacity").inc()
+                self.__delete(evicted.pod)
+
+            if pooled.pod is None:
+                self.__create(pooled)
+                return pooled, "created"
+
+            if time.monotonic() - pooled.created_at > self.max_pod_age_sec:
+                self.__remove(pooled, "age")
+            elif not self.__check_health(pooled):
+                self.__remove(pooled, "unhealthy")
+            else:
+                return pooled, "reused"
+
+    def __create(self, pooled: PooledPod):
+        node_name, image, annotations = pooled.key
+        try:
+            self.__delete_orphans_once()
+            pooled.pod = self.create_pod(node_name, image, dict(annotations) or None)
+        except BaseException:
+            self.__remove(pooled, "failed")
+            raise
+        self.__start_reaper()
+
+    def __check_health(self, pooled: PooledPod) -> bool:
+        try:
+            return self.is_healthy(pooled.pod)
+        except Exception:
+            logging.exception(f"Failed to check debugger pod {pooled.pod.metadata.name}")
+            return False
+
+    def __release(self, pooled: PooledPod):
+        with self.__condition:
+            if self.__stopped:
+                stopped = True
+            else:
+                stopped = False
+                pooled.leased = False
+                pooled.released_at = time.monotonic()
+                self.__update_metrics()
+                self.__condition.notify_all()
+        if stopped:
+            self.__remove(pooled, "stopped")
+
+    def __remove(self, pooled: PooledPod, reason: str):
+        with self.__condition:
+            if pooled in self.__pods:
+                self.__pods.remove(pooled)
+            self.__update_metrics()
+            self.__condition.notify_all()
+        debugger_pool_evictions.labels(reason).inc()
+        if pooled.pod is not None:
+            self.__delete(pooled.pod)
+
+    def __remove_idle(self, reason: str, predicate: Callable[[PooledPod], bool]):
+        with self.__condition:
+            removed = [pooled for pooled in self.__pods if not pooled.leased and predicate(pooled)]
+            for pooled in removed:
+                self.__pods.remove(pooled)
+            self.__update_metrics()
+        for pooled in removed:
+            debugger_pool_evictions.labels(reason).inc()
+            self.__delete(pooled.pod)
+
+    def __delete(self, pod: Any):
+        try:
+            self.delete_pod(pod)
+        except Exception:
+            logging.exception(f"Failed to delete debugger pod {pod.metadata.name}")
+
+    def __most_recent_idle(self, key: PoolKey) -> Optional[PooledPod]:
+        idle = [pooled for pooled in self.__pods if pooled.key == key and not pooled.leased]
+        return max(idle, key=lambda pooled: pooled.released_at) if idle else None
+
+    def __least_recent_idle(self) -> Optional[PooledPod]:
+        idle = [pooled for pooled in self.__pods if not pooled.leased]
+        return min(idle, key=lambda pooled: pooled.released_at) if idle else None
+
+    def __update_metrics(self):
+        leased = sum(pooled.leased for pooled in self.__pods)
+        debugger_pool_pods.labels("leased").set(leased)
+        debugger_pool_pods.labels("idle").set(len(self.__pods) - leased)
+
+    def __delete_orphans_once(self):
+        # pods pooled by a previous runner are not known to this pool
+        with self.__orphans_lock:
+            if self.__orphans_deleted:
+                return
+            self.__orphans_deleted = True
+            self.__delete_orphans()
+
+    def __delete_orphans(self):
+        try:
+            self.delete_orphans()
+        except Exception:
+            logging.exception("Failed to delete the orphan debugger pods")
+
+    def __start_reaper(self):
+        with self.__condition:
+            if self.__reaper is not None:
+                return
+            self.__reaper = threading.Thread(target=self.__reap, name="debugger-pool-reaper", daemon=True)
+            self.__reaper.start()
+
+    def __reap(self):
+        cleaned_at = time.monotonic()
+        while True:
+            with self.__condition:
+                self.__condition.wait(max(min(self.idle_ttl_sec / 2, self.cleanup_interval_sec), 0.01))
+                if self.__stopped:
+                    return
+            try:
+                self.evict_idle()
+            except Exception:
+                logging.exception("Failed to evict idle debugger pods")
+            if self.delete_orphans is not None and time.monotonic() - cleaned_at >= self.cleanup_interval_sec:
+                cleaned_at = time.monotonic()
+                self.__delete_orphans()
@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import prometheus_client
+from hikaru.model.rel_1_26 import Node, NodeList
+
+from robusta.core.model.env_vars import NODE_INDEX_MIN_REFRESH_SEC, NODE_INDEX_REFRESH_SEC
+
+node_index_lookups = prometheus_client.Counter("node_index_lookups", "Number of node index lookups", ["type", "result"])
+node_index_refreshes = prometheus_client.Counter(
+    "node_index_refreshes", "Number of node listings made by the node index"
+)
+
+
+def list_nodes() -> List[Node]:
+    return NodeList.listNode().obj.items
+
+
+class NodeAddressIndex:
+    """
+    The cluster nodes, by name and by address (InternalIP, ExternalIP, Hostname and the other node addresses).
+
+    The index is built by listing the nodes when it's first used, and listed again when it's older than refresh_sec.
+    A lookup of an unknown node lists the nodes again too, so new nodes and changed addresses are found quickly, but
+    the nodes are listed at most once every min_refresh_sec. Between listings, lookups don't call the api server.
+    Each lookup returns its own copy of the node.
+    """
+
+    def __init__(
+        self,
+        refresh_sec: float = NODE_INDEX_REFRESH_SEC,
+        min_refresh_sec: float = NODE_INDEX_MIN_REFRESH_SEC,
+        list_func: Callable[[], List[Node]] = list_nodes,
+    ):
+        self.refresh_sec = refresh_sec
+        self.min_refresh_sec = min_refresh_sec
+        self.list_func = list_func
+        self.__nodes: Dict[str, Node] = {}  # name -> node
+        self.__addresses: Dict[str, str] = {}  # address -> node name
+        self.__refreshed_at: Optional[float] = None
+        self.__attempted_at: Optional[float] = None
+        self.__lock = threading.Lock()
+
+    def reset_after_fork(self):
+        """Keep the listed nodes, with a new lock. A parent thread may have been listing the nodes when it forked"""
+        self.__lock = threading.Lock()
+
+    def get_node(self, name: str) -> Optional[Node]:
+        return self.__lookup("name", lambda: self.__nodes.get(name))
+
+    def find_node_by_address(self, address: str) -> Optional[Node]:
+        return self.__lookup("address", lambda: self.__nodes.get(self.__addresses.get(address)))
+
+    def refresh(self):
+        nodes = self.list_func()
+        node_index_refreshes.inc()
+        by_name = {}
+        by_address = {}
+        for node in nodes:
+            by_name[node.metadata.name] = node
+            for address in (node.status.addresses or []) if node.status else []:
+                by_address[address.address] = node.metadata.name
+
+        # replaced at once, so removed nodes and addresses that moved to other nodes are not left behind
+        self.__nodes = by_name
+        self.__addresses = by_address
+
+    def __lookup(self, lookup_type: str, find: Callable[[], Optional[Node]]) -> Optional[Node]:
+        self.__refresh_if_older(self.refresh_sec)
+        node = find()
+        if node is None and self.__refresh_if_older(self.min_refresh_sec):
+            node = find()
+        node_index_lookups.labels(lookup_type, "found" if node else "not_found").inc()
+        return node.dup() if node else None
+
+    def __refresh_if_older(self, max_age: float) -> bool:
+        with self.__lock:
+            now = time.monotonic()
+            if self.__refreshed_at is not None and now - self.__refreshed_at < max_age:
+                return False
+            # failed listings are retried only after min_refresh_sec too
+            if self.__attempted_at is not None and now - self.__attempted_at < self.min_refresh_sec:
+                return False
+
+            self.__attempted_at = now
+            try:
+                self.refresh()
+            except Exception:
+                logging.exception("Failed to list the cluster nodes")
+                return False
+            self.__refreshed_at = now
+            return True
@@ -0,0 +1,64 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, Tuple, TypeVar
+
+import prometheus_client
+from cachetools import TTLCache
+from hikaru import HikaruBase
+
+object_cache_requests = prometheus_client.Counter(
+    "kubernetes_object_cache_requests", "Number of kubernetes object cache requests", ["kind", "result"]
+)
+
+T = TypeVar("T", bound=HikaruBase)
+
+
+class KubernetesObjectCache:
+    """
+    Short lived cache of kubernetes objects, by (kind, namespace, name).
+
+    Concurrent requests of the same object wait for a single read. Failed reads are not cached.
+    Each caller gets its own copy of the object, since playbook actions may change the objects of their event.
+    """
+
+    def __init__(self, ttl_sec: float, max_size: int = 1000):
+        self.ttl_sec = ttl_sec
+        self.max_size = max_size
+        self.__init_state()
+
+    def reset_after_fork(self):
+        """Drop the objects of the parent process. The reads of the parent threads never complete in the child"""
+        self.__init_state()
+
+    def __init_state(self):
+        self.__objects: TTLCache = TTLCache(maxsize=self.max_size, ttl=self.ttl_sec) if self.ttl_sec > 0 else None
+        self.__lock = threading.Lock()
+
+    def get(self, kind: str, namespace: str, name: str, read: Callable[[], T]) -> T:
+        if self.__objects is None:
+            object_cache_requests.labels(kind, "miss").inc()
+            return read()
+
+        key: Tuple[str, str, str] = (kind, namespace, name)
+        with self.__lock:
+            future = self.__objects.get(key)
+            is_reader = future is None
+            if is_reader:
+                future = self.__objects[key] = Future()
+
+        object_cache_requests.labels(kind, "miss" if is_reader else "hit").inc()
+        if is_reader:
+            try:
+                future.set_result(read())
+            except Exception as e:
+                with self.__lock:
+                    if self.__objects.get(key) is future:
+                        del self.__objects[key]
+                future.set_exception(e)
+
+        return future.result().dup()
+
+    def clear(self):
+        if self.__objects is not None:
+            with self.__lock:
+                self.__objects.clear()
@@ -0,0 +1,179 @@
+import logging
+import re
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+from kubernetes.client.api import core_v1_api
+from kubernetes.client.rest import ApiException
+
+LOG_READ_CHUNK_BYTES = 64 * 1024
+BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+class LogLineProcessor:
+    """
+    Filters and redacts log lines, one line at a time.
+
+    A line is replaced by the matches of filter_regex in it, and lines without matches are dropped.
+    All the redaction patterns are combined into one compiled pattern, so each line is scanned once. Where patterns
+    overlap, the leftmost match is redacted, and of matches starting at the same position, the one of the earlier
+    pattern. Patterns that can't be combined (e.g. with backreferences or inline flags) are applied one by one.
+    """
+
+    def __init__(
+        self,
+        filter_regex: Optional[str] = None,
+        redaction_patterns: Optional[List[Tuple[str, str]]] = None,
+        named_redaction: bool = False,
+    ):
+        """
+        :param filter_regex: only the matches of this regex are kept
+        :param redaction_patterns: (name, regex) pairs of text to redact
+        :param named_redaction: replace matches with the uppercase pattern name, e.g. "[IP]", instead of asterisks
+        """
+        self.filter = re.compile(filter_regex) if filter_regex else None
+        self.replacements = [f"[{name.upper()}]" for name, _ in redaction_patterns or []]
+        self.named_redaction = named_redaction
+        self.combined: Optional[Pattern] = None
+        self.sequential: List[Pattern] = []
+        self.group_to_pattern = {}
+
+        regexes = [regex for _, regex in redaction_patterns or []]
+        if not regexes:
+            return
+        compiled = [re.compile(regex) for regex in regexes]
+        if not any(BACKREFERENCE.search(regex) for regex in regexes):
+            try:
+                self.combined = re.compile("|".join(f"({regex})" for regex in regexes))
+                group = 1
+                for index, pattern in enumerate(compiled):
+                    self.group_to_pattern[group] = index
+                    group += pattern.groups + 1
+                return
+            except re.error:
+                pass
+        self.sequential = compiled
+
+    @property
+    def is_noop(self) -> bool:
+        return self.filter is None and self.combined is None and not self.sequential
+
+    def process(self, line: str) -> Iterator[str]:
+        if self.filter is None:
+            yield self.redact(line)
+            return
+        for match in self.filter.findall(line):
+            yield self.redact(match)
+
+    def redact(self, text: str) -> str:
+        if self.combined is not None:
+            return self.combined.sub(self.__combined_replacement, text)
+        for index, pattern in enumerate(self.sequential):
+            text = pattern.sub(self.__replacement(index), text)
+        return text
+
+    def __combined_replacement(self, match: re.Match) -> str:
+        # the wrapping group of the matching pattern closes last, so it's the lastindex
+        return self.__replacement(self.group_to_pattern[match.lastindex])(match)
+
+    def __replacement(self, index: int):
+        if self.named_redaction:
+            return lambda match: self.replacements[index]
+        return lambda match: "*" * len(match.group(0))
+
+
+class LogTail:
+    """
+    Keeps the last lines of a log, up to max_bytes (including the line breaks). A single line longer than max_bytes
+    is cut to its last max_bytes. With no max_bytes, all the lines are kept.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.lines: Deque[bytes] = deque()
+        self.size = 0
+        self.dropped_bytes = 0
+
+    def append(self, line: bytes):
+        if self.max_bytes and len(line) >= self.max_bytes:
+            self.dropped_bytes += self.size + len(line) - self.max_bytes + 1
+            # drop the partial utf-8 character at the start of the cut line, if any
+            line = line[len(line) - self.max_bytes + 1 :].decode("utf-8", "ignore").encode("utf-8")
+            self.lines.clear()
+            self.size = 0
+
+        self.lines.append(line)
+        self.size += len(line) + 1
+        while self.max_bytes and self.size > self.max_bytes + 1:
+            dropped = self.lines.popleft()
+            self.size -= len(dropped) + 1
+            self.dropped_bytes += len(dropped) + 1
+
+    def getvalue(self) -> bytes:
+        return b"\n".join(self.lines)
+
+
+def split_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Split a stream of byte chunks into lines, without the line breaks"""
+    partial = b""
+    for chunk in chunks:
+        lines = (partial + chunk).split(b"\n")
+        partial = lines.pop()
+        yield from lines
+    if partial:
+        yield partial
+
+
+def process_log_stream(
+    chunks: Iterable[bytes], processor: Optional[LogLineProcessor] = None, max_bytes: Optional[int] = None
+) -> bytes:
+    tail = LogTail(max_bytes)
+    if processor is None or processor.is_noop:
+        for line in split_lines(chunks):
+            tail.append(line)
+    else:
+        for line in split_lines(chunks):
+            for processed in processor.process(line.decode("utf-8")):
+                tail.append(processed.encode("utf-8"))
+
+    if tail.dropped_bytes:
+        logging.debug(f"Dropped the first {tail.dropped_bytes} bytes of the log, to keep the last {max_bytes} bytes")
+    return tail.getvalue()
+
+
+def stream_pod_logs(
+    name: str,
+    namespace: str = "default",
+    container: str = "",
+    previous: Optional[bool] = None,
+    tail_lines: Optional[int] = None,
+    since_seconds: Optional[int] = None,
+    processor: Optional[LogLineProcessor] = None,
+    max_bytes: Optional[int] = None,
+) -> Optional[bytes]:
+    """
+    Read pod logs from the api server line by line, processing each line and keeping only the last max_bytes, so the
+    whole log is never held in memory. Like get_pod_logs, returns None if the pod or container don't exist, and an
+    empty log on other errors.
+    """
+    try:
+        core_v1 = core_v1_api.CoreV1Api()
+        response = core_v1.read_namespaced_pod_log(
+            name,
+            namespace,
+            container=container,
+            previous=previous,
+            tail_lines=tail_lines,
+            since_seconds=since_seconds,
+            _preload_content=False,
+        )
+    except ApiException as e:
+        if e.status != 404:
+            logging.exception(f"failed to get pod logs {name} {namespace} {container}")
+            return b""
+        return None
+
+    try:
+        return process_log_stream(response.stream(LOG_READ_CHUNK_BYTES), processor, max_bytes)
+    finally:
+        response.release_conn()
@@ -2,8 +2,6 @@ import json
 import logging
 from typing import List
 
-import requests
-
 from robusta.core.reporting import (
     FileBlock,
     Finding,
@@ -16,6 +14,7 @@ from robusta.core.reporting import (
 )
 from robusta.core.reporting.base import FindingStatus, LinkType
 from robusta.core.reporting.url_helpers import convert_prom_graph_url_to_robusta_metrics_explorer
+from robusta.integrations.common.requests import http_transport
 from robusta.integrations.msteams.msteams_adaptive_card_files import MsTeamsAdaptiveCardFiles
 from robusta.integrations.msteams.msteams_elements.msteams_base import MsTeamsBase
 from robusta.integrations.msteams.msteams_elements.msteams_card import MsTeamsCard
@@ -183,7 +182,7 @@ class MsTeamsMsg:
             complete_card_map: dict = MsTeamsCard(self.entire_msg).get_map_value()
             self._put_text_files_data_up_to_max_limit(complete_card_map)
 
-            response = requests.post(self.webhook_url, json=complete_card_map)
+            response = http_transport.post(self.webhook_url, json=complete_card_map)
             if response.status_code not in [200, 201]:
                 logging.error(f"Error sending to ms teams json: {complete_card_map} error: {response.reason}")
 
@@ -1,14 +1,23 @@
 import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from typing import Any, Dict, List, NamedTuple, Optional, Type, Union
 
-from hikaru.model.rel_1_26 import DaemonSet, HorizontalPodAutoscaler, Job, Node, NodeList, StatefulSet
+from hikaru.model.rel_1_26 import DaemonSet, HorizontalPodAutoscaler, Job, Node, StatefulSet
 from pydantic.main import BaseModel
 
+from robusta.core.model.env_vars import (
+    ALERT_RESOURCES_CACHE_TTL_SEC,
+    ALERT_RESOURCES_LOAD_TIMEOUT_SEC,
+    ALERT_RESOURCES_LOAD_WORKERS,
+)
 from robusta.core.model.events import ExecutionBaseEvent
 from robusta.core.playbooks.base_trigger import BaseTrigger, TriggerEvent
 from robusta.core.reporting.base import Finding
 from robusta.integrations.helper import exact_match, prefix_match
 from robusta.integrations.kubernetes.custom_models import RobustaDeployment, RobustaJob, RobustaPod
+from robusta.integrations.kubernetes.node_index import NodeAddressIndex
+from robusta.integrations.kubernetes.object_cache import KubernetesObjectCache
 from robusta.integrations.prometheus.models import PrometheusAlert, PrometheusKubernetesAlert
 from robusta.utils.cluster_provider_discovery import cluster_provider
 from robusta.utils.scope import ScopeParams, BaseScopeMatcher
@@ -36,6 +45,9 @@ class PrometheusTriggerEvent(TriggerEvent):
         alert_severity = self.alert.labels.get("severity", "NA")
         return f"PrometheusAlert-{alert_name}-{alert_severity}"
 
+    def get_event_key(self) -> Optional[str]:
+        return self.alert.fingerprint or None
+
 
 class ResourceMapping(NamedTuple):
     hikaru_class: Union[
@@ -105,10 +117,10 @@ class PrometheusAlertTrigger(BaseTrigger):
         if self.scope is not None:
             scope_matcher = PrometheusTriggerEventScopeMatcher(event.alert)
             if self.scope.exclude:
-                if scope_matcher.scope_inc_exc_matches(self.scope.exclude):
+                if scope_matcher.scope_inc_exc_matches(self.scope.compiled_exclude):
                     return False
             if self.scope.include:
-                return scope_matcher.scope_inc_exc_matches(self.scope.include)
+                return scope_matcher.scope_inc_exc_matches(self.scope.compiled_include)
 
         return True
 
@@ -130,15 +142,17 @@ class PrometheusAlertTriggers(BaseModel):
 
 
 class AlertEventBuilder:
+    # the kubernetes objects of an alert are read concurrently, and reused by the next alerts of the same objects
+    loader = ThreadPoolExecutor(max_workers=ALERT_RESOURCES_LOAD_WORKERS, thread_name_prefix="alert-resources")
+    object_cache = KubernetesObjectCache(ttl_sec=ALERT_RESOURCES_CACHE_TTL_SEC)
+    node_index = NodeAddressIndex()
+
     @classmethod
-    def __find_node_by_ip(cls, ip) -> Optional[Node]:
-        nodes: NodeList = NodeList.listNode().obj
-        for node in nodes.items:
-            addresses = [a.address for a in node.status.addresses]
-            logging.info(f"node {node.metadata.name} has addresses {addresses}")
-            if ip in addresses:
-                return node
-        return None
+    def reset_after_fork(cls):
+        """The loader threads of the parent process don't run in the child, so the child starts its own"""
+        cls.loader = ThreadPoolExecutor(max_workers=ALERT_RESOURCES_LOAD_WORKERS, thread_name_prefix="alert-resources")
+        cls.object_cache.reset_after_fork()
+        cls.node_index.reset_after_fork()
 
     @classmethod
     def __load_node(cls, alert: PrometheusAlert, node_name: str) -> Optional[Node]:
@@ -146,13 +160,35 @@ class AlertEventBuilder:
         try:
             # sometimes we get an IP:PORT instead of the node name. handle that case
             if ":" in node_name:
-                node = cls.__find_node_by_ip(node_name.split(":")[0])
+                node = cls.node_index.find_node_by_address(node_name.split(":")[0])
             else:
-                node = Node().read(name=node_name)
+                node = cls.node_index.get_node(node_name) or cls.object_cache.get(
+                    "Node", "", node_name, lambda: Node().read(name=node_name)
+                )
         except Exception as e:
             logging.info(f"Error loading Node kubernetes object {alert}. error: {e}")
         return node
 
+    @classmethod
+    def __load_resource(cls, mapping: ResourceMapping, resource_name: str, namespace: str, alert_name: str):
+        try:
+            resource = cls.object_cache.get(
+                mapping.hikaru_class.__name__,
+                namespace,
+                resource_name,
+                lambda: mapping.hikaru_class().read(name=resource_name, namespace=namespace),
+            )
+            logging.info(f"Loaded k8s {mapping.prometheus_label} {resource_name} for alert {alert_name}")
+            return resource
+        except Exception as e:
+            reason = getattr(e, "reason", "NA")
+            status = getattr(e, "status", 0)
+            logging.info(
+                f"Error loading kubernetes {mapping.attribute_name} {namespace}/{resource_name}. "
+                f"reason: {reason} status: {status}"
+            )
+            return None
+
     @staticmethod
     def _build_event_task(
         event: PrometheusTriggerEvent, sink_findings: Dict[str, List[Finding]]
@@ -168,27 +204,31 @@ class AlertEventBuilder:
 
         namespace = labels.get("namespace", "default")
 
+        loads: Dict[str, Future] = {}  # event attribute name -> loaded resource
         for mapping in MAPPINGS:
-            try:
-                resource_name = labels.get(mapping.prometheus_label, None)
-                if not resource_name or "kube-state-metrics" in resource_name:
-                    continue
-                resource = mapping.hikaru_class().read(name=resource_name, namespace=namespace)
-                setattr(execution_event, mapping.attribute_name, resource)
-                logging.info(
-                    f"Loaded k8s {mapping.prometheus_label} {resource_name} for alert {execution_event.alert_name}"
-                )
-            except Exception as e:
-                reason = getattr(e, "reason", "NA")
-                status = getattr(e, "status", 0)
-                logging.info(
-                    f"Error loading kubernetes {mapping.attribute_name} {namespace}/{resource_name}. "
-                    f"reason: {reason} status: {status}"
-                )
+            resource_name = labels.get(mapping.prometheus_label, None)
+            if not resource_name or "kube-state-metrics" in resource_name:
+                continue
+            loads[mapping.attribute_name] = AlertEventBuilder.loader.submit(
+                AlertEventBuilder.__load_resource, mapping, resource_name, namespace, execution_event.alert_name
+            )
 
         node_name = labels.get("node")
         if node_name:
-            execution_event.node = AlertEventBuilder.__load_node(execution_event.alert, node_name)
+            loads["node"] = AlertEventBuilder.loader.submit(
+                AlertEventBuilder.__load_node, execution_event.alert, node_name
+            )
+
+        done, not_done = wait(loads.values(), timeout=ALERT_RESOURCES_LOAD_TIMEOUT_SEC)
+        for attribute_name, load in loads.items():
+            if load in done and load.result() is not None:
+                setattr(execution_event, attribute_name, load.result())
+        if not_done:
+            missing = [attribute_name for attribute_name, load in loads.items() if load in not_done]
+            logging.warning(
+                f"Loading kubernetes {missing} for alert {execution_event.alert_name} did not finish within "
+                f"{ALERT_RESOURCES_LOAD_TIMEOUT_SEC} seconds"
+            )
 
         # we handle nodes differently than other resources
         node_name = labels.get("instance", None)
@@ -205,3 +245,6 @@ class AlertEventBuilder:
         event: PrometheusTriggerEvent, sink_findings: Dict[str, List[Finding]]
     ) -> Optional[ExecutionBaseEvent]:
         return AlertEventBuilder._build_event_task(event, sink_findings)
+
+
+os.register_at_fork(after_in_child=AlertEventBuilder.reset_after_fork)
@@ -1,7 +1,11 @@
 import logging
 import os
-from typing import Dict, List, Optional
+import threading
+import time
+import weakref
+from typing import Dict, List, Optional, Tuple
 
+import prometheus_client
 from cachetools import TTLCache
 from prometrix import (
     AWSPrometheusConfig,
@@ -10,11 +14,17 @@ from prometrix import (
     PrometheusConfig,
     VictoriaMetricsPrometheusConfig,
 )
+from prometrix.auth import PrometheusAuthorization
 from prometrix.connect.custom_connect import CustomPrometheusConnect
 
 from robusta.core.exceptions import NoPrometheusUrlFound
 from robusta.core.model.base_params import PrometheusParams
-from robusta.core.model.env_vars import PROMETHEUS_SSL_ENABLED, SERVICE_CACHE_TTL_SEC
+from robusta.core.model.env_vars import (
+    PROMETHEUS_CLIENT_MAX_AGE_SEC,
+    PROMETHEUS_HEALTH_CHECK_TTL_SEC,
+    PROMETHEUS_SSL_ENABLED,
+    SERVICE_CACHE_TTL_SEC,
+)
 from robusta.utils.service_discovery import find_service_url
 
 AZURE_RESOURCE = os.environ.get("AZURE_RESOURCE", "https://prometheus.monitor.azure.com")
@@ -32,6 +42,13 @@ AWS_REGION = os.environ.get("AWS_REGION")
 AWS_ASSUME_ROLE = os.environ.get("AWS_ASSUME_ROLE")
 VICTORIA_METRICS_CONFIGURED = os.environ.get("VICTORIA_METRICS_CONFIGURED", "false").lower() == "true"
 
+prometheus_client_pool_requests = prometheus_client.Counter(
+    "prometheus_client_pool_requests", "Number of prometheus client requests from the pool", ["result"]
+)
+prometheus_query_latency = prometheus_client.Summary(
+    "prometheus_query_latency", "Prometheus queries latency, in seconds", ["query_type"]
+)
+
 
 def generate_prometheus_config(prometheus_params: PrometheusParams) -> PrometheusConfig:
     is_victoria_metrics = VICTORIA_METRICS_CONFIGURED
@@ -89,12 +106,85 @@ def generate_prometheus_config(prometheus_params: PrometheusParams) -> Prometheu
 
 
 def get_prometheus_connect(prometheus_params: PrometheusParams) -> CustomPrometheusConnect:
-    # due to cli import dependency errors without prometheus package installed
-    from prometrix import get_custom_prometheus_connect
+    return PrometheusClientPool.get_client(prometheus_params)
+
+
+def check_prometheus_connection(prom: CustomPrometheusConnect, params: Optional[dict] = None):
+    PrometheusClientPool.check_connection(prom, params)
+
+
+class PrometheusClientPool:
+    """
+    Long lived prometheus clients, one per effective prometheus configuration.
+
+    Each client keeps its http session, so the keep-alive connections to prometheus are reused between queries.
+    Clients are rebuilt after PROMETHEUS_CLIENT_MAX_AGE_SEC, before the auth token (or the AWS assumed role
+    credentials) they were created with expire.
+    A successful connection check is cached for PROMETHEUS_HEALTH_CHECK_TTL_SEC, and dropped when a query fails.
+    """
+
+    clients: Dict[Tuple, Tuple[CustomPrometheusConnect, float]] = {}  # config key -> (client, creation time)
+    healthy_until: "weakref.WeakKeyDictionary[CustomPrometheusConnect, float]" = weakref.WeakKeyDictionary()
+    lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls, prometheus_params: PrometheusParams) -> CustomPrometheusConnect:
+        # due to cli import dependency errors without prometheus package installed
+        from prometrix import get_custom_prometheus_connect
+
+        config = generate_prometheus_config(prometheus_params)
+        key = cls.config_key(config)
+        with cls.lock:
+            cached = cls.clients.get(key)
+        if cached and time.time() - cached[1] < PROMETHEUS_CLIENT_MAX_AGE_SEC:
+            prometheus_client_pool_requests.labels("hit").inc()
+            return cached[0]
+
+        prometheus_client_pool_requests.labels("miss").inc()
+        if cached and PrometheusAuthorization.azure_authorization(config):
+            # refresh the token before the old one expires, instead of waiting for a 401 from prometheus
+            PrometheusAuthorization.request_new_token(config)
+
+        prom = get_custom_prometheus_connect(config)
+        with cls.lock:
+            cls.clients[key] = (prom, time.time())
+        return prom
+
+    @classmethod
+    def check_connection(cls, prom: CustomPrometheusConnect, params: Optional[dict] = None):
+        if cls.healthy_until.get(prom, 0) > time.time():
+            return
+        prom.check_prometheus_connection(params)
+        cls.healthy_until[prom] = time.time() + PROMETHEUS_HEALTH_CHECK_TTL_SEC
+
+    @classmethod
+    def mark_unhealthy(cls, prom: CustomPrometheusConnect):
+        cls.healthy_until.pop(prom, None)
+
+    @classmethod
+    def clear(cls):
+        with cls.lock:
+            cls.clients.clear()
+            cls.healthy_until.clear()
+
+    @classmethod
+    def reset_after_fork(cls):
+        """Drop the clients of the parent process. Their connections are still used by the parent"""
+        cls.lock = threading.Lock()
+        cls.clients = {}
+        cls.healthy_until = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def config_key(config: PrometheusConfig) -> Tuple:
+        # secrets are masked when the config is serialized, so the actual values are part of the key
+        fields = tuple(
+            (name, value.get_secret_value() if hasattr(value, "get_secret_value") else repr(value))
+            for name, value in sorted(config.__dict__.items())
+        )
+        return (type(config).__name__,) + fields
 
-    config = generate_prometheus_config(prometheus_params)
 
-    return get_custom_prometheus_connect(config)
+os.register_at_fork(after_in_child=PrometheusClientPool.reset_after_fork)
 
 
 def get_prometheus_flags(prom: CustomPrometheusConnect) -> Optional[Dict]:
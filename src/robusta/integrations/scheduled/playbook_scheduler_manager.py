@@ -8,3 +8,7 @@ class PlaybooksSchedulerManager(PlaybooksScheduler):
     def update(self, playbooks: List[PlaybookDefinition]):
         """Update the scheduler with the new deployed playbooks"""
         pass
+
+    def flush(self):
+        """Save the state of the scheduled jobs"""
+        pass
@@ -14,6 +14,7 @@ from robusta.core.reporting.consts import EnrichmentAnnotation
 from robusta.core.sinks.common.html_tools import HTMLBaseSender, HTMLTransformer, with_attr
 from robusta.core.sinks.servicenow.servicenow_sink_params import ServiceNowSinkParams
 from robusta.core.sinks.transformer import Transformer
+from robusta.integrations.common.requests import http_transport
 
 
 mimetypes.add_type('text/plain', 'log')
@@ -55,7 +56,7 @@ class ServiceNowSender(HTMLBaseSender):
 
         payload = self.params_to_payload(header, message, self.params.caller_id, finding.severity)
         url = f"https://{self.params.instance}.service-now.com/api/now/v1/table/incident"
-        response = requests.post(url, auth=self.auth, headers={"Content-Type": "application/json"}, json=payload)
+        response = http_transport.post(url, auth=self.auth, headers={"Content-Type": "application/json"}, json=payload)
         if response.status_code != 201:
             logging.error(
                 f"ServiceNow incident creation failure: status {response.status_code}, response body {response.text}"
@@ -78,7 +79,7 @@ class ServiceNowSender(HTMLBaseSender):
                 f"table_sys_id={incident_sys_id}"
             )
 
-            response = requests.post(
+            response = http_transport.post(
                 url, auth=self.auth, data=file_block.contents,
                 headers={"Accept": "*/*", "Content-Type": mime_type}
             )
@@ -2,8 +2,8 @@ import copy
 import logging
 import time
 import ssl
-import tempfile
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from itertools import chain
 from typing import Any, Dict, List, Optional, Set, Tuple, Union
@@ -24,6 +24,8 @@ from robusta.core.model.env_vars import (
     SLACK_REQUEST_TIMEOUT,
     SLACK_TABLE_COLUMNS_LIMIT,
     SLACK_FORWARD_URL,
+    SLACK_UPLOAD_CACHE_TTL_SEC,
+    SLACK_UPLOAD_WORKERS,
 )
 from robusta.core.reporting.base import Emojis, EnrichmentType, Finding, FindingStatus, LinkType
 from robusta.core.reporting.blocks import (
@@ -52,6 +54,7 @@ from robusta.core.sinks.sink_base import KeyT
 from robusta.core.sinks.slack.slack_sink_params import SlackSinkParams
 from robusta.core.sinks.slack.preview.slack_sink_preview_params import SlackSinkPreviewParams
 from robusta.core.sinks.transformer import Transformer
+from robusta.integrations.slack.upload_cache import SlackUploadCache
 
 ACTION_TRIGGER_PLAYBOOK = "trigger_playbook"
 ACTION_LINK = "link"
@@ -77,6 +80,9 @@ def _build_retry_handlers():
 class SlackSender:
     verified_api_tokens: Set[str] = set()
     channel_name_to_id = {}
+    # shared by all the Slack sinks, so a file sent to several sinks or channels is uploaded once
+    upload_cache = SlackUploadCache(ttl_sec=SLACK_UPLOAD_CACHE_TTL_SEC)
+    uploader = ThreadPoolExecutor(max_workers=SLACK_UPLOAD_WORKERS, thread_name_prefix="slack-upload")
 
     def __init__(self, slack_token: str, account_id: str, cluster_name: str, signing_key: str, slack_channel: str, registry, is_preview: bool = False, disable_holmes_note: bool = False):
         """
@@ -255,36 +261,28 @@ class SlackSender:
             logging.warning(f"cannot convert block of type {type(block)} to slack format block: {block}")
             return []  # no reason to crash the entire report
 
-    def _upload_temp_file(self, f, file_reference, truncated_content: bytes, filename: str) -> Optional[str]:
-        """Helper to upload a file-like or file path to Slack."""
-        f.write(truncated_content)
-        f.flush()
-        f.seek(0)
-
+    def _upload_file(self, content: bytes, filename: str) -> Optional[str]:
+        """Upload file contents from memory to Slack, and return a permalink to it."""
         result = self.slack_client.files_upload_v2(
             title=filename,
-            file_uploads=[{"file": file_reference, "filename": filename, "title": filename}],
+            file_uploads=[{"content": content, "filename": filename, "title": filename}],
         )
         return result["file"]["permalink"]
 
     def __upload_file_to_slack(self, block: FileBlock, max_log_file_limit_kb: int) -> Optional[str]:
-        """Upload a file to Slack and return a permalink to it."""
+        """Upload a file to Slack, or reuse a recent upload of the same file, and return a permalink to it."""
         truncated_content = block.truncate_content(max_file_size_bytes=max_log_file_limit_kb * 1000)
         filename = block.filename
 
         try:
-            with tempfile.NamedTemporaryFile() as f:
-                logging.debug("Trying NamedTemporaryFile for Slack upload")
-                return self._upload_temp_file(f, f.name, truncated_content, filename)
-        except Exception as e:
-            logging.debug(f"NamedTemporaryFile failed: {e}")
-        try:
-            SPOOLED_FILE_SIZE = 10 * 1000 * 1000  # 10MB to protect against OOM
-            with tempfile.SpooledTemporaryFile(max_size=SPOOLED_FILE_SIZE) as f:
-                logging.debug("Trying SpooledTemporaryFile for Slack upload")
-                return self._upload_temp_file(f, f, truncated_content, filename)
-        except Exception as e2:
-            logging.exception(f"SpooledTemporaryFile also failed: {e2}")
+            return self.upload_cache.get_permalink(
+                self.slack_client.token,
+                truncated_content,
+                filename,
+                lambda: self._upload_file(truncated_content, filename),
+            )
+        except Exception:
+            logging.exception(f"Failed to upload file {filename} to Slack")
             return None
 
     def prepare_slack_text(self, message: str, max_log_file_limit_kb: int, files: List[FileBlock] = []):
@@ -297,11 +295,14 @@ class SlackSender:
             # the file wasn't actually shared and the link was broken
             uploaded_files = []
 
-            for file_block in files:
-                # slack throws an error if you write empty files, so skip it
-                if len(file_block.contents) == 0:
-                    continue
-                permalink = self.__upload_file_to_slack(file_block, max_log_file_limit_kb=max_log_file_limit_kb)
+            # slack throws an error if you write empty files, so skip it
+            files = [file_block for file_block in files if len(file_block.contents) > 0]
+            permalinks = list(
+                self.uploader.map(
+                    lambda file_block: self.__upload_file_to_slack(file_block, max_log_file_limit_kb), files
+                )
+            )
+            for file_block, permalink in zip(files, permalinks):
                 if permalink:
                     uploaded_files.append(f"* <{permalink} | {file_block.filename}>")
                 else:
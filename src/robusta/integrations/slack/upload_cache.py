@@ -0,0 +1,69 @@
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Callable, Tuple
+
+import prometheus_client
+from cachetools import TTLCache
+
+slack_upload_bytes = prometheus_client.Counter(
+    "slack_file_upload_bytes", "Bytes of files sent to Slack, and bytes not sent by reusing an upload", ["result"]
+)
+
+
+class SlackUploadCache:
+    """
+    Permalinks of files uploaded to Slack, by (workspace token, content hash, filename).
+
+    When a finding is sent to several Slack sinks or channels, each file is uploaded once and its permalink is reused
+    for ttl_sec. Permalinks are only valid in the workspace they were uploaded to, so the token is part of the key.
+    Concurrent uploads of the same file wait for a single upload. Failed uploads are not cached.
+    """
+
+    def __init__(self, ttl_sec: float, max_size: int = 1000):
+        self.ttl_sec = ttl_sec
+        self.__permalinks: TTLCache = TTLCache(maxsize=max_size, ttl=ttl_sec) if ttl_sec > 0 else None
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str, content: bytes, filename: str) -> Tuple[str, str, str]:
+        token_hash = hashlib.sha256(str(token).encode()).hexdigest()
+        return token_hash, hashlib.sha256(content).hexdigest(), filename
+
+    def get_permalink(self, token: str, content: bytes, filename: str, upload: Callable[[], str]) -> str:
+        if self.__permalinks is None:
+            permalink = upload()
+            slack_upload_bytes.labels("uploaded").inc(len(content))
+            return permalink
+
+        key = self.key(token, content, filename)
+        with self.__lock:
+            future = self.__permalinks.get(key)
+            is_uploader = future is None
+            if is_uploader:
+                future = self.__permalinks[key] = Future()
+
+        if not is_uploader:
+            permalink = future.result()
+            slack_upload_bytes.labels("reused").inc(len(content))
+            return permalink
+
+        try:
+            permalink = upload()
+            if not permalink:
+                raise Exception(f"No permalink returned for {filename}")
+        except Exception as e:
+            with self.__lock:
+                if self.__permalinks.get(key) is future:
+                    del self.__permalinks[key]
+            future.set_exception(e)
+            raise
+
+        future.set_result(permalink)
+        slack_upload_bytes.labels("uploaded").inc(len(content))
+        return permalink
+
+    def clear(self):
+        if self.__permalinks is not None:
+            with self.__lock:
+                self.__permalinks.clear()
@@ -6,6 +6,7 @@ from robusta.core.model.env_vars import PROMETHEUS_ENABLED, RUNNER_VERSION
 from robusta.core.playbooks.actions_registry import ActionsRegistry
 from robusta.core.playbooks.base_trigger import TriggerEvent
 from robusta.core.playbooks.playbook_utils import merge_global_params
+from robusta.core.playbooks.playbooks_index import PlaybooksIndex
 from robusta.core.pubsub.event_emitter import EventEmitter
 from robusta.core.pubsub.event_subscriber import EventHandler
 from robusta.core.pubsub.events_pubsub import EventsPubSub
@@ -106,6 +107,9 @@ class PlaybooksRegistry:
     def get_playbooks(self, trigger_event: TriggerEvent) -> List[PlaybookDefinition]:
         return []
 
+    def get_candidate_playbooks(self, trigger_event: TriggerEvent) -> List[PlaybookDefinition]:
+        return self.get_playbooks(trigger_event)
+
     def get_default_sinks(self):
         return []
 
@@ -139,6 +143,11 @@ class PlaybooksRegistryImpl(PlaybooksRegistry):
                 action.set_func_hash(get_function_hash(action_def.func))
                 if action_def.params_type:  # action has params
                     action.action_params = merge_global_params(global_config, action.action_params)
+                    # validate the params once here, instead of on the first event
+                    try:
+                        action.get_params(global_config, action_def.params_type)
+                    except Exception as e:
+                        logging.warning(f"Invalid params for action {action.action_name}: {e}")
                     if getattr(action_def.params_type, "pre_deploy_func", None):
                         for trigger in playbook_def.triggers:
                             action_params = action_def.params_type(**action.action_params)
@@ -161,9 +170,20 @@ class PlaybooksRegistryImpl(PlaybooksRegistry):
             for event in playbooks_trigger_events:
                 self.triggers_to_playbooks[event].append(playbook_def)
 
+        self.triggers_to_index = {
+            event: PlaybooksIndex(playbooks) for event, playbooks in self.triggers_to_playbooks.items()
+        }
+
     def get_playbooks(self, trigger_event: TriggerEvent) -> List[PlaybookDefinition]:
         return self.triggers_to_playbooks.get(trigger_event.get_event_name(), [])
 
+    def get_candidate_playbooks(self, trigger_event: TriggerEvent) -> List[PlaybookDefinition]:
+        """Return only the playbooks that might fire on this event, in the registration order"""
+        playbooks_index = self.triggers_to_index.get(trigger_event.get_event_name())
+        if not playbooks_index:
+            return []
+        return playbooks_index.get_candidates(trigger_event)
+
     def get_default_sinks(self) -> List[str]:
         return self.default_sinks
 
@@ -211,6 +231,16 @@ class Registry:
     def get_sinks(self) -> SinksRegistry:
         return self._sinks
 
+    def set_runtime_config(self, actions: ActionsRegistry, playbooks: PlaybooksRegistry, sinks: SinksRegistry):
+        """
+        Swap in a reloaded configuration. Events look up the playbooks first, and the actions and sinks when running
+        them, so the playbooks are set last: new playbooks never run with the previous actions or sinks.
+        Events that are already running keep the playbooks they started with.
+        """
+        self._sinks = sinks
+        self._actions = actions
+        self._playbooks = playbooks
+
     def set_scheduler(self, scheduler: PlaybooksSchedulerManager):
         self._scheduler = scheduler
 
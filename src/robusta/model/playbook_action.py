@@ -1,14 +1,24 @@
-from typing import Optional
+import time
+from typing import NamedTuple, Optional, Type
 
 from pydantic import BaseModel, PrivateAttr, validator
 
-from robusta.core.playbooks.playbook_utils import replace_env_vars_values
+from robusta.core.model.env_vars import ACTION_PARAMS_CACHE_TTL_SEC
+from robusta.core.playbooks.playbook_utils import merge_global_params, replace_env_vars_values
+
+
+class CachedActionParams(NamedTuple):
+    global_config: dict
+    params_type: Type[BaseModel]
+    params: BaseModel
+    created_at: float
 
 
 class PlaybookAction(BaseModel):
     action_name: str
     action_params: Optional[dict]
     _func_hash: str = PrivateAttr()
+    _cached_params: Optional[CachedActionParams] = PrivateAttr(default=None)
 
     def set_func_hash(self, func_hash):
         self._func_hash = func_hash
@@ -16,6 +26,28 @@ class PlaybookAction(BaseModel):
     def as_str(self):
         return self._func_hash + self.json()
 
+    def get_params(self, global_config: dict, params_type: Type[BaseModel]) -> BaseModel:
+        """
+        Return the params of this action, merged with the global config and validated.
+
+        The validated params are cached for ACTION_PARAMS_CACHE_TTL_SEC, as long as the global config and params type
+        are the same objects (both are replaced on reload). Each call returns a deep copy, so an action can change
+        its params, including their lists and dicts, without changing the params of the next events.
+        """
+        cached = self._cached_params
+        if (
+            cached is None
+            or cached.global_config is not global_config
+            or cached.params_type is not params_type
+            or time.monotonic() - cached.created_at >= ACTION_PARAMS_CACHE_TTL_SEC
+        ):
+            params = params_type(**merge_global_params(global_config, self.action_params or {}))
+            params.post_initialization()
+            cached = CachedActionParams(global_config, params_type, params, time.monotonic())
+            if ACTION_PARAMS_CACHE_TTL_SEC > 0:
+                self._cached_params = cached
+        return cached.params.copy(deep=True)
+
     @validator("action_params")
     def env_var_params(cls, action_params: Optional[dict]):
         if action_params:
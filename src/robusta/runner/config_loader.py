@@ -41,6 +41,7 @@ from robusta.integrations.scheduled.playbook_scheduler_manager_impl import Playb
 from robusta.integrations.scheduled.trigger import ScheduledTriggerEvent
 from robusta.model.config import PlaybooksRegistry, PlaybooksRegistryImpl, Registry, SinksRegistry
 from robusta.model.playbook_definition import PlaybookDefinition
+from robusta.runner.playbook_packages_tracker import PlaybookPackagesTracker, ReloadTimer, hash_directory
 from robusta.utils.archive import safe_extract_tar
 from robusta.utils.cluster_provider_discovery import cluster_provider
 from robusta.utils.file_system_watcher import FileSystemWatcher
@@ -66,6 +67,7 @@ class ConfigLoader:
         self.event_handler = event_handler
         self.root_playbook_path = PLAYBOOKS_ROOT
         self.reload_lock = threading.RLock()
+        self.packages_tracker = PlaybookPackagesTracker()
         self.watcher = FileSystemWatcher(self.root_playbook_path, self.reload)
         self.conf_watcher = FileSystemWatcher(self.config_file_path, self.reload)
         self.reload("initialization")
@@ -83,6 +85,8 @@ class ConfigLoader:
         if not scheduler:  # no scheduler yet, initialization
             scheduler = PlaybooksSchedulerManagerImpl(event_handler=self.event_handler)
             self.registry.set_scheduler(scheduler)
+        else:
+            scheduler.flush()  # save the jobs state before unscheduling the removed playbooks
 
         scheduler.update(playbooks_registry.get_playbooks(ScheduledTriggerEvent()))
 
@@ -142,19 +146,21 @@ class ConfigLoader:
                             logging.warning(f"Downloading a playbook package from non-https source f{url}")
 
                         playbook_package = self.install_package_remote_tgz(
-                            url=url, headers=playbooks_repo.http_headers, build_isolation=playbooks_repo.build_isolation
+                            url=url,
+                            headers=playbooks_repo.http_headers,
+                            build_isolation=playbooks_repo.build_isolation,
+                            tracker=self.packages_tracker,
                         )
                     elif url.startswith((GIT_SSH_PREFIX, GIT_HTTPS_PREFIX)):
                         repo = GitRepo(url, playbooks_repo.key.get_secret_value(), playbooks_repo.branch)
-                        pkg_path = repo.repo_local_path
-                        self.install_package(
-                            pkg_path=repo.repo_local_path, build_isolation=playbooks_repo.build_isolation
+                        playbook_package = self.__install_local_package(
+                            url, repo.repo_local_path, playbooks_repo.build_isolation
                         )
-                        playbook_package = self.__get_package_name(local_path=pkg_path)
                     elif url.startswith(LOCAL_PATH_URL_PREFIX):
                         pkg_path = url.replace(LOCAL_PATH_URL_PREFIX, "")
-                        self.install_package(pkg_path=pkg_path, build_isolation=playbooks_repo.build_isolation)
-                        playbook_package = self.__get_package_name(local_path=pkg_path)
+                        playbook_package = self.__install_local_package(
+                            url, pkg_path, playbooks_repo.build_isolation
+                        )
                     else:
                         raise Exception(
                             f"Illegal playbook repo url {url}. "
@@ -168,6 +174,20 @@ class ConfigLoader:
         for package_name in playbook_packages:
             self.__import_playbooks_package(actions_registry, package_name)
 
+    def __install_local_package(self, url: str, pkg_path: str, build_isolation: bool) -> str:
+        """pip install a package from a local path, unless it was installed from the same source before"""
+        source_hash = None
+        if os.path.exists(pkg_path):
+            source_hash = f"{hash_directory(pkg_path)}-{build_isolation}"
+            installed_package = self.packages_tracker.get_installed_package(url, source_hash)
+            if installed_package:
+                return installed_package
+
+        self.install_package(pkg_path=pkg_path, build_isolation=build_isolation)
+        package_name = self.__get_package_name(local_path=pkg_path)
+        self.packages_tracker.set_installed(url, source_hash, package_name)
+        return package_name
+
     @classmethod
     def install_package(cls, pkg_path: str, build_isolation: bool) -> str:
         logging.debug(f"Installing package {pkg_path}")
@@ -182,34 +202,52 @@ class ConfigLoader:
 
         subprocess.check_call([sys.executable, "-m", "pip", "install"] + extra_pip_args + [pkg_path])
 
-    @classmethod
-    def __import_playbooks_package(cls, actions_registry: ActionsRegistry, package_name: str):
-        logging.info(f"Importing actions package {package_name}")
+    def __import_playbooks_package(self, actions_registry: ActionsRegistry, package_name: str):
         # Clear stale FileFinder caches so walk_packages discovers new .py files
         importlib.invalidate_caches()
-        # Reload is required for modules that are already loaded
-        pkg = importlib.reload(importlib.import_module(package_name))
+        already_imported = package_name in sys.modules
+        pkg = importlib.import_module(package_name)
+        modules_hash = "-".join(hash_directory(path, suffixes=(".py",)) for path in pkg.__path__)
+        reimport = not self.packages_tracker.is_imported(package_name, modules_hash)
+        if reimport:
+            logging.info(f"Importing actions package {package_name}")
+            if already_imported:  # Reload is required for modules that are already loaded
+                pkg = importlib.reload(pkg)
+        else:
+            logging.info(f"Actions package {package_name} not changed, reusing its modules")
+
+        failed = False
         playbooks_modules = [name for _, name, _ in pkgutil.walk_packages(path=pkg.__path__)]
         for playbooks_module in playbooks_modules:
             try:
                 module_name = ".".join([package_name, playbooks_module])
-                logging.info(f"importing actions from {module_name}")
-                # Reload is required for modules that are already loaded
-                m = importlib.reload(importlib.import_module(module_name))
+                already_imported = module_name in sys.modules
+                m = importlib.import_module(module_name)
+                if reimport:
+                    logging.info(f"importing actions from {module_name}")
+                    if already_imported:
+                        m = importlib.reload(m)
+                # actions of unchanged packages are added again, so later packages still override them in order
                 playbook_actions = getmembers(m, Action.is_action)
                 for action_name, action_func in playbook_actions:
                     actions_registry.add_action(action_func)
             except Exception:
+                failed = True
                 logging.error(f"failed to module {playbooks_module}", exc_info=True)
 
+        if reimport and not failed:
+            self.packages_tracker.set_imported(package_name, modules_hash)
+
     def __reload_playbook_packages(self, change_name):
         logging.info(f"Reloading playbook packages due to change on {change_name}")
+        timer = ReloadTimer()
         with self.reload_lock:
             try:
-                runner_config = self.__load_runner_config(self.config_file_path)
-                if runner_config is None:
-                    return
-                cluster_provider.init_provider_discovery()
+                with timer.phase("config"):
+                    runner_config = self.__load_runner_config(self.config_file_path)
+                    if runner_config is None:
+                        return
+                    cluster_provider.init_provider_discovery()
                 self.registry.set_global_config(runner_config.global_config)
                 self.registry.set_relabel_config(runner_config.alert_relabel)
                 update_severity_map(runner_config.global_config)
@@ -246,7 +284,8 @@ class ConfigLoader:
                 else:
                     logging.info(f"No custom playbooks defined at {CUSTOM_PLAYBOOKS_ROOT}")
 
-                self.__load_playbooks_repos(action_registry, runner_config.playbook_repos)
+                with timer.phase("packages"):
+                    self.__load_playbooks_repos(action_registry, runner_config.playbook_repos)
 
                 # This needs to be set before the robusta sink is created since a cluster status is sent on creation
                 self.registry.set_light_actions(runner_config.light_actions if runner_config.light_actions else [])
@@ -256,15 +295,16 @@ class ConfigLoader:
                     self.registry.get_sinks(),
                     action_registry,
                     self.registry,
+                    timer,
                 )
                 # clear git repos, so it would be re-initialized
                 GitRepoManager.clear_git_repos()
 
-                self.__reload_scheduler(playbooks_registry)
-                self.registry.set_actions(action_registry)
-                self.registry.set_playbooks(playbooks_registry)
-                self.registry.set_sinks(sinks_registry)
-                self.__reload_receiver()
+                with timer.phase("swap"):
+                    self.__reload_scheduler(playbooks_registry)
+                    self.registry.set_runtime_config(action_registry, playbooks_registry, sinks_registry)
+                    self.__reload_receiver()
+                logging.info(f"Reloaded playbooks ({timer})")
 
                 telemetry = self.registry.get_telemetry()
                 telemetry.playbooks_count = len(runner_config.active_playbooks) if runner_config.active_playbooks else 0
@@ -293,14 +333,16 @@ class ConfigLoader:
         sinks_registry: SinksRegistry,
         actions_registry: ActionsRegistry,
         registry: Registry,
+        timer: ReloadTimer,
     ) -> tuple[SinksRegistry, PlaybooksRegistry]:
         existing_sinks = sinks_registry.get_all() if sinks_registry else {}
-        new_sinks, has_sink_errors = SinksRegistry.construct_new_sinks(
-            runner_config.sinks_config, 
-            existing_sinks, 
-            registry,
-            runner_config.global_config.get("continue_on_sink_errors", False)
-        )
+        with timer.phase("sinks"):
+            new_sinks, has_sink_errors = SinksRegistry.construct_new_sinks(
+                runner_config.sinks_config,
+                existing_sinks,
+                registry,
+                runner_config.global_config.get("continue_on_sink_errors", False)
+            )
         sinks_registry = SinksRegistry(new_sinks)
         registry.set_sink_initialization_errors(has_sink_errors)
 
@@ -324,12 +366,13 @@ class ConfigLoader:
         else:
             logging.warning("No active playbooks configured")
 
-        playbooks_registry = PlaybooksRegistryImpl(
-            active_playbooks,
-            actions_registry,
-            runner_config.global_config,
-            sinks_registry.default_sinks,
-        )
+        with timer.phase("registry"):
+            playbooks_registry = PlaybooksRegistryImpl(
+                active_playbooks,
+                actions_registry,
+                runner_config.global_config,
+                sinks_registry.default_sinks,
+            )
 
         return sinks_registry, playbooks_registry
 
@@ -345,14 +388,23 @@ class ConfigLoader:
             return RunnerConfig(**yaml_content)
 
     @classmethod
-    def install_package_remote_tgz(cls, url: str, headers, build_isolation: bool) -> Optional[str]:
+    def install_package_remote_tgz(
+        cls, url: str, headers, build_isolation: bool, tracker: Optional[PlaybookPackagesTracker] = None
+    ) -> Optional[str]:
         with tempfile.NamedTemporaryFile(suffix=".tgz") as f:
             r = requests.get(url, stream=True, headers=headers)
             r.raise_for_status()
+            digest = hashlib.sha256()
             for chunk in r.iter_content(chunk_size=65536):
                 f.write(chunk)
+                digest.update(chunk)
 
             f.flush()
+            source_hash = f"{digest.hexdigest()}-{build_isolation}"
+            if tracker:
+                installed_package = tracker.get_installed_package(url, source_hash)
+                if installed_package:
+                    return installed_package
 
             with tarfile.open(f.name, "r:gz") as tar, tempfile.TemporaryDirectory() as temp_dir:
                 safe_extract_tar(tar, temp_dir)
@@ -363,4 +415,7 @@ class ConfigLoader:
                     pkg_path = os.path.join(temp_dir, extracted_items[0])
 
                 cls.install_package(pkg_path=pkg_path, build_isolation=build_isolation)
-                return cls.__get_package_name(local_path=pkg_path)
+                package_name = cls.__get_package_name(local_path=pkg_path)
+                if tracker:
+                    tracker.set_installed(url, source_hash, package_name)
+                return package_name
@@ -0,0 +1,367 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import signal
+import threading
+import time
+import zlib
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import prometheus_client
+from prometheus_client.metrics import MetricWrapperBase
+from prometheus_client.values import MutexValue
+
+from robusta.core.model.env_vars import (
+    EVENT_WORKER_PROCESSES,
+    EVENT_WORKER_STOP_TIMEOUT_SEC,
+    EVENT_WORKER_THREADS,
+    INCOMING_EVENTS_QUEUE_MAX_SIZE,
+    NUM_EVENT_THREADS,
+)
+from robusta.core.playbooks.base_trigger import TriggerEvent
+from robusta.core.playbooks.playbooks_event_handler_impl import PlaybooksEventHandlerImpl
+from robusta.core.pubsub.event_subscriber import EventHandler
+from robusta.core.reporting.base import Finding
+from robusta.integrations.kubernetes.custom_models import debugger_pod_pool
+from robusta.model.config import SinksRegistry
+from robusta.utils.task_queue import QueueMetrics, TaskQueue
+
+event_worker_restarts = prometheus_client.Counter(
+    "event_worker_restarts", "Restarts of the event worker processes", ["reason"]
+)
+
+# workers are forked, so they start with the loaded playbooks, actions and sinks of the runner process
+fork_context = multiprocessing.get_context("fork")
+
+# methods of the runner process objects, called by actions in the workers
+SCHEDULER_FORWARDED_METHODS = {"schedule_action"}
+SINK_FORWARDED_METHODS = {"handle_service_diff"}
+
+Target = Tuple[str, Optional[str]]  # ("scheduler", None) or ("sink", sink name)
+
+
+def reset_metric_locks(registry: prometheus_client.CollectorRegistry = prometheus_client.REGISTRY):
+    """
+    Replace the locks of the prometheus metrics in a forked worker. Runner threads may have held them when it forked.
+    The modules with their own locks, connections and threads reset them with os.register_at_fork too.
+    """
+    lock_type = type(threading.Lock())
+
+    def new_locks(obj: Any):
+        for name, value in list(getattr(obj, "__dict__", {}).items()):
+            if isinstance(value, lock_type):
+                setattr(obj, name, threading.Lock())
+            for metric_value in value if isinstance(value, list) else [value]:  # histogram buckets
+                if isinstance(metric_value, MutexValue):
+                    metric_value._lock = threading.Lock()
+
+    registry._lock = threading.Lock()
+    for collector in list(registry._collector_to_names):
+        new_locks(collector)
+        if isinstance(collector, MetricWrapperBase) and collector._is_parent():
+            for child in list(collector._metrics.values()):
+                new_locks(child)
+
+
+os.register_at_fork(after_in_child=reset_metric_locks)
+
+
+def key_hash(key: str) -> int:
+    # hash() of strings is randomized per process
+    return zlib.crc32(key.encode("utf-8"))
+
+
+class RunnerObjectProxy:
+    """
+    An object of the runner process, used by a worker process. The forwarded methods are called in the runner process,
+    without waiting for their result. Other attributes are read from the worker copy of the object.
+    """
+
+    def __init__(self, target: Target, obj: Any, forwarded_methods: Set[str], send: Callable[..., None]):
+        self.__target = target
+        self.__obj = obj
+        self.__forwarded_methods = forwarded_methods
+        self.__send = send
+
+    def __getattr__(self, name: str) -> Any:
+        if name in self.__forwarded_methods:
+            return lambda *args, **kwargs: self.__send("call", self.__target, name, args, kwargs)
+        return getattr(self.__obj, name)
+
+
+class EventWorker:
+    """
+    Runs in an event worker process, and handles the events of its queue with its copy of the runner registry.
+
+    Events with the same key are handled in order, by the same thread. Findings are sent to the runner process, which
+    delivers them to the sinks.
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        threads: int,
+        events: multiprocessing.Queue,
+        connection: Connection,
+        event_handler: PlaybooksEventHandlerImpl,
+    ):
+        self.processes = processes
+        self.threads = threads
+        self.events = events
+        self.connection = connection
+        self.event_handler = event_handler
+        self.__send_lock = threading.Lock()
+        self.__round_robin = itertools.count()
+        self.__handled = threading.local()  # the key of the event handled by the thread
+
+    def run(self):
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # the runner process stops the workers
+        # the debugger pods are pooled by the runner process only, so the pool stays within its cluster wide cap, and
+        # the pods of replaced workers aren't left behind. A stopped pool runs each command in a one-off pod
+        debugger_pod_pool.stop()
+        self.__forward_runner_state()
+
+        thread_queues = [queue.Queue() for _ in range(self.threads)]
+        threads = [threading.Thread(target=self.__handle_events, args=(events,)) for events in thread_queues]
+        for thread in threads:
+            thread.start()
+
+        while True:
+            item = self.events.get()
+            if item is None:
+                break
+            key, trigger_event = item
+            index = (key_hash(key) // self.processes if key is not None else next(self.__round_robin)) % self.threads
+            thread_queues[index].put((key, trigger_event))
+
+        for events in thread_queues:
+            events.put(None)
+        for thread in threads:
+            thread.join()
+        debugger_pod_pool.stop()
+        self.connection.close()
+
+    def __handle_events(self, events: queue.Queue):
+        while True:
+            item: Optional[Tuple[Optional[str], TriggerEvent]] = events.get()
+            if item is None:
+                return
+
+            self.__handled.key, trigger_event = item
+            start_time = time.time()
+            try:
+                self.event_handler.handle_trigger(trigger_event)
+            except Exception:
+                logging.error("Event worker error", exc_info=True)
+            self.__send("processed", time.time() - start_time)
+
+    def __send(self, message_type: str, *args):
+        # findings and calls are sent with the key of the event, so the runner process handles them in order too
+        try:
+            data = pickle.dumps((message_type, getattr(self.__handled, "key", None), *args))
+            with self.__send_lock:
+                self.connection.send_bytes(data)
+        except Exception:
+            logging.error(f"Failed to send {message_type} to the runner process", exc_info=True)
+
+    def __forward_runner_state(self):
+        registry = self.event_handler.registry
+        scheduler = registry.get_scheduler()
+        if scheduler:
+            registry.set_scheduler(
+                RunnerObjectProxy(("scheduler", None), scheduler, SCHEDULER_FORWARDED_METHODS, self.__send)
+            )
+
+        sinks = registry.get_sinks()
+        if sinks:
+            proxies = {
+                sink_name: RunnerObjectProxy(("sink", sink_name), sink, SINK_FORWARDED_METHODS, self.__send)
+                for sink_name, sink in sinks.get_all().items()
+            }
+            registry.set_sinks(SinksRegistry(proxies))
+
+        self.event_handler.findings_forwarder = lambda sink_findings: self.__send("findings", sink_findings)
+
+
+class WorkerProcess(NamedTuple):
+    name: str
+    process: multiprocessing.Process
+    events: multiprocessing.Queue
+    connection: Connection
+
+
+class EventWorkerPool(EventHandler):
+    """
+    Runs the playbooks of events in worker processes, so CPU bound actions aren't limited by a single interpreter.
+
+    Events are routed to a worker by their key, like the alert fingerprint or the kubernetes object uid, so the events
+    of an object are handled in order. Events without a key are spread over the workers.
+
+    The workers are forked from the runner process after the config is loaded, and are replaced when it's reloaded.
+    The runner process delivers the findings of the workers to the sinks, so the sink state (like grouping) is kept
+    in one place. It also runs the scheduler calls of the workers, and the sink service updates.
+    """
+
+    def __init__(
+        self,
+        event_handler: PlaybooksEventHandlerImpl,
+        metrics: QueueMetrics,
+        processes: int = EVENT_WORKER_PROCESSES,
+        threads: int = EVENT_WORKER_THREADS,
+    ):
+        self.event_handler = event_handler
+        self.metrics = metrics
+        self.processes = processes
+        self.threads = threads
+        # findings are delivered by a thread chosen by the event key, so the findings of an object stay in order
+        self.results_queues = [
+            TaskQueue(name=f"event_worker_results_{index}", num_workers=1, metrics=metrics)
+            for index in range(NUM_EVENT_THREADS)
+        ]
+        self.__lock = threading.Lock()
+        self.__connections: Dict[Connection, WorkerProcess] = {}  # including the workers stopped by a reload
+        self.__round_robin = itertools.count()
+        self.__stopping = False
+        with self.__lock:
+            self.__workers: List[WorkerProcess] = [self.__start_worker(index) for index in range(processes)]
+        self.__reader = threading.Thread(target=self.__read_messages, name="event-worker-reader", daemon=True)
+        self.__reader.start()
+        event_handler.registry.subscribe("config_reload", self)
+        logging.info(f"Started {processes} event worker processes, {threads} threads each")
+
+    def add_event(self, trigger_event: TriggerEvent):
+        key = trigger_event.get_event_key()
+        with self.__lock:
+            stopping = self.__stopping
+            workers = self.__workers
+        index = (key_hash(key) if key is not None else next(self.__round_robin)) % len(workers)
+        worker = workers[index]
+        if stopping:
+            self.metrics.on_rejected(worker.name)
+            return
+        try:
+            worker.events.put((key, trigger_event), block=False)
+            self.metrics.on_queued(worker.name)
+        except queue.Full:
+            self.metrics.on_rejected(worker.name)
+
+    def handle_event(self, event_name: str, **kwargs):
+        self.restart()
+
+    def restart(self):
+        """Start workers with the current config. The previous workers exit after handling their queued events"""
+        with self.__lock:
+            if self.__stopping:
+                return
+            previous = self.__workers
+            self.__workers = [self.__start_worker(index) for index in range(self.processes)]
+        for worker in previous:
+            worker.events.put(None)
+        event_worker_restarts.labels("config_reload").inc(len(previous))
+
+    def stop(self, timeout: float = EVENT_WORKER_STOP_TIMEOUT_SEC):
+        """Stop the workers after they handle their queued events, and wait for their findings to be delivered"""
+        deadline = time.time() + timeout
+        with self.__lock:
+            self.__stopping = True
+            workers = list(self.__connections.values())
+        for worker in workers:
+            try:
+                worker.events.put(None, timeout=max(deadline - time.time(), 0))
+            except queue.Full:
+                pass
+        for worker in workers:
+            worker.process.join(max(deadline - time.time(), 0))
+            if worker.process.is_alive():
+                logging.warning(f"Event worker {worker.name} didn't stop in {timeout} seconds, killing it")
+                worker.process.kill()
+
+        self.__reader.join(max(deadline - time.time(), 0))
+        while any(results.unfinished_tasks for results in self.results_queues) and time.time() < deadline:
+            time.sleep(0.1)
+
+    def __start_worker(self, index: int) -> WorkerProcess:
+        name = f"event_worker_{index}"
+        events = fork_context.Queue(maxsize=INCOMING_EVENTS_QUEUE_MAX_SIZE)
+        receiver, sender = fork_context.Pipe(duplex=False)
+        worker = EventWorker(self.processes, self.threads, events, sender, self.event_handler)
+        process = fork_context.Process(target=worker.run, name=name, daemon=True)
+        process.start()
+        sender.close()  # only the worker writes to the pipe
+        self.metrics.size_callback(name, events.qsize)
+        worker_process = WorkerProcess(name, process, events, receiver)
+        self.__connections[receiver] = worker_process
+        return worker_process
+
+    def __read_messages(self):
+        while True:
+            with self.__lock:
+                if self.__stopping and not self.__connections:
+                    return
+                connections = list(self.__connections)
+
+            for connection in wait(connections, timeout=1):
+                worker = self.__connections[connection]
+                try:
+                    message = connection.recv()
+                except EOFError:
+                    self.__on_exit(worker)
+                    continue
+                except Exception:
+                    logging.error(f"Failed to read a message of event worker {worker.name}", exc_info=True)
+                    continue
+                self.__on_message(worker, message)
+
+    def __on_message(self, worker: WorkerProcess, message: tuple):
+        message_type, key, *args = message
+        if message_type == "processed":
+            self.metrics.on_processed(worker.name, *args)
+            return
+
+        index = (key_hash(key) if key is not None else next(self.__round_robin)) % len(self.results_queues)
+        if message_type == "findings":
+            self.results_queues[index].add_task(self.__deliver_findings, *args)
+        elif message_type == "call":
+            self.results_queues[index].add_task(self.__call, *args)
+
+    def __on_exit(self, worker: WorkerProcess):
+        with self.__lock:
+            del self.__connections[worker.connection]
+            current = not self.__stopping and worker in self.__workers
+        worker.connection.close()
+        worker.process.join(5)
+        if not current:  # stopped
+            return
+
+        logging.error(
+            f"Event worker {worker.name} exited unexpectedly, exit code {worker.process.exitcode}. "
+            f"Restarting it, its queued events are lost"
+        )
+        event_worker_restarts.labels("exited").inc()
+        with self.__lock:
+            if self.__stopping or worker not in self.__workers:
+                return
+            index = self.__workers.index(worker)
+            self.__workers[index] = self.__start_worker(index)
+
+    def __deliver_findings(self, sink_findings: Dict[str, List[Finding]]):
+        for findings in sink_findings.values():
+            for finding in findings:
+                if not finding.service_key:  # the service cache of the worker is a copy from when it started
+                    finding.resolve_service()
+        self.event_handler.deliver_findings(sink_findings)
+
+    def __call(self, target: Target, method: str, args: tuple, kwargs: dict):
+        target_type, sink_name = target
+        registry = self.event_handler.registry
+        obj = (
+            registry.get_scheduler() if target_type == "scheduler" else registry.get_sinks().get_sink_by_name(sink_name)
+        )
+        if obj is None:
+            logging.error(f"Cannot call {method} of an event worker, {sink_name or target_type} not found")
+            return
+        getattr(obj, method)(*args, **kwargs)
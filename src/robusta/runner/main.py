@@ -48,7 +48,11 @@ def main():
 
     Web.init(event_handler, loader)
 
-    signal.signal(signal.SIGINT, event_handler.handle_sigint)
+    def handle_sigint(sig, frame):
+        Web.stop()  # the event workers finish their queued events, and their findings are delivered
+        event_handler.handle_sigint(sig, frame)
+
+    signal.signal(signal.SIGINT, handle_sigint)
     event_handler.set_cluster_active(True)
     Web.run()  # blocking
     loader.close()
@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+import prometheus_client
+
+reload_phase_time = prometheus_client.Summary(
+    "playbooks_reload_phase_time", "Time of each phase of a playbooks reload (seconds)", ["phase"]
+)
+
+SKIPPED_DIRECTORIES = {".git", "__pycache__"}
+
+
+def hash_files(paths: Iterable[Tuple[str, str]]) -> str:
+    """Hash of (name, path) files, by name and content"""
+    digest = hashlib.sha256()
+    for name, path in sorted(paths):
+        digest.update(name.encode())
+        digest.update(b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def hash_directory(path: str, suffixes: Optional[Tuple[str, ...]] = None) -> str:
+    """Hash of the files in a directory tree, with one of the suffixes if given. Compiled files are skipped"""
+    files = []
+    for root, dirs, filenames in os.walk(path):
+        dirs[:] = [d for d in dirs if d not in SKIPPED_DIRECTORIES]
+        for filename in filenames:
+            if filename.endswith(".pyc") or (suffixes and not filename.endswith(suffixes)):
+                continue
+            file_path = os.path.join(root, filename)
+            files.append((os.path.relpath(file_path, path), file_path))
+    return hash_files(files)
+
+
+class PlaybookPackagesTracker:
+    """
+    Content hashes of the installed playbook repos and of the imported playbook packages.
+
+    On reload, repos with the same source are not pip installed again, and packages whose modules didn't change are
+    not re-imported. A package is re-imported as a whole when any of its modules changed, since its modules can import
+    each other.
+    """
+
+    def __init__(self):
+        self.__installed: Dict[str, Tuple[str, str]] = {}  # repo url -> (source hash, package name)
+        self.__imported: Dict[str, str] = {}  # package name -> hash of its modules
+        self.__lock = threading.Lock()
+
+    def get_installed_package(self, url: str, source_hash: str) -> Optional[str]:
+        with self.__lock:
+            installed = self.__installed.get(url)
+        if installed and installed[0] == source_hash:
+            logging.info(f"Playbooks repo {url} not changed, skipping install")
+            return installed[1]
+        return None
+
+    def set_installed(self, url: str, source_hash: str, package_name: str):
+        with self.__lock:
+            self.__installed[url] = (source_hash, package_name)
+
+    def is_imported(self, package_name: str, modules_hash: str) -> bool:
+        with self.__lock:
+            return self.__imported.get(package_name) == modules_hash
+
+    def set_imported(self, package_name: str, modules_hash: str):
+        with self.__lock:
+            self.__imported[package_name] = modules_hash
+
+    def clear(self):
+        with self.__lock:
+            self.__installed.clear()
+            self.__imported.clear()
+
+
+class ReloadTimer:
+    """Measures the phases of a reload, for the logs and the playbooks_reload_phase_time metric"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0) + duration
+            reload_phase_time.labels(name).observe(duration)
+
+    def __str__(self):
+        return ", ".join(f"{name}: {duration:.2f}s" for name, duration in self.phases.items())
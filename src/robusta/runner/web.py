@@ -2,7 +2,7 @@ import hashlib
 import logging
 import threading
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from cachetools import TTLCache
 from flask import Flask, abort, jsonify, request
@@ -11,7 +11,9 @@ from werkzeug.middleware.dispatcher import DispatcherMiddleware
 
 from robusta.clients.robusta_client import fetch_runner_info
 from robusta.core.model.env_vars import NUM_EVENT_THREADS, PORT, TRACE_INCOMING_ALERTS, TRACE_INCOMING_REQUESTS, \
-    PROCESSED_ALERTS_CACHE_TTL, PROCESSED_ALERTS_CACHE_MAX_SIZE, RUNNER_VERSION, RUNNER_BIND_ADDR, ENABLE_TELEMETRY
+    PROCESSED_ALERTS_CACHE_TTL, PROCESSED_ALERTS_CACHE_MAX_SIZE, RUNNER_VERSION, RUNNER_BIND_ADDR, ENABLE_TELEMETRY, \
+    EVENT_WORKER_PROCESSES
+from robusta.core.playbooks.base_trigger import TriggerEvent
 from robusta.core.playbooks.playbooks_event_handler import PlaybooksEventHandler
 from robusta.core.triggers.helm_releases_triggers import HelmReleasesTriggerEvent, IncomingHelmReleasesEventPayload
 from robusta.integrations.kubernetes.base_triggers import IncomingK8sEventPayload, K8sTriggerEvent
@@ -19,6 +21,7 @@ from robusta.integrations.prometheus.models import AlertManagerEvent, Prometheus
 from robusta.integrations.prometheus.trigger import PrometheusTriggerEvent
 from robusta.model.alert_relabel_config import AlertRelabelOp
 from robusta.runner.config_loader import ConfigLoader
+from robusta.runner.event_workers import EventWorkerPool
 from robusta.utils.task_queue import QueueMetrics, TaskQueue
 
 app = Flask(__name__)
@@ -28,6 +31,7 @@ app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {"/metrics": make_wsgi_app()})
 class Web:
     api_server_queue: TaskQueue
     alerts_queue: TaskQueue
+    event_workers: Optional[EventWorkerPool] = None
     event_handler: PlaybooksEventHandler
     metrics: QueueMetrics
     loader: ConfigLoader
@@ -42,8 +46,15 @@ class Web:
         Web.alerts_queue = TaskQueue(name="alerts_queue", num_workers=NUM_EVENT_THREADS, metrics=Web.metrics)
         Web.event_handler = event_handler
         Web.loader = loader
+        if EVENT_WORKER_PROCESSES > 0:
+            Web.event_workers = EventWorkerPool(event_handler, Web.metrics)
         Web._check_version()
 
+    @staticmethod
+    def stop():
+        if Web.event_workers:
+            Web.event_workers.stop()
+
     @staticmethod
     def _check_version():
         if not ENABLE_TELEMETRY:
@@ -102,13 +113,18 @@ class Web:
                     continue
                 else:
                     Web.processed_alerts_cache[alert_hash] = True
-            Web.alerts_queue.add_task(
-                Web.event_handler.handle_trigger, PrometheusTriggerEvent(alert=alert)
-            )
+            Web._add_event(Web.alerts_queue, PrometheusTriggerEvent(alert=alert))
 
         Web.event_handler.get_telemetry().last_alert_at = str(datetime.now())
         return jsonify(success=True)
 
+    @staticmethod
+    def _add_event(queue: TaskQueue, trigger_event: TriggerEvent):
+        if Web.event_workers:
+            Web.event_workers.add_event(trigger_event)
+        else:
+            queue.add_task(Web.event_handler.handle_trigger, trigger_event)
+
     @staticmethod
     def get_compound_hash(data: List[bytes]) -> bytes:
         hash_value = hashlib.sha1()
@@ -124,9 +140,7 @@ class Web:
         logging.debug("received helm release trigger events via api\n")
         helm_release_payload = IncomingHelmReleasesEventPayload.parse_obj(req_json)
         for helm_release in helm_release_payload.data:
-            Web.api_server_queue.add_task(
-                Web.event_handler.handle_trigger, HelmReleasesTriggerEvent(helm_release=helm_release)
-            )
+            Web._add_event(Web.api_server_queue, HelmReleasesTriggerEvent(helm_release=helm_release))
         return jsonify(success=True)
 
     @staticmethod
@@ -135,7 +149,7 @@ class Web:
         data = request.get_json()["data"]
         Web._trace_incoming("api server", data)
         k8s_payload = IncomingK8sEventPayload(**data)
-        Web.api_server_queue.add_task(Web.event_handler.handle_trigger, K8sTriggerEvent(k8s_payload=k8s_payload))
+        Web._add_event(Web.api_server_queue, K8sTriggerEvent(k8s_payload=k8s_payload))
         return jsonify(success=True)
 
     @staticmethod
@@ -0,0 +1,55 @@
+from typing import Tuple
+
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Downsample a series to threshold points, using the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are always kept. The points between them are split into threshold - 2 buckets, and from
+    each bucket the point forming the largest triangle with the point kept from the previous bucket and the average
+    of the next bucket is kept. Unlike averaging or striding, this keeps the spikes and drops of the series.
+    x must be sorted. Series with threshold points or less are returned as is.
+    """
+    n = len(x)
+    if threshold < 3 or n <= threshold:
+        return x, y
+
+    # bucket i holds the points edges[i]:edges[i + 1], all the points except the first and the last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[: n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[: n - 1], edges[:-1]) / counts
+    # the next bucket of the last bucket, is the last point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    # the doubled triangle area of point j, with the kept point a and the next average c, is
+    # |ax * (yj - cy) + ay * (cx - xj) + (xj * cy - cx * yj)|, so only a is computed sequentially
+    bucket_of_point = np.repeat(np.arange(threshold - 2), counts)
+    cx = next_x[bucket_of_point]
+    cy = next_y[bucket_of_point]
+    bucket_x = x[1 : n - 1]
+    bucket_y = y[1 : n - 1]
+    coef_ax = bucket_y - cy
+    coef_ay = cx - bucket_x
+    constant = bucket_x * cy - cx * bucket_y
+
+    # the buckets are small, so the sequential part runs faster on python lists than on numpy slices
+    coef_ax, coef_ay, constant = coef_ax.tolist(), coef_ay.tolist(), constant.tolist()
+    points_x, points_y = x.tolist(), y.tolist()
+    selected = [0]
+    a = 0
+    for start, end in zip((edges[:-1] - 1).tolist(), (edges[1:] - 1).tolist()):
+        ax, ay = points_x[a], points_y[a]
+        max_area = -1.0
+        for j in range(start, end):
+            area = abs(ax * coef_ax[j] + ay * coef_ay[j] + constant[j])
+            if area > max_area:
+                max_area = area
+                a = j + 1
+        selected.append(a)
+    selected.append(n - 1)
+
+    return x[selected], y[selected]
@@ -0,0 +1,80 @@
+from typing import Dict, Generic, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _TrieNode(Generic[T]):
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode[T]"] = {}
+        self.values: List[T] = []
+
+
+class PrefixTrie(Generic[T]):
+    """
+    Character trie mapping string keys to lists of values.
+
+    Used to answer "which stored keys are a prefix of this string" without scanning all keys.
+    Values stored under the same key are kept in insertion order.
+    """
+
+    def __init__(self):
+        self.__root: _TrieNode[T] = _TrieNode()
+        self.__size = 0
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def insert(self, key: str, value: T):
+        node = self.__root
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                child = _TrieNode()
+                node.children[char] = child
+            node = child
+        node.values.append(value)
+        self.__size += 1
+
+    def remove(self, key: str, value: T) -> bool:
+        path = [self.__root]
+        for char in key:
+            child = path[-1].children.get(char)
+            if child is None:
+                return False
+            path.append(child)
+
+        node = path[-1]
+        try:
+            node.values.remove(value)
+        except ValueError:
+            return False
+        self.__size -= 1
+
+        # prune empty branches, so that lookups don't walk dead nodes
+        for depth in range(len(key), 0, -1):
+            node = path[depth]
+            if node.values or node.children:
+                break
+            del path[depth - 1].children[key[depth - 1]]
+        return True
+
+    def iter_prefix_values(self, text: str) -> Iterator[List[T]]:
+        """Yield the values of every stored key that is a prefix of text, shortest key first"""
+        node = self.__root
+        if node.values:
+            yield node.values
+        for char in text:
+            node = node.children.get(char)
+            if node is None:
+                return
+            if node.values:
+                yield node.values
+
+    def longest_prefix_value(self, text: str) -> Optional[T]:
+        """Return the first value stored under the longest key that is a prefix of text"""
+        longest = None
+        for values in self.iter_prefix_values(text):
+            longest = values
+        return longest[0] if longest else None
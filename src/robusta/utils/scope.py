@@ -1,16 +1,131 @@
 import logging
 import re
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Union
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple, Union
 
-from pydantic import BaseModel, root_validator
+from pydantic import BaseModel, PrivateAttr, root_validator
 
 ScopeIncludeExcludeParamsT = Dict[str, Optional[Union[str, List[str]]]]
 
+REGEX_SPECIAL_CHARS = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+
+class ValueMatcher:
+    """Compiled regex matcher. Patterns without regex special characters are matched with string comparison"""
+
+    __slots__ = ("pattern", "literal", "regex")
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.literal = None if REGEX_SPECIAL_CHARS.search(pattern) else pattern
+        self.regex = re.compile(pattern)
+
+    def is_literal(self) -> bool:
+        return self.literal is not None
+
+    def fullmatch(self, value: str) -> bool:
+        if self.literal is not None:
+            return value == self.literal
+        return self.regex.fullmatch(value) is not None
+
+    def match(self, value: str) -> bool:
+        # same as re.match, the match is anchored only to the beginning of the value
+        if self.literal is not None:
+            return value.startswith(self.literal)
+        return self.regex.match(value) is not None
+
+
+class LabelPredicate(NamedTuple):
+    name: str
+    matcher: ValueMatcher
+    expect_match: bool
+
+    def matches(self, labels: Dict[str, str]) -> bool:
+        label_value = labels.get(self.name)
+        if label_value is None:  # no label with that name
+            return False
+        return self.matcher.fullmatch(label_value.strip()) == self.expect_match
+
+
+@lru_cache(maxsize=4096)
+def compile_value_matcher(pattern: str) -> ValueMatcher:
+    return ValueMatcher(pattern)
+
+
+@lru_cache(maxsize=4096)
+def parse_label_selector(labels_match_expr: str) -> Tuple[LabelPredicate, ...]:
+    # labels_match_expr is e.g. "app=oomki.*,app!=X.*Y"
+    predicates = []
+    for label_match in labels_match_expr.split(","):
+        label_name, label_regex = label_match.split("=", 1)
+        label_name = label_name.strip()
+        if label_name.endswith("!"):  # label_name!=match_expr
+            label_name = label_name[:-1].rstrip()
+            expect_match = False
+        else:
+            expect_match = True
+        predicates.append(LabelPredicate(label_name, compile_value_matcher(label_regex.strip()), expect_match))
+    return tuple(predicates)
+
+
+class CompiledAttribute:
+    """
+    Compiled matchers of a single scope attribute. The attribute matches if any of the matchers match.
+
+    Literal matchers of plain attributes are checked with a single set lookup, before any regex is evaluated.
+    Matchers of "attributes" and "namespace_labels" are evaluated by the scope matcher implementation.
+    """
+
+    def __init__(self, name: str, matchers: List[str]):
+        self.name = name
+        self.matchers = matchers
+        self.label_selectors: List[Tuple[LabelPredicate, ...]] = []
+        self.literals: FrozenSet[str] = frozenset()
+        self.regexes: List[ValueMatcher] = []
+        self.delegated = name in ["attributes", "namespace_labels"]
+        if name in ["labels", "annotations"]:
+            self.label_selectors = [parse_label_selector(matcher) for matcher in matchers]
+        elif not self.delegated:
+            value_matchers = [compile_value_matcher(matcher) for matcher in matchers]
+            self.literals = frozenset(matcher.literal for matcher in value_matchers if matcher.is_literal())
+            self.regexes = [matcher for matcher in value_matchers if not matcher.is_literal()]
+
+    @property
+    def cost(self) -> int:
+        if self.name == "attributes":  # searching the full object
+            return 4
+        if self.name == "namespace_labels":  # might require fetching the namespace
+            return 3
+        if self.label_selectors:
+            return 2
+        return 1 if self.regexes else 0
+
+    def value_matches(self, value) -> bool:
+        if self.label_selectors:
+            return any(all(predicate.matches(value) for predicate in predicates) for predicates in self.label_selectors)
+        return value in self.literals or any(regex.fullmatch(value) for regex in self.regexes)
+
+
+class CompiledScopeRule:
+    """
+    A single scope include/exclude entry, with the attributes ordered so that the cheapest checks are evaluated first.
+    All the attributes of the entry must match, so the evaluation order doesn't change the result.
+    """
+
+    def __init__(self, rule: ScopeIncludeExcludeParamsT):
+        self.rule = rule
+        self.attributes: List[CompiledAttribute] = sorted(
+            (CompiledAttribute(attr_name, attr_matchers) for attr_name, attr_matchers in rule.items()),
+            key=lambda attribute: attribute.cost,
+        )
+
 
 class ScopeParams(BaseModel):
     include: Optional[List[ScopeIncludeExcludeParamsT]]
     exclude: Optional[List[ScopeIncludeExcludeParamsT]]
+    _compiled_include: Optional[List[CompiledScopeRule]] = PrivateAttr(None)
+    _compiled_exclude: Optional[List[CompiledScopeRule]] = PrivateAttr(None)
 
     @root_validator
     def check_non_empty(cls, data: Dict) -> Dict:
@@ -34,23 +149,58 @@ class ScopeParams(BaseModel):
                     inc_exc_params[attr_name] = regex_or_regexes
         return data
 
+    # Compiled once, on the first evaluation of the scope, so that errors in the scope are raised when evaluated
+    @property
+    def compiled_include(self) -> Optional[List[CompiledScopeRule]]:
+        if self._compiled_include is None and self.include:
+            self._compiled_include = [CompiledScopeRule(rule) for rule in self.include]
+        return self._compiled_include
+
+    @property
+    def compiled_exclude(self) -> Optional[List[CompiledScopeRule]]:
+        if self._compiled_exclude is None and self.exclude:
+            self._compiled_exclude = [CompiledScopeRule(rule) for rule in self.exclude]
+        return self._compiled_exclude
+
+    def uses_attribute(self, attr_name: str) -> bool:
+        return any(attr_name in rule for rule in (self.include or []) + (self.exclude or []))
+
 
 class BaseScopeMatcher(ABC):
     @abstractmethod
     def get_data(self) -> Dict:
         raise NotImplementedError
 
-    def scope_inc_exc_matches(self, scope_inc_exc: List[ScopeIncludeExcludeParamsT]) -> bool:
+    def scope_inc_exc_matches(self, scope_inc_exc: List[Union[ScopeIncludeExcludeParamsT, CompiledScopeRule]]) -> bool:
         return any(self.scope_matches(scope) for scope in scope_inc_exc)
 
-    def scope_matches(self, scope: ScopeIncludeExcludeParamsT) -> bool:
+    def scope_matches(self, scope: Union[ScopeIncludeExcludeParamsT, CompiledScopeRule]) -> bool:
         # scope is e.g. {'labels': ['app=oomki.*,app!=X.*Y']}
         # or {'name': ['pod-xyz.*'], 'title': ['fdc.*a', 'fdd.*b'], 'type': ['ISSUE']}
+        if isinstance(scope, CompiledScopeRule):
+            return self.compiled_scope_matches(scope)
         for attr_name, attr_matchers in scope.items():
             if not self.scope_attribute_matches(attr_name, attr_matchers):
                 return False
         return True
 
+    def compiled_scope_matches(self, scope: CompiledScopeRule) -> bool:
+        data = self.get_data()
+        for attribute in scope.attributes:
+            if attribute.name not in data:
+                logging.warning(f'Scope match on non-existent attribute "{attribute.name}" ({data=})')
+                return False
+            attr_value = data[attribute.name]
+            if attribute.delegated:
+                matched = any(
+                    self.match_attribute(attribute.name, attr_value, matcher) for matcher in attribute.matchers
+                )
+            else:
+                matched = attribute.value_matches(attr_value)
+            if not matched:
+                return False
+        return True
+
     def match_attribute(self, attr_name: str, attr_value, attr_matcher: str) -> bool:
         if attr_name == "attributes":
             return self.scope_match_attributes(attr_matcher, attr_value)
@@ -58,9 +208,7 @@ class BaseScopeMatcher(ABC):
             return self.scope_match_namespace_labels(attr_matcher, attr_value)
         elif attr_name in ["labels", "annotations"]:
             return self.match_labels_annotations(attr_matcher, attr_value)
-        elif re.fullmatch(attr_matcher, attr_value):
-            return True
-        return False
+        return compile_value_matcher(attr_matcher).fullmatch(attr_value)
 
     def scope_attribute_matches(self, attr_name: str, attr_matchers: List[str]) -> bool:
         data = self.get_data()
@@ -68,7 +216,7 @@ class BaseScopeMatcher(ABC):
             logging.warning(f'Scope match on non-existent attribute "{attr_name}" ({data=})')
             return False
         attr_value = data[attr_name]
-        return any([self.match_attribute(attr_name, attr_value, matcher) for matcher in attr_matchers])
+        return any(self.match_attribute(attr_name, attr_value, matcher) for matcher in attr_matchers)
 
     def scope_match_attributes(self, attr_matcher: str, attr_value: Dict[str, Union[List, Dict]]) -> bool:
         raise NotImplementedError
@@ -77,21 +225,7 @@ class BaseScopeMatcher(ABC):
         raise NotImplementedError
 
     def match_labels_annotations(self, labels_match_expr: str, labels: Dict[str, str]) -> bool:
-        for label_match in labels_match_expr.split(","):
-            if not self.label_matches(label_match, labels):
-                return False
-        return True
+        return all(predicate.matches(labels) for predicate in parse_label_selector(labels_match_expr))
 
     def label_matches(self, label_match: str, labels: Dict[str, str]) -> bool:
-        label_name, label_regex = label_match.split("=", 1)
-        label_name = label_name.strip()
-        label_regex = label_regex.strip()
-        if label_name.endswith("!"):  # label_name!=match_expr
-            label_name = label_name[:-1].rstrip()
-            expect_match = False
-        else:
-            expect_match = True
-        label_value = labels.get(label_name)
-        if label_value is None:  # no label with that name
-            return False
-        return bool(re.fullmatch(label_regex, label_value.strip())) == expect_match
+        return parse_label_selector(label_match)[0].matches(labels)
@@ -0,0 +1,181 @@
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+from kubernetes.client import (
+    V1Container,
+    V1Deployment,
+    V1DeploymentList,
+    V1DeploymentSpec,
+    V1DeploymentStatus,
+    V1Job,
+    V1JobList,
+    V1JobSpec,
+    V1JobStatus,
+    V1LabelSelector,
+    V1ListMeta,
+    V1Namespace,
+    V1NamespaceList,
+    V1Node,
+    V1NodeList,
+    V1NodeSpec,
+    V1NodeStatus,
+    V1ObjectMeta,
+    V1Pod,
+    V1PodList,
+    V1PodSpec,
+    V1PodStatus,
+    V1PodTemplateSpec,
+    V1ResourceRequirements,
+)
+
+from robusta.core.discovery import discovery
+from robusta.core.discovery.discovery import Discovery, DiscoveryBatch, DiscoveryResults
+
+API_LATENCY_SEC = 0.05
+
+
+def make_container() -> V1Container:
+    return V1Container(name="main", image="busybox", env=[], resources=V1ResourceRequirements(requests={"cpu": "1"}))
+
+
+def make_pod(name: str, labels: dict) -> V1Pod:
+    return V1Pod(
+        metadata=V1ObjectMeta(name=name, namespace="default", labels=labels, resource_version="1"),
+        spec=V1PodSpec(containers=[make_container()], node_name="node-1"),
+        status=V1PodStatus(phase="Running", conditions=[]),
+    )
+
+
+class SlowCluster:
+    """Fake api server, where every list call takes API_LATENCY_SEC"""
+
+    def __init__(self):
+        self.max_parallel_calls = 0
+        self.__parallel_calls = 0
+        self.__lock = threading.Lock()
+        pods = [make_pod("job-a-1", {"job-name": "job-a"}), make_pod("standalone", {})]
+        deployment = V1Deployment(
+            metadata=V1ObjectMeta(name="api", namespace="default", resource_version="1"),
+            spec=V1DeploymentSpec(
+                replicas=2,
+                selector=V1LabelSelector(match_labels={"app": "api"}),
+                template=V1PodTemplateSpec(spec=V1PodSpec(containers=[make_container()])),
+            ),
+            status=V1DeploymentStatus(ready_replicas=2),
+        )
+        job = V1Job(
+            metadata=V1ObjectMeta(name="job-a", namespace="default"),
+            spec=V1JobSpec(
+                backoff_limit=6,
+                selector=V1LabelSelector(match_labels={"job-name": "job-a"}),
+                template=V1PodTemplateSpec(spec=V1PodSpec(containers=[make_container()])),
+            ),
+            status=V1JobStatus(),
+        )
+        node = V1Node(metadata=V1ObjectMeta(name="node-1"), spec=V1NodeSpec(), status=V1NodeStatus(conditions=[]))
+        empty = SimpleNamespace(items=[], metadata=V1ListMeta())
+
+        apps = SimpleNamespace(
+            list_deployment_for_all_namespaces=self.__slow(V1DeploymentList(items=[deployment], metadata=V1ListMeta())),
+            list_stateful_set_for_all_namespaces=self.__slow(empty),
+            list_daemon_set_for_all_namespaces=self.__slow(empty),
+            list_replica_set_for_all_namespaces=self.__slow(empty),
+        )
+        core = SimpleNamespace(
+            list_pod_for_all_namespaces=self.__slow(V1PodList(items=pods, metadata=V1ListMeta())),
+            list_node=self.__slow(V1NodeList(items=[node], metadata=V1ListMeta())),
+            list_secret_for_all_namespaces=self.__slow(empty),
+            list_namespace=self.__slow(
+                V1NamespaceList(items=[V1Namespace(metadata=V1ObjectMeta(name="default"))], metadata=V1ListMeta())
+            ),
+        )
+        batch = SimpleNamespace(list_job_for_all_namespaces=self.__slow(V1JobList(items=[job], metadata=V1ListMeta())))
+        self.client = SimpleNamespace(
+            AppsV1Api=lambda: apps, CoreV1Api=lambda: core, BatchV1Api=lambda: batch, CustomObjectsApi=Mock()
+        )
+
+    def __slow(self, response):
+        def list_resources(**kwargs):
+            with self.__lock:
+                self.__parallel_calls += 1
+                self.max_parallel_calls = max(self.max_parallel_calls, self.__parallel_calls)
+            time.sleep(API_LATENCY_SEC)
+            with self.__lock:
+                self.__parallel_calls -= 1
+            return response
+
+        return list_resources
+
+
+@pytest.fixture
+def slow_cluster(monkeypatch) -> SlowCluster:
+    cluster = SlowCluster()
+    monkeypatch.setattr(discovery, "client", cluster.client)
+    return cluster
+
+
+def run_discovery(monkeypatch, concurrency: int) -> DiscoveryResults:
+    monkeypatch.setattr(discovery, "DISCOVERY_CONCURRENCY", concurrency)
+    return Discovery.discovery_process()
+
+
+class TestConcurrentDiscovery:
+    def test_same_results_as_sequential(self, slow_cluster, monkeypatch):
+        sequential = run_discovery(monkeypatch, 1)
+        concurrent = run_discovery(monkeypatch, 4)
+
+        assert sorted(service.get_service_key() for service in concurrent.services) == sorted(
+            service.get_service_key() for service in sequential.services
+        )
+        assert concurrent.jobs == sequential.jobs
+        assert concurrent.jobs[0].job_data.pods == ["job-a-1"]
+        assert concurrent.nodes == sequential.nodes
+        assert concurrent.nodes[0].pods_count == 2
+        assert concurrent.namespaces == sequential.namespaces
+        assert concurrent.pods_running_count == sequential.pods_running_count == 2
+
+    def test_concurrency_cap(self, slow_cluster, monkeypatch):
+        run_discovery(monkeypatch, 3)
+        assert slow_cluster.max_parallel_calls == 3
+
+    def test_kind_durations(self, slow_cluster, monkeypatch):
+        results = run_discovery(monkeypatch, 4)
+        assert set(results.kind_durations.keys()) == {
+            "Deployment",
+            "StatefulSet",
+            "DaemonSet",
+            "ReplicaSet",
+            "Pod",
+            "Node",
+            "Job",
+            "HelmRelease",
+            "Namespace",
+        }
+        assert all(duration >= API_LATENCY_SEC for duration in results.kind_durations.values())
+
+    def test_listing_error_is_raised(self, slow_cluster, monkeypatch):
+        slow_cluster.client.CoreV1Api().list_node = Mock(side_effect=ValueError("api server error"))
+        with pytest.raises(ValueError, match="api server error"):
+            run_discovery(monkeypatch, 4)
+
+    def test_listing_waits_for_consumer(self, slow_cluster, monkeypatch):
+        listed = []
+
+        def list_pages(state):
+            for page in range(50):
+                listed.append(page)
+                yield DiscoveryBatch()
+
+        monkeypatch.setattr(Discovery, "_Discovery__kind_listers", lambda: {"A": list_pages, "B": list_pages})
+        monkeypatch.setattr(discovery, "DISCOVERY_CONCURRENCY", 2)
+        batches = Discovery.discovery_batches()
+        next(batches)
+        time.sleep(0.2)
+        # one batch held by each listing thread, and up to DISCOVERY_CONCURRENCY batches in the queue
+        assert len(listed) <= 5
+
+        batches.close()
+        assert len(listed) <= 5
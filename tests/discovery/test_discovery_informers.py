@@ -0,0 +1,397 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from threading import Lock
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+from unittest.mock import Mock
+
+import pytest
+from kubernetes.client import (
+    V1Container,
+    V1Deployment,
+    V1DeploymentSpec,
+    V1DeploymentStatus,
+    V1Job,
+    V1JobSpec,
+    V1JobStatus,
+    V1LabelSelector,
+    V1Namespace,
+    V1Node,
+    V1NodeSpec,
+    V1NodeStatus,
+    V1ObjectMeta,
+    V1Pod,
+    V1PodSpec,
+    V1PodStatus,
+    V1PodTemplateSpec,
+    V1ResourceRequirements,
+)
+from kubernetes.client.exceptions import ApiException
+
+from robusta.core.discovery import informer
+from robusta.core.discovery.informer import PodIndex, ResourceInformer
+from robusta.core.model.helm_release import HelmRelease, Info
+from robusta.core.sinks.robusta import robusta_sink
+from robusta.core.sinks.robusta.robusta_sink import RobustaSink
+
+
+def make_container() -> V1Container:
+    return V1Container(name="main", image="busybox", env=[], resources=V1ResourceRequirements(requests={"cpu": "250m"}))
+
+
+def make_pod(name: str, labels: Dict[str, str] = None, node: str = "node-1", phase: str = "Running") -> V1Pod:
+    return V1Pod(
+        metadata=V1ObjectMeta(name=name, namespace="default", labels=labels or {}),
+        spec=V1PodSpec(containers=[make_container()], node_name=node),
+        status=V1PodStatus(phase=phase, conditions=[]),
+    )
+
+
+def make_deployment(name: str, replicas: int = 1) -> V1Deployment:
+    return V1Deployment(
+        metadata=V1ObjectMeta(name=name, namespace="default"),
+        spec=V1DeploymentSpec(
+            replicas=replicas,
+            selector=V1LabelSelector(match_labels={"app": name}),
+            template=V1PodTemplateSpec(spec=V1PodSpec(containers=[make_container()])),
+        ),
+        status=V1DeploymentStatus(),
+    )
+
+
+def make_job(name: str) -> V1Job:
+    return V1Job(
+        metadata=V1ObjectMeta(name=name, namespace="default"),
+        spec=V1JobSpec(
+            backoff_limit=6,
+            selector=V1LabelSelector(match_labels={"job-name": name}),
+            template=V1PodTemplateSpec(spec=V1PodSpec(containers=[make_container()])),
+        ),
+        status=V1JobStatus(),
+    )
+
+
+def make_node(name: str) -> V1Node:
+    return V1Node(
+        metadata=V1ObjectMeta(name=name),
+        spec=V1NodeSpec(),
+        status=V1NodeStatus(capacity={"cpu": "4"}, allocatable={"cpu": "4"}, conditions=[]),
+    )
+
+
+class FakeApiServer:
+    """
+    In memory api server, with list, watch, bookmarks and compaction of old resource versions.
+
+    Every change gets a new cluster wide resourceVersion. Watching from a resourceVersion older than the last
+    compaction fails with 410 Gone, like etcd compaction on a real api server.
+    """
+
+    def __init__(self):
+        self.resource_version = 0
+        self.compacted_version = 0
+        self.objects: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        self.events: List[Tuple[int, str, str, Any]] = []  # resourceVersion, kind, event type, object
+        self.list_calls: Dict[str, int] = defaultdict(int)
+
+    def apply(self, kind: str, obj: Any):
+        key = f"{obj.metadata.namespace}/{obj.metadata.name}"
+        event_type = "MODIFIED" if key in self.objects[kind] else "ADDED"
+        self.__record(kind, event_type, obj)
+        self.objects[kind][key] = obj
+
+    def delete(self, kind: str, obj: Any):
+        del self.objects[kind][f"{obj.metadata.namespace}/{obj.metadata.name}"]
+        self.__record(kind, "DELETED", obj)
+
+    def compact(self):
+        self.compacted_version = self.resource_version
+
+    def list_func(self, kind: str):
+        def list_resources(limit: int = None, _continue: str = None, label_selector: str = None, **kwargs):
+            self.list_calls[kind] += 1
+            return SimpleNamespace(
+                items=list(self.objects[kind].values()),
+                metadata=SimpleNamespace(resource_version=str(self.resource_version), _continue=None),
+            )
+
+        list_resources.kind = kind
+        return list_resources
+
+    def client(self) -> SimpleNamespace:
+        apps = SimpleNamespace(
+            list_deployment_for_all_namespaces=self.list_func("Deployment"),
+            list_stateful_set_for_all_namespaces=self.list_func("StatefulSet"),
+            list_daemon_set_for_all_namespaces=self.list_func("DaemonSet"),
+            list_replica_set_for_all_namespaces=self.list_func("ReplicaSet"),
+        )
+        core = SimpleNamespace(
+            list_pod_for_all_namespaces=self.list_func("Pod"),
+            list_node=self.list_func("Node"),
+            list_namespace=self.list_func("Namespace"),
+            list_secret_for_all_namespaces=self.list_func("Secret"),
+        )
+        batch = SimpleNamespace(list_job_for_all_namespaces=self.list_func("Job"))
+        return SimpleNamespace(AppsV1Api=lambda: apps, CoreV1Api=lambda: core, BatchV1Api=lambda: batch)
+
+    def watch(self) -> "FakeWatch":
+        return FakeWatch(self)
+
+    def __record(self, kind: str, event_type: str, obj: Any):
+        self.resource_version += 1
+        obj.metadata.resource_version = str(self.resource_version)
+        self.events.append((self.resource_version, kind, event_type, obj))
+
+
+class FakeWatch:
+    def __init__(self, server: FakeApiServer):
+        self.server = server
+
+    def stream(self, func, resource_version: str, allow_watch_bookmarks: bool = False, **kwargs):
+        kind = func.kind
+        if int(resource_version) < self.server.compacted_version:
+            raise ApiException(status=410, reason="Gone")
+
+        for event_version, event_kind, event_type, obj in self.server.events:
+            if event_kind == kind and event_version > int(resource_version):
+                raw_object = {"metadata": {"resourceVersion": str(event_version)}}
+                yield {"type": event_type, "object": obj, "raw_object": raw_object}
+        if allow_watch_bookmarks:
+            raw_object = {"metadata": {"resourceVersion": str(self.server.resource_version)}}
+            yield {"type": "BOOKMARK", "object": raw_object, "raw_object": raw_object}
+        time.sleep(0.01)  # the watch timed out
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch) -> FakeApiServer:
+    server = FakeApiServer()
+    monkeypatch.setattr(informer, "watch", SimpleNamespace(Watch=server.watch))
+    return server
+
+
+class RecordingInformer:
+    def __init__(self, server: FakeApiServer, kind: str):
+        self.listed: List[List[Any]] = []
+        self.events: List[Tuple[str, str]] = []
+        self.informer = ResourceInformer(
+            kind,
+            server.list_func(kind),
+            self.listed.append,
+            lambda event_type, obj: self.events.append((event_type, obj.metadata.name)),
+        )
+
+
+class TestResourceInformer:
+    def test_list_then_watch(self, server):
+        server.apply("Deployment", make_deployment("api"))
+        recorder = RecordingInformer(server, "Deployment")
+
+        recorder.informer.relist()
+        assert [[deployment.metadata.name for deployment in items] for items in recorder.listed] == [["api"]]
+
+        server.apply("Deployment", make_deployment("api", replicas=3))
+        server.apply("Deployment", make_deployment("worker"))
+        server.delete("Deployment", make_deployment("api"))
+        recorder.informer.watch_once()
+        assert recorder.events == [("MODIFIED", "api"), ("ADDED", "worker"), ("DELETED", "api")]
+
+        # the next watch resumes from the last event
+        recorder.informer.watch_once()
+        assert len(recorder.events) == 3
+        assert server.list_calls["Deployment"] == 1
+
+    def test_bookmarks_prevent_relist(self, server):
+        recorder = RecordingInformer(server, "Deployment")
+        recorder.informer.relist()
+
+        # changes of other kinds advance the resource version, the bookmark keeps the informer up to date
+        for i in range(10):
+            server.apply("Pod", make_pod(f"pod-{i}"))
+        recorder.informer.watch_once()
+        assert recorder.informer.resource_version == str(server.resource_version)
+
+        server.compact()
+        recorder.informer.watch_once()
+        assert server.list_calls["Deployment"] == 1
+
+    def test_relist_on_gone(self, server):
+        server.apply("Deployment", make_deployment("api"))
+        recorder = RecordingInformer(server, "Deployment")
+        recorder.informer.relist()
+
+        server.apply("Deployment", make_deployment("worker"))
+        server.compact()
+        with pytest.raises(ApiException):
+            recorder.informer.watch_once()
+
+        thread = threading.Thread(target=recorder.informer.run, daemon=True)
+        thread.start()
+        deadline = time.time() + 5
+        while server.list_calls["Deployment"] < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        recorder.informer.stop()
+        thread.join(5)
+
+        assert server.list_calls["Deployment"] == 2
+        assert sorted(deployment.metadata.name for deployment in recorder.listed[-1]) == ["api", "worker"]
+
+
+class TestPodIndex:
+    def test_job_pods_and_node_requests(self):
+        index = PodIndex()
+        index.reset([make_pod("job-a-1", {"job-name": "job-a"}), make_pod("web", {"app": "web"}, node="node-2")])
+        index.update(make_pod("job-a-2", {"job-name": "job-a"}, phase="Pending"))
+
+        assert sorted(index.job_pods("default", {"job-name": "job-a"})) == ["job-a-1", "job-a-2"]
+        assert index.job_pods("default", {}) == []
+        assert len(index.node_requests("node-1")) == 2
+        assert index.running_count() == 2
+
+        index.update(make_pod("job-a-2", {"job-name": "job-a"}, phase="Succeeded"))
+        index.remove(make_pod("web", node="node-2"))
+        assert len(index.node_requests("node-1")) == 1
+        assert index.node_requests("node-2") == []
+        assert index.running_count() == 1
+
+    def test_changed_nodes(self):
+        index = PodIndex()
+        assert index.update(make_pod("web", phase="Pending")) == {"node-1"}
+        assert index.update(make_pod("web", node="node-2")) == {"node-1", "node-2"}
+        assert index.update(make_pod("web", node="node-2", phase="Succeeded")) == {"node-2"}
+        assert index.remove(make_pod("web", node="node-2")) == set()
+
+
+class TestInformersSink:
+    @staticmethod
+    def make_sink() -> RobustaSink:
+        sink = RobustaSink.__new__(RobustaSink)
+        sink.dal = Mock()
+        for get_active in ["services", "jobs", "nodes", "namespaces", "helm_release"]:
+            getattr(sink.dal, f"get_active_{get_active}").return_value = []
+        sink.services_publish_lock = Lock()
+        sink.namespace_monitored_resources = None
+        sink._RobustaSink__discovery_metrics = Mock()
+        sink._RobustaSink__pod_index = PodIndex()
+        sink._RobustaSink__helm_secrets = {}
+        sink._RobustaSink__reset_caches()
+        return sink
+
+    @staticmethod
+    def watch_all(sink: RobustaSink):
+        for resource_informer in sink._RobustaSink__informers:
+            resource_informer.watch_once()
+
+    @staticmethod
+    def persisted_services(sink: RobustaSink) -> List[str]:
+        persisted = [call.args[0] for call in sink.dal.persist_services.call_args_list]
+        return [service.get_service_key() for services in persisted for service in services]
+
+    def test_deltas_are_published(self, server, monkeypatch):
+        monkeypatch.setattr(robusta_sink, "client", server.client())
+        monkeypatch.setattr(robusta_sink, "DISABLE_HELM_MONITORING", True)
+        monkeypatch.setattr(ResourceInformer, "start", lambda self: None)
+        server.apply("Deployment", make_deployment("api"))
+        server.apply("Pod", make_pod("standalone"))
+        server.apply("Pod", make_pod("job-a-1", {"job-name": "job-a"}))
+        server.apply("Job", make_job("job-a"))
+        server.apply("Node", make_node("node-1"))
+        server.apply("Namespace", V1Namespace(metadata=V1ObjectMeta(name="default")))
+
+        sink = self.make_sink()
+        sink._RobustaSink__start_informers()
+
+        assert sorted(self.persisted_services(sink)) == [
+            "default/Deployment/api",
+            "default/Pod/job-a-1",
+            "default/Pod/standalone",
+        ]
+        [published_job] = sink.dal.publish_jobs.call_args.args[0]
+        assert published_job.job_data.pods == ["job-a-1"]
+        [published_node] = sink.dal.publish_nodes.call_args.args[0]
+        assert published_node.pods_count == 2
+        assert [namespace.name for namespace in sink.dal.publish_namespaces.call_args.args[0]] == ["default"]
+
+        sink.dal.reset_mock()
+        server.apply("Deployment", make_deployment("api", replicas=3))
+        server.apply("Pod", make_pod("standalone", phase="Succeeded"))
+        server.apply("Deployment", make_deployment("worker"))
+        server.delete("Deployment", make_deployment("worker"))
+        self.watch_all(sink)
+
+        assert self.persisted_services(sink) == ["default/Deployment/api", "default/Deployment/worker"]
+        assert [key for call in sink.dal.remove_deleted_services.call_args_list for key in call.args[0]] == [
+            "default/Pod/standalone",
+            "default/Deployment/worker",
+        ]
+        assert set(server.list_calls.values()) == {1}
+
+    def test_unchanged_services_are_not_published(self, server, monkeypatch):
+        monkeypatch.setattr(robusta_sink, "client", server.client())
+        monkeypatch.setattr(robusta_sink, "DISABLE_HELM_MONITORING", True)
+        monkeypatch.setattr(ResourceInformer, "start", lambda self: None)
+        server.apply("Deployment", make_deployment("api"))
+        sink = self.make_sink()
+        sink._RobustaSink__start_informers()
+
+        sink.dal.reset_mock()
+        for _ in range(5):  # status only updates
+            server.apply("Deployment", make_deployment("api"))
+        self.watch_all(sink)
+        assert self.persisted_services(sink) == []
+
+    def test_node_allocated_updated_on_pod_events(self, server, monkeypatch):
+        monkeypatch.setattr(robusta_sink, "client", server.client())
+        monkeypatch.setattr(robusta_sink, "DISABLE_HELM_MONITORING", True)
+        monkeypatch.setattr(ResourceInformer, "start", lambda self: None)
+        server.apply("Node", make_node("node-1"))
+        server.apply("Pod", make_pod("api-1"))
+        sink = self.make_sink()
+        sink._RobustaSink__start_informers()
+        [published_node] = sink.dal.publish_nodes.call_args.args[0]
+        assert (published_node.pods_count, published_node.cpu_allocated) == (1, 0.25)
+
+        sink.dal.reset_mock()
+        server.apply("Pod", make_pod("api-2"))
+        server.apply("Pod", make_pod("api-3", phase="Pending"))
+        server.apply("Pod", make_pod("api-1", phase="Succeeded"))
+        self.watch_all(sink)
+
+        published_nodes = [node for call in sink.dal.publish_nodes.call_args_list for node in call.args[0]]
+        assert [(node.pods_count, node.cpu_allocated) for node in published_nodes] == [(2, 0.5), (3, 0.75), (2, 0.5)]
+        assert published_nodes[-1].pods == "api-2,api-3"
+
+    def test_helm_relist_sends_changed_releases(self, monkeypatch):
+        def release(name: str, version: int) -> HelmRelease:
+            now = datetime.now()
+            return HelmRelease(
+                name=name,
+                namespace="default",
+                version=version,
+                info=Info(first_deployed=now, last_deployed=now, status="deployed"),
+            )
+
+        def secret(name: str) -> SimpleNamespace:
+            return SimpleNamespace(metadata=SimpleNamespace(namespace="default", name=name))
+
+        releases = {"api.v1": release("api", 1), "web.v1": release("web", 1), "api.v2": release("api", 2)}
+        monkeypatch.setattr(
+            RobustaSink, "_RobustaSink__decode_helm_secret", staticmethod(lambda secret: releases[secret.metadata.name])
+        )
+        sink = self.make_sink()
+        sink._RobustaSink__assert_helm_releases_cache_initialized()
+        sent = []
+        sink._RobustaSink__send_helm_release_events = lambda release_data: sent.append(release_data)
+
+        sink._RobustaSink__on_helm_secrets_list([secret("api.v1"), secret("web.v1")])
+        sink._RobustaSink__on_helm_secrets_list([secret("api.v1"), secret("web.v1")])
+        sink._RobustaSink__on_helm_secrets_list([secret("api.v1"), secret("api.v2")])
+
+        assert [[(release.name, release.version) for release in events] for events in sent] == [
+            [("api", 1), ("web", 1)],
+            [("api", 2)],
+        ]
@@ -0,0 +1,196 @@
+import os
+import signal
+from threading import Lock
+from types import SimpleNamespace
+from typing import List
+from unittest.mock import Mock
+
+import pytest
+from kubernetes.client import (
+    V1Container,
+    V1Job,
+    V1JobList,
+    V1JobSpec,
+    V1JobStatus,
+    V1LabelSelector,
+    V1ListMeta,
+    V1ObjectMeta,
+    V1Pod,
+    V1PodList,
+    V1PodSpec,
+    V1PodStatus,
+    V1PodTemplateSpec,
+    V1ResourceRequirements,
+)
+
+from robusta.core.discovery import discovery
+from robusta.core.discovery.discovery import Discovery, DiscoveryBatch, DiscoveryResults
+from robusta.core.model.services import ServiceConfig, ServiceInfo
+from robusta.core.sinks.robusta import robusta_sink
+from robusta.core.sinks.robusta.robusta_sink import RobustaSink
+
+PAGE_SIZE = 3
+
+
+def make_pod(name: str, namespace: str, labels: dict) -> V1Pod:
+    return V1Pod(
+        metadata=V1ObjectMeta(name=name, namespace=namespace, labels=labels, resource_version="1"),
+        spec=V1PodSpec(
+            containers=[V1Container(name="main", image="busybox", env=[], resources=V1ResourceRequirements())]
+        ),
+        status=V1PodStatus(phase="Running"),
+    )
+
+
+def make_job(name: str, namespace: str) -> V1Job:
+    return V1Job(
+        metadata=V1ObjectMeta(name=name, namespace=namespace),
+        spec=V1JobSpec(
+            backoff_limit=6,
+            selector=V1LabelSelector(match_labels={"job-name": name}),
+            template=V1PodTemplateSpec(
+                spec=V1PodSpec(
+                    containers=[V1Container(name="main", image="busybox", env=[], resources=V1ResourceRequirements())]
+                )
+            ),
+        ),
+        status=V1JobStatus(),
+    )
+
+
+def paginate(items: list, list_cls, limit: int, _continue=None, **kwargs):
+    start = int(_continue or 0)
+    end = start + min(limit, PAGE_SIZE)
+    next_ref = str(end) if end < len(items) else None
+    return list_cls(items=items[start:end], metadata=V1ListMeta(_continue=next_ref))
+
+
+class FakeCluster:
+    def __init__(self, pods: List[V1Pod], jobs: List[V1Job]):
+        empty = SimpleNamespace(items=[], metadata=SimpleNamespace(_continue=None))
+        apps = SimpleNamespace(
+            list_deployment_for_all_namespaces=lambda **kwargs: empty,
+            list_stateful_set_for_all_namespaces=lambda **kwargs: empty,
+            list_daemon_set_for_all_namespaces=lambda **kwargs: empty,
+            list_replica_set_for_all_namespaces=lambda **kwargs: empty,
+        )
+        core = SimpleNamespace(
+            list_pod_for_all_namespaces=lambda **kwargs: paginate(pods, V1PodList, **kwargs),
+            list_node=lambda: empty,
+            list_secret_for_all_namespaces=lambda **kwargs: empty,
+            list_namespace=lambda: empty,
+        )
+        batch = SimpleNamespace(list_job_for_all_namespaces=lambda **kwargs: paginate(jobs, V1JobList, **kwargs))
+        self.client = SimpleNamespace(
+            AppsV1Api=lambda: apps, CoreV1Api=lambda: core, BatchV1Api=lambda: batch, CustomObjectsApi=Mock()
+        )
+
+
+@pytest.fixture
+def fake_cluster(monkeypatch) -> FakeCluster:
+    pods = [make_pod(f"pod-{i}", "default", {"app": "web"}) for i in range(7)]
+    pods.append(make_pod("job-a-xyz", "default", {"job-name": "job-a"}))
+    pods.append(make_pod("job-a-other-ns", "other", {"job-name": "job-a"}))
+    jobs = [make_job("job-a", "default"), make_job("job-b", "default")]
+    cluster = FakeCluster(pods, jobs)
+    monkeypatch.setattr(discovery, "client", cluster.client)
+    return cluster
+
+
+def make_service(name: str, total_pods: int = 1) -> ServiceInfo:
+    return ServiceInfo(
+        name=name,
+        namespace="default",
+        service_type="Deployment",
+        total_pods=total_pods,
+        service_config=ServiceConfig(labels={}, containers=[], volumes=[]),
+    )
+
+
+class TestDiscoveryBatches:
+    def test_batch_per_page(self, fake_cluster):
+        batches = list(Discovery.discovery_batches())
+
+        results = batches[-1]
+        assert isinstance(results, DiscoveryResults)
+        assert results.pods_running_count == 9
+
+        pod_batches = [batch for batch in batches[:-1] if batch.services]
+        assert [len(batch.services) for batch in pod_batches] == [3, 3, 3]
+        job_batches = [batch for batch in batches[:-1] if batch.jobs]
+        assert len(job_batches) == 1
+        job_a = job_batches[0].jobs[0]
+        assert job_a.name == "job-a"
+        assert job_a.job_data.pods == ["job-a-xyz"]
+
+    def test_discovery_process_merges_batches(self, fake_cluster):
+        results = Discovery.discovery_process()
+        assert len(results.services) == 9
+        assert [job.name for job in results.jobs] == ["job-a", "job-b"]
+
+
+class TestStreamResources:
+    def test_batches_are_streamed(self, monkeypatch):
+        def batches():
+            for i in range(5):
+                yield DiscoveryBatch(services=[make_service(f"service-{i}")])
+            yield DiscoveryResults(pods_running_count=42)
+
+        monkeypatch.setattr(Discovery, "discovery_batches", batches)
+        received = []
+        results = Discovery.stream_resources(received.append)
+
+        assert [batch.services[0].name for batch in received] == [f"service-{i}" for i in range(5)]
+        assert results.pods_running_count == 42
+        assert results.services == []
+
+    def test_discovery_error_is_raised(self, monkeypatch):
+        def batches():
+            yield DiscoveryBatch(services=[make_service("service")])
+            raise ValueError("api server error")
+
+        monkeypatch.setattr(Discovery, "discovery_batches", batches)
+        received = []
+        with pytest.raises(ValueError, match="api server error"):
+            Discovery.stream_resources(received.append)
+        assert len(received) == 1
+
+    def test_killed_process(self, monkeypatch):
+        def batches():
+            yield DiscoveryBatch(services=[make_service("service")])
+            os.kill(os.getpid(), signal.SIGKILL)
+
+        monkeypatch.setattr(Discovery, "discovery_batches", batches)
+        monkeypatch.setattr(Discovery, "out_of_memory_detected", False)
+        with pytest.raises(Exception, match="exited unexpectedly"):
+            Discovery.stream_resources(lambda batch: None)
+        assert Discovery.out_of_memory_detected
+
+
+class TestStreamingPublish:
+    @staticmethod
+    def make_sink(cached_services: List[ServiceInfo]) -> RobustaSink:
+        sink = RobustaSink.__new__(RobustaSink)
+        sink.dal = Mock()
+        sink.dal.get_active_services.return_value = cached_services
+        sink.dal.get_active_jobs.return_value = []
+        sink.services_publish_lock = Lock()
+        sink._RobustaSink__discovery_metrics = Mock()
+        sink._RobustaSink__reset_caches()
+        return sink
+
+    def test_publish_batches_then_deletions(self, monkeypatch):
+        sink = self.make_sink([make_service("unchanged"), make_service("changed"), make_service("deleted")])
+
+        def stream_resources(on_batch):
+            on_batch(DiscoveryBatch(services=[make_service("unchanged"), make_service("changed", 2)]))
+            assert not sink.dal.remove_deleted_services.called  # deletions are published after all the batches
+            on_batch(DiscoveryBatch(services=[make_service("new")]))
+            return DiscoveryResults()
+
+        monkeypatch.setattr(robusta_sink.Discovery, "stream_resources", stream_resources)
+        sink._RobustaSink__stream_discovered_resources()
+
+        persisted = [call.args[0] for call in sink.dal.persist_services.call_args_list]
+        assert [[service.name for service in services] for services in persisted] == [["changed"], ["new"]]
+        sink.dal.remove_deleted_services.assert_called_once_with(["default/Deployment/deleted"])
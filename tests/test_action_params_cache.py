@@ -0,0 +1,159 @@
+import time
+from typing import Dict, List, Optional
+
+import pytest
+
+from robusta.core.model.base_params import HolmesParams, PrometheusParams
+from robusta.core.model.events import ExecutionBaseEvent
+from robusta.core.playbooks.actions_registry import ActionsRegistry, action
+from robusta.core.playbooks.playbooks_event_handler_impl import PlaybooksEventHandlerImpl
+from robusta.model import playbook_action
+from robusta.model.playbook_action import PlaybookAction
+
+GLOBAL_CONFIG = {"cluster_name": "prod", "prometheus_url": "prometheus:9090", "holmes_url": "http://holmes:80"}
+
+
+class CountingParams(PrometheusParams, HolmesParams):
+    labels: Dict[str, str] = {}
+    selectors: List[str] = []
+    threshold: Optional[float] = None
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        CountingParams.instances += 1
+
+    def post_initialization(self):
+        CountingParams.post_initializations += 1
+
+
+CountingParams.instances = 0
+CountingParams.post_initializations = 0
+seen_params: List[CountingParams] = []
+
+
+@action
+def params_recording_action(event: ExecutionBaseEvent, params: CountingParams):
+    seen_params.append(params)
+    params.threshold = 1.0  # actions may change their params
+
+
+class FakeRegistry:
+    """The parts of the registry used to run actions, and its sinks"""
+
+    def __init__(self):
+        self.actions = ActionsRegistry()
+        self.actions.add_action(params_recording_action)
+        self.global_config = GLOBAL_CONFIG
+
+    def get_actions(self) -> ActionsRegistry:
+        return self.actions
+
+    def get_global_config(self) -> dict:
+        return self.global_config
+
+    def get_scheduler(self):
+        return None
+
+    def get_event_emitter(self):
+        return None
+
+    def get_sinks(self):
+        return self
+
+    def get_all(self) -> dict:
+        return {}
+
+
+@pytest.fixture
+def handler():
+    CountingParams.instances = 0
+    CountingParams.post_initializations = 0
+    seen_params.clear()
+    return PlaybooksEventHandlerImpl(FakeRegistry())
+
+
+def make_action(**params) -> PlaybookAction:
+    return PlaybookAction(
+        action_name="params_recording_action", action_params={"selectors": ["app=api"], "labels": {"a": "b"}, **params}
+    )
+
+
+def run(handler: PlaybooksEventHandlerImpl, actions: List[PlaybookAction]):
+    return handler._PlaybooksEventHandlerImpl__run_playbook_actions(ExecutionBaseEvent(), actions)
+
+
+class TestActionParamsCache:
+    def test_params_validated_once(self, handler):
+        pb_action = make_action()
+        for _ in range(10):
+            assert run(handler, [pb_action]) == {"success": True}
+
+        assert CountingParams.instances == 1
+        assert CountingParams.post_initializations == 1
+        assert seen_params[0].prometheus_url == "http://prometheus:9090"
+        assert seen_params[0].selectors == ["app=api"]
+
+    def test_changes_of_actions_not_shared(self, handler):
+        pb_action = make_action()
+        run(handler, [pb_action])
+        run(handler, [pb_action])
+        assert seen_params[0] is not seen_params[1]
+        assert seen_params[1].threshold == 1.0
+        assert pb_action.get_params(GLOBAL_CONFIG, CountingParams).threshold is None
+
+    def test_revalidated_on_global_config_change(self, handler):
+        pb_action = make_action()
+        run(handler, [pb_action])
+        handler.registry.global_config = {**GLOBAL_CONFIG, "prometheus_url": "http://other:9090"}
+        run(handler, [pb_action])
+        assert CountingParams.instances == 2
+        assert seen_params[1].prometheus_url == "http://other:9090"
+
+    def test_expired(self, handler, monkeypatch):
+        monkeypatch.setattr(playbook_action, "ACTION_PARAMS_CACHE_TTL_SEC", 0.01)
+        pb_action = make_action()
+        run(handler, [pb_action])
+        time.sleep(0.02)
+        run(handler, [pb_action])
+        assert CountingParams.instances == 2
+
+    def test_disabled(self, handler, monkeypatch):
+        monkeypatch.setattr(playbook_action, "ACTION_PARAMS_CACHE_TTL_SEC", 0)
+        pb_action = make_action()
+        run(handler, [pb_action])
+        run(handler, [pb_action])
+        assert CountingParams.instances == 2
+
+    def test_invalid_params_not_cached(self, handler):
+        pb_action = make_action(threshold="not a number")
+        for _ in range(2):
+            response = run(handler, [pb_action])
+            assert response["success"] is False
+        assert seen_params == []
+
+    def test_validated_once_per_cache_key(self, handler):
+        first, second = make_action(), make_action(threshold=2.0)
+        other_config = {**GLOBAL_CONFIG, "prometheus_url": "http://other:9090"}
+        for _ in range(20):
+            first.get_params(GLOBAL_CONFIG, CountingParams)
+            second.get_params(GLOBAL_CONFIG, CountingParams)
+        assert CountingParams.instances == 2
+
+        for _ in range(20):
+            first.get_params(other_config, CountingParams)
+        assert CountingParams.instances == 3
+        assert CountingParams.post_initializations == 3
+
+    def test_get_params_returns_independent_copy(self, handler):
+        pb_action = make_action()
+        params = pb_action.get_params(GLOBAL_CONFIG, CountingParams)
+        params.threshold = 5.0
+        params.labels["team"] = "sre"
+        params.selectors.append("tier=web")
+
+        copy = pb_action.get_params(GLOBAL_CONFIG, CountingParams)
+        assert copy is not params
+        assert copy.threshold is None
+        assert copy.labels == {"a": "b"}
+        assert copy.selectors == ["app=api"]
+        assert CountingParams.instances == 1
@@ -0,0 +1,159 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import pytest
+from hikaru.model.rel_1_26 import DaemonSet, Node, ObjectMeta
+from prometheus_client import REGISTRY
+
+from robusta.integrations.kubernetes.custom_models import RobustaDeployment, RobustaPod
+from robusta.integrations.kubernetes.node_index import NodeAddressIndex
+from robusta.integrations.kubernetes.object_cache import KubernetesObjectCache
+from robusta.integrations.prometheus import trigger
+from robusta.integrations.prometheus.models import PrometheusAlert
+from robusta.integrations.prometheus.trigger import AlertEventBuilder, PrometheusTriggerEvent, ResourceMapping
+
+API_LATENCY_SEC = 0.05
+
+
+class FakeApiServer:
+    """Counts the reads of each object, each read takes API_LATENCY_SEC"""
+
+    def __init__(self):
+        self.reads: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.barrier: Optional[threading.Barrier] = None  # when set, reads wait for each other
+
+    def reader(self, hikaru_class):
+        api_server = self
+
+        class FakeResource:
+            def read(self, name: str, namespace: str = None, **kwargs):
+                with api_server.lock:
+                    key = f"{hikaru_class.__name__}/{namespace}/{name}"
+                    api_server.reads[key] = api_server.reads.get(key, 0) + 1
+                if api_server.barrier:
+                    api_server.barrier.wait()
+                time.sleep(API_LATENCY_SEC)
+                if name == "missing":
+                    raise Exception("not found")
+                return hikaru_class(metadata=ObjectMeta(name=name, namespace=namespace))
+
+        FakeResource.__name__ = hikaru_class.__name__
+        return FakeResource
+
+
+@pytest.fixture
+def api_server(monkeypatch) -> FakeApiServer:
+    server = FakeApiServer()
+    monkeypatch.setattr(
+        trigger,
+        "MAPPINGS",
+        [
+            ResourceMapping(server.reader(RobustaDeployment), "deployment", "deployment"),
+            ResourceMapping(server.reader(DaemonSet), "daemonset", "daemonset"),
+            ResourceMapping(server.reader(RobustaPod), "pod", "pod"),
+        ],
+    )
+    monkeypatch.setattr(trigger, "Node", server.reader(Node))
+    monkeypatch.setattr(AlertEventBuilder, "object_cache", KubernetesObjectCache(ttl_sec=10))
+    monkeypatch.setattr(AlertEventBuilder, "node_index", NodeAddressIndex(list_func=list))
+    return server
+
+
+def make_event(**labels) -> PrometheusTriggerEvent:
+    alert = PrometheusAlert(
+        endsAt=datetime.now(),
+        startsAt=datetime.now(),
+        generatorURL="",
+        status="firing",
+        labels={"alertname": "TestAlert", "namespace": "default", **labels},
+        annotations={},
+    )
+    return PrometheusTriggerEvent(alert=alert)
+
+
+def cache_requests(result: str) -> float:
+    return REGISTRY.get_sample_value("kubernetes_object_cache_requests_total", {"kind": "RobustaPod", "result": result})
+
+
+class TestAlertEventBuilder:
+    def test_resources_loaded_concurrently(self, api_server):
+        # the reads only pass the barrier when all 4 run at the same time
+        api_server.barrier = threading.Barrier(4, timeout=5)
+        event = AlertEventBuilder.build_event(
+            make_event(deployment="api", daemonset="agent", pod="api-1", node="node-1"), {}
+        )
+
+        assert event.deployment.metadata.name == "api"
+        assert event.daemonset.metadata.name == "agent"
+        assert event.pod.metadata.name == "api-1"
+        assert event.node.metadata.name == "node-1"
+
+    def test_failed_load_leaves_attribute_empty(self, api_server):
+        event = AlertEventBuilder.build_event(make_event(deployment="missing", pod="api-1"), {})
+        assert event.deployment is None
+        assert event.pod.metadata.name == "api-1"
+
+    def test_deadline(self, api_server, monkeypatch):
+        monkeypatch.setattr(trigger, "ALERT_RESOURCES_LOAD_TIMEOUT_SEC", API_LATENCY_SEC / 5)
+        event = AlertEventBuilder.build_event(make_event(pod="api-1"), {})
+        assert event.pod is None
+
+    def test_alert_burst_reads_once(self, api_server):
+        hits_before = cache_requests("hit") or 0
+        events = [make_event(pod="api-1", alertname=f"alert-{i}") for i in range(20)]
+        threads = [threading.Thread(target=AlertEventBuilder.build_event, args=(event, {})) for event in events]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert api_server.reads == {"RobustaPod/default/api-1": 1}
+        assert cache_requests("hit") - hits_before == 19
+
+    def test_each_event_gets_its_own_copy(self, api_server):
+        first = AlertEventBuilder.build_event(make_event(pod="api-1"), {})
+        first.pod.metadata.name = "changed"
+        second = AlertEventBuilder.build_event(make_event(pod="api-1"), {})
+        assert second.pod.metadata.name == "api-1"
+        assert api_server.reads == {"RobustaPod/default/api-1": 1}
+
+
+class TestKubernetesObjectCache:
+    def test_failed_reads_not_cached(self):
+        cache = KubernetesObjectCache(ttl_sec=10)
+
+        def fail():
+            raise Exception("api server error")
+
+        with pytest.raises(Exception, match="api server error"):
+            cache.get("Pod", "default", "api-1", fail)
+        pod = cache.get("Pod", "default", "api-1", lambda: RobustaPod(metadata=ObjectMeta(name="api-1")))
+        assert pod.metadata.name == "api-1"
+
+    def test_expired(self):
+        cache = KubernetesObjectCache(ttl_sec=0.01)
+        reads = []
+
+        def read():
+            reads.append(1)
+            return RobustaPod(metadata=ObjectMeta(name="api-1"))
+
+        cache.get("Pod", "default", "api-1", read)
+        time.sleep(0.02)
+        cache.get("Pod", "default", "api-1", read)
+        assert len(reads) == 2
+
+    def test_disabled(self):
+        cache = KubernetesObjectCache(ttl_sec=0)
+        reads = []
+
+        def read():
+            reads.append(1)
+            return RobustaPod(metadata=ObjectMeta(name="api-1"))
+
+        cache.get("Pod", "default", "api-1", read)
+        cache.get("Pod", "default", "api-1", read)
+        assert len(reads) == 2
@@ -0,0 +1,122 @@
+import math
+
+import numpy as np
+import pytest
+from prometrix import PrometheusQueryResult
+
+from robusta.core.model.base_params import ChartValuesFormat
+from robusta.core.model.env_vars import CHART_MAX_POINTS_PER_SERIES
+from robusta.core.playbooks import prometheus_enrichment_utils
+from robusta.core.playbooks.prometheus_enrichment_utils import (
+    build_chart_from_prometheus_result,
+    get_series_plot_values,
+)
+from robusta.utils.downsampling import lttb
+
+BASE_TIMESTAMP = 1764072332
+
+
+def make_series(points: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    values = 100 + rng.normal(size=points).cumsum()
+    return {
+        "metric": {"pod": f"pod-{seed}", "namespace": "default"},
+        "values": [[BASE_TIMESTAMP + i * 15, str(value)] for i, value in enumerate(values.tolist())],
+    }
+
+
+def make_query_result(series_count: int, points: int) -> PrometheusQueryResult:
+    return PrometheusQueryResult(
+        data={"resultType": "matrix", "result": [make_series(points, seed) for seed in range(series_count)]}
+    )
+
+
+class TestLttb:
+    def test_short_series_unchanged(self):
+        x = np.arange(10, dtype=float)
+        y = np.arange(10, dtype=float)
+        sampled_x, sampled_y = lttb(x, y, 20)
+        assert sampled_x.tolist() == x.tolist()
+        assert sampled_y.tolist() == y.tolist()
+
+    def test_downsampled_to_threshold(self):
+        x = np.arange(3000, dtype=float)
+        y = np.sin(x / 50)
+        sampled_x, sampled_y = lttb(x, y, 100)
+        assert len(sampled_x) == len(sampled_y) == 100
+        assert sampled_x[0] == 0 and sampled_x[-1] == 2999
+        assert np.all(np.diff(sampled_x) > 0)
+        assert np.all(np.sin(sampled_x / 50) == sampled_y)
+
+    def test_keeps_spikes(self):
+        x = np.arange(3000, dtype=float)
+        y = np.zeros(3000)
+        y[1234] = 50
+        y[2345] = -20
+        sampled_x, sampled_y = lttb(x, y, 50)
+        assert 1234 in sampled_x.tolist()
+        assert 2345 in sampled_x.tolist()
+        assert sampled_y.max() == 50 and sampled_y.min() == -20
+
+
+class TestSeriesPlotValues:
+    def test_same_as_python_loop(self):
+        series = make_query_result(1, 300).series_list_result[0]
+        python_values, python_max, python_min_time, python_max_time = get_series_plot_values(series, vectorized=False)
+        values, max_value, min_time, max_time = get_series_plot_values(series, vectorized=True)
+
+        assert values == pytest.approx(python_values)
+        assert (max_value, min_time, max_time) == pytest.approx((python_max, python_min_time, python_max_time))
+
+    def test_downsampled(self):
+        series = make_query_result(1, 3000).series_list_result[0]
+        values, max_value, min_time, max_time = get_series_plot_values(series, vectorized=True)
+        assert len(values) == prometheus_enrichment_utils.CHART_MAX_POINTS_PER_SERIES
+        assert max_value == pytest.approx(max(float(value) for value in series["values"]))
+        assert (min_time, max_time) == (BASE_TIMESTAMP, BASE_TIMESTAMP + 2999 * 15)
+
+    def test_python_loop_by_default(self):
+        series = make_query_result(1, 3000).series_list_result[0]
+        assert get_series_plot_values(series) == get_series_plot_values(series, vectorized=False)
+
+    def test_downsampling_disabled(self, monkeypatch):
+        monkeypatch.setattr(prometheus_enrichment_utils, "CHART_MAX_POINTS_PER_SERIES", 0)
+        series = make_query_result(1, 3000).series_list_result[0]
+        values, _, _, _ = get_series_plot_values(series, vectorized=True)
+        assert len(values) == 3000
+
+    def test_nan_values(self):
+        series = make_query_result(1, 3000).series_list_result[0]
+        series["values"][10] = "NaN"
+        python_values, python_max, _, _ = get_series_plot_values(series, vectorized=False)
+        values, max_value, _, _ = get_series_plot_values(series, vectorized=True)
+        assert len(values) == 3000  # not downsampled
+        assert math.isnan(values[10][1])
+        assert max_value == python_max
+
+    def test_negative_values(self):
+        series = {"metric": {}, "timestamps": [1.0, 2.0], "values": ["-1", "-2"]}
+        assert get_series_plot_values(series, vectorized=True)[1] == get_series_plot_values(series, vectorized=False)[1]
+
+
+class TestChartRendering:
+    def test_same_chart_range(self, monkeypatch):
+        query_result = make_query_result(3, 3000)
+        monkeypatch.setattr(prometheus_enrichment_utils, "CHART_VECTORIZED_SERIES", False)
+        python_chart = build_chart_from_prometheus_result(query_result, values_format=ChartValuesFormat.Plain)
+        monkeypatch.setattr(prometheus_enrichment_utils, "CHART_VECTORIZED_SERIES", True)
+        chart = build_chart_from_prometheus_result(query_result, values_format=ChartValuesFormat.Plain)
+
+        assert chart.range == pytest.approx(python_chart.range)
+        assert chart.y_labels == python_chart.y_labels
+
+    def test_50_series_3000_points(self, monkeypatch):
+        query_result = make_query_result(50, 3000)
+        charts = {}
+        for vectorized in [False, True]:
+            monkeypatch.setattr(prometheus_enrichment_utils, "CHART_VECTORIZED_SERIES", vectorized)
+            charts[vectorized] = build_chart_from_prometheus_result(query_result, values_format=ChartValuesFormat.Plain)
+
+        assert [len(values) for values, _ in charts[False].raw_series] == [3000] * 50
+        assert [len(values) for values, _ in charts[True].raw_series] == [CHART_MAX_POINTS_PER_SERIES] * 50
+        assert len(charts[True].render()) < len(charts[False].render()) / 2
@@ -0,0 +1,175 @@
+import re
+from typing import Dict, List
+from unittest.mock import Mock
+
+import pytest
+
+from robusta.core.reporting import Finding, FindingSubject
+from robusta.core.reporting.base import FilterableScopeMatcher
+from robusta.core.reporting.consts import FindingSubjectType
+from robusta.core.sinks.sink_base import SinkBase
+from robusta.core.sinks.sink_base_params import SinkBaseParams
+from robusta.utils.scope import CompiledScopeRule, ScopeParams, ValueMatcher, parse_label_selector
+
+NUM_SINKS = 20
+NUM_RULES = 10
+NUM_FINDINGS = 200
+
+
+class _TestSink(SinkBase):
+    def write_finding(self, finding: Finding, platform_enabled: bool):
+        pass
+
+
+class _TestSinkParams(SinkBaseParams):
+    @classmethod
+    def _get_sink_type(cls):
+        return "test"
+
+
+def legacy_rule_matches(data: Dict, rule: Dict[str, List[str]]) -> bool:
+    # the matching logic before compilation, kept as a reference for the benchmark
+    for attr_name, attr_matchers in rule.items():
+        attr_value = data[attr_name]
+        if attr_name in ["labels", "annotations"]:
+            matched = False
+            for attr_matcher in attr_matchers:
+                all_match = True
+                for label_match in attr_matcher.split(","):
+                    label_name, label_regex = label_match.split("=", 1)
+                    label_name, label_regex = label_name.strip(), label_regex.strip()
+                    expect_match = not label_name.endswith("!")
+                    label_name = label_name.rstrip("!").rstrip()
+                    label_value = attr_value.get(label_name)
+                    if label_value is None or bool(re.fullmatch(label_regex, label_value.strip())) != expect_match:
+                        all_match = False
+                        break
+                matched = matched or all_match
+        else:
+            matched = any(re.fullmatch(attr_matcher, attr_value) for attr_matcher in attr_matchers)
+        if not matched:
+            return False
+    return True
+
+
+def make_scope(sink_index: int) -> ScopeParams:
+    include = []
+    for rule_index in range(NUM_RULES):
+        include.append(
+            {
+                "labels": [f"app=service-{rule_index}.*,tier!=test"],
+                "name": [f"pod-{sink_index}-{rule_index}-.*"],
+                "namespace": [f"namespace-{rule_index}"],
+            }
+        )
+    return ScopeParams(include=include, exclude=[{"namespace": ["kube-system"]}, {"title": ["Test.*"]}])
+
+
+def make_finding(index: int) -> Finding:
+    return Finding(
+        title=f"Crashing pod {index}",
+        aggregation_key="CrashLoopBackoff",
+        subject=FindingSubject(
+            name=f"pod-{index % NUM_SINKS}-{index % NUM_RULES}-abcde",
+            namespace=f"namespace-{index % (NUM_RULES * 2)}",
+            subject_type=FindingSubjectType.TYPE_POD,
+            labels={"app": f"service-{index % NUM_RULES}", "tier": "prod"},
+        ),
+    )
+
+
+class TestValueMatcher:
+    @pytest.mark.parametrize(
+        "pattern,value,expected_fullmatch,expected_match",
+        [
+            ("default", "default", True, True),
+            ("default", "default-2", False, True),
+            ("api-server", "api-server", True, True),
+            ("api.*", "api-server", True, True),
+            ("d[1-9]*", "d12x", False, True),
+            ("a|b", "b", True, True),
+        ],
+    )
+    def test_same_result_as_re(self, pattern, value, expected_fullmatch, expected_match):
+        matcher = ValueMatcher(pattern)
+        assert matcher.fullmatch(value) is expected_fullmatch is bool(re.fullmatch(pattern, value))
+        assert matcher.match(value) is expected_match is bool(re.match(pattern, value))
+
+    def test_literal_detection(self):
+        assert ValueMatcher("my-namespace").is_literal()
+        assert not ValueMatcher("my-namespace.*").is_literal()
+        assert not ValueMatcher("(?i)default").is_literal()
+
+    def test_parse_label_selector(self):
+        predicates = parse_label_selector(" app = api.* , tier != test ")
+        assert [(predicate.name, predicate.matcher.pattern, predicate.expect_match) for predicate in predicates] == [
+            ("app", "api.*", True),
+            ("tier", "test", False),
+        ]
+        assert parse_label_selector(" app = api.* , tier != test ") is predicates
+
+
+class TestCompiledScopeRule:
+    def test_cheap_attributes_first(self):
+        rule = CompiledScopeRule(
+            {"labels": ["app=x"], "title": ["crash.*"], "namespace": ["default"], "attributes": ["spec.x=y"]}
+        )
+        assert [attribute.name for attribute in rule.attributes] == ["namespace", "title", "labels", "attributes"]
+
+    def test_scope_is_compiled_once(self):
+        scope = ScopeParams(include=[{"namespace": "default"}])
+        assert scope.compiled_include is scope.compiled_include
+        assert scope.compiled_exclude is None
+        assert not scope.uses_attribute("namespace_labels")
+
+    def test_namespace_labels_fetched_only_when_used(self, monkeypatch):
+        get_namespace_labels = Mock(return_value={"team": "sre"})
+        monkeypatch.setattr("robusta.core.reporting.base.get_namespace_labels", get_namespace_labels)
+        finding = make_finding(0)
+
+        assert finding.matches({}, ScopeParams(include=[{"namespace": "namespace-0"}]))
+        get_namespace_labels.assert_not_called()
+
+        assert finding.matches({}, ScopeParams(include=[{"namespace_labels": "team=sre"}]))
+        get_namespace_labels.assert_called_once_with("namespace-0")
+
+
+class TestScopeLegacyEquivalence:
+    def test_20_sinks_10_rules(self):
+        sinks = [
+            _TestSink(sink_params=_TestSinkParams(name=f"sink-{i}", scope=make_scope(i)), registry=Mock())
+            for i in range(NUM_SINKS)
+        ]
+        findings = [make_finding(i) for i in range(NUM_FINDINGS)]
+        scopes = [sink.params.scope for sink in sinks]
+        findings_data = [make_finding(i).attribute_map for i in range(NUM_FINDINGS)]
+
+        legacy_results = [
+            [
+                not any(legacy_rule_matches(data, rule) for rule in scope.exclude)
+                and any(legacy_rule_matches(data, rule) for rule in scope.include)
+                for scope in scopes
+            ]
+            for data in findings_data
+        ]
+        compiled_results = []
+        for data in findings_data:
+            matcher = FilterableScopeMatcher(data)
+            compiled_results.append(
+                [
+                    not matcher.scope_inc_exc_matches(scope.compiled_exclude)
+                    and matcher.scope_inc_exc_matches(scope.compiled_include)
+                    for scope in scopes
+                ]
+            )
+
+        assert compiled_results == legacy_results
+        assert any(any(results) for results in compiled_results)
+        accepted = [[sink.accepts(finding) for sink in sinks] for finding in findings]
+        assert accepted == legacy_results
+
+    def test_filterable_scope_matcher_with_compiled_rules(self):
+        data = make_finding(3).attribute_map
+        matcher = FilterableScopeMatcher(data)
+        scope = make_scope(3)
+        assert matcher.scope_inc_exc_matches(scope.compiled_include) == matcher.scope_inc_exc_matches(scope.include)
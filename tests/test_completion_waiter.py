@@ -0,0 +1,243 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+import pytest
+from kubernetes.client import V1Job, V1JobStatus, V1ObjectMeta, V1Pod, V1PodStatus
+from kubernetes.client.exceptions import ApiException
+
+from robusta.integrations.kubernetes import api_client_utils, completion_waiter
+from robusta.integrations.kubernetes.api_client_utils import (
+    FAILED_STATE,
+    RUNNING_STATE,
+    SUCCEEDED_STATE,
+    wait_for_pod_status,
+    wait_until_job_complete,
+)
+from robusta.integrations.kubernetes.completion_waiter import CompletionWaiter, WaitedKind
+
+
+def make_pod(name: str, phase: str = "Pending") -> V1Pod:
+    return V1Pod(metadata=V1ObjectMeta(name=name, namespace="default"), status=V1PodStatus(phase=phase))
+
+
+def make_job(name: str, failed: int = None) -> V1Job:
+    return V1Job(metadata=V1ObjectMeta(name=name, namespace="default"), status=V1JobStatus(failed=failed))
+
+
+class FakeApiServer:
+    """In memory pods and jobs of the default namespace, with reads, lists and blocking watches. Counts the calls"""
+
+    def __init__(self):
+        self.resource_version = 0
+        self.objects: Dict[Tuple[str, str], Any] = {}
+        self.events: List[Tuple[int, str, str, Any]] = []  # resourceVersion, kind, event type, object
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.list_error = None
+        self.condition = threading.Condition()
+
+    def apply(self, kind: str, obj: Any):
+        with self.condition:
+            self.resource_version += 1
+            event_type = "MODIFIED" if (kind, obj.metadata.name) in self.objects else "ADDED"
+            self.objects[(kind, obj.metadata.name)] = obj
+            self.events.append((self.resource_version, kind, event_type, obj))
+            self.condition.notify_all()
+
+    def apply_later(self, delay_sec: float, kind: str, obj: Any):
+        timer = threading.Timer(delay_sec, self.apply, args=(kind, obj))
+        timer.daemon = True
+        timer.start()
+
+    def read(self, kind: str, name: str) -> Any:
+        with self.condition:
+            self.calls["get"] += 1
+            obj = self.objects.get((kind, name))
+        if obj is None:
+            raise ApiException(status=404, reason="Not Found")
+        return obj
+
+    def list_func(self, kind: str):
+        def list_objects(limit: int = None, _continue: str = None, field_selector: str = None, **kwargs):
+            with self.condition:
+                self.calls["list"] += 1
+                if self.list_error:
+                    raise self.list_error
+                return SimpleNamespace(
+                    items=[obj for (obj_kind, _), obj in self.objects.items() if obj_kind == kind],
+                    metadata=SimpleNamespace(resource_version=str(self.resource_version), _continue=None),
+                )
+
+        list_objects.kind = kind
+        return list_objects
+
+    def kinds(self) -> Dict[str, WaitedKind]:
+        return {
+            kind: WaitedKind(
+                lambda namespace, kind=kind: self.list_func(kind),
+                lambda name, namespace, kind=kind: self.read(kind, name),
+            )
+            for kind in ["Pod", "Job"]
+        }
+
+    def watch(self) -> "FakeWatch":
+        return FakeWatch(self)
+
+
+class FakeWatch:
+    def __init__(self, server: FakeApiServer):
+        self.server = server
+        self.stopped = False
+
+    def stream(self, func, resource_version: str, timeout_seconds: int = 60, **kwargs):
+        with self.server.condition:
+            self.server.calls["watch"] += 1
+        deadline = time.monotonic() + timeout_seconds
+        last_version = int(resource_version)
+        while not self.stopped and time.monotonic() < deadline:
+            with self.server.condition:
+                events = [event for event in self.server.events if event[0] > last_version and event[1] == func.kind]
+                if not events:
+                    self.server.condition.wait(0.05)
+                    continue
+            for event_version, _, event_type, obj in events:
+                last_version = event_version
+                yield {
+                    "type": event_type,
+                    "object": obj,
+                    "raw_object": {"metadata": {"resourceVersion": str(event_version)}},
+                }
+
+    def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def server() -> FakeApiServer:
+    return FakeApiServer()
+
+
+@pytest.fixture
+def waiter(server, monkeypatch) -> CompletionWaiter:
+    waiter = CompletionWaiter(kinds=server.kinds(), idle_sec=0.1, resync_sec=30, watch_factory=server.watch)
+    monkeypatch.setattr(completion_waiter, "completion_waiter", waiter)
+    yield waiter
+    waiter.stop()
+
+
+def is_running(pod: V1Pod) -> bool:
+    return pod.status.phase == RUNNING_STATE
+
+
+class TestCompletionWaiter:
+    def test_woken_by_watch_event(self, server, waiter):
+        server.apply("Pod", make_pod("debugger"))
+        server.apply_later(0.3, "Pod", make_pod("debugger", RUNNING_STATE))
+
+        pod = waiter.wait("Pod", "default", "debugger", is_running, timeout_sec=5, poll_interval_sec=1)
+        assert pod.status.phase == RUNNING_STATE
+        # the pod is read before and after the waiter is registered, and then the watch wakes the waiter before the
+        # next poll
+        assert server.calls["get"] == 2
+
+    def test_already_reached(self, server, waiter):
+        server.apply("Pod", make_pod("debugger", RUNNING_STATE))
+        pod = waiter.wait("Pod", "default", "debugger", is_running, timeout_sec=5, poll_interval_sec=1)
+        assert pod.status.phase == RUNNING_STATE
+        assert server.calls["get"] == 1
+        assert server.calls["list"] == server.calls["watch"] == 0
+
+    def test_timeout(self, server, waiter):
+        server.apply("Pod", make_pod("debugger"))
+        assert waiter.wait("Pod", "default", "debugger", is_running, timeout_sec=0.3, poll_interval_sec=0.1) is None
+
+    def test_one_watch_per_namespace_and_kind(self, server, waiter):
+        for i in range(5):
+            server.apply("Pod", make_pod(f"pod-{i}"))
+            server.apply_later(0.2, "Pod", make_pod(f"pod-{i}", RUNNING_STATE))
+
+        def wait(i: int):
+            return waiter.wait("Pod", "default", f"pod-{i}", is_running, timeout_sec=5, poll_interval_sec=1)
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            pods = list(executor.map(wait, range(5)))
+
+        assert [pod.metadata.name for pod in pods] == [f"pod-{i}" for i in range(5)]
+        assert server.calls["list"] == 1
+        assert server.calls["watch"] == 1
+
+    def test_watch_stopped_when_idle(self, server, waiter):
+        def wait(name: str):
+            server.apply("Pod", make_pod(name))
+            server.apply_later(0.02, "Pod", make_pod(name, RUNNING_STATE))
+            waiter.wait("Pod", "default", name, is_running, timeout_sec=5, poll_interval_sec=1)
+
+        wait("debugger-1")
+        time.sleep(0.05)
+        wait("debugger-2")
+        time.sleep(0.2)
+        wait("debugger-3")
+        time.sleep(0.05)
+        # the watch is reused by the second wait, and restarted by the third one
+        assert server.calls["list"] == 2
+
+    def test_polling_when_watch_unavailable(self, server, waiter):
+        server.list_error = ApiException(status=403, reason="Forbidden")
+        server.apply("Pod", make_pod("debugger"))
+        server.apply_later(0.3, "Pod", make_pod("debugger", RUNNING_STATE))
+
+        pod = waiter.wait("Pod", "default", "debugger", is_running, timeout_sec=5, poll_interval_sec=0.1)
+        assert pod.status.phase == RUNNING_STATE
+        assert server.calls["get"] >= 3
+
+    def test_failed_pod_not_waited_until_timeout(self, server, waiter):
+        server.apply("Pod", make_pod("debugger", RUNNING_STATE))
+        server.apply_later(0.1, "Pod", make_pod("debugger", FAILED_STATE))
+        # a timeout would return FAIL, instead of the phase the pod completed in
+        assert wait_for_pod_status("debugger", "default", SUCCEEDED_STATE, 5, 0.2) == FAILED_STATE
+
+    def test_job_complete(self, server, waiter, monkeypatch):
+        monkeypatch.setattr(
+            api_client_utils,
+            "Job",
+            SimpleNamespace(readNamespacedJob=lambda name, namespace: SimpleNamespace(obj=name)),
+        )
+        server.apply("Job", make_job("krr"))
+        server.apply_later(0.1, "Job", make_job("krr", failed=1))
+        job = SimpleNamespace(metadata=SimpleNamespace(name="krr", namespace="default"))
+        assert wait_until_job_complete(job, 5) == "krr"
+
+        server.apply("Job", make_job("popeye"))
+        with pytest.raises(Exception):
+            wait_until_job_complete(SimpleNamespace(metadata=SimpleNamespace(name="popeye", namespace="default")), 0.2)
+
+    def test_fewer_api_calls_than_polling(self, server, waiter, monkeypatch):
+        pods = 10
+
+        def wait_for_pods(prefix: str) -> int:
+            calls = sum(server.calls.values())
+            for i in range(pods):
+                server.apply("Pod", make_pod(f"{prefix}-{i}"))
+                server.apply_later(0.5, "Pod", make_pod(f"{prefix}-{i}", RUNNING_STATE))
+
+            def wait(i: int):
+                assert wait_for_pod_status(f"{prefix}-{i}", "default", RUNNING_STATE, 10, 0.1) == RUNNING_STATE
+
+            with ThreadPoolExecutor(max_workers=pods) as executor:
+                list(executor.map(wait, range(pods)))
+            return sum(server.calls.values()) - calls
+
+        core_api = SimpleNamespace(read_namespaced_pod_status=lambda name, namespace: server.read("Pod", name))
+        monkeypatch.setattr(api_client_utils, "core_v1_api", SimpleNamespace(CoreV1Api=lambda: core_api))
+        monkeypatch.setattr(api_client_utils, "COMPLETION_WAITER_ENABLED", False)
+        polling_calls = wait_for_pods("polled")
+
+        monkeypatch.setattr(api_client_utils, "COMPLETION_WAITER_ENABLED", True)
+        watch_calls = wait_for_pods("watched")
+
+        # every pod is polled a few times, while the watched pods are read once, and share the watches
+        assert polling_calls >= pods * 3
+        assert watch_calls < polling_calls / 2
@@ -0,0 +1,244 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Set
+
+import pytest
+from prometheus_client import REGISTRY
+
+from robusta.integrations.kubernetes import custom_models
+from robusta.integrations.kubernetes.custom_models import (
+    DEBUGGER_POOL_LABEL,
+    DEBUGGER_POOL_RUN_ID,
+    delete_orphan_debugger_pods,
+)
+from robusta.integrations.kubernetes.debugger_pool import DebuggerPodPool
+
+
+class FakeCluster:
+    """Creates and deletes fake debugger pods, and checks that a pod runs a single command at a time"""
+
+    def __init__(self):
+        self.created: List[SimpleNamespace] = []
+        self.deleted: List[str] = []
+        self.unhealthy: Set[str] = set()
+        self.orphans_deleted = 0
+        self.in_use: Set[str] = set()
+        self.lock = threading.Lock()
+
+    def create_pod(self, node_name: str, image: str, custom_annotations: Optional[Dict[str, str]]) -> SimpleNamespace:
+        with self.lock:
+            pod = SimpleNamespace(
+                metadata=SimpleNamespace(name=f"debug-{len(self.created)}", annotations=custom_annotations),
+                node_name=node_name,
+                image=image,
+            )
+            self.created.append(pod)
+        return pod
+
+    def delete_pod(self, pod: SimpleNamespace):
+        with self.lock:
+            self.deleted.append(pod.metadata.name)
+
+    def is_healthy(self, pod: SimpleNamespace) -> bool:
+        return pod.metadata.name not in self.unhealthy
+
+    def delete_orphans(self):
+        self.orphans_deleted += 1
+
+    def run(self, pod: SimpleNamespace, duration_sec: float = 0) -> str:
+        with self.lock:
+            assert pod.metadata.name not in self.in_use
+            assert pod.metadata.name not in self.deleted
+            self.in_use.add(pod.metadata.name)
+        time.sleep(duration_sec)
+        with self.lock:
+            self.in_use.remove(pod.metadata.name)
+        return pod.metadata.name
+
+
+def make_pool(cluster: FakeCluster, **kwargs) -> DebuggerPodPool:
+    params = dict(max_pods=10, idle_ttl_sec=60, max_pod_age_sec=600, lease_timeout_sec=1)
+    params.update(kwargs)
+    return DebuggerPodPool(cluster.create_pod, cluster.delete_pod, cluster.is_healthy, cluster.delete_orphans, **params)
+
+
+@pytest.fixture
+def cluster() -> FakeCluster:
+    return FakeCluster()
+
+
+def leases(result: str) -> float:
+    return REGISTRY.get_sample_value("debugger_pool_leases_total", {"result": result}) or 0
+
+
+class TestDebuggerPodPool:
+    def test_pod_reused(self, cluster):
+        pool = make_pool(cluster)
+        reused = leases("reused")
+        names = []
+        for _ in range(5):
+            with pool.lease("node-1", "debug-toolkit") as pod:
+                names.append(cluster.run(pod))
+
+        assert names == ["debug-0"] * 5
+        assert len(cluster.created) == 1
+        assert leases("reused") - reused == 4
+        assert cluster.orphans_deleted == 1
+
+    def test_pods_per_node_image_and_annotations(self, cluster):
+        pool = make_pool(cluster)
+        for node_name, image, annotations in [
+            ("node-1", "debug-toolkit", None),
+            ("node-2", "debug-toolkit", None),
+            ("node-1", "java-toolkit", None),
+            ("node-1", "debug-toolkit", {"sidecar.istio.io/inject": "false"}),
+            ("node-2", "debug-toolkit", None),
+        ]:
+            with pool.lease(node_name, image, annotations) as pod:
+                assert (pod.node_name, pod.image, pod.metadata.annotations) == (node_name, image, annotations)
+        assert len(cluster.created) == 4
+
+    def test_pod_leased_by_one_command_at_a_time(self, cluster):
+        pool = make_pool(cluster)
+
+        def run_command(_):
+            with pool.lease("node-1", "debug-toolkit") as pod:
+                return cluster.run(pod, 0.05)
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(run_command, range(9)))
+        assert len(cluster.created) == 3
+
+    def test_pool_size_capped(self, cluster):
+        pool = make_pool(cluster, max_pods=2)
+        for node in ["node-1", "node-2", "node-3", "node-1"]:
+            with pool.lease(node, "debug-toolkit") as pod:
+                cluster.run(pod)
+            assert pool.pod_count() <= 2
+
+        # node-1 was the least recently used when node-3 needed room
+        assert cluster.deleted == ["debug-0", "debug-1"]
+        assert len(cluster.created) == 4
+
+    def test_one_off_pod_when_all_leased(self, cluster):
+        pool = make_pool(cluster, max_pods=1, lease_timeout_sec=0.05)
+        with pool.lease("node-1", "debug-toolkit") as pooled_pod:
+            with pool.lease("node-1", "debug-toolkit") as one_off_pod:
+                assert one_off_pod is not pooled_pod
+            assert cluster.deleted == [one_off_pod.metadata.name]
+        assert pool.pod_count() == 1
+
+    def test_waits_for_released_pod(self, cluster):
+        pool = make_pool(cluster, max_pods=1, lease_timeout_sec=5)
+        first_leased = threading.Event()
+
+        def hold_pod():
+            with pool.lease("node-1", "debug-toolkit") as pod:
+                first_leased.set()
+                cluster.run(pod, 0.1)
+
+        thread = threading.Thread(target=hold_pod)
+        thread.start()
+        first_leased.wait()
+        with pool.lease("node-1", "debug-toolkit") as pod:
+            cluster.run(pod)
+        thread.join()
+        assert len(cluster.created) == 1
+
+    def test_idle_pods_evicted(self, cluster):
+        pool = make_pool(cluster, idle_ttl_sec=0.05)
+        with pool.lease("node-1", "debug-toolkit"):
+            pass
+        time.sleep(0.3)
+        assert pool.pod_count() == 0
+        assert cluster.deleted == ["debug-0"]
+
+    def test_orphans_deleted_periodically(self, cluster):
+        pool = make_pool(cluster, cleanup_interval_sec=0.05)
+        with pool.lease("node-1", "debug-toolkit"):
+            pass
+        time.sleep(0.3)
+        # before the first pod is created, and then by the reaper
+        assert cluster.orphans_deleted >= 3
+        pool.stop()
+
+    def test_orphan_pods(self, monkeypatch):
+        def pool_pod(name: str, run_id: str, phase: str) -> SimpleNamespace:
+            return SimpleNamespace(
+                metadata=SimpleNamespace(name=name, labels={DEBUGGER_POOL_LABEL: run_id}),
+                status=SimpleNamespace(phase=phase),
+            )
+
+        pods = [
+            pool_pod("previous-run", "0123", "Running"),
+            pool_pod("deadline-exceeded", DEBUGGER_POOL_RUN_ID, "Failed"),
+            pool_pod("pooled", DEBUGGER_POOL_RUN_ID, "Running"),
+        ]
+        deleted = []
+        pod_list = SimpleNamespace(obj=SimpleNamespace(items=pods))
+        monkeypatch.setattr(
+            custom_models, "PodList", SimpleNamespace(listNamespacedPod=lambda namespace, label_selector: pod_list)
+        )
+        monkeypatch.setattr(custom_models, "delete_debugger_pod", lambda pod: deleted.append(pod.metadata.name))
+
+        delete_orphan_debugger_pods()
+        assert deleted == ["previous-run", "deadline-exceeded"]
+
+    def test_unhealthy_pod_replaced(self, cluster):
+        pool = make_pool(cluster)
+        with pool.lease("node-1", "debug-toolkit"):
+            pass
+        cluster.unhealthy.add("debug-0")
+        with pool.lease("node-1", "debug-toolkit") as pod:
+            assert pod.metadata.name == "debug-1"
+        assert cluster.deleted == ["debug-0"]
+
+    def test_old_pod_retired(self, cluster):
+        pool = make_pool(cluster, max_pod_age_sec=0.05)
+        with pool.lease("node-1", "debug-toolkit"):
+            pass
+        time.sleep(0.1)
+        with pool.lease("node-1", "debug-toolkit") as pod:
+            assert pod.metadata.name == "debug-1"
+
+    def test_failed_command_discards_pod(self, cluster):
+        pool = make_pool(cluster)
+        with pytest.raises(RuntimeError):
+            with pool.lease("node-1", "debug-toolkit"):
+                raise RuntimeError("exec failed")
+        assert cluster.deleted == ["debug-0"]
+        assert pool.pod_count() == 0
+
+    def test_stop_deletes_pods(self, cluster):
+        pool = make_pool(cluster)
+        with pool.lease("node-1", "debug-toolkit"):
+            pass
+        with pool.lease("node-2", "debug-toolkit"):
+            pool.stop()
+            assert cluster.deleted == ["debug-0"]
+        assert cluster.deleted == ["debug-0", "debug-1"]
+        assert pool.pod_count() == 0
+
+    def test_pods_created_per_node(self):
+        commands = 30
+        nodes = 3
+
+        def burst(pooled: bool) -> int:
+            cluster = FakeCluster()
+            pool = make_pool(cluster)
+            for i in range(commands):
+                node = f"node-{i % nodes}"
+                if pooled:
+                    with pool.lease(node, "debug-toolkit") as pod:
+                        cluster.run(pod, 0)
+                else:
+                    pod = cluster.create_pod(node, "debug-toolkit", None)
+                    cluster.run(pod, 0)
+                    cluster.delete_pod(pod)
+            pool.stop()
+            return len(cluster.created)
+
+        assert burst(pooled=False) == commands
+        assert burst(pooled=True) == nodes
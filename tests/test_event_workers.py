@@ -0,0 +1,319 @@
+import itertools
+import os
+import pickle
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from unittest.mock import Mock
+
+import pytest
+from hikaru.model.rel_1_26 import Node, ObjectMeta
+from prometheus_client import REGISTRY, generate_latest
+
+from robusta.core.discovery.top_service_resolver import TopLevelResource, TopServiceResolver
+from robusta.core.model.env_vars import ALERT_RESOURCES_LOAD_WORKERS
+from robusta.core.model.events import ExecutionBaseEvent
+from robusta.core.model.helm_release import HelmRelease
+from robusta.core.playbooks.base_trigger import TriggerEvent
+from robusta.core.playbooks.playbooks_event_handler_impl import PlaybooksEventHandlerImpl
+from robusta.core.playbooks.prometheus_query_cache import prometheus_query_cache
+from robusta.core.reporting import Finding, MarkdownBlock, TableBlock
+from robusta.core.reporting.blocks import FileBlock
+from robusta.core.triggers.helm_releases_triggers import HelmReleasesTriggerEvent
+from robusta.integrations.kubernetes.base_triggers import IncomingK8sEventPayload, K8sTriggerEvent
+from robusta.integrations.kubernetes.custom_models import debugger_pod_pool
+from robusta.integrations.prometheus.models import PrometheusAlert
+from robusta.integrations.prometheus.trigger import AlertEventBuilder, PrometheusTriggerEvent
+from robusta.model.config import Registry, SinksRegistry
+from robusta.runner.event_workers import EventWorkerPool, event_worker_restarts, fork_context
+
+
+def use_shared_state():
+    AlertEventBuilder.node_index.list_func = lambda: []
+    assert AlertEventBuilder.loader.submit(int).result(timeout=5) == 0
+    node = AlertEventBuilder.object_cache.get("Node", "", "forked-node", lambda: Node(metadata=ObjectMeta(name="a")))
+    assert node.metadata.name == "a"
+    assert AlertEventBuilder.node_index.get_node("forked-node") is None
+    prometheus_query_cache.clear()
+    TopServiceResolver.add_cached_resource(TopLevelResource(name="api", namespace="default", resource_type="Pod"))
+    event_worker_restarts.labels("test").inc()
+    assert b"event_worker_restarts" in generate_latest(REGISTRY)
+
+
+class FakeTriggerEvent(TriggerEvent):
+    key: Optional[str]
+    seq: int
+    work: int = 0  # cpu bound iterations
+    crash: bool = False
+    schedule: bool = False
+    debug: bool = False  # run a command in a debugger pod
+
+    def get_event_name(self) -> str:
+        return FakeTriggerEvent.__name__
+
+    def get_event_key(self) -> Optional[str]:
+        return self.key
+
+
+def burn_cpu(iterations: int) -> int:
+    total = 0
+    for i in range(iterations):
+        total += i * i % 7
+    return total
+
+
+class WorkerEventHandler(PlaybooksEventHandlerImpl):
+    """Handles the fake events like a playbook: burns cpu, and reports a finding with the handling process id"""
+
+    def handle_trigger(self, trigger_event: FakeTriggerEvent):
+        if trigger_event.crash:
+            os._exit(1)
+        burn_cpu(trigger_event.work)
+        aggregation_key = "fake"
+        if trigger_event.debug:
+            with debugger_pod_pool.lease("node-1", "debug-toolkit"):
+                pass
+            aggregation_key = f"pooled-pods:{debugger_pod_pool.pod_count()}"
+        if trigger_event.schedule:
+            self.registry.get_scheduler().schedule_action(burn_cpu, task_id=trigger_event.key, named_sinks=["sink"])
+            self.registry.get_sinks().get_all()["sink"].handle_service_diff(trigger_event.key, operation="update")
+
+        execution_event = ExecutionBaseEvent(named_sinks=["sink"])
+        execution_event.sink_findings["sink"].append(
+            Finding(
+                title=f"{trigger_event.key}:{trigger_event.seq}",
+                aggregation_key=aggregation_key,
+                description=str(os.getpid()),
+            )
+        )
+        self._PlaybooksEventHandlerImpl__handle_findings(execution_event)
+
+
+class FakeSink:
+    def __init__(self):
+        self.sink_name = "sink"
+        self.default = True
+        self.params = Mock(stop=False, delivery=None)
+        self.written: List[Finding] = []
+        self.service_diffs: List[Tuple] = []
+        self.lock = threading.Lock()
+
+    def accepts(self, finding: Finding) -> bool:
+        return True
+
+    def write_finding(self, finding: Finding, platform_enabled: bool):
+        with self.lock:
+            self.written.append(finding)
+
+    def handle_service_diff(self, new_obj, operation):
+        self.service_diffs.append((new_obj, operation, os.getpid()))
+
+    def titles(self, key: str) -> List[str]:
+        with self.lock:
+            return [finding.title for finding in self.written if finding.title.startswith(f"{key}:")]
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.scheduled: List[Tuple] = []
+
+    def schedule_action(self, action_func, task_id: str, named_sinks: List[str]):
+        self.scheduled.append((action_func, task_id, os.getpid()))
+
+
+def wait_for(condition, timeout: float = 10):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+@pytest.fixture
+def sink() -> FakeSink:
+    return FakeSink()
+
+
+@pytest.fixture
+def handler(sink) -> WorkerEventHandler:
+    registry = Registry()
+    registry.set_sinks(SinksRegistry({"sink": sink}))
+    registry.set_scheduler(FakeScheduler())
+    return WorkerEventHandler(registry)
+
+
+@pytest.fixture
+def make_pool(handler):
+    pools = []
+
+    def make(processes: int = 2, threads: int = 2) -> EventWorkerPool:
+        pool = EventWorkerPool(handler, Mock(), processes=processes, threads=threads)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.stop(timeout=5)
+
+
+class TestEventWorkerPool:
+    def test_findings_delivered_by_runner(self, make_pool, sink):
+        pool = make_pool()
+        for i in range(20):
+            pool.add_event(FakeTriggerEvent(key=f"pod-{i}", seq=0))
+
+        wait_for(lambda: len(sink.written) == 20)
+        worker_pids = {finding.description for finding in sink.written}
+        assert str(os.getpid()) not in worker_pids
+        assert 1 <= len(worker_pids) <= 2
+
+    def test_events_of_a_key_handled_in_order(self, make_pool, sink):
+        pool = make_pool(processes=2, threads=3)
+        keys = [f"alert-{i}" for i in range(5)]
+        for seq in range(30):
+            for key in keys:
+                pool.add_event(FakeTriggerEvent(key=key, seq=seq, work=(seq * 7919) % 5000))
+
+        wait_for(lambda: len(sink.written) == 150)
+        for key in keys:
+            assert sink.titles(key) == [f"{key}:{seq}" for seq in range(30)]
+            # all the events of a key are handled by the same worker
+            assert len({finding.description for finding in sink.written if finding.title.startswith(f"{key}:")}) == 1
+
+    def test_events_without_key_spread(self, make_pool, sink):
+        pool = make_pool(processes=2)
+        for seq in range(10):
+            pool.add_event(FakeTriggerEvent(key=None, seq=seq))
+
+        wait_for(lambda: len(sink.written) == 10)
+        assert len({finding.description for finding in sink.written}) == 2
+
+    def test_scheduler_and_sink_calls_forwarded(self, make_pool, sink, handler):
+        pool = make_pool()
+        pool.add_event(FakeTriggerEvent(key="deployment", seq=0, schedule=True))
+
+        wait_for(lambda: len(sink.written) == 1)
+        scheduler = handler.registry.get_scheduler()
+        wait_for(lambda: len(scheduler.scheduled) == 1 and len(sink.service_diffs) == 1)
+        assert scheduler.scheduled == [(burn_cpu, "deployment", os.getpid())]
+        assert sink.service_diffs == [("deployment", "update", os.getpid())]
+
+    def test_worker_restarted_after_crash(self, make_pool, sink):
+        pool = make_pool(processes=1)
+        pool.add_event(FakeTriggerEvent(key="pod", seq=0))
+        wait_for(lambda: len(sink.written) == 1)
+        pool.add_event(FakeTriggerEvent(key="pod", seq=1, crash=True))
+
+        def handled_after_restart() -> bool:
+            pool.add_event(FakeTriggerEvent(key="pod", seq=2))
+            time.sleep(0.1)
+            return "pod:2" in sink.titles("pod")
+
+        wait_for(handled_after_restart)
+        assert sink.written[0].description != sink.written[-1].description
+
+    def test_debugger_pods_not_pooled_by_workers(self, make_pool, sink, monkeypatch):
+        pods = itertools.count()
+        monkeypatch.setattr(debugger_pod_pool, "create_pod", lambda *args: f"debug-{next(pods)}")
+        monkeypatch.setattr(debugger_pod_pool, "delete_pod", lambda pod: None)
+        pool = make_pool(processes=1)
+        pool.add_event(FakeTriggerEvent(key="pod", seq=0, debug=True))
+
+        wait_for(lambda: len(sink.written) == 1)
+        assert sink.written[0].aggregation_key == "pooled-pods:0"
+
+    def test_config_reload_restarts_workers(self, make_pool, sink, handler):
+        pool = make_pool(processes=1)
+        pool.add_event(FakeTriggerEvent(key="pod", seq=0))
+        wait_for(lambda: len(sink.written) == 1)
+
+        handler.registry.get_event_emitter().emit_event("config_reload")
+        pool.add_event(FakeTriggerEvent(key="pod", seq=1))
+        wait_for(lambda: len(sink.written) == 2)
+        assert sink.written[0].description != sink.written[1].description
+
+    def test_stop_handles_queued_events(self, make_pool, sink):
+        pool = make_pool()
+        for seq in range(20):
+            pool.add_event(FakeTriggerEvent(key=f"pod-{seq % 4}", seq=seq, work=20_000))
+
+        pool.stop(timeout=30)
+        assert len(sink.written) == 20
+        pool.add_event(FakeTriggerEvent(key="pod", seq=20))
+        time.sleep(0.1)
+        assert len(sink.written) == 20
+
+    def test_event_keys(self):
+        alert = PrometheusAlert.construct(labels={"alertname": "KubePodCrashLooping"}, fingerprint="a1b2")
+        assert PrometheusTriggerEvent(alert=alert).get_event_key() == "a1b2"
+
+        def k8s_event(metadata: Dict) -> K8sTriggerEvent:
+            payload = IncomingK8sEventPayload(
+                operation="update", kind="Pod", clusterUid="c", description="", obj={"metadata": metadata}, oldObj={}
+            )
+            return K8sTriggerEvent(k8s_payload=payload)
+
+        assert k8s_event({"name": "api", "namespace": "default", "uid": "u-1"}).get_event_key() == "u-1"
+        assert k8s_event({"name": "api", "namespace": "default"}).get_event_key() == "Pod/default/api"
+
+        release = HelmRelease.construct(name="robusta", namespace="monitoring")
+        assert HelmReleasesTriggerEvent.construct(helm_release=release).get_event_key() == "monitoring/robusta"
+
+    def test_findings_pickled(self):
+        finding = Finding(title="title", aggregation_key="key")
+        finding.add_enrichment(
+            [MarkdownBlock("text"), TableBlock(rows=[["a", 1]], headers=["name", "count"]), FileBlock("f.txt", b"abc")]
+        )
+        finding.encoding.to_json(finding.enrichments[0].blocks[0])
+
+        sink_findings = pickle.loads(pickle.dumps({"slack": [finding], "jira": [finding]}))
+        copy = sink_findings["slack"][0]
+        assert copy is sink_findings["jira"][0]
+        assert copy.enrichments[0].blocks[2].contents == b"abc"
+        assert copy.encoding.to_json(copy.enrichments[0].blocks[0]) == finding.encoding.to_json(
+            finding.enrichments[0].blocks[0]
+        )
+
+    def test_workers_use_more_than_one_process(self, make_pool, sink):
+        pool = make_pool(processes=4, threads=1)
+        for i in range(40):
+            pool.add_event(FakeTriggerEvent(key=f"pod-{i}", seq=0, work=100_000))
+
+        wait_for(lambda: len(sink.written) == 40, timeout=60)
+        assert len({finding.description for finding in sink.written}) > 1
+
+    def test_state_held_by_runner_threads_reset_in_worker(self):
+        read_started, release = threading.Event(), threading.Event()
+
+        def blocked_read() -> Node:
+            read_started.set()
+            release.wait()
+            return Node(metadata=ObjectMeta(name="forked-node"))
+
+        def read_node():
+            return AlertEventBuilder.object_cache.get("Node", "", "forked-node", blocked_read)
+
+        # all the loader threads wait for a read of the node, and the runner threads hold the shared locks
+        loads = [AlertEventBuilder.loader.submit(read_node) for _ in range(ALERT_RESOURCES_LOAD_WORKERS)]
+        read_started.wait(5)
+        locks = [
+            prometheus_query_cache._PrometheusQueryCache__lock,
+            AlertEventBuilder.node_index._NodeAddressIndex__lock,
+            TopServiceResolver._TopServiceResolver__cached_updates_lock,
+            REGISTRY._lock,
+            event_worker_restarts._lock,
+        ]
+        for lock in locks:
+            lock.acquire()
+        try:
+            worker = fork_context.Process(target=use_shared_state)
+            worker.start()
+            worker.join(timeout=10)
+            if worker.exitcode is None:
+                worker.kill()
+        finally:
+            for lock in locks:
+                lock.release()
+            release.set()
+
+        assert worker.exitcode == 0
+        assert all(load.result(timeout=5).metadata.name == "forked-node" for load in loads)
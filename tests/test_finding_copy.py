@@ -0,0 +1,83 @@
+import copy
+import os
+import tracemalloc
+import uuid
+
+from robusta.core.reporting import FileBlock, Finding, FindingSubject, MarkdownBlock, TableBlock
+from robusta.core.reporting.base import Link
+from robusta.core.reporting.consts import FindingSubjectType
+from robusta.core.sinks.robusta.dal.model_conversion import ModelConversion
+
+NUM_SINKS = 8
+LOG_SIZE = 4 * 1024 * 1024
+TABLE_ROWS = 5000
+
+
+def make_finding() -> Finding:
+    finding = Finding(
+        title="OOMKilled",
+        aggregation_key="PodOOMKilled",
+        subject=FindingSubject(
+            name="api-123", namespace="default", subject_type=FindingSubjectType.TYPE_POD, labels={"app": "api"}
+        ),
+    )
+    finding.add_enrichment([MarkdownBlock("container was oom killed")])
+    finding.add_enrichment([FileBlock("api.log", os.urandom(LOG_SIZE))])
+    rows = [[f"pod-{i}", "Running", i] for i in range(TABLE_ROWS)]
+    finding.add_enrichment([TableBlock(rows=rows, headers=["name", "status", "restarts"])])
+    finding.add_link(Link(url="https://example.com", name="example"))
+    return finding
+
+
+def peak_memory(copy_func) -> int:
+    finding = make_finding()
+    tracemalloc.start()
+    copies = [copy_func(finding) for _ in range(NUM_SINKS)]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(copies) == NUM_SINKS
+    return peak
+
+
+class TestFindingCopyForSink:
+    def test_sink_changes_are_isolated(self):
+        finding = make_finding()
+        finding_copy = finding.copy_for_sink()
+
+        finding_copy.title = "changed"
+        finding_copy.dirty = True
+        finding_copy.subject.labels["team"] = "sre"
+        finding_copy.links[0].name = "changed"
+        finding_copy.add_link(Link(url="https://example.com/other", name="other"), suppress_warning=True)
+        finding_copy.enrichments[0].blocks = [MarkdownBlock("replaced")]
+        finding_copy.enrichments[1].annotations["rendered"] = "true"
+        finding_copy.add_enrichment([MarkdownBlock("sink only")], suppress_warning=True)
+
+        assert finding.title == "OOMKilled"
+        assert not finding.dirty
+        assert finding.subject.labels == {"app": "api"}
+        assert [link.name for link in finding.links] == ["example"]
+        assert finding.enrichments[0].blocks[0].text == "container was oom killed"
+        assert finding.enrichments[1].annotations == {}
+        assert len(finding.enrichments) == 3
+
+    def test_blocks_are_shared(self):
+        finding = make_finding()
+        finding_copy = finding.copy_for_sink()
+
+        assert finding_copy.id == finding.id
+        assert finding_copy.enrichments[1] is not finding.enrichments[1]
+        assert finding_copy.enrichments[1].blocks[0] is finding.enrichments[1].blocks[0]
+
+    def test_evidence_conversion_does_not_modify_shared_blocks(self):
+        finding = make_finding()
+        file_block = finding.enrichments[1].blocks[0]
+        contents = file_block.contents
+
+        ModelConversion.to_evidence_json("account", "cluster", "sink", "key", uuid.uuid4(), finding.enrichments[1])
+
+        assert file_block.filename == "api.log"
+        assert file_block.contents is contents
+
+    def test_copies_do_not_duplicate_blocks(self):
+        assert peak_memory(lambda finding: finding.copy_for_sink()) < peak_memory(copy.deepcopy) / 10
@@ -0,0 +1,168 @@
+import copy
+import json
+import uuid
+from typing import List
+from unittest.mock import Mock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from robusta.core.reporting import Finding, FindingSubject, HeaderBlock, MarkdownBlock, TableBlock
+from robusta.core.reporting.base import Link
+from robusta.core.reporting.consts import FindingSubjectType
+from robusta.core.reporting.finding_encoding import SizeLimitedJsonObject
+from robusta.core.sinks.robusta.dal.model_conversion import ModelConversion
+from robusta.core.sinks.webhook import webhook_sink
+from robusta.core.sinks.webhook.webhook_sink import WebhookSink
+from robusta.core.sinks.webhook.webhook_sink_params import WebhookSinkConfigWrapper, WebhookSinkParams
+
+NUM_SINKS = 5
+NUM_ENRICHMENTS = 20
+TABLE_ROWS = 200
+
+
+class FakeTransport:
+    def __init__(self):
+        self.bodies: List[bytes] = []
+
+    def post(self, url, data=None, json=None, headers=None):
+        self.bodies.append(data)
+        return Mock()
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    fake = FakeTransport()
+    monkeypatch.setattr(webhook_sink, "http_transport", fake)
+    return fake
+
+
+def make_sink(name: str = "webhook", size_limit: int = 10_000_000, format: str = "json") -> WebhookSink:
+    registry = Mock()
+    registry.get_global_config.return_value = {"account_id": "acc", "cluster_name": "prod"}
+    params = WebhookSinkParams(name=name, url="http://webhook", size_limit=size_limit, format=format)
+    return WebhookSink(WebhookSinkConfigWrapper(webhook_sink=params), registry)
+
+
+def make_finding(enrichments: int = NUM_ENRICHMENTS) -> Finding:
+    finding = Finding(
+        title="CrashLoopBackOff",
+        aggregation_key="CrashLoopBackOff",
+        subject=FindingSubject(
+            name="api-123", namespace="default", subject_type=FindingSubjectType.TYPE_POD, labels={"app": "api"}
+        ),
+    )
+    rows = [[f"pod-{i}", "Running", i, "ünïcode"] for i in range(TABLE_ROWS)]
+    for i in range(enrichments):
+        finding.add_enrichment(
+            [
+                HeaderBlock(f"enrichment {i}"),
+                MarkdownBlock(f"container *restarted* {i} times"),
+                TableBlock(rows=rows, headers=["name", "status", "restarts", "note"], table_name="pods"),
+            ],
+            title=f"enrichment {i}",
+        )
+    finding.add_link(Link(url="https://example.com", name="example"))
+    return finding
+
+
+def legacy_enrichments(finding: Finding):
+    """The enrichments of the webhook message, as they were encoded before the encoding cache"""
+    return json.loads(json.dumps(finding.enrichments, default=lambda o: getattr(o, "__dict__", str(o))))
+
+
+def sample(kind: str, result: str) -> float:
+    return REGISTRY.get_sample_value("finding_encoding_requests_total", {"kind": kind, "result": result}) or 0
+
+
+class TestFindingEncoding:
+    def test_webhook_json_unchanged(self, transport):
+        finding = make_finding(enrichments=3)
+        make_sink().write_finding(finding, platform_enabled=False)
+
+        message = json.loads(transport.bodies[0])
+        assert message["enrichments"] == legacy_enrichments(finding)
+        assert message["title"] == "CrashLoopBackOff"
+        assert message["subject"]["labels"] == {"app": "api"}
+        assert list(message.keys())[-1] == "enrichments"
+
+    def test_webhook_size_limit(self, transport):
+        finding = make_finding(enrichments=3)
+        make_sink(size_limit=1000).write_finding(finding, platform_enabled=False)
+
+        message = json.loads(transport.bodies[0])
+        assert "enrichments" not in message
+        assert message["title"] == "CrashLoopBackOff"
+        assert len(transport.bodies[0]) <= 1000
+
+    def test_size_limit_counts_like_single_key_objects(self):
+        values = {"title": "a" * 10, "description": "ü" * 20, "labels": {"app": "api"}, "enrichments": [1, 2, 3]}
+        for size_limit in range(0, 200, 7):
+            expected = {}
+            size = 0
+            for key, value in values.items():
+                pair_size = len(json.dumps({key: value}).encode("utf-8"))
+                if size + pair_size > size_limit:
+                    break
+                expected[key] = value
+                size += pair_size
+
+            message = SizeLimitedJsonObject(size_limit)
+            for key, value in values.items():
+                if not message.add(key, json.dumps(value)):
+                    break
+            assert json.loads(message.to_json()) == expected
+            assert message.size == size
+
+    def test_evidence_unchanged(self):
+        finding = make_finding(enrichments=1)
+        without_cache = ModelConversion.to_evidence_json(
+            "acc", "prod", "sink", "key", finding.id, finding.enrichments[0]
+        )
+        with_cache = ModelConversion.to_evidence_json(
+            "acc", "prod", "sink", "key", finding.id, finding.enrichments[0], finding.encoding
+        )
+        assert with_cache == without_cache
+        assert [block["type"] for block in json.loads(with_cache["data"])] == [
+            "header",
+            "markdown",
+            "markdown",
+            "table",
+        ]
+
+    def test_empty_evidence(self):
+        finding = make_finding(enrichments=0)
+        finding.add_enrichment([MarkdownBlock("")])
+        evidence = ModelConversion.to_evidence_json(
+            "acc", "prod", "sink", "key", uuid.uuid4(), finding.enrichments[0], finding.encoding
+        )
+        assert evidence == {}
+
+    def test_encoding_shared_by_sink_copies(self, transport):
+        finding = make_finding(enrichments=2)
+        hits, misses = sample("json", "hit"), sample("json", "miss")
+        for i in range(NUM_SINKS):
+            make_sink(f"webhook-{i}").write_finding(finding.copy_for_sink(), platform_enabled=False)
+
+        assert len(set(transport.bodies)) == 1
+        blocks = 2 * 3
+        assert sample("json", "miss") - misses == blocks
+        assert sample("json", "hit") - hits == blocks * (NUM_SINKS - 1)
+
+    def test_deep_copy_has_own_encoding(self):
+        finding = make_finding(enrichments=1)
+        finding.encoding.to_json(finding.enrichments[0].blocks[0])
+        assert finding.copy_for_sink().encoding is finding.encoding
+        assert copy.deepcopy(finding).encoding is not finding.encoding
+
+    def test_blocks_encoded_once_for_all_sinks(self, transport):
+        sinks = [make_sink(f"webhook-{i}") for i in range(NUM_SINKS)]
+        finding = make_finding()
+        misses = sample("json", "miss")
+        for sink in sinks:
+            sink.write_finding(finding.copy_for_sink(), platform_enabled=False)
+
+        assert sample("json", "miss") - misses == NUM_ENRICHMENTS * 3
+        assert len(transport.bodies) == NUM_SINKS
+        assert len(set(transport.bodies)) == 1
+        assert json.loads(transport.bodies[0])["enrichments"] == legacy_enrichments(finding)
@@ -0,0 +1,116 @@
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import pytest
+from hikaru.model.rel_1_26 import Node, NodeAddress, NodeStatus, ObjectMeta
+
+from robusta.integrations.kubernetes.node_index import NodeAddressIndex
+from robusta.integrations.prometheus.models import PrometheusAlert
+from robusta.integrations.prometheus.trigger import AlertEventBuilder, PrometheusTriggerEvent
+
+
+def make_node(name: str, internal_ip: str) -> Node:
+    return Node(
+        metadata=ObjectMeta(name=name),
+        status=NodeStatus(
+            addresses=[NodeAddress(type="InternalIP", address=internal_ip), NodeAddress(type="Hostname", address=name)]
+        ),
+    )
+
+
+class FakeCluster:
+    def __init__(self, nodes: Dict[str, str]):
+        self.nodes = nodes  # name -> internal ip
+        self.list_calls = 0
+        self.fail = False
+
+    def list_nodes(self) -> List[Node]:
+        self.list_calls += 1
+        if self.fail:
+            raise Exception("api server error")
+        return [make_node(name, ip) for name, ip in self.nodes.items()]
+
+
+@pytest.fixture
+def cluster() -> FakeCluster:
+    return FakeCluster({"node-1": "10.0.0.1", "node-2": "10.0.0.2"})
+
+
+def make_index(cluster: FakeCluster, refresh_sec: float = 60, min_refresh_sec: float = 15) -> NodeAddressIndex:
+    return NodeAddressIndex(refresh_sec=refresh_sec, min_refresh_sec=min_refresh_sec, list_func=cluster.list_nodes)
+
+
+class TestNodeAddressIndex:
+    def test_lookups(self, cluster):
+        index = make_index(cluster)
+        assert index.find_node_by_address("10.0.0.2").metadata.name == "node-2"
+        assert index.find_node_by_address("node-1").metadata.name == "node-1"  # Hostname address
+        assert index.get_node("node-1").status.addresses[0].address == "10.0.0.1"
+        assert cluster.list_calls == 1
+
+    def test_unknown_addresses_rate_limited(self, cluster):
+        index = make_index(cluster)
+        for _ in range(1000):
+            assert index.find_node_by_address("10.9.9.9") is None
+        assert cluster.list_calls == 1
+
+    def test_new_node_found_after_min_refresh(self, cluster):
+        index = make_index(cluster, min_refresh_sec=0.05)
+        assert index.get_node("node-3") is None
+        cluster.nodes["node-3"] = "10.0.0.3"
+        assert index.get_node("node-3") is None  # listed less than min_refresh_sec ago
+        time.sleep(0.05)
+        assert index.find_node_by_address("10.0.0.3").metadata.name == "node-3"
+        assert cluster.list_calls == 2
+
+    def test_ip_churn(self, cluster):
+        index = make_index(cluster, refresh_sec=0.05, min_refresh_sec=0.01)
+        assert index.find_node_by_address("10.0.0.1").metadata.name == "node-1"
+
+        # node-1 gets a new ip, and its old ip is reused by a new node
+        cluster.nodes["node-1"] = "10.0.0.11"
+        cluster.nodes["node-3"] = "10.0.0.1"
+        time.sleep(0.05)
+        assert index.find_node_by_address("10.0.0.1").metadata.name == "node-3"
+        assert index.find_node_by_address("10.0.0.11").metadata.name == "node-1"
+
+    def test_stale_entries_removed(self, cluster):
+        index = make_index(cluster, refresh_sec=0.05, min_refresh_sec=0.01)
+        assert index.get_node("node-2") is not None
+        del cluster.nodes["node-2"]
+        time.sleep(0.05)
+        assert index.get_node("node-2") is None
+        assert index.find_node_by_address("10.0.0.2") is None
+        assert index.get_node("node-1") is not None
+
+    def test_failed_listing_keeps_index(self, cluster):
+        index = make_index(cluster, refresh_sec=0.05, min_refresh_sec=0.05)
+        assert index.get_node("node-1") is not None
+        cluster.fail = True
+        time.sleep(0.05)
+        for _ in range(10):
+            assert index.get_node("node-1") is not None
+        assert cluster.list_calls == 2
+
+    def test_each_lookup_gets_its_own_copy(self, cluster):
+        index = make_index(cluster)
+        index.get_node("node-1").metadata.name = "changed"
+        assert index.get_node("node-1").metadata.name == "node-1"
+
+
+class TestAlertNodeLookup:
+    def test_alerts_with_node_ip(self, cluster, monkeypatch):
+        monkeypatch.setattr(AlertEventBuilder, "node_index", make_index(cluster))
+        for _ in range(100):
+            alert = PrometheusAlert(
+                endsAt=datetime.now(),
+                startsAt=datetime.now(),
+                generatorURL="",
+                status="firing",
+                labels={"alertname": "NodeExporterDown", "node": "10.0.0.2:9100"},
+                annotations={},
+            )
+            event = AlertEventBuilder.build_event(PrometheusTriggerEvent(alert=alert), {})
+            assert event.node.metadata.name == "node-2"
+        assert cluster.list_calls == 1
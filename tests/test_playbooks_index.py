@@ -0,0 +1,187 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from robusta.core.playbooks.playbooks_index import PlaybooksIndex
+from robusta.integrations.kubernetes.base_triggers import IncomingK8sEventPayload, K8sTriggerEvent
+from robusta.integrations.prometheus.models import PrometheusAlert
+from robusta.integrations.prometheus.trigger import PrometheusTriggerEvent
+from robusta.model.playbook_definition import PlaybookDefinition
+from robusta.utils.prefix_trie import PrefixTrie
+
+K8S_TRIGGERS = [
+    "on_pod_create",
+    "on_pod_update",
+    "on_pod_all_changes",
+    "on_deployment_update",
+    "on_deployment_all_changes",
+    "on_job_create",
+    "on_kubernetes_any_resource_all_changes",
+]
+KINDS = ["Pod", "Deployment", "Job", "ConfigMap"]
+OPERATIONS = ["create", "update", "delete"]
+NAMES = ["", "api", "api-server", "web", "worker", "worker-blue"]
+NAMESPACES = ["", "default", "prod", "prod-eu", "kube-system"]
+ALERT_NAMES = [None, "KubePodCrashLooping", "KubeJobFailed", "HostHighCpuLoad"]
+
+
+def make_playbook(triggers):
+    playbook = PlaybookDefinition(triggers=triggers, actions=[{"noop": {}}])
+    for action in playbook.get_actions():
+        action.set_func_hash("")
+    playbook.post_init()
+    return playbook
+
+
+def random_k8s_playbook(rand: random.Random) -> PlaybookDefinition:
+    trigger_params = {}
+    name_prefix = rand.choice(NAMES)
+    namespace_prefix = rand.choice(NAMESPACES)
+    if name_prefix:
+        trigger_params["name_prefix"] = name_prefix
+    if namespace_prefix:
+        trigger_params["namespace_prefix"] = namespace_prefix
+    return make_playbook([{rand.choice(K8S_TRIGGERS): trigger_params}])
+
+
+def random_alert_playbook(rand: random.Random) -> PlaybookDefinition:
+    trigger_params = {"status": rand.choice(["firing", "resolved", "all"])}
+    alert_name = rand.choice(ALERT_NAMES)
+    if alert_name:
+        trigger_params["alert_name"] = alert_name
+    return make_playbook([{"on_prometheus_alert": trigger_params}])
+
+
+def make_k8s_event(kind: str, operation: str, name: str, namespace: str) -> K8sTriggerEvent:
+    return K8sTriggerEvent(
+        k8s_payload=IncomingK8sEventPayload(
+            operation=operation,
+            kind=kind,
+            clusterUid="test",
+            description="test",
+            obj={"metadata": {"name": name, "namespace": namespace}},
+        )
+    )
+
+
+def make_alert_event(alert_name: str, status: str) -> PrometheusTriggerEvent:
+    return PrometheusTriggerEvent(
+        alert=PrometheusAlert(
+            endsAt=datetime.now(),
+            startsAt=datetime.now(),
+            generatorURL="",
+            status=status,
+            labels={"alertname": alert_name, "namespace": "default"},
+            annotations={},
+        )
+    )
+
+
+def random_k8s_event(rand: random.Random) -> K8sTriggerEvent:
+    return make_k8s_event(
+        rand.choice(KINDS),
+        rand.choice(OPERATIONS),
+        rand.choice(NAMES) + rand.choice(["", "-1", "-abcde"]),
+        rand.choice(NAMESPACES) + rand.choice(["", "-2"]),
+    )
+
+
+def fired_playbooks(playbooks, trigger_event):
+    return [
+        playbook.get_id()
+        for playbook in playbooks
+        if any(trigger.get().should_fire(trigger_event, playbook.get_id(), {}) for trigger in playbook.triggers)
+    ]
+
+
+class TestPrefixTrie:
+    def test_prefix_values(self):
+        trie = PrefixTrie()
+        trie.insert("", 0)
+        trie.insert("api", 1)
+        trie.insert("api-server", 2)
+        trie.insert("web", 3)
+        trie.insert("api", 4)
+
+        assert list(trie.iter_prefix_values("api-server-123")) == [[0], [1, 4], [2]]
+        assert list(trie.iter_prefix_values("ap")) == [[0]]
+        assert trie.longest_prefix_value("api-x") == 1
+        assert trie.longest_prefix_value("worker") == 0
+        assert len(trie) == 5
+
+    def test_remove(self):
+        trie = PrefixTrie()
+        trie.insert("api", 1)
+        trie.insert("api-server", 2)
+
+        assert trie.remove("api-server", 2)
+        assert not trie.remove("api-server", 2)
+        assert not trie.remove("missing", 1)
+        assert trie.longest_prefix_value("api-server-1") == 1
+        assert len(trie) == 1
+
+
+class TestPlaybooksIndex:
+    def test_k8s_candidates(self):
+        pod_update = make_playbook([{"on_pod_update": {"name_prefix": "api", "namespace_prefix": "prod"}}])
+        any_change = make_playbook([{"on_kubernetes_any_resource_all_changes": {}}])
+        deployment = make_playbook([{"on_deployment_create": {}}])
+        index = PlaybooksIndex([pod_update, any_change, deployment])
+
+        assert index.get_candidates(make_k8s_event("Pod", "update", "api-1", "prod")) == [pod_update, any_change]
+        assert index.get_candidates(make_k8s_event("Pod", "update", "web-1", "prod")) == [any_change]
+        assert index.get_candidates(make_k8s_event("Pod", "create", "api-1", "prod")) == [any_change]
+        assert index.get_candidates(make_k8s_event("Deployment", "create", "x", "y")) == [any_change, deployment]
+
+    def test_alert_candidates(self):
+        crash_firing = make_playbook([{"on_prometheus_alert": {"alert_name": "KubePodCrashLooping"}}])
+        crash_all = make_playbook([{"on_prometheus_alert": {"alert_name": "KubePodCrashLooping", "status": "all"}}])
+        any_alert = make_playbook([{"on_prometheus_alert": {}}])
+        index = PlaybooksIndex([crash_firing, crash_all, any_alert])
+
+        assert index.get_candidates(make_alert_event("KubePodCrashLooping", "firing")) == [
+            crash_firing,
+            crash_all,
+            any_alert,
+        ]
+        assert index.get_candidates(make_alert_event("KubePodCrashLooping", "resolved")) == [crash_all]
+        assert index.get_candidates(make_alert_event("Other", "firing")) == [any_alert]
+
+    def test_unindexed_triggers_are_always_candidates(self):
+        mixed = make_playbook([{"on_schedule": {"fixed_delay_repeat": {"repeat": 1, "seconds_delay": 10}}}])
+        pod = make_playbook([{"on_pod_create": {"name_prefix": "api"}}])
+        index = PlaybooksIndex([mixed, pod])
+
+        assert index.get_candidates(make_k8s_event("Job", "delete", "x", "y")) == [mixed]
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_same_result_as_linear_scan(self, seed):
+        rand = random.Random(seed)
+        playbooks = [random_k8s_playbook(rand) for _ in range(200)] + [random_alert_playbook(rand) for _ in range(50)]
+        index = PlaybooksIndex(playbooks)
+
+        for _ in range(300):
+            trigger_event = random_k8s_event(rand)
+            assert fired_playbooks(index.get_candidates(trigger_event), trigger_event) == fired_playbooks(
+                playbooks, trigger_event
+            )
+
+        for alert_name in ALERT_NAMES[1:] + ["Unknown"]:
+            for status in ["firing", "resolved"]:
+                trigger_event = make_alert_event(alert_name, status)
+                assert fired_playbooks(index.get_candidates(trigger_event), trigger_event) == fired_playbooks(
+                    playbooks, trigger_event
+                )
+
+    def test_index_narrows_candidates(self):
+        rand = random.Random(0)
+        playbooks = [random_k8s_playbook(rand) for _ in range(500)]
+        index = PlaybooksIndex(playbooks)
+
+        candidates = 0
+        for trigger_event in [random_k8s_event(rand) for _ in range(500)]:
+            indexed_candidates = index.get_candidates(trigger_event)
+            assert fired_playbooks(indexed_candidates, trigger_event) == fired_playbooks(playbooks, trigger_event)
+            candidates += len(indexed_candidates)
+        assert candidates < 500 * len(playbooks) / 2
@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+
+import pytest
+
+from robusta.core.playbooks.actions_registry import ActionsRegistry
+from robusta.runner.config_loader import ConfigLoader
+from robusta.runner.playbook_packages_tracker import PlaybookPackagesTracker, ReloadTimer, hash_directory
+
+ACTION_TEMPLATE = """
+import reload_log
+from robusta.core.model.events import ExecutionBaseEvent
+from robusta.core.playbooks.actions_registry import action
+
+reload_log.loads.append(__name__)
+
+
+@action
+def {name}(event: ExecutionBaseEvent):
+    return "{result}"
+"""
+
+
+@pytest.fixture
+def playbooks_dir(tmp_path, monkeypatch):
+    (tmp_path / "reload_log.py").write_text("loads = []\n")
+    for package in ["reload_pkg_a", "reload_pkg_b"]:
+        package_dir = tmp_path / package
+        package_dir.mkdir()
+        (package_dir / "__init__.py").write_text("")
+        (package_dir / "pyproject.toml").write_text(f'[tool.poetry]\nname = "{package}"\n')
+        (package_dir / "actions.py").write_text(ACTION_TEMPLATE.format(name=f"{package}_action", result="v1"))
+        (package_dir / "utils.py").write_text("VALUE = 1\n")
+
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path
+    for module in list(sys.modules):
+        if module.startswith(("reload_pkg_", "reload_log")):
+            del sys.modules[module]
+
+
+def make_loader() -> ConfigLoader:
+    # not initialized, so it doesn't watch the playbooks directory or load the runner config
+    loader = ConfigLoader.__new__(ConfigLoader)
+    loader.packages_tracker = PlaybookPackagesTracker()
+    return loader
+
+
+def import_packages(loader: ConfigLoader, *packages: str) -> ActionsRegistry:
+    actions_registry = ActionsRegistry()
+    for package in packages:
+        loader._ConfigLoader__import_playbooks_package(actions_registry, package)
+    return actions_registry
+
+
+def loads():
+    import reload_log
+
+    return reload_log.loads
+
+
+def rewrite(path, content: str):
+    path.write_text(content)
+    # make sure the modified source is not taken from a cached .pyc with the same mtime
+    os.utime(path, (time.time() + 5, time.time() + 5))
+
+
+class TestIncrementalReload:
+    def test_unchanged_packages_not_reimported(self, playbooks_dir):
+        loader = make_loader()
+        import_packages(loader, "reload_pkg_a", "reload_pkg_b")
+        assert sorted(loads()) == ["reload_pkg_a.actions", "reload_pkg_b.actions"]
+
+        actions_registry = import_packages(loader, "reload_pkg_a", "reload_pkg_b")
+        assert len(loads()) == 2
+        # the actions of unchanged packages are still registered
+        assert actions_registry.get_action("reload_pkg_a_action") is not None
+        assert actions_registry.get_action("reload_pkg_b_action") is not None
+
+    def test_changed_package_reimported(self, playbooks_dir):
+        loader = make_loader()
+        import_packages(loader, "reload_pkg_a", "reload_pkg_b")
+        loads().clear()
+
+        rewrite(
+            playbooks_dir / "reload_pkg_a" / "actions.py",
+            ACTION_TEMPLATE.format(name="reload_pkg_a_action", result="v2"),
+        )
+        actions_registry = import_packages(loader, "reload_pkg_a", "reload_pkg_b")
+
+        assert loads() == ["reload_pkg_a.actions"]
+        assert actions_registry.get_action("reload_pkg_a_action").func(None) == "v2"
+
+    def test_package_reimported_when_other_module_changed(self, playbooks_dir):
+        loader = make_loader()
+        import_packages(loader, "reload_pkg_a")
+        loads().clear()
+
+        rewrite(playbooks_dir / "reload_pkg_a" / "utils.py", "VALUE = 2\n")
+        import_packages(loader, "reload_pkg_a")
+        assert loads() == ["reload_pkg_a.actions"]
+
+    def test_new_module_imported(self, playbooks_dir):
+        loader = make_loader()
+        import_packages(loader, "reload_pkg_a")
+
+        (playbooks_dir / "reload_pkg_a" / "more_actions.py").write_text(
+            ACTION_TEMPLATE.format(name="reload_pkg_a_new_action", result="new")
+        )
+        actions_registry = import_packages(loader, "reload_pkg_a")
+        assert actions_registry.get_action("reload_pkg_a_new_action").func(None) == "new"
+
+    def test_unchanged_local_repo_not_installed(self, playbooks_dir, monkeypatch):
+        installs = []
+        monkeypatch.setattr(ConfigLoader, "install_package", classmethod(lambda cls, **kwargs: installs.append(kwargs)))
+        loader = make_loader()
+        pkg_path = str(playbooks_dir / "reload_pkg_a")
+        url = f"file://{pkg_path}"
+
+        for _ in range(3):
+            assert loader._ConfigLoader__install_local_package(url, pkg_path, False) == "reload_pkg_a"
+        assert len(installs) == 1
+
+        rewrite(playbooks_dir / "reload_pkg_a" / "utils.py", "VALUE = 2\n")
+        loader._ConfigLoader__install_local_package(url, pkg_path, False)
+        loader._ConfigLoader__install_local_package(url, pkg_path, True)  # build isolation changed
+        assert len(installs) == 3
+
+    def test_failed_install_retried(self, playbooks_dir, monkeypatch):
+        def fail(cls, **kwargs):
+            raise Exception("pip failed")
+
+        monkeypatch.setattr(ConfigLoader, "install_package", classmethod(fail))
+        loader = make_loader()
+        pkg_path = str(playbooks_dir / "reload_pkg_a")
+        with pytest.raises(Exception, match="pip failed"):
+            loader._ConfigLoader__install_local_package("file://pkg", pkg_path, False)
+
+        assert loader.packages_tracker.get_installed_package("file://pkg", hash_directory(pkg_path) + "-False") is None
+
+
+class TestReloadTimer:
+    def test_phases(self):
+        timer = ReloadTimer()
+        with timer.phase("packages"):
+            time.sleep(0.01)
+        with timer.phase("sinks"):
+            pass
+        assert timer.phases["packages"] >= 0.01
+        assert str(timer).startswith("packages: 0.0")
+        assert str(timer).endswith(", sinks: 0.00s")
@@ -0,0 +1,163 @@
+import re
+from typing import List
+
+import pytest
+from hikaru.model.rel_1_26 import Container, ObjectMeta, PodSpec
+from kubernetes.client.rest import ApiException
+
+from robusta.core.model.base_params import NamedRegexPattern
+from robusta.core.reporting.blocks import FileBlock
+from robusta.integrations.kubernetes import pod_logs
+from robusta.integrations.kubernetes.custom_models import RegexReplacementStyle, RobustaPod
+from robusta.integrations.kubernetes.pod_logs import LogLineProcessor, LogTail, process_log_stream
+
+REDACTIONS = [
+    NamedRegexPattern(name="ip", regex=r"\b(\d{1,3}\.){3}\d{1,3}\b"),
+    NamedRegexPattern(name="token", regex=r"token=[a-z0-9]+"),
+]
+
+LOG = "\n".join(
+    f"2024-05-01T10:00:{i % 60:02d} level={'error' if i % 7 == 0 else 'info'} client=10.0.{i % 255}.1 token=ab{i}cd "
+    f"request {i} took {i % 13}ms"
+    for i in range(2000)
+)
+
+
+def reference_logs(logs: str, patterns, style, filter_regex) -> str:
+    """The logs processing of RobustaPod.get_logs, before it was streamed"""
+    if logs and filter_regex:
+        logs = "\n".join(re.findall(re.compile(filter_regex), logs))
+    if logs and patterns:
+        for replacer in patterns:
+            if style == RegexReplacementStyle.NAMED:
+                logs = re.sub(replacer.regex, f"[{replacer.name.upper()}]", logs)
+            else:
+                logs = re.sub(replacer.regex, lambda match: "*" * len(match.group(0)), logs)
+    return logs
+
+
+def chunks(data: bytes, size: int = 1000):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class FakeLogResponse:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.released = False
+
+    def stream(self, amt: int):
+        return iter(chunks(self.data, amt))
+
+    def release_conn(self):
+        self.released = True
+
+
+@pytest.fixture
+def api_logs(monkeypatch):
+    responses: List[FakeLogResponse] = []
+    log = {"data": LOG.encode(), "status": None}
+
+    class FakeCoreV1Api:
+        def read_namespaced_pod_log(self, name, namespace, _preload_content=True, **kwargs):
+            assert _preload_content is False
+            if log["status"]:
+                raise ApiException(status=log["status"])
+            responses.append(FakeLogResponse(log["data"]))
+            return responses[-1]
+
+    monkeypatch.setattr(pod_logs.core_v1_api, "CoreV1Api", FakeCoreV1Api)
+    log["responses"] = responses
+    return log
+
+
+def make_pod() -> RobustaPod:
+    return RobustaPod(
+        metadata=ObjectMeta(name="api-1", namespace="default"), spec=PodSpec(containers=[Container(name="api")])
+    )
+
+
+class TestLogLineProcessor:
+    @pytest.mark.parametrize("style", [RegexReplacementStyle.NAMED, RegexReplacementStyle.SAME_LENGTH_ASTERISKS])
+    @pytest.mark.parametrize("filter_regex", [None, r".*level=error.*", r"client=\S+"])
+    def test_same_as_whole_log_processing(self, style, filter_regex):
+        processor = LogLineProcessor(
+            filter_regex, [(p.name, p.regex) for p in REDACTIONS], style == RegexReplacementStyle.NAMED
+        )
+        assert processor.combined is not None
+        result = process_log_stream(chunks(LOG.encode()), processor)
+        assert result.decode() == reference_logs(LOG, REDACTIONS, style, filter_regex)
+
+    def test_patterns_with_backreferences_applied_one_by_one(self):
+        processor = LogLineProcessor(redaction_patterns=[("quoted", r"(['\"]).*?\1"), ("ip", r"\d+\.\d+\.\d+\.\d+")])
+        assert processor.combined is None
+        assert processor.redact("user 'bob' from 10.0.0.1") == "user ***** from ********"
+
+    def test_patterns_with_inline_flags_applied_one_by_one(self):
+        processor = LogLineProcessor(
+            redaction_patterns=[("a", "x"), ("password", "(?i)password=\\S+")], named_redaction=True
+        )
+        assert processor.combined is None
+        assert processor.redact("x PASSWORD=123") == "[A] [PASSWORD]"
+
+
+class TestLogTail:
+    def test_keeps_last_lines(self):
+        tail = LogTail(max_bytes=10)
+        for line in [b"aaaa", b"bbbb", b"cccc"]:
+            tail.append(line)
+        assert tail.getvalue() == b"bbbb\ncccc"
+
+    def test_long_line_cut(self):
+        tail = LogTail(max_bytes=5)
+        tail.append(b"aa")
+        tail.append("xxé012".encode())
+        assert tail.getvalue() == b"012"  # the partial é is dropped too
+
+    def test_same_as_file_truncation(self):
+        data = LOG.encode()
+        tail = process_log_stream(chunks(data), max_bytes=50_000)
+        assert tail == FileBlock("pod.log", data).truncate_content(50_000)
+        assert len(tail) <= 50_000
+
+
+class TestRobustaPodLogs:
+    def test_get_logs(self, api_logs):
+        logs = make_pod().get_logs(regex_replacer_patterns=REDACTIONS, filter_regex=r".*level=error.*")
+        assert logs == reference_logs(LOG, REDACTIONS, None, r".*level=error.*")
+        assert api_logs["responses"][0].released
+
+    def test_log_contents_for_file_block(self, api_logs):
+        contents = make_pod().get_log_contents(max_bytes=10_000)
+        assert isinstance(contents, bytes)
+        assert len(contents) <= 10_000
+        assert LOG.encode().endswith(contents)
+
+    def test_missing_pod(self, api_logs):
+        api_logs["status"] = 404
+        assert make_pod().get_logs() is None
+
+    def test_api_error(self, api_logs):
+        api_logs["status"] = 500
+        assert make_pod().get_logs() == ""
+
+    def test_large_logs(self, api_logs):
+        api_logs["data"] = (LOG + "\n").encode() * 50
+        contents = make_pod().get_log_contents(
+            regex_replacer_patterns=REDACTIONS, filter_regex=r".*level=error.*", max_bytes=100_000
+        )
+        expected = reference_logs(api_logs["data"].decode(), REDACTIONS, None, r".*level=error.*")
+        assert len(contents) <= 100_000
+        assert expected.encode().endswith(contents)
+
+
+class TestFileBlockTruncation:
+    @pytest.mark.parametrize("max_bytes", [0, 5, 9, 10, 11, 100])
+    def test_removes_first_lines(self, max_bytes):
+        contents = b"line1\nline2\nline3"
+        truncated = FileBlock("pod.log", contents).truncate_content(max_bytes)
+        assert len(truncated) <= max_bytes
+        assert contents.endswith(truncated)
+        assert truncated == b"" or truncated.startswith(b"line")
+
+    def test_binary_files_not_truncated(self):
+        assert FileBlock("graph.png", b"x" * 100).truncate_content(10) == b"x" * 100
@@ -0,0 +1,133 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from robusta.core.model.base_params import PrometheusParams
+from robusta.core.playbooks.prometheus_enrichment_utils import run_prometheus_query, run_prometheus_query_range
+from robusta.integrations.prometheus import utils
+from robusta.integrations.prometheus.utils import PrometheusClientPool, get_prometheus_connect
+
+
+class FakePrometheus(ThreadingHTTPServer):
+    """Answers every query with an empty result, and counts the tcp connections and the requests made to it"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.connections = 0
+        self.paths = []
+        self.fail = False
+        super().__init__(("127.0.0.1", 0), FakePrometheusHandler)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakePrometheusHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.paths.append(self.path.split("?")[0])
+        if self.server.fail:
+            body = b"error"
+            self.send_response(500)
+        elif "query_range" in self.path:
+            body = json.dumps({"status": "success", "data": {"resultType": "matrix", "result": []}}).encode()
+            self.send_response(200)
+        else:
+            body = json.dumps({"status": "success", "data": {"resultType": "vector", "result": []}}).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def prometheus():
+    server = FakePrometheus()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    PrometheusClientPool.clear()
+    yield server
+    PrometheusClientPool.clear()
+    server.shutdown()
+    server.server_close()
+
+
+def query_count(server: FakePrometheus) -> int:
+    return sum(1 for path in server.paths if path.endswith("/query") or path.endswith("/query_range"))
+
+
+class TestPrometheusClientPool:
+    def test_same_params_same_client(self, prometheus):
+        params = PrometheusParams(prometheus_url=prometheus.url)
+        assert get_prometheus_connect(params) is get_prometheus_connect(params)
+
+    def test_different_params_different_clients(self, prometheus):
+        first = get_prometheus_connect(PrometheusParams(prometheus_url=prometheus.url))
+        assert first is not get_prometheus_connect(PrometheusParams(prometheus_url=prometheus.url + "/"))
+        assert first is not get_prometheus_connect(
+            PrometheusParams(prometheus_url=prometheus.url, prometheus_auth="Bearer a")
+        )
+        with_auth = get_prometheus_connect(PrometheusParams(prometheus_url=prometheus.url, prometheus_auth="Bearer b"))
+        assert with_auth is not get_prometheus_connect(
+            PrometheusParams(prometheus_url=prometheus.url, prometheus_auth="Bearer c")
+        )
+
+    def test_client_rebuilt_after_max_age(self, prometheus, monkeypatch):
+        params = PrometheusParams(prometheus_url=prometheus.url)
+        first = get_prometheus_connect(params)
+        monkeypatch.setattr(utils, "PROMETHEUS_CLIENT_MAX_AGE_SEC", 0)
+        assert get_prometheus_connect(params) is not first
+
+    def test_connections_and_health_checks_reused(self, prometheus):
+        params = PrometheusParams(prometheus_url=prometheus.url)
+        for _ in range(5):
+            run_prometheus_query(params, "up")
+            run_prometheus_query_range(params, "up", datetime.now() - timedelta(hours=1), datetime.now(), step=None)
+
+        # a single connection check, followed by the 10 queries
+        assert query_count(prometheus) == 11
+        assert prometheus.connections == 1
+
+    def test_failed_query_invalidates_health_check(self, prometheus):
+        params = PrometheusParams(prometheus_url=prometheus.url)
+        run_prometheus_query(params, "up")
+        prometheus.fail = True
+        with pytest.raises(Exception):
+            run_prometheus_query(params, "up")
+
+        prometheus.fail = False
+        run_prometheus_query(params, "up")
+        assert query_count(prometheus) == 5  # check, query, failed query, check, query
+
+    def test_session_reused_between_queries(self, prometheus):
+        params = PrometheusParams(prometheus_url=prometheus.url)
+        queries = 50
+        for _ in range(queries):
+            run_prometheus_query(params, "up")
+            PrometheusClientPool.clear()
+        assert prometheus.connections == queries
+
+        prometheus.connections = 0
+        client = get_prometheus_connect(params)
+        for _ in range(queries):
+            run_prometheus_query(params, "up")
+        assert get_prometheus_connect(params) is client
+        assert prometheus.connections == 1
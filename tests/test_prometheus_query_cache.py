@@ -0,0 +1,205 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+from urllib.parse import parse_qs
+
+import pytest
+from prometheus_client import REGISTRY
+
+from robusta.core.model.base_params import PrometheusParams
+from robusta.core.playbooks import prometheus_enrichment_utils
+from robusta.core.playbooks.prometheus_enrichment_utils import run_prometheus_query_range
+from robusta.core.playbooks.prometheus_query_cache import PrometheusQueryCache
+from robusta.integrations.prometheus.utils import PrometheusClientPool
+
+# an hour boundary in the past, so all the queried points are final
+BASE_TIME = datetime.fromtimestamp(1_700_002_800, tz=timezone.utc)
+HOUR = timedelta(hours=1)
+STEP = 15  # the step of one hour queries (3600 / 250 points, rounded up)
+
+
+class FakePrometheus(ThreadingHTTPServer):
+    """Answers range queries with two series, with the timestamp of each point as its value"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.ranges: List[Tuple[int, int, str]] = []  # (start, end, step) of each range query
+        self.sent_bytes = 0
+        super().__init__(("127.0.0.1", 0), FakePrometheusHandler)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakePrometheusHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode())
+        if self.path.endswith("/query_range"):
+            start, end, step = int(form["start"][0]), int(form["end"][0]), form["step"][0]
+            self.server.ranges.append((start, end, step))
+            step_sec = int(step[:-1]) * 60 if step.endswith("m") else max(int(float(step)), 1)
+            timestamps = range(start, end + 1, step_sec)
+            result = [
+                {"metric": {"pod": pod}, "values": [[timestamp, f"{timestamp}.{pod}"] for timestamp in timestamps]}
+                for pod in ["a", "b"]
+            ]
+            data = {"resultType": "matrix", "result": result}
+        else:
+            data = {"resultType": "vector", "result": []}
+        body = json.dumps({"status": "success", "data": data}).encode()
+        if self.path.endswith("/query_range"):
+            self.server.sent_bytes += len(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def prometheus():
+    server = FakePrometheus()
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    PrometheusClientPool.clear()
+    yield server
+    PrometheusClientPool.clear()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def query_cache(monkeypatch) -> PrometheusQueryCache:
+    cache = PrometheusQueryCache(max_bytes=10 * 1024 * 1024, ttl_sec=600, freshness_lag_sec=60)
+    monkeypatch.setattr(prometheus_enrichment_utils, "prometheus_query_cache", cache)
+    return cache
+
+
+def query(prometheus: FakePrometheus, starts_at: datetime, ends_at: datetime, promql: str = "up") -> List[dict]:
+    params = PrometheusParams(prometheus_url=prometheus.url)
+    return run_prometheus_query_range(params, promql, starts_at, ends_at, step=None).series_list_result
+
+
+def expected_series(start: datetime, end: datetime) -> List[dict]:
+    timestamps = [float(t) for t in range(int(start.timestamp()), int(end.timestamp()) + 1, STEP)]
+    return [
+        {"metric": {"pod": pod}, "timestamps": timestamps, "values": [f"{int(t)}.{pod}" for t in timestamps]}
+        for pod in ["a", "b"]
+    ]
+
+
+def sample(name: str, labels: dict = None) -> float:
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+class TestPrometheusQueryCache:
+    def test_same_query_served_from_cache(self, prometheus, query_cache):
+        first = query(prometheus, BASE_TIME - HOUR, BASE_TIME)
+        second = query(prometheus, BASE_TIME - HOUR, BASE_TIME)
+        assert first == second == expected_series(BASE_TIME - HOUR, BASE_TIME)
+        assert len(prometheus.ranges) == 1
+
+    def test_windows_snapped_to_grid(self, prometheus, query_cache):
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME)
+        result = query(prometheus, BASE_TIME - HOUR + timedelta(seconds=7), BASE_TIME + timedelta(seconds=7))
+        assert result == expected_series(BASE_TIME - HOUR, BASE_TIME)
+        assert prometheus.ranges == [(int((BASE_TIME - HOUR).timestamp()), int(BASE_TIME.timestamp()), str(STEP))]
+
+    def test_only_missing_tail_fetched(self, prometheus, query_cache):
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME)
+        later = BASE_TIME + timedelta(minutes=10)
+        result = query(prometheus, later - HOUR, later)
+
+        assert result == expected_series(later - HOUR, later)
+        tail_start, tail_end, _ = prometheus.ranges[-1]
+        assert (tail_start, tail_end) == (int(BASE_TIME.timestamp()) + STEP, int(later.timestamp()))
+
+    def test_different_queries_not_shared(self, prometheus, query_cache):
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME, promql="up")
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME, promql="down")
+        assert len(prometheus.ranges) == 2
+
+    def test_earlier_start_is_a_miss(self, prometheus, query_cache):
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME)
+        result = query(prometheus, BASE_TIME - HOUR - timedelta(minutes=5), BASE_TIME - timedelta(minutes=5))
+        assert result == expected_series(BASE_TIME - HOUR - timedelta(minutes=5), BASE_TIME - timedelta(minutes=5))
+        assert len(prometheus.ranges) == 2
+
+    def test_recent_points_fetched_again(self, prometheus, query_cache):
+        now = datetime.now(tz=timezone.utc)
+        query(prometheus, now - HOUR, now)
+        query(prometheus, now - HOUR, now)
+
+        first_end = prometheus.ranges[0][1]
+        tail_start, tail_end, _ = prometheus.ranges[1]
+        assert tail_end == first_end
+        # the points of the last freshness_lag_sec (rounded to the step) are fetched again
+        assert first_end - 60 - 2 * STEP <= tail_start <= first_end - 60 + STEP
+
+    def test_expired_range_fetched_again(self, prometheus, query_cache, monkeypatch):
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME)
+        monkeypatch.setattr(query_cache, "ttl_sec", 0)
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME)
+        assert len(prometheus.ranges) == 2
+
+    def test_memory_bound(self, prometheus, monkeypatch):
+        cache = PrometheusQueryCache(max_bytes=20_000, ttl_sec=600, freshness_lag_sec=60)
+        monkeypatch.setattr(prometheus_enrichment_utils, "prometheus_query_cache", cache)
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME, promql="first")  # about 13KB
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME, promql="second")  # evicts the first query
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME, promql="second")
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME, promql="first")
+        assert len(prometheus.ranges) == 3
+
+        result = query(prometheus, BASE_TIME - 24 * HOUR, BASE_TIME, promql="large")  # larger than the whole cache
+        assert result[0]["timestamps"][0] == (BASE_TIME - 24 * HOUR).timestamp()
+        query(prometheus, BASE_TIME - 24 * HOUR, BASE_TIME, promql="large")
+        assert len(prometheus.ranges) == 5
+
+    def test_step_not_in_seconds_bypasses_cache(self, prometheus, query_cache):
+        params = PrometheusParams(prometheus_url=prometheus.url)
+        for _ in range(2):
+            run_prometheus_query_range(params, "up", BASE_TIME - HOUR, BASE_TIME, step="5m")
+        assert len(prometheus.ranges) == 2
+
+    def test_metrics(self, prometheus, query_cache):
+        hits = sample("prometheus_query_cache_requests_total", {"result": "hit"})
+        partials = sample("prometheus_query_cache_requests_total", {"result": "partial"})
+        misses = sample("prometheus_query_cache_requests_total", {"result": "miss"})
+        saved = sample("prometheus_query_cache_saved_bytes_total")
+
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME)
+        query(prometheus, BASE_TIME - HOUR, BASE_TIME)
+        query(prometheus, BASE_TIME - HOUR + timedelta(minutes=5), BASE_TIME + timedelta(minutes=5))
+
+        assert sample("prometheus_query_cache_requests_total", {"result": "miss"}) == misses + 1
+        assert sample("prometheus_query_cache_requests_total", {"result": "hit"}) == hits + 1
+        assert sample("prometheus_query_cache_requests_total", {"result": "partial"}) == partials + 1
+        assert sample("prometheus_query_cache_saved_bytes_total") > saved
+
+    def test_alert_storm(self, prometheus, query_cache, monkeypatch):
+        # 10 alerts a minute, for 10 minutes, each with a one hour chart of the same pod
+        windows = [BASE_TIME + timedelta(seconds=6 * i) for i in range(100)]
+
+        monkeypatch.setattr(prometheus_enrichment_utils, "PROMETHEUS_QUERY_CACHE_ENABLED", False)
+        uncached_results = [query(prometheus, end - HOUR, end) for end in windows]
+        uncached_bytes = prometheus.sent_bytes
+
+        prometheus.sent_bytes = 0
+        monkeypatch.setattr(prometheus_enrichment_utils, "PROMETHEUS_QUERY_CACHE_ENABLED", True)
+        cached_results = [query(prometheus, end - HOUR, end) for end in windows]
+
+        assert len(uncached_results) == len(cached_results)
+        for end, result in zip(windows, cached_results):
+            snapped_end = datetime.fromtimestamp(end.timestamp() // STEP * STEP, tz=timezone.utc)
+            assert result == expected_series(snapped_end - HOUR, snapped_end)
+        assert prometheus.sent_bytes < uncached_bytes / 10
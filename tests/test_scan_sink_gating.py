@@ -78,14 +78,7 @@ def slack_sender_with_mock_client():
 
         def capture_upload(**kwargs):
             file_upload = kwargs["file_uploads"][0]
-            file_ref = file_upload["file"]
-            if isinstance(file_ref, str):
-                with open(file_ref, "rb") as f:
-                    contents = f.read()
-            else:
-                file_ref.seek(0)
-                contents = file_ref.read()
-            uploads.append({"filename": file_upload["filename"], "contents": contents})
+            uploads.append({"filename": file_upload["filename"], "contents": file_upload["content"]})
             return {"file": {"permalink": "https://files.slack.com/fake-permalink"}}
 
         client.files_upload_v2.side_effect = capture_upload
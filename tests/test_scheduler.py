@@ -0,0 +1,173 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+import pytest
+
+from robusta.core.schedule import scheduler
+from robusta.core.schedule.model import FixedDelayRepeat, JobState, ScheduledJob
+from robusta.core.schedule.scheduler import Scheduler
+from robusta.core.schedule.timer_dispatcher import TimerDispatcher
+
+NUM_JOBS = 10_000
+
+
+class InMemorySchedulerDal:
+    def __init__(self):
+        self.jobs: Dict[str, ScheduledJob] = {}
+
+    def save_scheduled_job(self, job: ScheduledJob):
+        self.jobs[job.job_id] = job
+
+    def get_scheduled_job(self, job_id: str) -> Optional[ScheduledJob]:
+        return self.jobs.get(job_id)
+
+    def del_scheduled_job(self, job_id: str):
+        self.jobs.pop(job_id, None)
+
+    def list_scheduled_jobs(self) -> List[ScheduledJob]:
+        return list(self.jobs.values())
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def record(executed: list):
+    return lambda value: executed.append(value)
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = TimerDispatcher(max_workers=4, name="test-scheduler")
+    yield dispatcher
+    dispatcher.stop()
+
+
+class TestTimerDispatcher:
+    def test_runs_in_due_time_order(self, dispatcher):
+        executed = []
+        for delay in [0.3, 0.1, 0.2]:
+            dispatcher.schedule(delay, record(executed), {"value": delay})
+
+        wait_for(lambda: len(executed) == 3)
+        assert executed == [0.1, 0.2, 0.3]
+
+    def test_cancel(self, dispatcher):
+        executed = []
+        cancelled = dispatcher.schedule(0.1, record(executed), {"value": "cancelled"})
+        dispatcher.schedule(0.2, record(executed), {"value": "kept"})
+        cancelled.cancel()
+
+        assert dispatcher.pending() == 1
+        wait_for(lambda: executed == ["kept"])
+        time.sleep(0.1)
+        assert executed == ["kept"]
+
+    def test_earlier_task_wakes_dispatcher(self, dispatcher):
+        executed = []
+        dispatcher.schedule(60, record(executed), {"value": "late"})
+        dispatcher.schedule(0.05, record(executed), {"value": "early"})
+
+        wait_for(lambda: executed == ["early"], timeout=1)
+
+    def test_failed_task_does_not_stop_dispatcher(self, dispatcher):
+        executed = []
+        dispatcher.schedule(0, lambda: 1 / 0)
+        dispatcher.schedule(0.05, record(executed), {"value": "ok"})
+
+        wait_for(lambda: executed == ["ok"])
+
+    def test_wall_clock_changes_ignored(self, dispatcher, monkeypatch):
+        executed = []
+        dispatcher.schedule(0.3, record(executed), {"value": "due"})
+        wall_clock = time.time
+        monkeypatch.setattr(time, "time", lambda: wall_clock() + 3600)
+        dispatcher.schedule(0, record(executed), {"value": "wake up"})
+
+        wait_for(lambda: executed == ["wake up"])
+        assert executed == ["wake up"]
+        wait_for(lambda: executed == ["wake up", "due"])
+
+    def test_10k_jobs(self, dispatcher):
+        lock = threading.Lock()
+        early = []
+        executed = []
+
+        def run(due_time: float):
+            with lock:
+                executed.append(due_time)
+                if time.monotonic() < due_time:
+                    early.append(due_time)
+
+        threads_before = threading.active_count()
+        start = time.monotonic()
+        for i in range(NUM_JOBS):
+            delay = 0.5 + (i % 100) / 100
+            dispatcher.schedule(delay, run, {"due_time": start + delay})
+        threads_after_schedule = threading.active_count()
+
+        wait_for(lambda: len(executed) == NUM_JOBS, timeout=30)
+        # a threading.Timer per job would have started NUM_JOBS threads
+        assert threads_after_schedule - threads_before <= 1
+        assert threading.active_count() - threads_before <= 4
+        assert early == []
+
+
+class TestScheduler:
+    @pytest.fixture(autouse=True)
+    def in_memory_dal(self, monkeypatch):
+        monkeypatch.setattr(scheduler, "SchedulerDal", InMemorySchedulerDal)
+        monkeypatch.setattr(scheduler, "INITIAL_SCHEDULE_DELAY_SEC", 0)
+
+    def make_scheduler(self, runs: list) -> Scheduler:
+        job_scheduler = Scheduler()
+        job_scheduler.register_task("test_task", lambda runnable_params, schedule_info: runs.append(schedule_info))
+        job_scheduler.init_scheduler()
+        return job_scheduler
+
+    @staticmethod
+    def make_job(job_id: str, repeat: int, seconds_delay: int = 0, replace_existing: bool = False) -> ScheduledJob:
+        return ScheduledJob(
+            job_id=job_id,
+            runnable_name="test_task",
+            runnable_params={},
+            state=JobState(),
+            scheduling_params=FixedDelayRepeat(repeat=repeat, seconds_delay=seconds_delay),
+            replace_existing=replace_existing,
+        )
+
+    def test_job_runs_and_reschedules(self):
+        runs = []
+        job_scheduler = self.make_scheduler(runs)
+        job_scheduler.schedule_job(self.make_job("repeat-3", repeat=3))
+
+        wait_for(lambda: not job_scheduler.is_scheduled("repeat-3"))
+        assert [schedule_info.execution_count for schedule_info in runs] == [0, 1, 2]
+        assert job_scheduler.dal.get_scheduled_job("repeat-3").state.exec_count == 3
+
+    def test_unschedule(self):
+        runs = []
+        job_scheduler = self.make_scheduler(runs)
+        job_scheduler.schedule_job(self.make_job("unscheduled", repeat=-1, seconds_delay=60))
+        wait_for(lambda: len(runs) == 1)
+
+        job_scheduler.unschedule_job("unscheduled")
+        assert not job_scheduler.is_scheduled("unscheduled")
+        assert job_scheduler.dal.get_scheduled_job("unscheduled") is None
+
+    def test_replace_existing(self, monkeypatch):
+        monkeypatch.setattr(scheduler, "INITIAL_SCHEDULE_DELAY_SEC", 60)
+        runs = []
+        job_scheduler = self.make_scheduler(runs)
+        job_scheduler.schedule_job(self.make_job("replaced", repeat=1))
+        first = job_scheduler.scheduled_jobs["replaced"]
+
+        job_scheduler.schedule_job(self.make_job("replaced", repeat=1, replace_existing=True))
+        assert first.cancelled
+        assert job_scheduler.scheduled_jobs["replaced"] is not first
+        job_scheduler.unschedule_job("replaced")
+        assert runs == []
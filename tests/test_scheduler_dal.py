@@ -0,0 +1,163 @@
+import time
+from typing import Dict, Optional, Tuple
+from unittest.mock import Mock
+
+import pytest
+from hikaru.model.rel_1_26 import ObjectMeta, OwnerReference
+
+from robusta.core.persistency.scheduled_jobs_states_dal import (
+    ConfigMapSchedulerBackend,
+    FileSchedulerBackend,
+    SchedulerBackend,
+    SchedulerDal,
+    StoreConflictError,
+)
+from robusta.core.schedule.model import FixedDelayRepeat, JobState, ScheduledJob
+from robusta.core.schedule.scheduler import Scheduler
+from robusta.integrations.kubernetes.autogenerated.v1.models import ConfigMap
+
+
+class CountingBackend(SchedulerBackend):
+    def __init__(self, backend: SchedulerBackend):
+        self.backend = backend
+        self.loads = 0
+        self.stores = 0
+
+    def load(self) -> Tuple[Dict[str, str], Optional[str]]:
+        self.loads += 1
+        return self.backend.load()
+
+    def store(self, jobs: Dict[str, str], version: Optional[str]) -> Optional[str]:
+        self.stores += 1
+        return self.backend.store(jobs, version)
+
+
+def make_job(job_id: str, exec_count: int = 0) -> ScheduledJob:
+    return ScheduledJob(
+        job_id=job_id,
+        runnable_name="task",
+        runnable_params={},
+        state=JobState(exec_count=exec_count),
+        scheduling_params=FixedDelayRepeat(seconds_delay=60),
+    )
+
+
+@pytest.fixture
+def backend(tmp_path) -> CountingBackend:
+    return CountingBackend(FileSchedulerBackend(str(tmp_path / "jobs.json")))
+
+
+class TestFileSchedulerBackend:
+    def test_version_conflict(self, tmp_path):
+        backend = FileSchedulerBackend(str(tmp_path / "jobs.json"))
+        jobs, version = backend.load()
+        assert jobs == {}
+
+        new_version = backend.store({"a": "1"}, version)
+        with pytest.raises(StoreConflictError):
+            backend.store({"a": "2"}, version)
+        assert backend.load() == ({"a": "1"}, new_version)
+
+
+class TestConfigMapSchedulerBackend:
+    def test_store_keeps_metadata(self, monkeypatch):
+        metadata = ObjectMeta(
+            name="scheduled-jobs",
+            namespace="robusta",
+            resourceVersion="1",
+            labels={"app": "robusta"},
+            annotations={"owner": "helm"},
+            ownerReferences=[OwnerReference(apiVersion="v1", kind="Deployment", name="runner", uid="u-1")],
+        )
+        stored = ConfigMap(metadata=metadata, data={"job": "old"})
+        replaced = []
+
+        def replace(conf_map: ConfigMap, name: str, namespace: str):
+            replaced.append(conf_map)
+            conf_map.metadata.resourceVersion = str(int(conf_map.metadata.resourceVersion) + 1)
+            return Mock(obj=conf_map)
+
+        monkeypatch.setattr(ConfigMap, "readNamespacedConfigMap", Mock(return_value=Mock(obj=stored)))
+        monkeypatch.setattr(ConfigMap, "replaceNamespacedConfigMap", replace)
+        backend = ConfigMapSchedulerBackend("scheduled-jobs", "robusta")
+
+        assert backend.load() == ({"job": "old"}, "1")
+        assert backend.store({"job": "new"}, "1") == "2"
+        assert replaced[0].data == {"job": "new"}
+        assert replaced[0].metadata.labels == {"app": "robusta"}
+        assert replaced[0].metadata.annotations == {"owner": "helm"}
+        assert replaced[0].metadata.ownerReferences[0].name == "runner"
+
+
+class TestSchedulerDal:
+    def test_list_is_a_single_read(self, backend):
+        dal = SchedulerDal(backend, flush_interval=0)
+        for i in range(50):
+            dal.save_scheduled_job(make_job(f"job-{i}"))
+
+        backend.loads = 0
+        jobs = dal.list_scheduled_jobs()
+        assert len(jobs) == 50
+        assert backend.loads == 1
+
+        assert dal.get_scheduled_job("job-7").job_id == "job-7"
+        assert dal.get_scheduled_job("missing") is None
+        assert backend.loads == 1
+
+    def test_write_behind_coalesces_saves(self, backend):
+        dal = SchedulerDal(backend, flush_interval=60)
+        for exec_count in range(100):
+            dal.save_scheduled_job(make_job("job", exec_count))
+        dal.save_scheduled_job(make_job("deleted"))
+        dal.del_scheduled_job("deleted")
+
+        assert backend.stores == 0
+        assert dal.get_scheduled_job("job").state.exec_count == 99
+        assert dal.get_scheduled_job("deleted") is None
+
+        dal.flush()
+        assert backend.stores == 1
+        reloaded = SchedulerDal(backend, flush_interval=0)
+        assert [job.job_id for job in reloaded.list_scheduled_jobs()] == ["job"]
+        assert reloaded.get_scheduled_job("job").state.exec_count == 99
+
+    def test_conflict_keeps_both_changes(self, backend):
+        dal = SchedulerDal(backend, flush_interval=60)
+        other_dal = SchedulerDal(backend, flush_interval=0)
+
+        other_dal.save_scheduled_job(make_job("other"))
+        dal.save_scheduled_job(make_job("local"))
+        dal.flush()
+
+        jobs = SchedulerDal(backend, flush_interval=0).list_scheduled_jobs()
+        assert sorted(job.job_id for job in jobs) == ["local", "other"]
+
+    def test_list_keeps_unflushed_changes(self, backend):
+        dal = SchedulerDal(backend, flush_interval=60)
+        other_dal = SchedulerDal(backend, flush_interval=0)
+        other_dal.save_scheduled_job(make_job("job", exec_count=1))
+
+        dal.save_scheduled_job(make_job("job", exec_count=5))
+        jobs = dal.list_scheduled_jobs()
+        assert [job.state.exec_count for job in jobs] == [5]
+
+    def test_periodic_flush(self, backend):
+        dal = SchedulerDal(backend, flush_interval=0.05)
+        dal.save_scheduled_job(make_job("a"))
+        dal.save_scheduled_job(make_job("b"))
+
+        deadline = time.time() + 5
+        while backend.stores == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert backend.stores == 1
+        assert len(SchedulerDal(backend, flush_interval=0).list_scheduled_jobs()) == 2
+
+    def test_scheduler_flush(self, backend):
+        dal = SchedulerDal(backend, flush_interval=60)
+        dal.save_scheduled_job(make_job("job", exec_count=3))
+        scheduler = Scheduler()
+        scheduler.dal = dal
+
+        scheduler.flush()
+        assert backend.stores == 1
+        assert SchedulerDal(backend, flush_interval=0).get_scheduled_job("job").state.exec_count == 3
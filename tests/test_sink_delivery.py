@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import defaultdict
+from unittest.mock import Mock
+
+import pytest
+
+from robusta.core.model.events import ExecutionBaseEvent
+from robusta.core.playbooks import playbooks_event_handler_impl
+from robusta.core.playbooks.playbooks_event_handler_impl import PlaybooksEventHandlerImpl
+from robusta.core.reporting import Finding
+from robusta.core.reporting.consts import SYNC_RESPONSE_SINK
+from robusta.core.sinks.sink_base_params import SinkDeliveryParams
+from robusta.core.sinks.sink_delivery import SinkDeliveryEngine
+from robusta.runner.telemetry import SinkInfo
+
+
+class FakeSink:
+    def __init__(
+        self,
+        name: str,
+        delay: float = 0,
+        stop: bool = False,
+        delivery: SinkDeliveryParams = None,
+        gate: threading.Event = None,
+    ):
+        self.sink_name = name
+        self.delay = delay
+        self.gate = gate  # when set, writes wait for it
+        self.params = Mock(stop=stop, delivery=delivery)
+        self.written = []
+        self.max_concurrent = 0
+        self.__concurrent = 0
+        self.__lock = threading.Lock()
+
+    def accepts(self, finding: Finding) -> bool:
+        return True
+
+    def write_finding(self, finding: Finding, platform_enabled: bool):
+        with self.__lock:
+            self.__concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.__concurrent)
+        if self.gate:
+            self.gate.wait(timeout=5)
+        time.sleep(self.delay)
+        with self.__lock:
+            self.__concurrent -= 1
+            self.written.append(finding.title)
+
+
+def make_handler(sinks) -> PlaybooksEventHandlerImpl:
+    registry = Mock()
+    registry.get_sinks().sinks = {sink.sink_name: sink for sink in sinks}
+    registry.get_sinks().platform_enabled = False
+    registry.get_telemetry().sinks_info = defaultdict(SinkInfo)
+    return PlaybooksEventHandlerImpl(registry)
+
+
+def make_event(sink_names, titles) -> ExecutionBaseEvent:
+    execution_event = ExecutionBaseEvent(named_sinks=sink_names)
+    for sink_name in sink_names:
+        for title in titles:
+            execution_event.sink_findings[sink_name].append(Finding(title=title, aggregation_key=title))
+    return execution_event
+
+
+def handle_findings(handler: PlaybooksEventHandlerImpl, execution_event: ExecutionBaseEvent):
+    handler._PlaybooksEventHandlerImpl__handle_findings(execution_event)
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+@pytest.fixture
+def async_delivery(monkeypatch):
+    monkeypatch.setattr(playbooks_event_handler_impl, "ASYNC_SINK_DELIVERY", True)
+
+
+class TestSinkDeliveryEngine:
+    def test_concurrency_limit(self):
+        engine = SinkDeliveryEngine()
+        sink = FakeSink("slow", delay=0.05)
+        params = SinkDeliveryParams(workers=3, queue_size=100, timeout_sec=60)
+        for i in range(12):
+            engine.add_task(
+                sink.sink_name, params, sink.write_finding, Finding(title=str(i), aggregation_key="a"), False
+            )
+
+        engine.stop(timeout=5)
+        assert len(sink.written) == 12
+        assert sink.max_concurrent == 3
+
+    def test_delivered_in_order_by_default(self):
+        engine = SinkDeliveryEngine()
+        sink = FakeSink("slack")
+        params = SinkDeliveryParams()
+        for i in range(20):
+            engine.add_task(
+                sink.sink_name, params, sink.write_finding, Finding(title=str(i), aggregation_key="a"), False
+            )
+
+        engine.stop(timeout=5)
+        assert sink.written == [str(i) for i in range(20)]
+        assert sink.max_concurrent == 1
+
+    def test_queue_full_drops(self):
+        engine = SinkDeliveryEngine()
+        sink = FakeSink("slow", delay=0.2)
+        params = SinkDeliveryParams(workers=1, queue_size=2, timeout_sec=60)
+        results = [
+            engine.add_task(
+                sink.sink_name, params, sink.write_finding, Finding(title=str(i), aggregation_key="a"), False
+            )
+            for i in range(10)
+        ]
+
+        engine.stop(timeout=5)
+        assert not all(results)
+        assert len(sink.written) == sum(results)
+
+    def test_expired_findings_are_dropped(self):
+        engine = SinkDeliveryEngine()
+        sink = FakeSink("slow", delay=1.1)
+        params = SinkDeliveryParams(workers=1, queue_size=10, timeout_sec=1)
+        for i in range(3):
+            engine.add_task(
+                sink.sink_name, params, sink.write_finding, Finding(title=str(i), aggregation_key="a"), False
+            )
+
+        engine.stop(timeout=5)
+        assert sink.written == ["0"]
+
+
+class TestAsyncFindingsDelivery:
+    def test_slow_sink_does_not_block(self, async_delivery):
+        gate = threading.Event()
+        slow = FakeSink("jira", gate=gate)
+        fast = FakeSink("slack")
+        handler = make_handler([slow, fast])
+
+        handle_findings(handler, make_event(["jira", "slack"], ["oom"]))
+        assert slow.written == []
+
+        wait_for(lambda: fast.written == ["oom"])
+        assert slow.written == []
+        gate.set()
+        wait_for(lambda: slow.written == ["oom"])
+        assert handler.registry.get_telemetry().sinks_info["jira"].findings_count == 1
+
+    def test_stop_is_respected(self, async_delivery):
+        stopping = FakeSink("first", stop=True)
+        other = FakeSink("second")
+        handler = make_handler([stopping, other])
+
+        handle_findings(handler, make_event(["first", "second"], ["a", "b"]))
+        handler.sink_delivery.stop(timeout=5)
+
+        assert stopping.written == ["a"]
+        assert other.written == []
+
+    def test_sync_response_findings_are_not_delivered(self, async_delivery):
+        sink = FakeSink("slack")
+        handler = make_handler([sink])
+
+        execution_event = make_event(["slack", SYNC_RESPONSE_SINK], ["a"])
+        handle_findings(handler, execution_event)
+        handler.sink_delivery.stop(timeout=5)
+
+        assert sink.written == ["a"]
+        assert len(execution_event.sink_findings[SYNC_RESPONSE_SINK]) == 1
+
+    def test_sync_delivery(self):
+        sink = FakeSink("slack", delay=0.1)
+        handler = make_handler([sink])
+
+        handle_findings(handler, make_event(["slack"], ["a", "b"]))
+        assert sink.written == ["a", "b"]
@@ -0,0 +1,154 @@
+import threading
+import time
+from typing import Optional
+from unittest.mock import MagicMock, patch
+
+import pytest
+from prometheus_client import REGISTRY
+
+from robusta.core.reporting.blocks import FileBlock
+from robusta.integrations.slack.upload_cache import SlackUploadCache
+
+UPLOAD_LATENCY_SEC = 0.05
+
+
+def uploaded_bytes(result: str) -> float:
+    return REGISTRY.get_sample_value("slack_file_upload_bytes_total", {"result": result}) or 0
+
+
+class FakeSlackWorkspace:
+    """Records the files_upload_v2 calls of the senders, each upload takes UPLOAD_LATENCY_SEC"""
+
+    def __init__(self):
+        self.uploads = []
+        self.lock = threading.Lock()
+        self.fail = False
+        self.barrier: Optional[threading.Barrier] = None  # when set, uploads wait for each other
+
+    def client(self, token: str) -> MagicMock:
+        client = MagicMock()
+        client.token = token
+
+        def upload(**kwargs):
+            if self.barrier:
+                self.barrier.wait()
+            time.sleep(UPLOAD_LATENCY_SEC)
+            if self.fail:
+                raise Exception("upload failed")
+            file_upload = kwargs["file_uploads"][0]
+            with self.lock:
+                self.uploads.append((token, file_upload["filename"], file_upload["content"]))
+                return {"file": {"permalink": f"https://files.slack.com/{token}/{len(self.uploads)}"}}
+
+        client.files_upload_v2.side_effect = upload
+        return client
+
+
+@pytest.fixture
+def workspace():
+    workspace = FakeSlackWorkspace()
+    with patch("robusta.integrations.slack.sender.WebClient") as web_client:
+        from robusta.integrations.slack.sender import SlackSender
+
+        web_client.side_effect = lambda token, **kwargs: workspace.client(token)
+        with patch.object(SlackSender, "upload_cache", SlackUploadCache(ttl_sec=60)):
+            yield workspace
+
+
+def make_sender(token: str = "xoxb-1", channel: str = "alerts"):
+    from robusta.integrations.slack.sender import SlackSender
+
+    return SlackSender(token, "account", "cluster", "key", channel, registry=None)
+
+
+def make_files():
+    return [
+        FileBlock("graph.png", b"\x89PNG" + b"1" * 1000),
+        FileBlock("empty.log", b""),
+        FileBlock("pod.log", b"log line\n" * 100),
+    ]
+
+
+class TestSlackFileUploads:
+    def test_same_files_uploaded_once_for_all_sinks(self, workspace):
+        reused_before = uploaded_bytes("reused")
+        texts = [make_sender(channel=channel).prepare_slack_text("msg", 1000, make_files()) for channel in ["a", "b"]]
+
+        assert sorted((filename, len(content)) for _, filename, content in workspace.uploads) == [
+            ("graph.png", 1004),
+            ("pod.log", 900),
+        ]
+        assert texts[0] == texts[1]
+        message, error = texts[0]
+        assert error is None
+        # the files are referenced in their order, even though they're uploaded concurrently
+        assert message.index("graph.png") < message.index("pod.log")
+        assert "empty.log" not in message
+        assert uploaded_bytes("reused") - reused_before == 1904
+
+    def test_files_uploaded_concurrently(self, workspace):
+        # the uploads only pass the barrier when all 4 run at the same time
+        workspace.barrier = threading.Barrier(4, timeout=5)
+        files = [FileBlock(f"file-{i}.log", f"content {i}".encode()) for i in range(4)]
+        message, error = make_sender().prepare_slack_text("msg", 1000, files)
+        assert error is None
+        assert len(workspace.uploads) == 4
+
+    def test_other_workspaces_upload_again(self, workspace):
+        make_sender("xoxb-1").prepare_slack_text("msg", 1000, make_files())
+        message, _ = make_sender("xoxb-2").prepare_slack_text("msg", 1000, make_files())
+        assert len(workspace.uploads) == 4
+        assert "https://files.slack.com/xoxb-2/" in message
+
+    def test_changed_content_uploaded_again(self, workspace):
+        sender = make_sender()
+        sender.prepare_slack_text("msg", 1000, [FileBlock("pod.log", b"first")])
+        sender.prepare_slack_text("msg", 1000, [FileBlock("pod.log", b"second")])
+        assert [content for _, _, content in workspace.uploads] == [b"first", b"second"]
+
+    def test_failed_upload_not_cached(self, workspace):
+        sender = make_sender()
+        workspace.fail = True
+        message, error = sender.prepare_slack_text("msg", 1000, make_files())
+        assert "graph.png" in error and "pod.log" in error
+
+        workspace.fail = False
+        message, error = sender.prepare_slack_text("msg", 1000, make_files())
+        assert error is None
+        assert len(workspace.uploads) == 2
+
+
+class TestSlackUploadCache:
+    def test_concurrent_uploads_of_same_file(self):
+        cache = SlackUploadCache(ttl_sec=60)
+        uploads = []
+
+        def upload():
+            uploads.append(1)
+            time.sleep(UPLOAD_LATENCY_SEC)
+            return "https://files.slack.com/1"
+
+        threads = [
+            threading.Thread(target=cache.get_permalink, args=("xoxb-1", b"content", "pod.log", upload))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(uploads) == 1
+
+    def test_expired(self):
+        cache = SlackUploadCache(ttl_sec=0.01)
+        uploads = []
+        cache.get_permalink("xoxb-1", b"content", "pod.log", lambda: uploads.append(1) or "link")
+        time.sleep(0.02)
+        cache.get_permalink("xoxb-1", b"content", "pod.log", lambda: uploads.append(1) or "link")
+        assert len(uploads) == 2
+
+    def test_disabled(self):
+        cache = SlackUploadCache(ttl_sec=0)
+        uploads = []
+        for _ in range(2):
+            cache.get_permalink("xoxb-1", b"content", "pod.log", lambda: uploads.append(1) or "link")
+        assert len(uploads) == 2
@@ -0,0 +1,316 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, NamedTuple
+from unittest.mock import MagicMock
+from urllib.parse import parse_qsl, urlparse
+
+import httpx
+import pytest
+from postgrest import SyncPostgrestClient
+
+from robusta.core.sinks.robusta.dal.write_batcher import SupabaseWriteBatcher
+
+
+class PostgrestRequest(NamedTuple):
+    method: str
+    table: str
+    params: dict
+    prefer: str
+    rows: list
+    status: int
+
+
+class FakePostgrest:
+    """Records the PostgREST requests. Rejects rows with an `invalid` column, and fails the next `failures` requests"""
+
+    def __init__(self, latency_sec: float = 0):
+        self.requests: List[PostgrestRequest] = []
+        self.failures = 0
+        self.latency_sec = latency_sec
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                self.handle_request()
+
+            def do_DELETE(self):
+                self.handle_request()
+
+            def handle_request(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else []
+                url = urlparse(self.path)
+                rows = body if isinstance(body, list) else [body]
+                time.sleep(fake.latency_sec)
+                with fake.lock:
+                    if fake.failures > 0:
+                        fake.failures -= 1
+                        status, response = 503, b"unavailable"
+                    elif any("invalid" in row for row in rows):
+                        status, response = 400, json.dumps({"code": "22P02", "message": "invalid row"}).encode()
+                    else:
+                        status, response = 201, b""
+                    fake.requests.append(
+                        PostgrestRequest(
+                            self.command,
+                            url.path.split("/")[-1],
+                            dict(parse_qsl(url.query)),
+                            self.headers.get("Prefer", ""),
+                            rows,
+                            status,
+                        )
+                    )
+                self.reply(status, response)
+
+            def reply(self, status: int, body: bytes):
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = SyncPostgrestClient(f"http://127.0.0.1:{self.server.server_port}/rest/v1")
+
+    def written_rows(self, table: str) -> list:
+        rows = []
+        for request in self.requests:
+            if request.method == "POST" and request.table == table and request.status == 201:
+                rows.extend(request.rows)
+        return rows
+
+    def writes(self) -> List[PostgrestRequest]:
+        return [request for request in self.requests if request.method == "POST"]
+
+
+@pytest.fixture
+def postgrest():
+    fake = FakePostgrest()
+    yield fake
+    fake.server.shutdown()
+
+
+def make_batcher(postgrest: FakePostgrest, **kwargs) -> SupabaseWriteBatcher:
+    params = dict(window_sec=60, max_batch_rows=10, max_pending_rows=1000, retries=2, retry_backoff_sec=0.001)
+    params.update(kwargs)
+    return SupabaseWriteBatcher(postgrest.client, **params)
+
+
+def finding(i: int) -> dict:
+    return {"id": str(i), "title": f"finding {i}"}
+
+
+class TestSupabaseWriteBatcher:
+    def test_inserts_written_in_bulk(self, postgrest):
+        batcher = make_batcher(postgrest)
+        for i in range(25):
+            batcher.insert("Evidence", [{"issue_id": str(i)}])
+            batcher.insert("Issues", [finding(i)])
+        assert postgrest.requests == []
+
+        batcher.flush()
+        # evidence first, in batches of max_batch_rows
+        assert [(request.table, len(request.rows)) for request in postgrest.writes()] == [
+            ("Evidence", 10),
+            ("Evidence", 10),
+            ("Evidence", 5),
+            ("Issues", 10),
+            ("Issues", 10),
+            ("Issues", 5),
+        ]
+        assert postgrest.written_rows("Issues") == [finding(i) for i in range(25)]
+        assert "return=minimal" in postgrest.requests[0].prefer
+        assert batcher.pending_rows() == 0
+
+    def test_evidence_written_before_issues(self, postgrest):
+        batcher = make_batcher(postgrest, table_order=("Evidence", "Issues"))
+        # the first finding has no enrichments, so its issue is added before any evidence
+        batcher.insert("Evidence", [])
+        batcher.insert("Issues", [finding(1)])
+        batcher.insert("Evidence", [{"issue_id": "2"}])
+        batcher.insert("Issues", [finding(2)])
+        batcher.insert("Services", [{"name": "api"}])
+
+        batcher.flush()
+        assert [(request.table, request.rows) for request in postgrest.writes()] == [
+            ("Evidence", [{"issue_id": "2"}]),
+            ("Issues", [finding(1), finding(2)]),
+            ("Services", [{"name": "api"}]),
+        ]
+
+    def test_upserts_coalesced_by_key(self, postgrest):
+        batcher = make_batcher(postgrest)
+        for version in range(5):
+            batcher.upsert(
+                "Services",
+                [{"service_key": "default/Deployment/api", "version": version}],
+                key=lambda row: row["service_key"],
+            )
+            batcher.upsert(
+                "Services",
+                [{"service_key": "default/Deployment/db", "version": version}],
+                key=lambda row: row["service_key"],
+            )
+        batcher.upsert(
+            "Services", [{"service_key": "default/Deployment/api", "version": 10}], key=lambda row: row["service_key"]
+        )
+
+        batcher.flush()
+        requests = postgrest.writes()
+        assert len(requests) == 1
+        assert "resolution=merge-duplicates" in requests[0].prefer
+        assert postgrest.written_rows("Services") == [
+            {"service_key": "default/Deployment/api", "version": 10},
+            {"service_key": "default/Deployment/db", "version": 4},
+        ]
+
+    def test_rows_grouped_by_columns(self, postgrest):
+        # missing columns would be written as nulls instead of the column defaults
+        batcher = make_batcher(postgrest)
+        batcher.insert("Issues", [finding(1), {**finding(2), "fingerprint": "abc"}, finding(3)])
+        batcher.flush()
+        assert [len(request.rows) for request in postgrest.writes()] == [2, 1]
+
+    def test_flushed_after_window(self, postgrest):
+        batcher = make_batcher(postgrest, window_sec=0.05)
+        batcher.insert("Issues", [finding(1)])
+        batcher.insert("Issues", [finding(2)])
+        assert postgrest.requests == []
+        time.sleep(0.3)
+        assert postgrest.written_rows("Issues") == [finding(1), finding(2)]
+        assert len(postgrest.writes()) == 1
+
+    def test_flushed_when_batch_full(self, postgrest):
+        batcher = make_batcher(postgrest)
+        batcher.insert("Issues", [finding(i) for i in range(10)])
+        time.sleep(0.3)
+        assert len(postgrest.written_rows("Issues")) == 10
+
+    def test_pending_rows_bounded(self, postgrest):
+        batcher = make_batcher(postgrest, max_batch_rows=1000, max_pending_rows=50)
+        for i in range(120):
+            batcher.insert("Issues", [finding(i)])
+            assert batcher.pending_rows() < 50
+        assert len(postgrest.written_rows("Issues")) == 100
+
+    def test_synchronous_when_disabled(self, postgrest):
+        batcher = make_batcher(postgrest, window_sec=0)
+        batcher.insert("Issues", [finding(1)])
+        assert postgrest.written_rows("Issues") == [finding(1)]
+
+    def test_failed_requests_retried(self, postgrest):
+        batcher = make_batcher(postgrest)
+        postgrest.failures = 2
+        batcher.insert("Issues", [finding(1), finding(2)])
+        batcher.flush()
+        assert len(postgrest.writes()) == 3
+        assert postgrest.written_rows("Issues") == [finding(1), finding(2)]
+
+    def test_invalid_row_doesnt_drop_batch(self, postgrest):
+        failures = []
+        batcher = make_batcher(postgrest)
+        rows = [{"service_key": "a"}, {"service_key": "b", "invalid": True}, {"service_key": "c"}]
+        batcher.upsert("Services", rows[:1], key=lambda row: row["service_key"], on_failure=lambda: failures.append(1))
+        batcher.upsert("Services", rows[1:], key=lambda row: row["service_key"], on_failure=lambda: failures.append(2))
+        batcher.flush()
+
+        assert postgrest.written_rows("Services") == [{"service_key": "a"}, {"service_key": "c"}]
+        assert failures == [2]
+        # rejected rows are not retried
+        assert len([request for request in postgrest.writes() if len(request.rows) > 1]) == 1
+
+    def test_flushed_on_stop(self, postgrest):
+        batcher = make_batcher(postgrest, window_sec=600)
+        batcher.insert("Issues", [finding(1)])
+        batcher.stop()
+        assert postgrest.written_rows("Issues") == [finding(1)]
+
+        batcher.insert("Issues", [finding(2)])  # written synchronously after stop
+        assert postgrest.written_rows("Issues") == [finding(1), finding(2)]
+
+    def test_deletes_use_in_filters(self, postgrest):
+        batcher = make_batcher(postgrest, delete_batch_size=2)
+        batcher.upsert("Services", [{"service_key": "default/Pod/x"}], key=lambda row: row["service_key"])
+        batcher.delete_in(
+            "Services",
+            "service_key",
+            ["default/Pod/a", "default/Pod/b,c", "default/Pod/d"],
+            {"account_id": "acc", "cluster": "prod"},
+        )
+        deletes = [request for request in postgrest.requests if request.method == "DELETE"]
+        assert [request.params for request in deletes] == [
+            {"account_id": "eq.acc", "cluster": "eq.prod", "service_key": 'in.(default/Pod/a,"default/Pod/b,c")'},
+            {"account_id": "eq.acc", "cluster": "eq.prod", "service_key": "in.(default/Pod/d)"},
+        ]
+        # the pending upsert is written before the deletes
+        assert postgrest.requests[0].method == "POST"
+
+    def test_sent_inserts_not_retried(self):
+        client = MagicMock()
+        client.table().insert().execute.side_effect = httpx.ReadTimeout("timed out")
+        client.table().upsert().execute.side_effect = httpx.ReadTimeout("timed out")
+        batcher = SupabaseWriteBatcher(client, window_sec=0, retries=2, retry_backoff_sec=0.001)
+
+        # the server may have written the rows before the timeout, inserting them again would duplicate them
+        batcher.insert("Evidence", [{"issue_id": "1"}])
+        assert client.table().insert().execute.call_count == 1
+        batcher.upsert("Services", [{"service_key": "a"}], key=lambda row: row["service_key"])
+        assert client.table().upsert().execute.call_count == 3
+
+    def test_unsent_inserts_retried(self):
+        client = MagicMock()
+        client.table().insert().execute.side_effect = [httpx.ConnectError("refused"), None]
+        batcher = SupabaseWriteBatcher(client, window_sec=0, retries=2, retry_backoff_sec=0.001)
+        batcher.insert("Evidence", [{"issue_id": "1"}])
+        assert client.table().insert().execute.call_count == 2
+
+    def test_failure_callbacks_run_outside_flush(self, postgrest):
+        batcher = make_batcher(postgrest)
+        lock = threading.Lock()
+        flushed_with_lock = threading.Event()
+        acquired = []
+
+        def flush_holding_lock():
+            with lock:
+                batcher.flush()
+            flushed_with_lock.set()
+
+        def on_failure():
+            # a thread holding the lock waits for this flush, like publish_services waits for the sink caches reset
+            thread = threading.Thread(target=flush_holding_lock)
+            thread.start()
+            time.sleep(0.05)
+            acquired.append(lock.acquire(timeout=2))
+            if acquired[-1]:
+                lock.release()
+
+        batcher.insert("Issues", [{"invalid": True}], on_failure=on_failure)
+        batcher.flush()
+        assert flushed_with_lock.wait(timeout=5)
+        assert acquired == [True]
+
+    def test_batching_reduces_requests(self):
+        findings = 200
+        requests = {}
+        for window_sec in [0, 0.05]:
+            postgrest = FakePostgrest(latency_sec=0.002)
+            batcher = make_batcher(postgrest, window_sec=window_sec, max_batch_rows=100)
+            for i in range(findings):
+                batcher.insert("Evidence", [{"issue_id": str(i)}, {"issue_id": str(i)}])
+                batcher.insert("Issues", [finding(i)])
+            batcher.stop()
+            requests[window_sec] = len(postgrest.requests)
+            assert len(postgrest.written_rows("Issues")) == findings
+            postgrest.server.shutdown()
+
+        assert requests[0] == 2 * findings
+        assert requests[0.05] < requests[0]
@@ -0,0 +1,84 @@
+import random
+import string
+from typing import List, Optional
+
+from robusta.core.discovery.top_service_resolver import TopLevelResource, TopServiceResolver
+
+
+def linear_longest_match(resources: List[TopLevelResource], name: str) -> Optional[TopLevelResource]:
+    # the previous implementation, kept as a reference for the trie lookups
+    longest_match = None
+    max_length = -1
+    for cached_resource in resources:
+        if name.startswith(cached_resource.name):
+            if len(cached_resource.name) > max_length:
+                longest_match = cached_resource
+                max_length = len(cached_resource.name)
+    return longest_match
+
+
+def random_resources(rand: random.Random, namespace: str, count: int) -> List[TopLevelResource]:
+    resources = []
+    for _ in range(count):
+        name = "-".join("".join(rand.choices(string.ascii_lowercase, k=rand.randint(2, 5))) for _ in range(3))
+        resources.append(TopLevelResource(name=name, namespace=namespace, resource_type="Deployment"))
+    return resources
+
+
+def pod_name(rand: random.Random, resource: TopLevelResource) -> str:
+    return f"{resource.name}-{rand.randint(1000, 9999)}-{''.join(rand.choices(string.ascii_lowercase, k=5))}"
+
+
+class TestTopServiceResolver:
+    def test_longest_match(self):
+        resources = [
+            TopLevelResource(name="api", namespace="ns-longest", resource_type="Deployment"),
+            TopLevelResource(name="api-server", namespace="ns-longest", resource_type="Deployment"),
+            TopLevelResource(name="api-server", namespace="ns-longest", resource_type="StatefulSet"),
+            TopLevelResource(name="web", namespace="ns-other", resource_type="Deployment"),
+        ]
+        TopServiceResolver.store_cached_resources(resources)
+
+        assert TopServiceResolver.guess_cached_resource("api-server-1234", "ns-longest") == resources[1]
+        assert TopServiceResolver.guess_cached_resource("api-1234", "ns-longest") == resources[0]
+        assert TopServiceResolver.guess_cached_resource("web-1234", "ns-longest") is None
+        assert TopServiceResolver.guess_cached_resource("web-1234", "ns-missing") is None
+        assert TopServiceResolver.guess_cached_resource(None, "ns-longest") is None
+        assert TopServiceResolver.guess_service_key("web-1", "ns-other") == "ns-other/Deployment/web"
+
+    def test_add_cached_resource(self):
+        TopServiceResolver.store_cached_resources(
+            [TopLevelResource(name="api", namespace="ns-added", resource_type="Deployment")]
+        )
+        added = TopLevelResource(name="api-v2", namespace="ns-added", resource_type="Deployment")
+        TopServiceResolver.add_cached_resource(added)
+        assert TopServiceResolver.guess_cached_resource("api-v2-1234", "ns-added") == added
+
+        # recent updates are kept when the cache is rebuilt from the api server
+        TopServiceResolver.store_cached_resources([])
+        assert TopServiceResolver.guess_cached_resource("api-v2-1234", "ns-added") == added
+        assert TopServiceResolver.guess_cached_resource("api-1234", "ns-added") is None
+
+    def test_same_result_as_linear_scan(self):
+        rand = random.Random(1)
+        resources = random_resources(rand, "ns-linear", 2000)
+        # add prefixes of existing names, to have multiple candidates for the same name
+        resources += [
+            TopLevelResource(
+                name=resource.name[: rand.randint(1, len(resource.name))], namespace="ns-linear", resource_type="Job"
+            )
+            for resource in resources[:500]
+        ]
+        TopServiceResolver.store_cached_resources(resources)
+
+        names = [pod_name(rand, rand.choice(resources)) for _ in range(1000)] + ["", "zzz", "a"]
+        for name in names:
+            assert TopServiceResolver.guess_cached_resource(name, "ns-linear") == linear_longest_match(resources, name)
+
+    def test_10k_resources_per_namespace(self):
+        rand = random.Random(0)
+        resources = random_resources(rand, "ns-large", 10_000)
+        TopServiceResolver.store_cached_resources(resources)
+
+        for name in [pod_name(rand, rand.choice(resources)) for _ in range(200)]:
+            assert TopServiceResolver.guess_cached_resource(name, "ns-large") == linear_longest_match(resources, name)